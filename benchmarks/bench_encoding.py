@@ -0,0 +1,101 @@
+# benchmarks/bench_encoding.py
+"""
+Encode time and payload size of tool results per data type.
+
+For each admin data type, builds the result a data tool returns for a
+multi-year district window (stand-in records, see standin_server.py),
+padded with `--sparse-fields` extra fields that are null in 95% of the
+records, like the mostly empty metadata columns of some WRIS datasets.
+It then compares:
+
+- json: the unslimmed result through `json.dumps`, as before
+- slim: `slim_records` on the records and the batch the tools build anyway
+- encode: the slimmed result through `encode` (orjson when installed)
+- hit: `encode` of a result rebuilt from a response-cache entry whose
+  bytes are already known
+
+    python -m benchmarks.bench_encoding [--start 2015-01-01] [--end 2024-12-31] [--sparse-fields 4]
+"""
+
+import argparse
+import copy
+import json
+import os
+import time
+
+os.environ.setdefault('WRIS_PREFETCH', '0')
+
+import numpy as np
+
+from ingress_agent.tools.common import _rehydrate, _envelope
+from ingress_agent.utils.record_batch import RecordBatch
+from ingress_agent.utils.response_cache import CacheEntry
+from ingress_agent.utils.result_encoding import encode, orjson, slim_records
+from ingress_agent.utils.wris_client import ADMIN_ENDPOINT_MAP
+
+from benchmarks.standin_server import synthetic_records
+
+
+def _time(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def _records(path, start, end, sparse_fields):
+    records = synthetic_records(path, {'startdate': start, 'enddate': end, 'districtName': 'Pune'})
+    rng = np.random.default_rng(0)
+    for i in range(sparse_fields):
+        filled = rng.random(len(records)) < 0.05
+        for record, has in zip(records, filled):
+            record[f'extra{i}'] = 'value' if has else None
+    return records
+
+
+def _result(records):
+    return {"status": "success", "data": {"content": records, "totalElements": len(records)},
+            "total_records": len(records), "summary": f"Retrieved data. Total records: {len(records)}"}
+
+
+def run(start, end, sparse_fields):
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson is not None else 'json (orjson not installed)'}")
+    print(f"{'data type':<24} {'records':>7} {'json KB':>8} {'slim KB':>8} {'json ms':>8} {'slim ms':>8} "
+          f"{'encode ms':>9} {'hit ms':>7}")
+    for data_type, path in ADMIN_ENDPOINT_MAP.items():
+        records = _records(path, start, end, sparse_fields)
+        baseline = _result(records)
+        json_seconds, json_bytes = _time(lambda: json.dumps(baseline, default=str).encode())
+
+        # The tools build the batch anyway; slimming works from it
+        batch = RecordBatch.from_records(records)
+        copies = iter([copy.deepcopy(records) for _ in range(5)])
+        slim_seconds, _ = _time(lambda: slim_records(next(copies), batch))
+        slimmed = copy.deepcopy(records)
+        slim_records(slimmed, batch)
+        encode_seconds, slim_bytes = _time(lambda: encode(_result(slimmed)))
+
+        # A cache hit: the result is rebuilt from the entry, whose bytes are known
+        entry = CacheEntry(_envelope(baseline), batch.compact(), float('inf'))
+        encode(_rehydrate(entry))
+        hit = _rehydrate(entry)
+        hit_seconds, _ = _time(lambda: encode(hit))
+
+        print(f"{data_type:<24} {len(records):>7} {len(json_bytes) / 1024:>8.1f} {len(slim_bytes) / 1024:>8.1f} "
+              f"{json_seconds * 1000:>8.2f} {slim_seconds * 1000:>8.2f} {encode_seconds * 1000:>9.2f} "
+              f"{hit_seconds * 1000:>7.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--start', default='2015-01-01')
+    parser.add_argument('--end', default='2024-12-31')
+    parser.add_argument('--sparse-fields', type=int, default=4, help='extra fields, null in 95%% of records')
+    args = parser.parse_args()
+    run(args.start, args.end, args.sparse_fields)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_page_size.py
+"""
+Fixed versus tuned page sizes for paginated bulk exports.
+
+Starts the stand-in WRIS server with a per-request latency, a per-record
+cost, an overload point past which records cost more, and a page size
+above which requests fail. Several exporter threads then pull multi-decade
+district series through one `WRISClient` sharing a scheduler, first at
+each fixed page size, then with a `PageSizeTuner`. The tuner runs once
+from scratch, then again from the sizes the first run persisted.
+
+Reported per run: records per second across all exporters, upstream
+requests, failed exports, and the page size the tuner settled on.
+
+    python -m benchmarks.bench_page_size [--exports 24] [--exporters 8] [--latency 0.15]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import queue
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('WRIS_PREFETCH', '0')
+
+from ingress_agent.utils import wris_client
+from ingress_agent.utils.constants import STATES_DISTRICTS
+from ingress_agent.utils.page_tuner import PageSizeTuner
+from ingress_agent.utils.scheduler import FairScheduler
+
+from benchmarks import standin_server
+
+FIXED_SIZES = (100, 250, 500, 1000, 2500, 5000)
+START_DATE, END_DATE = '1995-01-01', '2024-12-31'
+
+
+def _places(count):
+    places = [(state, district) for state, districts in STATES_DISTRICTS.items() for district in districts]
+    return places[:count]
+
+
+def run_once(label, base_url, upstream, places, exporters, concurrency, tuner=None, fixed_size=None):
+    if fixed_size is not None:
+        wris_client.BULK_PAGE_SIZE = fixed_size
+    client = wris_client.WRISClient(base_url=base_url, scheduler=FairScheduler(max_concurrency=concurrency),
+                                    page_tuner=tuner)
+    work = queue.Queue()
+    for place in places:
+        work.put(place)
+    records, failures, lock = [0], [0], threading.Lock()
+
+    def exporter():
+        while True:
+            try:
+                state, district = work.get_nowait()
+            except queue.Empty:
+                return
+            result = client.bulk_export_admin_hierarchy_data('rainfall', state, district, 'CWC',
+                                                             START_DATE, END_DATE)
+            with lock:
+                if result.get('status') == 'success':
+                    records[0] += result['total_records']
+                else:
+                    failures[0] += 1
+
+    before = upstream.requests
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        threads = [threading.Thread(target=exporter) for _ in range(exporters)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+    settled = ', '.join(str(s) for k, s in tuner.sizes().items() if k.startswith('bulk ')) if tuner else '-'
+    print(f"{label:<22} {records[0] / elapsed:>10.0f} {upstream.requests - before:>9} {failures[0]:>8} "
+          f"{elapsed:>9.2f} {settled:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--exports', type=int, default=24, help='district series exported per run')
+    parser.add_argument('--exporters', type=int, default=8, help='concurrent exporter threads')
+    parser.add_argument('--concurrency', type=int, default=8, help='scheduler slots (concurrent requests)')
+    parser.add_argument('--latency', type=float, default=0.15, help='stand-in server latency per request (s)')
+    parser.add_argument('--per-record', type=float, default=0.0001, help='stand-in cost per record (s)')
+    parser.add_argument('--overload-size', type=int, default=2500, help='page length past which records cost 4x')
+    parser.add_argument('--max-size', type=int, default=4000, help='page size above which requests fail')
+    args = parser.parse_args()
+
+    upstream, base_url = standin_server.start(latency=args.latency, per_record=args.per_record,
+                                              overload_size=args.overload_size, max_size=args.max_size)
+    places = _places(args.exports)
+    print(f"{len(places)} exports of {START_DATE}..{END_DATE}, {args.exporters} exporters, "
+          f"{args.concurrency} concurrent requests; stand-in: {args.latency * 1000:.0f} ms + "
+          f"{args.per_record * 1e6:.0f} us/record, overloaded past {args.overload_size}, fails above {args.max_size}")
+    print(f"{'page size':<22} {'records/s':>10} {'requests':>9} {'failed':>8} {'seconds':>9} {'settled':>8}")
+    default_size = wris_client.BULK_PAGE_SIZE
+    sizes_path = os.path.join(tempfile.mkdtemp(prefix='wris_pages_'), 'page_sizes.json')
+    try:
+        for size in FIXED_SIZES:
+            run_once(f"fixed {size}", base_url, upstream, places, args.exporters, args.concurrency,
+                     fixed_size=size)
+        wris_client.BULK_PAGE_SIZE = default_size
+        run_once("tuned (cold)", base_url, upstream, places, args.exporters, args.concurrency,
+                 tuner=PageSizeTuner(sizes_path))
+        # A new tuner, as after a restart: starts from the persisted sizes
+        run_once("tuned (persisted)", base_url, upstream, places, args.exporters, args.concurrency,
+                 tuner=PageSizeTuner(sizes_path))
+    finally:
+        wris_client.BULK_PAGE_SIZE = default_size
+        upstream.shutdown()
+
+
+if __name__ == '__main__':
+    main()
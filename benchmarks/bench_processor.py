@@ -0,0 +1,316 @@
+# benchmarks/bench_processor.py
+"""
+Time and memory regression benchmark for WRISDataProcessor.
+
+For every admin data type and each `--sizes` record count, builds a
+synthetic WRIS page payload (`{"data": {"content": [...]}}`, values in the
+data type's range with 5% nulls) and measures the processor's hot path:
+
+- normalize: records to a RecordBatch (one array per field, numeric-type
+  detection per column)
+- to_dataframe: `to_dataframe` on the payload, as the tools call it
+- numeric_columns: `primary_value_column` on the batch
+- statistics: `calculate_statistics` on the batch
+
+Per operation it reports the best wall time of at least `--repeat` runs
+(more for fast operations, see MIN_TIMED_SECONDS), the peak
+Python/NumPy allocation during one run (tracemalloc) and the process's peak
+resident memory during one run (Linux only; "-" elsewhere). Peak RSS
+includes the interpreter and imports, so it mostly tells at large sizes.
+Results are compared with benchmarks/data/processor_baseline.json: an
+operation is flagged when its time or allocation exceeds the baseline by
+more than `--threshold`, beyond a small absolute floor so microsecond
+noise on tiny payloads is ignored, and is measured again (CONFIRM_RUNS
+times, keeping the best) before it counts. Baseline times are scaled by
+a calibration workload timed in both runs (building arrays from a fixed
+list of dicts), so a machine that is slower or busier overall does not
+read as a regression. The exit status is 1 when anything is
+flagged. `--save-baseline` records the current run instead; baselines are
+only comparable on the machine (and library versions) that wrote them.
+
+10 million records need several GB of memory for the payload alone.
+
+    python -m benchmarks.bench_processor [--sizes 10 1000 100000] [--threshold 0.25] [--save-baseline]
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault('WRIS_PREFETCH', '0')
+
+import numpy as np
+import pandas as pd
+
+from ingress_agent.utils.data_processor import WRISDataProcessor
+from ingress_agent.utils.wris_client import ADMIN_ENDPOINT_MAP
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'data', 'processor_baseline.json')
+OPERATIONS = ('normalize', 'to_dataframe', 'numeric_columns', 'statistics')
+NULL_SHARE = 0.05
+STATIONS = 50
+# Changes smaller than these are noise, whatever the ratio
+SECONDS_FLOOR = 0.0005
+ALLOC_MB_FLOOR = 0.1
+# Fast operations are timed at least this long in total (up to MAX_RUNS runs) for a stable best time
+MIN_TIMED_SECONDS = 0.5
+MAX_RUNS = 1000
+# Flagged operations are measured again this many times before they count
+CONFIRM_RUNS = 2
+
+# (low, high, decimals) of each data type's values; decimals of 0 give integer values
+VALUE_RANGES = {
+    'rainfall': (0.0, 120.0, 1),
+    'ground_water_level': (0.5, 60.0, 2),
+    'wind_direction': (0, 360, 0),
+    'temperature': (-5.0, 48.0, 1),
+    'suspended_sediment': (0.0, 4.0, 3),
+    'solar_radiation': (0.0, 1100.0, 1),
+    'soil_moisture': (5.0, 45.0, 2),
+    'snowfall': (0.0, 80.0, 1),
+    'river_water_level': (100.0, 600.0, 3),
+    'river_water_discharge': (0.0, 25000.0, 2),
+    'reservoir': (0.0, 3000.0, 2),
+    'relative_humidity': (5, 100, 0),
+    'evapo_transpiration': (0.0, 12.0, 2),
+    'atmospheric_pressure': (950.0, 1040.0, 1),
+}
+
+
+def payload(data_type, size, seed=0):
+    """An admin page with `size` records of `data_type`, deterministic in its arguments."""
+    rng = np.random.default_rng(seed)
+    low, high, decimals = VALUE_RANGES[data_type]
+    station = np.arange(size) % STATIONS
+    if decimals:
+        values = np.round(rng.uniform(low, high, size), decimals).tolist()
+    else:
+        values = rng.integers(low, high, size, endpoint=True).tolist()
+    for i in np.flatnonzero(rng.random(size) < NULL_SHARE).tolist():
+        values[i] = None
+    times = (pd.Timestamp('2015-01-01') + pd.to_timedelta(np.arange(size) // STATIONS, unit='h')) \
+        .strftime('%Y-%m-%dT%H:%M:%S').tolist()
+    codes = [f"ST{s:05d}" for s in range(STATIONS)]
+    names = [f"Station {s}" for s in range(STATIONS)]
+    latitudes = np.round(rng.uniform(8, 36, STATIONS), 4).tolist()
+    longitudes = np.round(rng.uniform(68, 97, STATIONS), 4).tolist()
+    unit = 'mm' if data_type in ('rainfall', 'snowfall') else 'unit'
+    content = [
+        {"stationCode": codes[s], "stationName": names[s], "latitude": latitudes[s], "longitude": longitudes[s],
+         "stateName": "Maharashtra", "districtName": "Pune", "agencyName": "CWC",
+         "dataTime": t, "dataValue": v, "unit": unit}
+        for s, t, v in zip(station.tolist(), times, values)
+    ]
+    return {"data": {"content": content, "totalElements": size}}
+
+
+def _rss_peak():
+    """Peak resident memory of this process in bytes (VmHWM), or None without /proc."""
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _reset_rss_peak():
+    """Reset VmHWM to the current RSS; False where the kernel does not allow it."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def measure(fn, repeat):
+    """(best seconds, peak allocation MB, peak RSS MB or None) of calling `fn`."""
+    # Peak RSS first, before the timed runs have grown the allocator's pools
+    gc.collect()
+    rss = None
+    if _reset_rss_peak():
+        out = fn()
+        rss = _rss_peak() / 2**20
+        del out
+
+    best, runs, spent = float('inf'), 0, 0.0
+    while runs < repeat or (spent < MIN_TIMED_SECONDS and runs < MAX_RUNS):
+        gc.collect()
+        start = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - start
+        best, runs, spent = min(best, elapsed), runs + 1, spent + elapsed
+        del out
+
+    gc.collect()
+    tracemalloc.start()
+    out = fn()
+    alloc = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    del out
+    return best, alloc, rss
+
+
+def calibrate(repeat=5):
+    """Best time of a fixed workload close to the processor's: arrays from 200k record dicts."""
+    records = [{'value': i * 0.5, 'name': f"S{i % 50}"} for i in range(200_000)]
+    best = float('inf')
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        np.array([r['value'] for r in records], dtype=np.float64)
+        np.array([r['name'] for r in records], dtype=object)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(sizes, repeat, only=None):
+    """Measure every (data type, size, operation), or the keys in `only`.
+
+    Returns {"type/size/operation": measurement}.
+    """
+    processor = WRISDataProcessor()
+    results = {}
+    # Keep the imported modules out of the collections between runs
+    gc.collect()
+    gc.freeze()
+    for data_type in ADMIN_ENDPOINT_MAP:
+        for size in sizes:
+            keys = {f"{data_type}/{size}/{operation}": operation for operation in OPERATIONS}
+            if only is not None:
+                keys = {key: operation for key, operation in keys.items() if key in only}
+            if not keys:
+                continue
+            data = payload(data_type, size)
+            batch = processor.normalize(data)
+            runs = 1 if size >= 1_000_000 else repeat
+            operations = {
+                'normalize': lambda: processor.normalize(data),
+                'to_dataframe': lambda: processor.to_dataframe(data),
+                'numeric_columns': lambda: batch.primary_value_column(),
+                'statistics': lambda: processor.calculate_statistics(batch, 'dataValue'),
+            }
+            for key, operation in keys.items():
+                seconds, alloc, rss = measure(operations[operation], runs)
+                results[key] = {'seconds': round(seconds, 7), 'alloc_mb': round(alloc, 3),
+                                'rss_mb': None if rss is None else round(rss, 1)}
+            del data, batch
+    return results
+
+
+def environment():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'machine': platform.machine(), 'cpus': os.cpu_count()}
+
+
+def load_baseline(path=BASELINE):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def save_baseline(results, calibration, path=BASELINE):
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump({'environment': environment(), 'calibration_seconds': round(calibration, 7), 'results': results},
+                  fh, indent=1, sort_keys=True)
+        fh.write('\n')
+
+
+def regressions(results, baseline, threshold, scale=1.0):
+    """Measurements exceeding the baseline by more than `threshold`: [(key, metric, baseline, now)].
+
+    Baseline times are multiplied by `scale` (this run's calibration over the baseline's).
+    """
+    flagged = []
+    for key, now in results.items():
+        base = baseline.get(key)
+        if base is None:
+            continue
+        for metric, floor, factor in (('seconds', SECONDS_FLOOR, scale), ('alloc_mb', ALLOC_MB_FLOOR, 1.0)):
+            expected = base[metric] * factor
+            if now[metric] > expected * (1 + threshold) and now[metric] - expected > floor:
+                flagged.append((key, metric, expected, now[metric]))
+    return flagged
+
+
+def report(results, baseline, scale=1.0):
+    print(f"{'data type':<22} {'records':>8} {'operation':<16} {'ms':>10} {'base ms':>10} {'alloc MB':>9} "
+          f"{'base MB':>8} {'rss MB':>7}")
+    for key, now in results.items():
+        data_type, size, operation = key.split('/')
+        base = baseline.get(key, {}) if baseline else {}
+        base_ms = f"{base['seconds'] * scale * 1000:.3f}" if 'seconds' in base else '-'
+        base_mb = f"{base['alloc_mb']:.3f}" if 'alloc_mb' in base else '-'
+        rss = f"{now['rss_mb']:.1f}" if now['rss_mb'] is not None else '-'
+        print(f"{data_type:<22} {size:>8} {operation:<16} {now['seconds'] * 1000:>10.3f} {base_ms:>10} "
+              f"{now['alloc_mb']:>9.3f} {base_mb:>8} {rss:>7}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 100000],
+                        help='records per payload (up to 10000000)')
+    parser.add_argument('--repeat', type=int, default=5, help='timed runs per operation (1 from 1M records)')
+    parser.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown/growth over the baseline')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='record this run as the baseline')
+    args = parser.parse_args()
+
+    calibration = calibrate()
+    results = run(args.sizes, args.repeat)
+    calibration = min(calibration, calibrate())
+    if args.save_baseline:
+        # Keep baseline entries for sizes not measured in this run
+        saved = load_baseline(args.baseline) or {}
+        if saved.get('calibration_seconds'):
+            # Kept entries stay comparable with the new calibration
+            ratio = calibration / saved['calibration_seconds']
+            for entry in saved['results'].values():
+                entry['seconds'] = round(entry['seconds'] * ratio, 7)
+        save_baseline(dict(saved.get('results', {}), **results), calibration, args.baseline)
+        report(results, None)
+        print(f"\nbaseline written to {args.baseline}")
+        return 0
+
+    saved = load_baseline(args.baseline)
+    if saved is None:
+        report(results, None)
+        print(f"\nno baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    scale = calibration / saved['calibration_seconds']
+    report(results, saved['results'], scale)
+    print(f"\ncalibration {calibration * 1000:.1f} ms, baseline {saved['calibration_seconds'] * 1000:.1f} ms: "
+          f"baseline times scaled by {scale:.2f}")
+    if saved.get('environment') != environment():
+        print(f"\nbaseline recorded on {saved.get('environment')}, this run on {environment()}; "
+              f"timings may not be comparable")
+    flagged = regressions(results, saved['results'], args.threshold, scale)
+    for _ in range(CONFIRM_RUNS):
+        if not flagged:
+            break
+        # A slow run on a busy machine is not a regression: measure flagged operations again, keep the best
+        again = run(args.sizes, args.repeat, only={key for key, *_ in flagged})
+        for key, now in again.items():
+            results[key] = {metric: min(results[key][metric], value) if value is not None else None
+                            for metric, value in now.items()}
+        flagged = regressions(results, saved['results'], args.threshold, scale)
+    if not flagged:
+        print(f"\nno regressions above {args.threshold:.0%}")
+        return 0
+    print(f"\n{len(flagged)} regressions above {args.threshold:.0%}:")
+    for key, metric, base, now in flagged:
+        print(f"  {key} {metric}: {base:.6g} -> {now:.6g} ({now / base - 1 if base else float('inf'):+.0%})")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,73 @@
+# benchmarks/bench_render.py
+"""
+Rendering benchmark for utils/charts.py.
+
+Times chart rendering for synthetic series of 10k to 1M points, with and
+without min/max downsampling, and the render-cache hit path.
+
+    python -m benchmarks.bench_render [--sizes 10000 100000 1000000] [--format png]
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from ingress_agent.utils.charts import RenderCache, minmax_downsample, plot_area_width, render_lines, spec_hash
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+
+def _series(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.datetime64('2000-01-01T00:00') + np.arange(n).astype('timedelta64[m]')
+    y = np.cumsum(rng.normal(0, 1, n)) + 10 * np.sin(np.arange(n) / 1440 * 2 * np.pi)
+    return x, y
+
+
+def _time(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def run(sizes, fmt):
+    spec = {'format': fmt, 'title': 'benchmark', 'width': 1000, 'height': 500}
+    cache = RenderCache(directory=tempfile.mkdtemp(prefix='wris_bench_'))
+    # Warm-up: the first render pays for importing matplotlib and font setup
+    render_lines([('warmup', *_series(100))], spec)
+    print(f"{'points':>10} {'downsample_s':>13} {'render_s':>10} {'drawn':>8} {'raw_render_s':>13} "
+          f"{'cache_hit_ms':>13} {'bytes':>9}")
+    for n in sizes:
+        x, y = _series(n)
+        t_down, (xs, _) = _time(lambda: minmax_downsample(x, y, plot_area_width(spec)))
+        t_render, (image, drawn) = _time(lambda: render_lines([('series', x, y)], spec), repeat=1)
+
+        # Drawing every point, for comparison (skipped above 200k: it dominates the run)
+        if n <= 200_000:
+            raw_spec = dict(spec, downsample=False)
+            t_raw, _ = _time(lambda: render_lines([('series', x, y)], raw_spec), repeat=1)
+            raw = f"{t_raw:13.3f}"
+        else:
+            raw = f"{'skipped':>13}"
+
+        key = spec_hash({'n': n}, spec)
+        cache.put(key, fmt, image)
+        t_hit, _ = _time(lambda: cache.get(key, fmt), repeat=100)
+        print(f"{n:>10} {t_down:13.4f} {t_render:10.3f} {drawn:>8} {raw} {t_hit * 1000:13.4f} {len(image):>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    parser.add_argument('--format', default='png', choices=('png', 'svg'))
+    args = parser.parse_args()
+    run(args.sizes, args.format)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+# benchmarks/bench_serving.py
+"""
+Load test for multi-process serving (ingress_agent/serve.py).
+
+Starts the stand-in WRIS server and, for each worker count, the serving
+front end with that many workers; client threads then call agent tools
+through it for a fixed time with a skewed mix of queries (per-district
+fetches and multi-year trend analyses over popular districts). Reported
+per run: throughput, latency percentiles, and upstream requests per tool
+call, which shows whether extra workers multiply upstream traffic. The
+last worker count is also run with `shared=False` (every worker with only
+its own caches) for comparison.
+
+Throughput can only scale up to the number of cores.
+
+    python -m benchmarks.bench_serving [--workers 1 2 4] [--clients 32] [--seconds 20]
+"""
+
+from http.client import HTTPConnection
+import argparse
+import contextlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+os.environ.setdefault('WRIS_PREFETCH', '0')
+
+from ingress_agent import serve
+from ingress_agent.utils.constants import STATES_DISTRICTS
+
+from benchmarks import standin_server
+
+DATA_TOOLS = ('get_rainfall_data', 'get_ground_water_level_data', 'get_river_water_level_data')
+TREND_SHARE = 0.3
+
+
+def _queries(seed=0, count=400):
+    """A skewed (Zipf-like) query stream over districts, tools and windows."""
+    rng = random.Random(seed)
+    places = [(state, district) for state, districts in STATES_DISTRICTS.items() for district in districts]
+    weights = [1.0 / (rank + 1) for rank in range(len(places))]
+    stream = []
+    for _ in range(count):
+        state, district = rng.choices(places, weights)[0]
+        if rng.random() < TREND_SHARE:
+            year = rng.choice((2019, 2020))
+            stream.append(('get_trend_analysis', {
+                'data_type': rng.choice(('rainfall', 'ground_water_level')), 'state_name': state,
+                'district_name': district, 'agency_name': 'CWC',
+                'start_date': f'{year}-01-01', 'end_date': '2023-12-31'}))
+        else:
+            month = rng.randint(1, 6)
+            stream.append((rng.choice(DATA_TOOLS), {
+                'state_name': state, 'district_name': district, 'agency_name': 'CWC',
+                'start_date': f'2024-{month:02d}-01', 'end_date': f'2024-{month:02d}-28'}))
+    return stream
+
+
+def _client(url, queries, stop, latencies, failures, seed):
+    rng = random.Random(seed)
+    host, port = url.rsplit('/', 1)[-1].split(':')
+    conn = HTTPConnection(host, int(port), timeout=120)
+    while not stop.is_set():
+        tool, args = rng.choice(queries)
+        started = time.perf_counter()
+        try:
+            conn.request('POST', f'/tools/{tool}', body=json.dumps({'args': args, 'session_id': f'client-{seed}'}),
+                         headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            body = json.loads(response.read())
+            ok = response.status == 200 and body.get('status') == 'success'
+        except OSError:
+            conn.close()
+            conn = HTTPConnection(host, int(port), timeout=120)
+            ok = False
+        latencies.append(time.perf_counter() - started)
+        if not ok:
+            failures.append(tool)
+
+
+@contextlib.contextmanager
+def _quiet_workers():
+    # The workers inherit this process's stdout; the client logs every request
+    saved = os.dup(1)
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    try:
+        yield
+    finally:
+        os.dup2(saved, 1)
+        os.close(devnull)
+        os.close(saved)
+
+
+def run_once(workers, shared, base_url, upstream, queries, clients, seconds, upstream_rate):
+    store = os.path.join(tempfile.mkdtemp(prefix='wris_serve_'), 'store.sqlite')
+    env = {'WRIS_BASE_URL': base_url, 'WRIS_PREFETCH': '0',
+           'WRIS_ROLLUP_DIR': os.path.join(os.path.dirname(store), 'rollups'),
+           'WRIS_SERIES_DIR': os.path.join(os.path.dirname(store), 'series'),
+           'WRIS_CROSSWALK': os.path.join(os.path.dirname(store), 'crosswalk.json'),
+           'WRIS_QUERY_LOG': os.path.join(os.path.dirname(store), 'queries.jsonl')}
+    with _quiet_workers():
+        server = serve.start(workers, port=0, store=store, upstream_rate=upstream_rate, env=env,
+                             background=True, shared=shared)
+    try:
+        stop, latencies, failures = threading.Event(), [], []
+        before = upstream.requests
+        threads = [threading.Thread(target=_client, args=(server.url, queries, stop, latencies, failures, i))
+                   for i in range(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        upstream_requests = upstream.requests - before
+    finally:
+        server.stop()
+    latencies.sort()
+    done = len(latencies)
+    pct = lambda q: latencies[min(done - 1, int(q * done))] if done else float('nan')
+    print(f"{workers:>8} {'yes' if shared else 'no':>7} {done / elapsed:>10.1f} {pct(0.5) * 1000:>9.1f} "
+          f"{pct(0.95) * 1000:>9.1f} {len(failures):>7} {upstream_requests:>9} "
+          f"{upstream_requests / max(done, 1):>14.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--seconds', type=float, default=20.0)
+    parser.add_argument('--latency', type=float, default=0.02, help='stand-in server latency per request (s)')
+    parser.add_argument('--upstream-rate', type=float, default=None,
+                        help='shared upstream rate limit (requests/s across workers)')
+    args = parser.parse_args()
+
+    upstream, base_url = standin_server.start(latency=args.latency, per_record=0.00002)
+    queries = _queries()
+    print(f"{os.cpu_count()} cores, {args.clients} clients, {args.seconds:.0f}s per run, "
+          f"{len(set(json.dumps(q, sort_keys=True) for q in queries))} distinct queries")
+    print(f"{'workers':>8} {'shared':>7} {'calls/s':>10} {'p50_ms':>9} {'p95_ms':>9} {'errors':>7} "
+          f"{'upstream':>9} {'upstream/call':>14}")
+    try:
+        for workers in args.workers:
+            run_once(workers, True, base_url, upstream, queries, args.clients, args.seconds, args.upstream_rate)
+        run_once(args.workers[-1], False, base_url, upstream, queries, args.clients, args.seconds,
+                 args.upstream_rate)
+    finally:
+        upstream.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,278 @@
+# benchmarks/bench_sessions.py
+"""
+Concurrent-session load simulation for the agent's tool layer.
+
+Runs the agent (`agent.build_agent`) through the ADK runner with a
+stand-in model instead of Gemini: for every user message the model issues
+the tool calls recorded for it in benchmarks/data/conversations.jsonl,
+waits `--model-latency` seconds per model call, and answers with a fixed
+text once the tool results are in. Tools run against the stand-in WRIS
+server, so no model quota is used and WRIS is never contacted.
+
+Every ramp level starts that many sessions at once, each playing one
+recorded conversation (cycled), with its dates shifted back by up to
+`--spread - 1` years so sessions do not all ask for the same windows.
+Caches and stores are emptied between levels. Reported per level:
+sessions/s, tool-call latency percentiles (including the wait for a tool
+thread), upstream requests, and peak resident memory above the level's
+start, per session.
+
+    python -m benchmarks.bench_sessions [--sessions 1 10 100 1000] [--model-latency 0.5] [--toolset full]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import resource
+import tempfile
+import threading
+import time
+import warnings
+
+# Isolate the benchmark's caches and logs; no background prefetching
+_scratch = tempfile.mkdtemp(prefix='wris_sessions_')
+os.environ.setdefault('WRIS_PREFETCH', '0')
+os.environ.setdefault('WRIS_QUERY_LOG', os.path.join(_scratch, 'queries.jsonl'))
+os.environ.setdefault('WRIS_AGENCY_MEMORY', os.path.join(_scratch, 'agencies.json'))
+os.environ.setdefault('WRIS_ROLLUP_DIR', os.path.join(_scratch, 'rollups'))
+os.environ.setdefault('WRIS_SERIES_DIR', os.path.join(_scratch, 'series'))
+os.environ.setdefault('WRIS_CROSSWALK', os.path.join(_scratch, 'crosswalk.json'))
+os.environ.setdefault('WRIS_RENDER_DIR', os.path.join(_scratch, 'charts'))
+
+from google.adk.agents.run_config import RunConfig, ToolThreadPoolConfig
+from google.adk.models import BaseLlm, LlmResponse
+from google.adk.runners import InMemoryRunner
+from google.genai import types
+
+from ingress_agent.agent import build_agent
+from ingress_agent.tools.answer_cache import default_answer_cache
+from ingress_agent.tools.common import default_agency_memory
+from ingress_agent.utils.charts import default_render_cache
+from ingress_agent.utils.crosswalk import default_crosswalk
+from ingress_agent.utils.response_cache import default_cache
+from ingress_agent.utils.rollups import default_rollups
+from ingress_agent.utils.series_store import default_series_store
+from ingress_agent.utils.wris_client import default_client
+
+from benchmarks import standin_server
+from benchmarks.bench_toolsets import compact_calls, load_conversations
+
+APP = 'bench_sessions'
+DATE_ARGS = ('start_date', 'end_date')
+
+
+class ScriptedModel(BaseLlm):
+    """A stand-in model that replays recorded tool calls.
+
+    `script` maps a user message to the (tool, args) calls recorded for
+    it. A request ending in that message gets those calls; a request
+    ending in tool results gets a short text answer.
+    """
+
+    script: dict = {}
+    latency: float = 0.0
+
+    async def generate_content_async(self, llm_request, stream=False):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        last = llm_request.contents[-1] if llm_request.contents else None
+        parts = last.parts or [] if last is not None else []
+        text = ''.join(p.text for p in parts if p.text)
+        calls = self.script.get(text) if last is not None and last.role == 'user' else None
+        if calls:
+            parts = [types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args in calls]
+        else:
+            results = sum(1 for p in parts if p.function_response is not None)
+            parts = [types.Part(text=f"Answered from {results} tool results.")]
+        # Token counts are estimated as characters / 4, as in bench_toolsets
+        usage = types.GenerateContentResponseUsageMetadata(
+            prompt_token_count=sum(len(str(c.parts)) for c in llm_request.contents) // 4,
+            candidates_token_count=len(str(parts)) // 4)
+        yield LlmResponse(content=types.Content(role='model', parts=parts), usage_metadata=usage)
+
+
+def _shift(args, years):
+    """`args` with every date moved back `years` years."""
+    if not years:
+        return args
+    shifted = dict(args)
+    for name in DATE_ARGS:
+        value = shifted.get(name)
+        if value and value[:4].isdigit():
+            shifted[name] = f"{int(value[:4]) - years}{value[4:]}"
+    return shifted
+
+
+def sessions(conversations, count, spread, toolset):
+    """The user messages of `count` sessions, and the script mapping each message to its calls."""
+    plans, script = [], {}
+    for i in range(count):
+        conversation = conversations[i % len(conversations)]
+        years = (i // len(conversations)) % spread
+        messages = []
+        for turn in conversation['turns']:
+            calls = [{'tool': c['tool'], 'args': _shift(c['args'], years)} for c in turn['calls']]
+            calls = compact_calls(calls) if toolset == 'compact' else [(c['tool'], c['args']) for c in calls]
+            message = turn['user'] if not years else f"{turn['user']} ({years} years earlier)"
+            script[message] = calls
+            messages.append(message)
+        plans.append(messages)
+    return plans, script
+
+
+class Recorder:
+    """Tool-call latencies and errors, from tool callbacks."""
+
+    def __init__(self):
+        self.started = {}
+        self.latencies = []
+        self.errors = 0
+
+    def before_tool(self, tool, args, tool_context):
+        self.started[tool_context.function_call_id] = time.perf_counter()
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        started = self.started.pop(tool_context.function_call_id, None)
+        if started is not None:
+            self.latencies.append(time.perf_counter() - started)
+        if isinstance(tool_response, dict) and tool_response.get('status') == 'error':
+            self.errors += 1
+
+
+def _callbacks(existing, added):
+    if existing is None:
+        return added
+    return [added] + (existing if isinstance(existing, list) else [existing])
+
+
+class PeakRss:
+    """Samples this process's resident memory on a thread; `peak` is the largest sample in bytes."""
+
+    PAGE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self.peak = self.current()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @classmethod
+    def current(cls):
+        try:
+            with open('/proc/self/statm') as fh:
+                return int(fh.read().split()[1]) * cls.PAGE
+        except OSError:
+            # No /proc: the lifetime peak is the best available
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, self.current())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self.current())
+
+
+def _reset():
+    # Every level starts cold: no cached responses, answers, stored series or charts
+    default_cache.invalidate()
+    default_answer_cache.invalidate()
+    default_agency_memory._entries.clear()
+    default_render_cache.directory = tempfile.mkdtemp(prefix='charts_', dir=_scratch)
+    default_render_cache._entries.clear()
+    for store, fields in ((default_rollups, ('_rows', '_coverage')),
+                          (default_series_store, ('_series', '_locations')),
+                          (default_crosswalk, ('_stations', '_locations'))):
+        with store._lock:
+            for field in fields:
+                getattr(store, field).clear()
+    default_series_store._bytes = 0
+
+
+async def _session(runner, user_id, messages):
+    session = await runner.session_service.create_session(app_name=APP, user_id=user_id)
+    for message in messages:
+        content = types.Content(role='user', parts=[types.Part(text=message)])
+        async for _ in runner.run_async(user_id=user_id, session_id=session.id, new_message=content,
+                                        run_config=runner.bench_run_config):
+            pass
+
+
+async def _level(runner, plans):
+    results = await asyncio.gather(*(_session(runner, f"user{i}", messages) for i, messages in enumerate(plans)),
+                                   return_exceptions=True)
+    return [r for r in results if isinstance(r, BaseException)]
+
+
+def run_level(count, conversations, args, upstream, report=True):
+    plans, script = sessions(conversations, count, args.spread, args.toolset)
+    recorder = Recorder()
+    agent = build_agent(args.toolset, answer_cache=args.answer_cache)
+    agent.model = ScriptedModel(model='scripted', script=script, latency=args.model_latency)
+    agent.before_tool_callback = _callbacks(agent.before_tool_callback, recorder.before_tool)
+    agent.after_tool_callback = _callbacks(agent.after_tool_callback, recorder.after_tool)
+    runner = InMemoryRunner(agent=agent, app_name=APP)
+    runner.bench_run_config = RunConfig(tool_thread_pool_config=ToolThreadPoolConfig(max_workers=args.tool_threads))
+
+    _reset()
+    requests_before = upstream.requests
+    baseline = PeakRss.current()
+    started = time.perf_counter()
+    # The client logs every request to stdout; keep the report readable
+    with PeakRss() as rss, contextlib.redirect_stdout(io.StringIO()):
+        failed = asyncio.run(_level(runner, plans))
+    elapsed = time.perf_counter() - started
+    if not report:
+        return
+
+    latencies = sorted(recorder.latencies)
+    pct = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float('nan')
+    upstream_requests = upstream.requests - requests_before
+    print(f"{count:>8} {count / elapsed:>10.1f} {len(latencies):>7} {pct(0.5):>8.1f} {pct(0.95):>8.1f} "
+          f"{pct(0.99):>8.1f} {recorder.errors + len(failed):>7} {upstream_requests:>9} "
+          f"{upstream_requests / count:>9.2f} {rss.peak / 2**20:>8.0f} {(rss.peak - baseline) / 1024 / count:>9.1f}")
+    if failed:
+        print(f"{'':>8} {len(failed)} sessions failed, first: {failed[0]!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 100, 1000],
+                        help='concurrent sessions per ramp level')
+    parser.add_argument('--model-latency', type=float, default=0.5, help='stand-in model time per call (s)')
+    parser.add_argument('--latency', type=float, default=0.02, help='stand-in server latency per request (s)')
+    parser.add_argument('--per-record', type=float, default=0.00002, help='stand-in server cost per record (s)')
+    parser.add_argument('--spread', type=int, default=4, help='distinct date shifts (years) across sessions')
+    parser.add_argument('--tool-threads', type=int, default=32, help='ADK tool thread pool size')
+    parser.add_argument('--toolset', choices=('full', 'compact'), default='full')
+    parser.add_argument('--answer-cache', action='store_true', help='install the answer cache on the agent')
+    args = parser.parse_args()
+    # Tool declarations are rebuilt per level; ADK warns about its experimental schema each time
+    warnings.filterwarnings('ignore', category=UserWarning, module='google.adk')
+
+    upstream, base_url = standin_server.start(latency=args.latency, per_record=args.per_record)
+    default_client.base_url = base_url
+    conversations = load_conversations()
+    print(f"{os.cpu_count()} cores, {len(conversations)} recorded conversations, toolset {args.toolset}, "
+          f"model latency {args.model_latency * 1000:.0f} ms, {args.tool_threads} tool threads")
+    print(f"{'sessions':>8} {'sessions/s':>10} {'calls':>7} {'p50_ms':>8} {'p95_ms':>8} {'p99_ms':>8} "
+          f"{'errors':>7} {'upstream':>9} {'up/sess':>9} {'peak_MB':>8} {'KB/sess':>9}")
+    try:
+        # Warm-up: imports, chart setup and connection pools are paid once
+        run_level(1, conversations, args, upstream, report=False)
+        for count in args.sessions:
+            run_level(count, conversations, args, upstream)
+    finally:
+        upstream.shutdown()
+
+
+if __name__ == '__main__':
+    main()
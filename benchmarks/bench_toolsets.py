@@ -0,0 +1,266 @@
+# benchmarks/bench_toolsets.py
+"""
+Full vs compact toolset benchmark for agent.build_agent.
+
+For each toolset, reports the size of what the model is sent on every call
+(instruction plus tool declarations) and replays the recorded conversations
+in benchmarks/data/conversations.jsonl against the stand-in WRIS server.
+Calls were recorded against the full toolset and are translated to the
+compact tools (same-type fetches for several districts of one state become
+one `fetch_water_data_batch` call).
+
+Turn latency offline is measured tool execution plus a modeled model cost:
+each model call pays `--call-overhead-ms` plus `--prefill-ms-per-1k` per
+thousand prompt tokens (instruction, declarations and the conversation so
+far, tokens estimated as characters / 4); a turn with tool calls takes two
+model calls. With `--live` the conversations are run through the real
+model instead (needs model credentials) and the reported token counts come
+from the model's usage metadata.
+
+    python -m benchmarks.bench_toolsets [--latency 0.05] [--live]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import tempfile
+import time
+import warnings
+
+# Isolate the benchmark's caches and logs; no background prefetching
+_scratch = tempfile.mkdtemp(prefix='wris_bench_')
+os.environ.setdefault('WRIS_PREFETCH', '0')
+os.environ.setdefault('WRIS_QUERY_LOG', os.path.join(_scratch, 'queries.jsonl'))
+os.environ.setdefault('WRIS_AGENCY_MEMORY', os.path.join(_scratch, 'agencies.json'))
+os.environ.setdefault('WRIS_ROLLUP_DIR', os.path.join(_scratch, 'rollups'))
+os.environ.setdefault('WRIS_SERIES_DIR', os.path.join(_scratch, 'series'))
+os.environ.setdefault('WRIS_CROSSWALK', os.path.join(_scratch, 'crosswalk.json'))
+os.environ.setdefault('WRIS_RENDER_DIR', os.path.join(_scratch, 'charts'))
+
+from google.adk.tools import FunctionTool
+
+from ingress_agent.agent import INSTRUCTION, TOOLSETS, build_agent
+from ingress_agent.tools.common import default_agency_memory
+from ingress_agent.utils.charts import default_render_cache
+from ingress_agent.utils.response_cache import default_cache
+from ingress_agent.utils.wris_client import default_client
+
+from benchmarks import standin_server
+
+CONVERSATIONS = os.path.join(os.path.dirname(__file__), 'data', 'conversations.jsonl')
+
+_ANALYSES = {
+    'get_trend_analysis': 'trend',
+    'get_seasonal_decomposition': 'seasonal',
+    'get_groundwater_fluctuation': 'groundwater_fluctuation',
+    'get_rainfall_departure': 'rainfall_departure',
+    'get_correlation_analysis': 'correlation',
+}
+_CHARTS = {
+    'render_time_series_chart': 'time_series',
+    'render_comparison_chart': 'comparison',
+    'render_station_map': 'station_map',
+}
+
+
+def _tokens(text):
+    return len(text) // 4
+
+
+def prompt_size(tools):
+    """Characters of the instruction and of the tool declarations sent with every model call."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', UserWarning)
+        declarations = [FunctionTool(tool)._get_declaration().model_dump(mode='json', exclude_none=True)
+                        for tool in tools]
+    return len(INSTRUCTION), len(json.dumps(declarations))
+
+
+def load_conversations(path=CONVERSATIONS):
+    with open(path, encoding='utf-8') as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def _compact_call(tool, args):
+    dates = {'start_date': args.get('start_date', ''), 'end_date': args.get('end_date', '')}
+    if tool.startswith('get_basin_') and tool.endswith('_data'):
+        return 'fetch_water_data', dict(data_type=tool[len('get_basin_'):-len('_data')], hierarchy='basin',
+                                        region_name=args['basin_name'], sub_region_name=args['tributary_name'],
+                                        agency_name=args['agency_name'], **dates)
+    if tool in _ANALYSES:
+        options = {'get_rainfall_departure': f"{args.get('normal_start_year', '')},{args.get('normal_end_year', '')}",
+                   'get_correlation_analysis': args.get('max_lag', '')}.get(tool, '')
+        return 'analyze_water_data', dict(analysis=_ANALYSES[tool],
+                                          data_types=args.get('data_types') or args.get('data_type', ''),
+                                          state_name=args['state_name'], district_name=args['district_name'],
+                                          agency_name=args['agency_name'], options=options, **dates)
+    if tool in _CHARTS:
+        return 'render_chart', dict(chart=_CHARTS[tool], data_type=args['data_type'],
+                                    state_name=args['state_name'],
+                                    district_names=args.get('district_names') or args.get('district_name', ''),
+                                    agency_name=args['agency_name'], image_format=args['image_format'], **dates)
+    if tool == 'get_aggregate_statistics':
+        return tool, args
+    return 'fetch_water_data', dict(data_type=tool[len('get_'):-len('_data')], hierarchy='admin',
+                                    region_name=args['state_name'], sub_region_name=args['district_name'],
+                                    agency_name=args['agency_name'], **dates)
+
+
+def compact_calls(calls):
+    """Translate one turn's full-toolset calls to the compact tools."""
+    translated = [_compact_call(call['tool'], call['args']) for call in calls]
+    groups = {}
+    for name, args in translated:
+        if name == 'fetch_water_data' and args['hierarchy'] == 'admin':
+            key = (args['data_type'], args['region_name'], args['agency_name'], args['start_date'], args['end_date'])
+            groups.setdefault(key, []).append(args['sub_region_name'])
+    out, batched = [], set()
+    for name, args in translated:
+        key = (args.get('data_type'), args.get('region_name'), args.get('agency_name'),
+               args.get('start_date'), args.get('end_date'))
+        if name == 'fetch_water_data' and args['hierarchy'] == 'admin' and len(groups.get(key, ())) > 1:
+            if key not in batched:
+                batched.add(key)
+                batch = {k: v for k, v in args.items() if k != 'sub_region_name'}
+                out.append(('fetch_water_data_batch', dict(batch, sub_region_names=', '.join(groups[key]))))
+            continue
+        out.append((name, args))
+    return out
+
+
+def _reset():
+    # Every run starts cold: no cached responses, charts or remembered agencies
+    default_cache.invalidate()
+    default_render_cache.directory = tempfile.mkdtemp(prefix='charts_', dir=_scratch)
+    default_render_cache._entries.clear()
+    default_agency_memory._entries.clear()
+
+
+def replay(toolset, conversations, call_overhead, prefill_per_token):
+    """Replay every turn with the toolset's tools; returns per-turn rows."""
+    agent = build_agent(toolset)
+    tools = {tool.__name__: tool for tool in agent.tools}
+    instruction_chars, declaration_chars = prompt_size(agent.tools)
+    fixed_tokens = (instruction_chars + declaration_chars) // 4
+    _reset()
+    rows = []
+    for conversation in conversations:
+        history_tokens = 0
+        for turn in conversation['turns']:
+            calls = [(c['tool'], c['args']) for c in turn['calls']]
+            if toolset == 'compact':
+                calls = compact_calls(turn['calls'])
+            history_tokens += _tokens(turn['user'])
+            started = time.perf_counter()
+            # The client logs every request to stdout; keep the report readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = [tools[name](**args) for name, args in calls]
+            tool_seconds = time.perf_counter() - started
+
+            model_calls = 2 if calls else 1
+            prompt_tokens = fixed_tokens + history_tokens
+            # The second call also sees the tool results
+            result_tokens = sum(_tokens(json.dumps(r, default=str)) for r in results)
+            if calls:
+                prompt_tokens += fixed_tokens + history_tokens + result_tokens
+            history_tokens += result_tokens
+            model_seconds = model_calls * call_overhead + prompt_tokens * prefill_per_token
+            rows.append({
+                'conversation': conversation['id'],
+                'tool_calls': len(calls),
+                'errors': [name for (name, _), r in zip(calls, results) if r.get('status') not in ('success', None)],
+                'prompt_tokens': prompt_tokens,
+                'tool_s': tool_seconds,
+                'turn_s': tool_seconds + model_seconds,
+            })
+    return rows
+
+
+async def _live_conversation(agent, conversation):
+    from google.adk.runners import InMemoryRunner
+    from google.genai import types
+
+    runner = InMemoryRunner(agent=agent, app_name='bench_toolsets')
+    session = await runner.session_service.create_session(app_name='bench_toolsets', user_id='bench')
+    rows = []
+    for turn in conversation['turns']:
+        started = time.perf_counter()
+        prompt_tokens = model_calls = tool_calls = 0
+        message = types.Content(role='user', parts=[types.Part(text=turn['user'])])
+        async for event in runner.run_async(user_id='bench', session_id=session.id, new_message=message):
+            if event.usage_metadata is not None:
+                model_calls += 1
+                prompt_tokens += event.usage_metadata.prompt_token_count or 0
+            tool_calls += len(event.get_function_calls())
+        rows.append({'conversation': conversation['id'], 'tool_calls': tool_calls, 'errors': [],
+                     'prompt_tokens': prompt_tokens, 'tool_s': float('nan'),
+                     'turn_s': time.perf_counter() - started})
+    return rows
+
+
+def replay_live(toolset, conversations):
+    agent = build_agent(toolset)
+    _reset()
+    rows = []
+    for conversation in conversations:
+        rows.extend(asyncio.run(_live_conversation(agent, conversation)))
+    return rows
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def run(latency, per_record, call_overhead_ms, prefill_ms_per_1k, live):
+    server, base_url = standin_server.start(latency=latency, per_record=per_record)
+    default_client.base_url = base_url
+    conversations = load_conversations()
+    try:
+        print(f"{'toolset':>8} {'tools':>6} {'instr_tok':>10} {'decl_tok':>9} {'decl_bytes':>11}")
+        for toolset in TOOLSETS:
+            tools = build_agent(toolset).tools
+            instruction_chars, declaration_chars = prompt_size(tools)
+            print(f"{toolset:>8} {len(tools):>6} {instruction_chars // 4:>10} {declaration_chars // 4:>9} "
+                  f"{declaration_chars:>11}")
+        print()
+
+        # Warm-up: imports, matplotlib setup and connection pools are paid once
+        replay('full', conversations[:1], 0.0, 0.0)
+        mode = 'live model' if live else (f"modeled model cost: {call_overhead_ms:.0f} ms/call + "
+                                          f"{prefill_ms_per_1k:.0f} ms per 1k prompt tokens")
+        print(f"turn latency over {sum(len(c['turns']) for c in conversations)} recorded turns ({mode})")
+        print(f"{'toolset':>8} {'calls':>6} {'errors':>7} {'prompt_tok':>11} {'tool_s':>8} "
+              f"{'turn_p50_s':>11} {'turn_p95_s':>11} {'total_s':>8}")
+        for toolset in TOOLSETS:
+            if live:
+                rows = replay_live(toolset, conversations)
+            else:
+                rows = replay(toolset, conversations, call_overhead_ms / 1000, prefill_ms_per_1k / 1e6)
+            turns = [r['turn_s'] for r in rows]
+            print(f"{toolset:>8} {sum(r['tool_calls'] for r in rows):>6} {sum(len(r['errors']) for r in rows):>7} "
+                  f"{sum(r['prompt_tokens'] for r in rows):>11} {sum(r['tool_s'] for r in rows):>8.2f} "
+                  f"{_percentile(turns, 0.5):>11.3f} {_percentile(turns, 0.95):>11.3f} {sum(turns):>8.2f}")
+            failed = [f"{r['conversation']}:{name}" for r in rows for name in r['errors']]
+            if failed:
+                print(f"{'':>8} failed: {', '.join(failed)}")
+    finally:
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--latency', type=float, default=0.05, help='stand-in server latency per request (s)')
+    parser.add_argument('--per-record', type=float, default=0.0002, help='stand-in server cost per record (s)')
+    parser.add_argument('--call-overhead-ms', type=float, default=400.0)
+    parser.add_argument('--prefill-ms-per-1k', type=float, default=40.0)
+    parser.add_argument('--live', action='store_true', help='run the conversations through the real model')
+    args = parser.parse_args()
+    run(args.latency, args.per_record, args.call_overhead_ms, args.prefill_ms_per_1k, args.live)
+
+
+if __name__ == '__main__':
+    main()
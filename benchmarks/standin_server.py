@@ -0,0 +1,117 @@
+# benchmarks/standin_server.py
+"""
+Stand-in WRIS server for benchmarks.
+
+Serves every admin and basin dataset endpoint with deterministic synthetic
+records (weekly readings from a few stations per location) in the same page
+shapes as WRIS: a Spring page for admin endpoints, `{statusCode, message,
+data}` for basin endpoints. Response time is `latency + per_record * page
+length`, so page-size and concurrency effects show up the way they do
+upstream. Optionally, records past `overload_size` in a page cost
+`overload_factor` times as much, and pages larger than `max_size` fail
+with a 500, like an upstream that struggles with big pages.
+
+    server, base_url = start(latency=0.05)
+    ...
+    server.shutdown()
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+import json
+import math
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+STATIONS_PER_LOCATION = 3
+
+
+def synthetic_records(path, params, stations=STATIONS_PER_LOCATION):
+    """All records for one query, deterministic in the location and window."""
+    start = pd.Timestamp(params.get('startdate', '2024-01-01'))
+    end = pd.Timestamp(params.get('enddate', '2024-01-05'))
+    location = params.get('districtName') or params.get('tributaryName') or ''
+    seed = zlib.crc32(f"{path}|{location}".encode())
+    days = pd.date_range(start, end, freq='7D')
+    month = days.month.to_numpy()
+    rng = np.random.default_rng(seed)
+    records = []
+    for station in range(stations):
+        if 'Ground' in path:
+            values = 10 + 3 * np.cos((month - 5) / 12 * 2 * np.pi) + rng.normal(0, 0.3, len(days))
+        else:
+            values = np.where((month >= 6) & (month <= 9), 50.0, 2.0) + rng.gamma(2.0, 2.0, len(days))
+        code = f"{seed % 100000:05d}-{station}"
+        latitude, longitude = 8 + (seed % 2800) / 100 + station / 10, 68 + (seed % 2900) / 100 + station / 10
+        for when, value in zip(days, values):
+            records.append({
+                "stationCode": code,
+                "stationName": f"{location} station {station}",
+                "latitude": round(latitude, 4),
+                "longitude": round(longitude, 4),
+                "dataTime": when.strftime('%Y-%m-%dT%H:%M:%S'),
+                "dataValue": round(float(value), 3),
+                "unit": "m" if 'Level' in path else "mm",
+            })
+    return records
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    per_record = 0.0
+    overload_size = None
+    overload_factor = 4.0
+    max_size = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        path = unquote(url.path)
+        with self.server.lock:
+            self.server.requests += 1
+        records = synthetic_records(path, params)
+        page, size = int(params.get('page', 0)), int(params.get('size', 30))
+        if self.max_size is not None and size > self.max_size:
+            time.sleep(self.latency)
+            return self._send(500, {"status": 500, "error": "Internal Server Error"})
+        content = records[page * size:(page + 1) * size]
+        cost = len(content)
+        if self.overload_size is not None and cost > self.overload_size:
+            cost += (self.overload_factor - 1) * (cost - self.overload_size)
+        time.sleep(self.latency + self.per_record * cost)
+        if '/Basin/' in path:
+            body = {"statusCode": 200, "message": "Data fetched successfully", "data": content}
+        else:
+            body = {"content": content, "totalElements": len(records),
+                    "totalPages": math.ceil(len(records) / size) if size else 0}
+        self._send(200, body)
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start(latency=0.0, per_record=0.0, port=0, overload_size=None, overload_factor=4.0, max_size=None):
+    """Start the server on a daemon thread; returns (server, base_url).
+
+    `server.requests` counts the requests served.
+    """
+    handler = type('Handler', (StandinHandler,), {
+        'latency': latency, 'per_record': per_record, 'overload_size': overload_size,
+        'overload_factor': overload_factor, 'max_size': max_size})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.lock, server.requests = threading.Lock(), 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
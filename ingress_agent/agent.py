@@ -194,6 +194,8 @@
 
 # ingress_agent/agent.py
 
+import os
+
 from google.adk.agents import Agent
 from .tools.admin_hierarchy_tools import (
     get_wind_direction_data,
@@ -226,12 +228,85 @@ from .tools.basin_hierarchy_tools import (
     get_basin_evapo_transpiration_data,
     get_basin_atmospheric_pressure_data
 )
+from .tools.analytics_tools import (
+    get_trend_analysis,
+    get_seasonal_decomposition,
+    get_groundwater_fluctuation,
+    get_rainfall_departure,
+    get_rainfall_intensity,
+    get_groundwater_stage_categories,
+    get_correlation_analysis,
+    get_aggregate_statistics
+)
+from .tools.visualization_tools import (
+    render_time_series_chart,
+    render_comparison_chart,
+    render_station_map
+)
+from .tools.generic_tools import (
+    fetch_water_data,
+    fetch_water_data_batch,
+    analyze_water_data,
+    render_chart
+)
+from .tools.watch_tools import WATCH_TOOLS
+from .tools.answer_cache import ANSWER_CACHE_ENABLED, default_answer_cache
+from .tools.prefetch import observed, start_prefetcher
+from .utils.deadline import budgeted
+from .utils.scheduler import scheduled
+from .utils.tracing import traced_tool
+from .utils.watch import default_watcher
+
+# Per-location data tools; while the prefetcher is on, their calls also feed it
+DATA_TOOLS = [
+    get_wind_direction_data,
+    get_temperature_data,
+    get_suspended_sediment_data,
+    get_solar_radiation_data,
+    get_soil_moisture_data,
+    get_snowfall_data,
+    get_river_water_level_data,
+    get_river_water_discharge_data,
+    get_reservoir_data,
+    get_relative_humidity_data,
+    get_rainfall_data,
+    get_ground_water_level_data,
+    get_evapo_transpiration_data,
+    get_atmospheric_pressure_data,
+    get_basin_wind_direction_data,
+    get_basin_temperature_data,
+    get_basin_suspended_sediment_data,
+    get_basin_solar_radiation_data,
+    get_basin_soil_moisture_data,
+    get_basin_snowfall_data,
+    get_basin_river_water_level_data,
+    get_basin_river_water_discharge_data,
+    get_basin_reservoir_data,
+    get_basin_relative_humidity_data,
+    get_basin_rainfall_data,
+    get_basin_evapo_transpiration_data,
+    get_basin_atmospheric_pressure_data
+]
+
+ANALYSIS_TOOLS = [
+    get_trend_analysis,
+    get_seasonal_decomposition,
+    get_groundwater_fluctuation,
+    get_rainfall_departure,
+    get_rainfall_intensity,
+    get_groundwater_stage_categories,
+    get_correlation_analysis,
+    get_aggregate_statistics,
+    render_time_series_chart,
+    render_comparison_chart,
+    render_station_map
+] + WATCH_TOOLS
 
-root_agent = Agent(
-    name="ingres_wris_agent",
-    model="gemini-2.0-flash",
-    description="AI-driven ChatBot agent for INGRES (India Ground Water Resource Estimation System) - currently using WRIS APIs for data access.",
-    instruction=(
+NAME = "ingres_wris_agent"
+MODEL = "gemini-2.0-flash"
+DESCRIPTION = "AI-driven ChatBot agent for INGRES (India Ground Water Resource Estimation System) - currently using WRIS APIs for data access."
+
+INSTRUCTION = (
         "You are an intelligent assistant for INGRES (India Ground Water Resource Estimation System), "
         "developed by CGWB and IIT Hyderabad. INGRES is used for the Assessment of Dynamic Ground Water Resources of India, "
         "conducted annually by the Central Ground Water Board (CGWB) and State/UT Ground Water Departments.\n\n"
@@ -251,11 +326,31 @@ root_agent = Agent(
         "1. **Administrative Hierarchy**: By State, District, and Agency\n"
         "2. **Basin Hierarchy**: By Basin and Tributary\n\n"
 
+        "For questions about trends, seasonality, monsoon groundwater fluctuation, rainfall compared "
+        "with normal, how many days had heavy rain, or how one dataset relates to another (e.g. "
+        "rainfall and groundwater level), use the analytics tools. They accept one district, a "
+        "comma-separated list, or an empty district for a whole state, and work best over several "
+        "years of data. For totals, averages, minima or maxima over a state, basin or all of India, "
+        "use get_aggregate_statistics. To categorize groundwater assessment units (Safe, "
+        "Semi-Critical, Critical, Over-Exploited) from their stage of extraction, use "
+        "get_groundwater_stage_categories.\n\n"
+
+        "If a result has \"truncated\": true, the data source did not answer within the time budget "
+        "and the result is partial; say so and suggest a shorter date range or fewer districts.\n\n"
+
+        "When a user asks to be told when a level crosses a threshold or changes unusually fast "
+        "(e.g. a river reaching its danger level), start a watch with watch_series and give them its "
+        "watch_id; report alerts from get_watch_alerts when they ask for updates.\n\n"
+
+        "When a user asks to see, plot or chart data, use the chart tools. They return the path of a "
+        "rendered image; share that path and describe the chart instead of listing raw values.\n\n"
+
         "**How to Use**:\n"
         "Simply tell me what data you need along with:\n"
         "• State and District names (for admin hierarchy), OR\n"
         "• Basin and Tributary names (for basin hierarchy)\n"
-        "• Agency name (defaults to 'CWC' if not specified)\n"
+        "• Agency name (optional; leave it empty to search every agency that publishes the data, "
+        "and results say which agency each station came from)\n"
         "• Start and end dates (recent dates used if not provided)\n\n"
 
         "**Instructions for Tool Usage**:\n"
@@ -270,34 +365,59 @@ root_agent = Agent(
 
         "Remember: You are part of the INGRES ecosystem, working towards making groundwater resource "
         "data more accessible for planners, researchers, policymakers, and the general public."
-    ),
-    tools=[
-        get_wind_direction_data,
-        get_temperature_data,
-        get_suspended_sediment_data,
-        get_solar_radiation_data,
-        get_soil_moisture_data,
-        get_snowfall_data,
-        get_river_water_level_data,
-        get_river_water_discharge_data,
-        get_reservoir_data,
-        get_relative_humidity_data,
-        get_rainfall_data,
-        get_ground_water_level_data,
-        get_evapo_transpiration_data,
-        get_atmospheric_pressure_data,
-        get_basin_wind_direction_data,
-        get_basin_temperature_data,
-        get_basin_suspended_sediment_data,
-        get_basin_solar_radiation_data,
-        get_basin_soil_moisture_data,
-        get_basin_snowfall_data,
-        get_basin_river_water_level_data,
-        get_basin_river_water_discharge_data,
-        get_basin_reservoir_data,
-        get_basin_relative_humidity_data,
-        get_basin_rainfall_data,
-        get_basin_evapo_transpiration_data,
-        get_basin_atmospheric_pressure_data
-    ]
-)
\ No newline at end of file
+)
+
+# Alternative toolset: a few generic tools that take the data type and
+# hierarchy as arguments instead of one tool per endpoint
+COMPACT_DATA_TOOLS = [
+    fetch_water_data
+]
+
+COMPACT_ANALYSIS_TOOLS = [
+    fetch_water_data_batch,
+    analyze_water_data,
+    get_aggregate_statistics,
+    get_groundwater_stage_categories,
+    render_chart
+] + WATCH_TOOLS
+
+TOOLSETS = {
+    "full": (DATA_TOOLS, ANALYSIS_TOOLS),
+    "compact": (COMPACT_DATA_TOOLS, COMPACT_ANALYSIS_TOOLS),
+}
+
+
+# Off by default: warming spends upstream requests ahead of any question
+PREFETCH_ENABLED = os.environ.get("WRIS_PREFETCH", "0").lower() in ("1", "true", "yes")
+
+
+def build_agent(toolset: str = "full", answer_cache: bool = ANSWER_CACHE_ENABLED) -> Agent:
+    """The INGRES agent with the "full" (one tool per endpoint) or "compact" (generic tools) toolset.
+
+    With `answer_cache`, repeated and paraphrased questions are answered
+    from `tools.answer_cache` without the model or the network.
+    """
+    data_tools, analysis_tools = TOOLSETS[toolset]
+    if PREFETCH_ENABLED:
+        data_tools = [observed(tool) for tool in data_tools]
+    return Agent(
+        name=NAME,
+        model=MODEL,
+        description=DESCRIPTION,
+        instruction=INSTRUCTION,
+        # Every tool call runs under its latency budget (utils.deadline), its
+        # requests are scheduled fairly against other sessions (utils.scheduler),
+        # and it is traced and can be profiled on demand (utils.tracing)
+        tools=[scheduled(budgeted(traced_tool(tool)))
+               for tool in data_tools + analysis_tools],
+        **(default_answer_cache.callbacks() if answer_cache else {}),
+    )
+
+
+root_agent = build_agent(os.environ.get("WRIS_TOOLSET", "full"))
+
+prefetcher = start_prefetcher() if PREFETCH_ENABLED else None
+
+# Watches restored from WRIS_WATCH_FILE resume polling
+if default_watcher.watches():
+    default_watcher.start()
@@ -0,0 +1,377 @@
+# ingress_agent/serve.py
+"""
+Multi-process serving of the agent.
+
+    python -m ingress_agent.serve --workers 4 --port 8080 [--host 127.0.0.1] [--upstream-rate 50]
+
+Starts N worker processes, each running the agent on its own local port,
+and a front server on `--host`:`--port` that forwards requests to them.
+The front server has no authentication and can call any tool, so it
+listens on the loopback interface unless another host is given:
+
+- POST /run {"user_id", "session_id", "message"}: one agent turn. Routed by
+  session id, so every turn of a session reaches the worker holding it.
+- POST /tools/<name> {"args": {...}, "session_id": ...}: one agent tool
+  called directly, with the same budget, scheduling and caches as from the
+  agent. Spread round-robin, except the watch tools, which are routed by
+  session id like /run, so a session's watches and alerts live on one
+  worker whether they were made by a turn or a direct call.
+- GET /metrics: cache, scheduler and shared-store metrics of every worker.
+- GET/POST /profile {"tool": {"rate", "calls", "interval"}, ...}: show or
+  replace the tools being profiled (utils/profiler.py), in every worker;
+  `{}` switches profiling off. Out-of-range options get a 400.
+
+Workers share a `SharedStore` (utils/shared_store.py): a second response
+cache tier, so one worker's fetch is a hit in all of them, and the upstream
+rate limit, so adding workers adds CPU without adding upstream traffic.
+Only worker 0 runs the cache prefetcher. With WRIS_WATCH_FILE set, every
+worker saves and restores its own watches in `<file>.<worker index>`.
+"""
+
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import tempfile
+import threading
+import zlib
+
+from .tools.watch_tools import WATCH_TOOL_NAMES
+from .utils.profiler import check_settings
+from .utils.result_encoding import encode
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORT = 8080
+DEFAULT_HOST = '127.0.0.1'
+APP_NAME = 'ingress_agent'
+WORKER_START_TIMEOUT_SECONDS = 120
+
+
+def _send_json(handler, status, body):
+    payload = encode(body)
+    handler.send_response(status)
+    handler.send_header('Content-Type', 'application/json')
+    handler.send_header('Content-Length', str(len(payload)))
+    handler.end_headers()
+    handler.wfile.write(payload)
+
+
+def _read_json(handler):
+    length = int(handler.headers.get('Content-Length') or 0)
+    return json.loads(handler.rfile.read(length) or b'{}')
+
+
+# Worker process
+
+class _Worker:
+    def __init__(self, index):
+        from google.adk.runners import InMemoryRunner
+
+        from .agent import root_agent
+
+        self.index = index
+        self.agent = root_agent
+        self.tools = {tool.__name__: tool for tool in root_agent.tools}
+        self.runner = InMemoryRunner(agent=root_agent, app_name=APP_NAME)
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+
+    def call_tool(self, name, body):
+        from .utils.scheduler import session_scope
+
+        tool = self.tools.get(name)
+        if tool is None:
+            return 404, {"status": "error", "error_message": f"Unknown tool '{name}'"}
+        with session_scope(body.get('session_id')):
+            return 200, tool(**body.get('args', {}))
+
+    def run_turn(self, body):
+        future = asyncio.run_coroutine_threadsafe(
+            self._turn(body.get('user_id', 'user'), body.get('session_id') or 'default', body.get('message', '')),
+            self.loop)
+        return 200, future.result()
+
+    async def _turn(self, user_id, session_id, message):
+        from google.genai import types
+
+        sessions = self.runner.session_service
+        if await sessions.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id) is None:
+            await sessions.create_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        answer = []
+        async for event in self.runner.run_async(
+                user_id=user_id, session_id=session_id,
+                new_message=types.Content(role='user', parts=[types.Part(text=message)])):
+            if event.is_final_response() and event.content and event.content.parts:
+                answer.extend(p.text for p in event.content.parts if p.text)
+        return {"answer": "".join(answer), "worker": self.index}
+
+    def profile(self, body=None):
+        from .utils.profiler import default_profiler
+
+        if body is not None:
+            try:
+                settings = check_settings(body)
+            except ValueError as exc:
+                return 400, {"status": "error", "error_message": str(exc)}
+            default_profiler.disable()
+            for tool, (rate, calls, interval) in settings.items():
+                default_profiler.enable(tool, rate, calls, interval)
+        return 200, {"worker": self.index, "profiling": default_profiler.settings(),
+                     "directory": default_profiler.directory}
+
+    def metrics(self):
+        from .tools.answer_cache import default_answer_cache
+        from .utils.crosswalk import default_crosswalk
+        from .utils.response_cache import default_cache
+        from .utils.page_tuner import default_page_tuner
+        from .utils.scheduler import default_scheduler
+        from .utils.series_store import default_series_store
+        from .utils.shared_store import default_rate_limiter, default_store
+        from .utils.watch import default_watcher
+
+        return {
+            "worker": self.index,
+            "pid": os.getpid(),
+            "response_cache": default_cache.stats(),
+            "answer_cache": default_answer_cache.metrics(),
+            "scheduler": default_scheduler.metrics(),
+            "shared_store": default_store.stats() if default_store is not None else None,
+            "rate_limit_wait_seconds": default_rate_limiter.waited_seconds if default_rate_limiter else 0.0,
+            "watch": default_watcher.metrics(),
+            "series_store": default_series_store.metrics(),
+            "crosswalk": default_crosswalk.metrics(),
+            "page_sizes": default_page_tuner.sizes() if default_page_tuner is not None else None,
+        }
+
+
+class _WorkerHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    worker = None
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == '/metrics':
+            _send_json(self, 200, self.worker.metrics())
+        elif self.path == '/profile':
+            _send_json(self, *self.worker.profile())
+        else:
+            _send_json(self, 404, {"status": "error", "error_message": "Not found"})
+
+    def do_POST(self):
+        try:
+            body = _read_json(self)
+            if self.path == '/run':
+                status, result = self.worker.run_turn(body)
+            elif self.path.startswith('/tools/'):
+                status, result = self.worker.call_tool(self.path[len('/tools/'):], body)
+            elif self.path == '/profile':
+                status, result = self.worker.profile(body)
+            else:
+                status, result = 404, {"status": "error", "error_message": "Not found"}
+        except Exception as exc:
+            logger.exception("Worker request failed")
+            status, result = 500, {"status": "error", "error_message": str(exc)}
+        _send_json(self, status, result)
+
+
+def _worker_main(index, ports):
+    worker = _Worker(index)
+    handler = type('Handler', (_WorkerHandler,), {'worker': worker})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    # Exit normally on terminate, so stores saved at exit (rollups) are flushed
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    ports.put((index, server.server_port))
+    server.serve_forever()
+
+
+# Front server
+
+class _Router:
+    def __init__(self, ports):
+        self.ports = ports
+        self._next = itertools.count()
+        self._local = threading.local()
+
+    def pick(self, path, body):
+        if path == '/run' or (path.startswith('/tools/') and path[len('/tools/'):] in WATCH_TOOL_NAMES):
+            session = str(body.get('session_id') or 'default')
+            return self.ports[zlib.crc32(session.encode()) % len(self.ports)]
+        return self.ports[next(self._next) % len(self.ports)]
+
+    def forward(self, port, method, path, payload):
+        pool = self._local.__dict__.setdefault('connections', {})
+        for attempt in range(2):
+            conn = pool.get(port)
+            if conn is None:
+                conn = pool[port] = HTTPConnection('127.0.0.1', port)
+            try:
+                conn.request(method, path, body=payload, headers={'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (ConnectionError, OSError):
+                # Stale keep-alive connection: reconnect once
+                conn.close()
+                pool.pop(port, None)
+                if attempt:
+                    raise
+
+
+class _FrontHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    router = None
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, payload):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _broadcast(self, method, payload):
+        # Metrics and profiling settings are per worker: ask every one
+        return [json.loads(self.router.forward(port, method, self.path, payload)[1]) for port in self.router.ports]
+
+    def do_GET(self):
+        if self.path not in ('/metrics', '/profile'):
+            return _send_json(self, 404, {"status": "error", "error_message": "Not found"})
+        _send_json(self, 200, {"workers": self._broadcast('GET', None)})
+
+    def do_POST(self):
+        payload = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        try:
+            body = json.loads(payload or b'{}')
+        except ValueError:
+            return _send_json(self, 400, {"status": "error", "error_message": "Body must be JSON"})
+        try:
+            if self.path == '/profile':
+                try:
+                    check_settings(body)
+                except ValueError as exc:
+                    return _send_json(self, 400, {"status": "error", "error_message": str(exc)})
+                return _send_json(self, 200, {"workers": self._broadcast('POST', payload)})
+            self._reply(*self.router.forward(self.router.pick(self.path, body), 'POST', self.path, payload))
+        except OSError as exc:
+            _send_json(self, 502, {"status": "error", "error_message": f"Worker unavailable: {exc}"})
+
+
+class Server:
+    """A running front server and its worker processes."""
+
+    def __init__(self, front, processes, store):
+        self.front = front
+        self.processes = processes
+        self.store = store
+        host = front.server_address[0]
+        self.url = f"http://{'127.0.0.1' if host in ('', '0.0.0.0', '::') else host}:{front.server_port}"
+
+    def serve_forever(self):
+        self.front.serve_forever()
+
+    def stop(self):
+        self.front.shutdown()
+        self.front.server_close()
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join(timeout=10)
+
+
+def start(workers=None, port=DEFAULT_PORT, store=None, upstream_rate=None, env=None, background=False,
+          shared=True, host=DEFAULT_HOST):
+    """Start `workers` agent processes sharing `store` and the front server on `host`:`port`.
+
+    `env` adds environment variables for the workers (e.g. WRIS_BASE_URL).
+    With `background`, the front server runs on a daemon thread. `shared=False`
+    gives every worker only its own caches (for comparison).
+    """
+    workers = workers or os.cpu_count() or 1
+    # A private (0700) directory: the store's contents are trusted by every worker
+    store = store or os.path.join(tempfile.mkdtemp(prefix='wris_serve_'), 'shared_store.sqlite')
+    worker_env = dict(env or {}, WRIS_SHARED_STORE=store if shared else '')
+    if upstream_rate is not None:
+        worker_env['WRIS_UPSTREAM_RATE'] = str(upstream_rate)
+
+    # Spawned (not forked) workers build their clients, caches and agent
+    # from scratch, configured by the environment they are started with
+    context = multiprocessing.get_context('spawn')
+    ports = context.Queue()
+    processes = []
+    saved = dict(os.environ)
+    try:
+        for index in range(workers):
+            os.environ.update(worker_env)
+            os.environ['WRIS_PREFETCH'] = saved.get('WRIS_PREFETCH', '0') if index == 0 else '0'
+            watch_file = saved.get('WRIS_WATCH_FILE', '')
+            os.environ['WRIS_WATCH_FILE'] = f"{watch_file}.{index}" if watch_file else ''
+            process = context.Process(target=_worker_main, args=(index, ports), daemon=True,
+                                      name=f'wris-worker-{index}')
+            process.start()
+            processes.append(process)
+    finally:
+        os.environ.clear()
+        os.environ.update(saved)
+
+    worker_ports = [None] * workers
+    try:
+        for _ in range(workers):
+            index, worker_port = ports.get(timeout=WORKER_START_TIMEOUT_SECONDS)
+            worker_ports[index] = worker_port
+    except Exception:
+        for process in processes:
+            process.terminate()
+        raise
+
+    handler = type('Handler', (_FrontHandler,), {'router': _Router(worker_ports)})
+    front = ThreadingHTTPServer((host, port), handler)
+    front.daemon_threads = True
+    server = Server(front, processes, store)
+    if background:
+        threading.Thread(target=front.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the agent from several worker processes.')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--host', default=DEFAULT_HOST,
+                        help='interface for the front server; it is unauthenticated, so only widen this '
+                             'behind a trusted network or proxy')
+    parser.add_argument('--store', default=None, help='shared SQLite store path')
+    parser.add_argument('--upstream-rate', type=float, default=None,
+                        help='upstream WRIS requests per second across all workers')
+    args = parser.parse_args()
+
+    # This process only forwards requests; it does not need its own prefetcher
+    from . import agent
+    if agent.prefetcher is not None:
+        agent.prefetcher.stop()
+
+    logging.basicConfig(level=logging.INFO)
+    server = start(args.workers, args.port, args.store, args.upstream_rate, host=args.host)
+    logger.info("Serving on %s:%d with %d workers (shared store %s)", args.host, args.port, args.workers,
+                server.store)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
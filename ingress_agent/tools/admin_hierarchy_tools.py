@@ -3,9 +3,53 @@
 Tools for accessing WRIS data using admin hierarchy (state/district)
 """
 
-from typing import Dict, Any
-from ..utils.wris_client import default_client
-from ..utils.data_processor import default_processor
+from typing import Dict, Any, Optional
+from ..utils.classification import classify_rainfall
+from ..utils.record_batch import RecordBatch
+from ..utils.timeseries import tidy_frame
+from .common import ADMIN, fetch_and_process
+
+
+def _fetch_admin(data_type: str, state_name: str, district_name: str, agency_name: Optional[str],
+                 start_date: Optional[str], end_date: Optional[str], **kwargs) -> Dict[str, Any]:
+    return fetch_and_process(ADMIN, data_type, (state_name, district_name), agency_name,
+                             start_date, end_date, **kwargs)
+
+
+def _attach_quality_score(result: Dict[str, Any], batch: RecordBatch,
+                          stats: Optional[Dict[str, Any]]) -> None:
+    if stats is not None:
+        result['data_quality_score'] = stats.get('data_quality_score', 0)
+
+
+def _classify_rainfall(result: Dict[str, Any], batch: RecordBatch,
+                       stats: Optional[Dict[str, Any]]) -> None:
+    """Count station-days per intensity band (see utils/classification.py).
+
+    Only the returned page is classified; when the query has more records,
+    the counts are marked as a sample of the period.
+    """
+    if stats is None:
+        return
+    tidy = tidy_frame(batch.to_dataframe(), value_col=stats['value_column'])
+    if tidy.empty:
+        return
+    intensity = classify_rainfall(tidy)
+    intensity['sample'] = len(batch) < result.get('total_records', 0)
+    if intensity['sample']:
+        intensity['note'] = (f"Counts cover the {len(batch)} returned records of {result['total_records']}; "
+                             "use the rainfall_intensity analysis for the whole period")
+    result['rainfall_intensity'] = intensity
+
+
+# Extra fetch options for the data types whose tools add more than the shared
+# summary/statistics; also used by the generic tools
+ADMIN_FETCH_OPTIONS = {
+    'ground_water_level': {'postprocess': _attach_quality_score},
+    'rainfall': {'postprocess': _classify_rainfall},
+    'evapo_transpiration': {'label': 'evapotranspiration'},
+}
+
 
 def get_wind_direction_data(state_name: str, district_name: str, agency_name: str, 
                            start_date: str, end_date: str) -> Dict[str, Any]:
@@ -22,35 +66,8 @@ def get_wind_direction_data(state_name: str, district_name: str, agency_name: st
     Returns:
         dict: status and result or error message
     """
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='wind_direction',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved wind direction data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-        
-        df = default_processor.to_dataframe(result)
-        if not df.empty:
-            value_cols = df.select_dtypes(include=['number']).columns
-            if len(value_cols) > 0:
-                stats = default_processor.calculate_statistics(df, value_cols[0])
-                if 'error' not in stats:
-                    result['statistics'] = stats # pyright: ignore[reportArgumentType]
-    
-    return result
+    return _fetch_admin('wind_direction', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_ground_water_level_data(state_name: str, district_name: str, agency_name: str,
                                start_date: str, end_date: str) -> Dict[str, Any]:
@@ -67,36 +84,9 @@ def get_ground_water_level_data(state_name: str, district_name: str, agency_name
     Returns:
         dict: status and result or error message
     """
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='ground_water_level',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved ground water level data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-        
-        df = default_processor.to_dataframe(result)
-        if not df.empty:
-            value_cols = df.select_dtypes(include=['number']).columns
-            if len(value_cols) > 0:
-                stats = default_processor.calculate_statistics(df, value_cols[0])
-                if 'error' not in stats:
-                    result['statistics'] = stats # pyright: ignore[reportArgumentType]
-                    result['data_quality_score'] = stats.get('data_quality_score', 0)
-    
-    return result
+    return _fetch_admin('ground_water_level', state_name, district_name, agency_name, start_date, end_date,
+                        **ADMIN_FETCH_OPTIONS['ground_water_level'])
+
 
 def get_rainfall_data(state_name: str, district_name: str, agency_name: str,
                      start_date: str, end_date: str) -> Dict[str, Any]:
@@ -113,46 +103,9 @@ def get_rainfall_data(state_name: str, district_name: str, agency_name: str,
     Returns:
         dict: status and result or error message
     """
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='rainfall',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved rainfall data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-        
-        df = default_processor.to_dataframe(result)
-        if not df.empty:
-            value_cols = df.select_dtypes(include=['number']).columns
-            if len(value_cols) > 0:
-                stats = default_processor.calculate_statistics(df, value_cols[0])
-                if 'error' not in stats:
-                    result['statistics'] = stats # pyright: ignore[reportArgumentType]
-                    mean_rainfall = stats['mean']
-                    if mean_rainfall < 10:
-                        result['rainfall_category'] = 'Very Low'
-                    elif mean_rainfall < 25:
-                        result['rainfall_category'] = 'Low'
-                    elif mean_rainfall < 65:
-                        result['rainfall_category'] = 'Moderate'
-                    elif mean_rainfall < 115:
-                        result['rainfall_category'] = 'Heavy'
-                    else:
-                        result['rainfall_category'] = 'Very Heavy'
-    
-    return result
+    return _fetch_admin('rainfall', state_name, district_name, agency_name, start_date, end_date,
+                        **ADMIN_FETCH_OPTIONS['rainfall'])
+
 
 def get_temperature_data(state_name: str, district_name: str, agency_name: str,
                         start_date: str, end_date: str) -> Dict[str, Any]:
@@ -169,274 +122,65 @@ def get_temperature_data(state_name: str, district_name: str, agency_name: str,
     Returns:
         dict: API response with status and data
     """
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='temperature',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved temperature data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('temperature', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_suspended_sediment_data(state_name: str, district_name: str, agency_name: str,
                                start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves suspended sediment data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='suspended_sediment',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved suspended sediment data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('suspended_sediment', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_solar_radiation_data(state_name: str, district_name: str, agency_name: str,
                             start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves solar radiation data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='solar_radiation',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved solar radiation data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('solar_radiation', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_soil_moisture_data(state_name: str, district_name: str, agency_name: str,
                           start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves soil moisture data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='soil_moisture',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved soil moisture data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('soil_moisture', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_snowfall_data(state_name: str, district_name: str, agency_name: str,
                      start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves snowfall data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='snowfall',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved snowfall data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('snowfall', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_river_water_level_data(state_name: str, district_name: str, agency_name: str,
                               start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves river water level data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='river_water_level',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved river water level data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('river_water_level', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_river_water_discharge_data(state_name: str, district_name: str, agency_name: str,
                                   start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves river water discharge data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='river_water_discharge',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved river water discharge data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('river_water_discharge', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_reservoir_data(state_name: str, district_name: str, agency_name: str,
                       start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves reservoir data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='reservoir',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved reservoir data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('reservoir', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_relative_humidity_data(state_name: str, district_name: str, agency_name: str,
                               start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves relative humidity data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='relative_humidity',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved relative humidity data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('relative_humidity', state_name, district_name, agency_name, start_date, end_date)
+
 
 def get_evapo_transpiration_data(state_name: str, district_name: str, agency_name: str,
                                 start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves evapotranspiration data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='evapo_transpiration',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved evapotranspiration data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
+    return _fetch_admin('evapo_transpiration', state_name, district_name, agency_name, start_date, end_date,
+                        **ADMIN_FETCH_OPTIONS['evapo_transpiration'])
+
 
 def get_atmospheric_pressure_data(state_name: str, district_name: str, agency_name: str,
                                  start_date: str, end_date: str) -> Dict[str, Any]:
     """Retrieves atmospheric pressure data from WRIS API"""
-    # Handle default values inside the function
-    if not agency_name:
-        agency_name = "CWC"
-    if not start_date:
-        start_date = "2024-01-01"
-    if not end_date:
-        end_date = "2024-01-05"
-
-    result = default_client.get_admin_hierarchy_data(
-        data_type='atmospheric_pressure',
-        state_name=state_name,
-        district_name=district_name,
-        agency_name=agency_name,
-        start_date=start_date,
-        end_date=end_date
-    )
-    
-    if result['status'] == 'success':
-        result['summary'] = f"Retrieved atmospheric pressure data for {district_name}, {state_name}. Total records: {result.get('total_records', 0)}"
-    
-    return result
\ No newline at end of file
+    return _fetch_admin('atmospheric_pressure', state_name, district_name, agency_name, start_date, end_date)
@@ -0,0 +1,590 @@
+# tools/analytics_tools.py
+"""
+Time-series analytics over fetched WRIS series (admin hierarchy).
+
+Every tool accepts a single district, a comma-separated list of districts,
+or an empty district to cover all known districts of the state
+(`STATES_DISTRICTS`). Districts are fetched concurrently through the shared
+bulk path (`tools.common.fetch_series`), which reuses cached series, and all
+stations are then analysed together as one matrix computation.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from ..utils import deadline
+from ..utils.agencies import default_agency_memory
+from ..utils.classification import classify_groundwater_stage, classify_rainfall
+from ..utils.constants import GROUNDWATER_CATEGORIES, SUMMED_DATA_TYPES
+from ..utils.correlation import (
+    align_asof,
+    align_resampled,
+    common_period,
+    lagged_correlation,
+    response_lag,
+)
+from ..utils.rollups import GRAINS, default_rollups, season_label
+from ..utils.timeseries import (
+    mann_kendall,
+    monsoon_fluctuation,
+    rainfall_departure,
+    seasonal_decompose,
+    seasonal_strength,
+    station_matrix,
+    tidy_frame,
+)
+from .common import ADMIN, fetch_series, resolve_districts
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_DEFAULT_START = "2015-01-01"
+ANALYTICS_DEFAULT_END = "2024-12-31"
+# Per-station rows included in a tool result; the rest is summarised
+MAX_STATIONS_IN_RESULT = 50
+# Rainfall departure compares one window of at most a year with the same days in earlier years
+MAX_DEPARTURE_DAYS = 366
+FETCH_WORKERS = 6
+
+
+def _load_tidy(data_type: str, state_name: str, district_name: Optional[str], agency_name: Optional[str],
+               start_date: Optional[str], end_date: Optional[str]) -> Tuple[pd.DataFrame, List[str]]:
+    """Fetch every requested district concurrently and return one tidy frame."""
+    districts = resolve_districts(state_name, district_name)
+    start_date = start_date or ANALYTICS_DEFAULT_START
+    end_date = end_date or ANALYTICS_DEFAULT_END
+
+    def load(district: str):
+        return district, fetch_series(ADMIN, data_type, (state_name, district), agency_name, start_date, end_date)
+
+    frames, errors = [], []
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        for district, (envelope, batch) in pool.map(deadline.bind(load), districts):
+            if batch is None:
+                errors.append(f"{district}: {envelope.get('error_message', 'fetch failed')}")
+            elif len(batch):
+                tidy = tidy_frame(batch.to_dataframe())
+                tidy["station"] = district + "/" + tidy["station"].astype(str)
+                frames.append(tidy)
+    if not frames:
+        return pd.DataFrame(columns=["station", "time", "value"]), errors
+    return pd.concat(frames, ignore_index=True), errors
+
+
+def _no_data(data_type: str, state_name: str, errors: List[str]) -> Dict[str, Any]:
+    return {
+        "status": "error",
+        "error_message": f"No {data_type.replace('_', ' ')} data found for {state_name}",
+        "fetch_errors": errors,
+    }
+
+
+def _same_days(day: pd.Timestamp, year: int) -> pd.Timestamp:
+    """`day` in `year` (29 February becomes the 28th in other years)."""
+    try:
+        return day.replace(year=year)
+    except ValueError:
+        return day.replace(year=year, day=28)
+
+
+def _round(values: np.ndarray, digits: int = 4) -> List[Optional[float]]:
+    return [None if not np.isfinite(v) else round(float(v), digits) for v in values]
+
+
+def get_trend_analysis(data_type: str, state_name: str, district_name: str, agency_name: str,
+                       start_date: str, end_date: str) -> Dict[str, Any]:
+    """
+    Runs a Mann-Kendall trend test with Sen's slope on monthly series for every station.
+
+    Args:
+        data_type (str): WRIS data type (e.g., "ground_water_level", "rainfall", "river_water_level")
+        state_name (str): Name of the state (e.g., "Maharashtra")
+        district_name (str): District, comma-separated districts, or empty for all districts of the state
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format (use several years for a meaningful trend)
+        end_date (str): End date in YYYY-MM-DD format
+
+    Returns:
+        dict: per-station trend direction, p-value and slope per year, plus a state-level summary
+    """
+    tidy, errors = _load_tidy(data_type, state_name, district_name, agency_name, start_date, end_date)
+    if tidy.empty:
+        return _no_data(data_type, state_name, errors)
+
+    how = "sum" if data_type in SUMMED_DATA_TYPES else "mean"
+    stations, _, matrix = station_matrix(tidy, freq="M", how=how)
+    mk = mann_kendall(matrix)
+
+    order = np.argsort(np.nan_to_num(mk["p"], nan=2.0))[:MAX_STATIONS_IN_RESULT]
+    counts = pd.Series(mk["trend"]).value_counts().to_dict()
+    return {
+        "status": "success",
+        "summary": (
+            f"Mann-Kendall trend test on monthly {data_type.replace('_', ' ')} for {len(stations)} stations "
+            f"in {state_name}: " + ", ".join(f"{v} {k}" for k, v in counts.items())
+        ),
+        "trend_counts": counts,
+        "median_slope_per_year": _round(np.array([np.nanmedian(mk["slope"]) * 12]))[0]
+        if np.isfinite(mk["slope"]).any() else None,
+        "stations": [
+            {
+                "station": str(stations[k]),
+                "trend": str(mk["trend"][k]),
+                "p_value": _round(mk["p"][k:k + 1])[0],
+                "z": _round(mk["z"][k:k + 1], 3)[0],
+                "sen_slope_per_year": _round(mk["slope"][k:k + 1] * 12)[0],
+                "months": int(mk["n"][k]),
+            }
+            for k in order
+        ],
+        "fetch_errors": errors,
+    }
+
+
+def get_seasonal_decomposition(data_type: str, state_name: str, district_name: str, agency_name: str,
+                               start_date: str, end_date: str) -> Dict[str, Any]:
+    """
+    Splits monthly series into trend, seasonal and residual parts for every station.
+
+    Args:
+        data_type (str): WRIS data type (e.g., "rainfall", "ground_water_level")
+        state_name (str): Name of the state (e.g., "Maharashtra")
+        district_name (str): District, comma-separated districts, or empty for all districts of the state
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format (at least two years)
+        end_date (str): End date in YYYY-MM-DD format
+
+    Returns:
+        dict: average seasonal profile by calendar month and per-station seasonal strength
+    """
+    tidy, errors = _load_tidy(data_type, state_name, district_name, agency_name, start_date, end_date)
+    if tidy.empty:
+        return _no_data(data_type, state_name, errors)
+
+    how = "sum" if data_type in SUMMED_DATA_TYPES else "mean"
+    stations, periods, matrix = station_matrix(tidy, freq="M", how=how)
+    if matrix.shape[1] < 24:
+        return {"status": "error", "error_message": "Seasonal decomposition needs at least two years of data"}
+
+    trend, seasonal, residual = seasonal_decompose(matrix, period=12)
+    strength = seasonal_strength(seasonal, residual)
+
+    months = np.asarray(periods.month)
+    with np.errstate(invalid="ignore"):
+        profile = {
+            pd.Timestamp(2000, m, 1).strftime("%b"): _round(np.array([np.nanmean(seasonal[:, months == m])]))[0]
+            for m in range(1, 13)
+        }
+    order = np.argsort(-np.nan_to_num(strength, nan=-1.0))[:MAX_STATIONS_IN_RESULT]
+    return {
+        "status": "success",
+        "summary": (
+            f"Seasonal decomposition of monthly {data_type.replace('_', ' ')} for {len(stations)} stations "
+            f"in {state_name} over {len(periods)} months"
+        ),
+        "seasonal_profile": profile,
+        "median_seasonal_strength": _round(np.array([np.nanmedian(strength)]), 3)[0],
+        "stations": [
+            {
+                "station": str(stations[k]),
+                "seasonal_strength": _round(strength[k:k + 1], 3)[0],
+                "trend_range": _round(np.array([np.nanmax(trend[k]) - np.nanmin(trend[k])]))[0]
+                if np.isfinite(trend[k]).any() else None,
+            }
+            for k in order
+        ],
+        "fetch_errors": errors,
+    }
+
+
+def get_groundwater_fluctuation(state_name: str, district_name: str, agency_name: str,
+                                start_date: str, end_date: str) -> Dict[str, Any]:
+    """
+    Computes pre-monsoon (April-June) to post-monsoon (October-November) groundwater level fluctuation.
+
+    Args:
+        state_name (str): Name of the state (e.g., "Maharashtra")
+        district_name (str): District, comma-separated districts, or empty for all districts of the state
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+
+    Returns:
+        dict: per-year fluctuation summary (positive = water table rose) and per-station values
+    """
+    tidy, errors = _load_tidy("ground_water_level", state_name, district_name, agency_name, start_date, end_date)
+    if tidy.empty:
+        return _no_data("ground_water_level", state_name, errors)
+
+    levels = monsoon_fluctuation(tidy).dropna(subset=["fluctuation"])
+    if levels.empty:
+        return {"status": "error", "error_message": "No station has both pre- and post-monsoon readings",
+                "fetch_errors": errors}
+
+    by_year = levels.groupby(level="year")["fluctuation"].agg(["mean", "median", "count"])
+    by_year["rise_fraction"] = levels["fluctuation"].gt(0).groupby(level="year").mean()
+    latest = levels.xs(levels.index.get_level_values("year").max(), level="year")
+    latest = latest.reindex(latest["fluctuation"].abs().sort_values(ascending=False).index)
+    return {
+        "status": "success",
+        "summary": (
+            f"Pre- to post-monsoon groundwater fluctuation for {levels.index.get_level_values('station').nunique()} "
+            f"stations in {state_name}; positive values mean the water table rose"
+        ),
+        "by_year": {
+            int(year): {
+                "mean_m": round(float(row["mean"]), 3),
+                "median_m": round(float(row["median"]), 3),
+                "stations": int(row["count"]),
+                "rise_fraction": round(float(row["rise_fraction"]), 3),
+            }
+            for year, row in by_year.iterrows()
+        },
+        "latest_year_stations": [
+            {"station": str(station), "pre_m": round(float(row["pre"]), 3), "post_m": round(float(row["post"]), 3),
+             "fluctuation_m": round(float(row["fluctuation"]), 3)}
+            for station, row in latest.head(MAX_STATIONS_IN_RESULT).iterrows()
+        ],
+        "fetch_errors": errors,
+    }
+
+
+def get_rainfall_departure(state_name: str, district_name: str, agency_name: str,
+                           start_date: str, end_date: str, normal_start_year: str,
+                           normal_end_year: str) -> Dict[str, Any]:
+    """
+    Compares rainfall in a period of up to a year with the normal (long-period average) for the same days.
+
+    Args:
+        state_name (str): Name of the state (e.g., "Karnataka")
+        district_name (str): District, comma-separated districts, or empty for all districts of the state
+        agency_name (str): Agency name
+        start_date (str): Start of the period to assess, YYYY-MM-DD
+        end_date (str): End of the period to assess, YYYY-MM-DD (at most a year after start_date;
+            assess longer periods one year or season at a time)
+        normal_start_year (str): First year of the reference period (e.g., "2000")
+        normal_end_year (str): Last year of the reference period (e.g., "2020"); years are those
+            in which the same days start
+
+    Returns:
+        dict: per-district actual vs normal rainfall, percent departure and IMD category
+    """
+    if not start_date or not end_date:
+        return {"status": "error", "error_message": "start_date and end_date are required"}
+    try:
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        normal_end_year = int(normal_end_year or start.year - 1)
+        normal_start_year = int(normal_start_year or normal_end_year - 10)
+    except ValueError as exc:
+        return {"status": "error", "error_message": f"Invalid date or year: {exc}"}
+    if end < start:
+        return {"status": "error", "error_message": "end_date is before start_date"}
+    if (end - start).days >= MAX_DEPARTURE_DAYS:
+        return {"status": "error", "error_message": (
+            "Rainfall departure compares a period of at most a year with the same days in the "
+            "reference years; assess longer periods one year or season at a time")}
+    if normal_end_year < normal_start_year or normal_end_year >= start.year:
+        return {"status": "error", "error_message": "The reference years must end before start_date's year"}
+    # Years the window crosses into (0, or 1 for e.g. November to February)
+    span = end.year - start.year
+
+    current, errors = _load_tidy("rainfall", state_name, district_name, agency_name, start_date, end_date)
+    reference, ref_errors = _load_tidy("rainfall", state_name, district_name, agency_name,
+                                       f"{normal_start_year}-01-01", f"{normal_end_year + span}-12-31")
+    errors += ref_errors
+    if current.empty or reference.empty:
+        return _no_data("rainfall", state_name, errors)
+
+    # Normal = mean over reference years of the total for exactly the same
+    # days, averaged across stations in each district
+    current = current[(current["time"] >= start) & (current["time"] < end + pd.Timedelta(days=1))]
+    times = reference["time"].to_numpy()
+    year = np.full(len(reference), -1)
+    for y in range(normal_start_year, normal_end_year + 1):
+        first = _same_days(start, y).to_datetime64()
+        last = (_same_days(end, y + span) + pd.Timedelta(days=1)).to_datetime64()
+        year[(times >= first) & (times < last)] = y
+    reference = reference.assign(year=year)[year >= 0]
+    current, reference = (frame.assign(district=frame["station"].str.split("/", n=1).str[0])
+                          for frame in (current, reference))
+    if current.empty or reference.empty:
+        return _no_data("rainfall", state_name, errors)
+
+    actual = current.groupby(["district", "station"])["value"].sum().groupby(level="district").mean()
+    per_year = reference.groupby(["district", "station", "year"])["value"].sum()
+    normal = per_year.groupby(level=["district", "station"]).mean().groupby(level="district").mean()
+    normal = normal.reindex(actual.index)
+
+    departure, category = rainfall_departure(actual.to_numpy(), normal.to_numpy())
+    return {
+        "status": "success",
+        "summary": (
+            f"Rainfall departure from the {normal_start_year}-{normal_end_year} normal for "
+            f"{start_date} to {end_date} in {state_name}"
+        ),
+        "districts": [
+            {
+                "district": district,
+                "actual_mm": round(float(a), 1),
+                "normal_mm": None if not np.isfinite(nm) else round(float(nm), 1),
+                "departure_percent": None if not np.isfinite(d) else round(float(d), 1),
+                "category": str(c),
+            }
+            for district, a, nm, d, c in zip(actual.index, actual.to_numpy(), normal.to_numpy(), departure, category)
+        ],
+        "fetch_errors": errors,
+    }
+
+
+def get_rainfall_intensity(state_name: str, district_name: str, agency_name: str,
+                           start_date: str, end_date: str) -> Dict[str, Any]:
+    """
+    Classifies every station-day of rainfall into IMD intensity bands (No Rain, Very Light, Light, Moderate, Heavy,
+    Very Heavy, Extremely Heavy).
+
+    Args:
+        state_name (str): Name of the state (e.g., "Kerala")
+        district_name (str): District, comma-separated districts, or empty for all districts of the state
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+
+    Returns:
+        dict: station-day counts and shares per band for the whole selection and per district,
+        plus the wettest station-day
+    """
+    tidy, errors = _load_tidy("rainfall", state_name, district_name, agency_name, start_date, end_date)
+    if tidy.empty:
+        return _no_data("rainfall", state_name, errors)
+    tidy["district"] = tidy["station"].str.split("/", n=1).str[0]
+    result = classify_rainfall(tidy, group="district")
+    heavy = result["counts"]["Heavy"] + result["counts"]["Very Heavy"] + result["counts"]["Extremely Heavy"]
+    return {
+        "status": "success",
+        "summary": (
+            f"Rainfall intensity for {result['station_days']} station-days in {state_name}: "
+            f"{heavy} heavy or heavier, {result['counts']['No Rain']} without rain"
+        ),
+        "station_days": result["station_days"],
+        "counts": result["counts"],
+        "distribution": result["distribution"],
+        "wettest": result.get("wettest"),
+        "districts": result["groups"],
+        "fetch_errors": errors,
+    }
+
+
+def get_groundwater_stage_categories(assessment_units: str, stage_of_extraction: str,
+                                     regions: Optional[str]) -> Dict[str, Any]:
+    """
+    Assigns groundwater assessment units to CGWB categories from their stage of extraction.
+
+    Categories: SAFE (up to 70%), SEMI_CRITICAL (70-90%), CRITICAL (90-100%) and
+    OVER_EXPLOITED (above 100% of annual recharge).
+
+    Args:
+        assessment_units (str): Comma-separated unit names (blocks, mandals, talukas)
+        stage_of_extraction (str): Comma-separated stage of extraction per unit, in percent
+        regions (str): Comma-separated district or state per unit, to count categories per region; may be empty
+
+    Returns:
+        dict: category per unit, counts and shares per category overall and per region
+    """
+    units = [u.strip() for u in (assessment_units or "").split(",")]
+    try:
+        stages = [float(v) if v.strip() else np.nan for v in (stage_of_extraction or "").split(",")]
+    except ValueError:
+        return {"status": "error", "error_message": "stage_of_extraction must be comma-separated numbers"}
+    groups = [r.strip() for r in regions.split(",")] if regions else None
+    if len(units) != len(stages) or (groups is not None and len(groups) != len(units)):
+        return {"status": "error",
+                "error_message": "assessment_units, stage_of_extraction and regions must have the same length"}
+    result = classify_groundwater_stage(stages, units, groups)
+    return {
+        "status": "success",
+        "summary": f"{len(units)} assessment units: " + ", ".join(
+            f"{c} {label}" for label, c in result["counts"].items() if c),
+        "units": [{"unit": u, "stage_of_extraction": None if np.isnan(s) else s, "category": c}
+                  for u, s, c in zip(units, stages, result["categories"])],
+        "counts": result["counts"],
+        "distribution": result["distribution"],
+        "regions": result.get("groups"),
+        "definitions": GROUNDWATER_CATEGORIES,
+    }
+
+
+def get_correlation_analysis(data_types: str, state_name: str, district_name: str, agency_name: str,
+                             start_date: str, end_date: str, max_lag: str) -> Dict[str, Any]:
+    """
+    Relates several datasets for one location, e.g. how groundwater level responds to rainfall.
+
+    All data types are fetched concurrently, aligned on a common time axis and
+    correlated at lags from 0 to max_lag periods. The first data type is the
+    driver; each other data type is correlated against it.
+
+    Args:
+        data_types (str): Comma-separated data types, driver first (e.g., "rainfall,ground_water_level")
+        state_name (str): Name of the state (e.g., "Maharashtra")
+        district_name (str): District, comma-separated districts, or empty for all districts of the state
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format (use a year or more)
+        end_date (str): End date in YYYY-MM-DD format
+        max_lag (str): Largest lag to test, in periods of the common time axis (default "6")
+
+    Returns:
+        dict: common period, per-pair correlation at lag 0, strongest lag and its correlation,
+        plus an as-of comparison of each sparse reading against the driver's preceding window
+    """
+    types = [t.strip() for t in (data_types or "").split(",") if t.strip()]
+    if len(types) < 2:
+        return {"status": "error", "error_message": "Provide at least two comma-separated data types"}
+    max_lag_periods = int(max_lag) if max_lag and str(max_lag).isdigit() else 6
+
+    with ThreadPoolExecutor(max_workers=len(types)) as pool:
+        loaded = list(pool.map(
+            deadline.bind(lambda t: _load_tidy(t, state_name, district_name, agency_name, start_date, end_date)),
+            types))
+    tidies, errors = {}, []
+    for data_type, (tidy, errs) in zip(types, loaded):
+        errors += errs
+        if not tidy.empty:
+            tidies[data_type] = tidy
+    driver = types[0]
+    if driver not in tidies or len(tidies) < 2:
+        missing = [t for t in types if t not in tidies]
+        return {"status": "error", "error_message": f"No data for: {', '.join(missing)}", "fetch_errors": errors}
+
+    freq = common_period(list(tidies.values()))
+    wide = align_resampled(tidies, freq)
+    others = [t for t in types[1:] if t in tidies]
+    # one row per pair: driver series against each other series
+    a = np.repeat(wide[driver].to_numpy()[None, :], len(others), axis=0)
+    b = np.stack([wide[t].to_numpy() for t in others])
+    corr, overlap = lagged_correlation(a, b, max_lag_periods)
+    best = response_lag(corr)
+
+    # Station-level view where both datasets report from the same stations
+    by_station = align_resampled(tidies, freq, by_station=True)
+    shared_stations = by_station.dropna(how="any").index.get_level_values(0).unique() \
+        if len(by_station) else []
+
+    pairs = []
+    for k, other in enumerate(others):
+        lag = int(best[k])
+        pair = {
+            "driver": driver,
+            "response": other,
+            "correlation_lag0": _round(corr[k, :1], 3)[0],
+            "overlap_periods": int(overlap[k, 0]),
+            "response_lag_periods": lag if lag >= 0 else None,
+            "correlation_at_response_lag": _round(corr[k, lag:lag + 1], 3)[0] if lag >= 0 else None,
+            "correlation_by_lag": _round(corr[k], 3),
+        }
+        sparse_interval = tidies[other]["time"].sort_values().diff().median()
+        if pd.notna(sparse_interval) and sparse_interval > pd.Timedelta(days=20):
+            # Sparse response (e.g. quarterly groundwater): relate each reading to
+            # the driver's total/mean over the preceding 30 days
+            joined = align_asof(tidies[other], tidies[driver], driver, window="30D").dropna()
+            if len(joined) >= 3:
+                pair["asof_30d_correlation"] = round(float(joined["value"].corr(joined["dense"])), 3)
+                pair["asof_readings"] = int(len(joined))
+        pairs.append(pair)
+
+    return {
+        "status": "success",
+        "summary": (
+            f"Aligned {', '.join(tidies)} for {state_name}"
+            f"{' - ' + district_name if district_name else ''} on a common '{freq}' period "
+            f"({len(wide)} periods) and correlated at lags 0-{max_lag_periods}"
+        ),
+        "common_period": freq,
+        "pairs": pairs,
+        "shared_stations": len(shared_stations),
+        "fetch_errors": errors,
+    }
+
+
+def get_aggregate_statistics(data_type: str, hierarchy: str, region_name: str, sub_region_name: str,
+                             agency_name: str, grain: str, start_date: str, end_date: str) -> Dict[str, Any]:
+    """
+    Answers aggregate questions (e.g. average monthly rainfall in a state for a year) from precomputed rollups.
+
+    Daily, monthly and seasonal aggregates are kept per district/tributary and agency; state, basin and
+    national answers are combined from them. Districts of a state that have not been loaded yet are
+    fetched once and added to the rollups.
+
+    Args:
+        data_type (str): WRIS data type (e.g., "rainfall")
+        hierarchy (str): "admin" (state/district) or "basin" (basin/tributary)
+        region_name (str): State or basin name; empty for all regions (national)
+        sub_region_name (str): District or tributary; empty for the whole region
+        agency_name (str): Agency name; empty for all agencies
+        grain (str): "day", "month" (default) or "season"
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+
+    Returns:
+        dict: one row per period with total, mean per reading, mean per-station total, min, max and count
+    """
+    hierarchy = (hierarchy or "admin").lower()
+    grain = (grain or "month").lower()
+    if grain not in GRAINS:
+        return {"status": "error", "error_message": f"grain must be one of {', '.join(GRAINS)}"}
+    start_date = start_date or ANALYTICS_DEFAULT_START
+    end_date = end_date or ANALYTICS_DEFAULT_END
+
+    errors: List[str] = []
+    if hierarchy == ADMIN and region_name:
+        # Without an agency, a district is loaded once every agency that
+        # would be fetched for it (see fetch_series) is rolled up
+        def loaded(district):
+            location = (region_name, district)
+            agencies = [agency_name] if agency_name else \
+                default_agency_memory.candidates(ADMIN, data_type, location)
+            return all(default_rollups.covers(data_type, ADMIN, location, agency, start_date, end_date)
+                       for agency in agencies)
+
+        missing = [d for d in resolve_districts(region_name, sub_region_name) if not loaded(d)]
+        if missing:
+            with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+                for district, (envelope, batch) in zip(missing, pool.map(
+                        deadline.bind(lambda d: fetch_series(ADMIN, data_type, (region_name, d), agency_name or None,
+                                                             start_date, end_date)), missing)):
+                    if batch is None:
+                        errors.append(f"{district}: {envelope.get('error_message', 'fetch failed')}")
+
+    rows = default_rollups.query(
+        data_type, grain, hierarchy=hierarchy, region=region_name or None, sub_region=sub_region_name or None,
+        agency=agency_name or None, start=start_date, end=end_date)
+    if rows.empty:
+        return {"status": "error", "error_message": "No aggregated data available for this query",
+                "fetch_errors": errors}
+
+    scope = ", ".join(p for p in (sub_region_name, region_name) if p) or "India"
+    periods = []
+    for period, row in rows.iterrows():
+        label = season_label(period) if grain == "season" else (
+            period.strftime("%Y-%m") if grain == "month" else period.strftime("%Y-%m-%d"))
+        periods.append({
+            "period": label,
+            "total": round(float(row["sum"]), 2),
+            "mean_per_reading": round(float(row["mean"]), 3),
+            "mean_station_total": None if pd.isna(row["mean_station_total"])
+            else round(float(row["mean_station_total"]), 2),
+            "min": round(float(row["min"]), 3),
+            "max": round(float(row["max"]), 3),
+            "readings": int(row["count"]),
+            "rollup_rows": int(row["rows"]),
+        })
+    return {
+        "status": "success",
+        "summary": (
+            f"{grain.capitalize()} {data_type.replace('_', ' ')} aggregates for {scope}, {start_date} to {end_date}, "
+            f"combined from {int(rows['rows'].sum())} precomputed rows"
+        ),
+        "periods": periods,
+        "fetch_errors": errors,
+    }
@@ -0,0 +1,415 @@
+# tools/answer_cache.py
+"""
+Agent-level cache of tool results and final answers.
+
+Tool results are keyed by canonical tool calls: data tools of either
+toolset are reduced to (hierarchy, data type, location, agency, window)
+with names case-folded, "all agencies" spellings unified and default dates
+filled in. Final answers are keyed by the question as well as the calls,
+since different questions ("which station had the wettest day", "what was
+the total rainfall") can need the same fetch. A question's key is its
+canonical call when `parse_question` resolves it to a plain fetch, so
+paraphrases of one plain question ("rainfall Pune Jan 2024", "how much did
+it rain in Pune in January 2024") share an answer; any other question is
+keyed by its normalized text.
+
+The cache sits in front of the model through the agent's callbacks:
+
+- before a turn's first model call, `parse_question` tries to resolve the
+  user's text to a single data fetch without the model; if an answer is
+  stored for that question and call, it is returned as the model's reply
+  (no model call, no network);
+- when the model proposes tool calls and an answer is stored for the same
+  question and calls, the stored answer replaces the proposal (the tools
+  and the second model call are skipped);
+- every tool call is looked up before it runs and its result stored after;
+- the final answer of a turn that used tools is stored under its question
+  and calls.
+
+Entries expire with the freshness of the data they cover: windows reaching
+the last few days live minutes, historical ones days. Memory is bounded by
+entry count and total (JSON) size, least recently used first. Truncated and
+failed results are never stored, and neither is any turn that used a watch
+tool, whose results depend on live state.
+"""
+
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import calendar
+import logging
+import os
+import re
+import threading
+import time
+
+from google.adk.models import LlmResponse
+from google.genai import types
+
+from ..utils.constants import DATA_TYPE_AGENCIES, STATES_DISTRICTS
+from ..utils.result_encoding import EncodedResult, encode
+from ..utils.wris_client import ADMIN_ENDPOINT_MAP, BASIN_ENDPOINT_MAP
+from .common import ADMIN, ALL_AGENCIES, ALL_AGENCIES_NAMES, BASIN, DEFAULT_END_DATE, DEFAULT_START_DATE
+from .watch_tools import WATCH_TOOL_NAMES
+
+logger = logging.getLogger(__name__)
+
+ANSWER_CACHE_ENABLED = os.environ.get("WRIS_ANSWER_CACHE", "0").lower() not in ("0", "false", "no")
+MAX_ENTRIES = 2048
+MAX_BYTES = int(float(os.environ.get("WRIS_ANSWER_CACHE_MB", 64)) * 1024 * 1024)
+# A single entry may take at most this share of MAX_BYTES
+MAX_ENTRY_SHARE = 0.125
+
+# Freshness TTLs by how long ago the data window ended: recent data is
+# still arriving, data for the last couple of months may still be revised
+RECENT_DAYS = 3
+REVISION_DAYS = 60
+RECENT_TTL_SECONDS = 15 * 60
+REVISION_TTL_SECONDS = 6 * 3600
+HISTORICAL_TTL_SECONDS = 7 * 24 * 3600
+
+# Invocations whose calls are tracked at once (oldest dropped first)
+MAX_OPEN_TURNS = 1024
+
+Call = Tuple
+
+
+def _norm(value: Any) -> str:
+    return " ".join(str(value if value is not None else "").split()).lower()
+
+
+def _agency(value: Any) -> str:
+    agency = _norm(value)
+    return ALL_AGENCIES if agency in ("",) + ALL_AGENCIES_NAMES else agency
+
+
+def _date(value: Any, default: str) -> str:
+    text = str(value or "").strip() or default
+    try:
+        return datetime.strptime(text[:10], "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        return _norm(text)
+
+
+def _fetch_call(hierarchy: str, data_type: str, region: Any, sub_region: Any, agency: Any,
+                start_date: Any, end_date: Any) -> Call:
+    return ("fetch", hierarchy, data_type, _norm(region), _norm(sub_region), _agency(agency),
+            _date(start_date, DEFAULT_START_DATE), _date(end_date, DEFAULT_END_DATE))
+
+
+def canonical_call(tool_name: str, args: Dict[str, Any]) -> Call:
+    """Toolset-independent form of one tool call."""
+    get = args.get
+    if tool_name == "fetch_water_data":
+        return _fetch_call(_norm(get("hierarchy")) or ADMIN, get("data_type"), get("region_name"),
+                           get("sub_region_name"), get("agency_name"), get("start_date"), get("end_date"))
+    if tool_name.startswith("get_basin_") and tool_name.endswith("_data"):
+        data_type = tool_name[len("get_basin_"):-len("_data")]
+        if data_type in BASIN_ENDPOINT_MAP:
+            return _fetch_call(BASIN, data_type, get("basin_name"), get("tributary_name"), get("agency_name"),
+                               get("start_date"), get("end_date"))
+    if tool_name.startswith("get_") and tool_name.endswith("_data"):
+        data_type = tool_name[len("get_"):-len("_data")]
+        if data_type in ADMIN_ENDPOINT_MAP:
+            return _fetch_call(ADMIN, data_type, get("state_name"), get("district_name"), get("agency_name"),
+                               get("start_date"), get("end_date"))
+    normalized = tuple(sorted(
+        (k, _agency(v) if k == "agency_name" else _norm(v)) for k, v in args.items()))
+    return (tool_name, normalized)
+
+
+def calls_key(calls: Iterable[Call]) -> Tuple:
+    return tuple(sorted(set(calls)))
+
+
+def _stateful(calls: Iterable[Call]) -> bool:
+    return any(call[0] in WATCH_TOOL_NAMES for call in calls)
+
+
+def _window_end(call: Call) -> Optional[date]:
+    end = call[7] if call[0] == "fetch" else dict(call[1]).get("end_date")
+    try:
+        return datetime.strptime(str(end), "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_ttl(calls: Iterable[Call], today: Optional[date] = None) -> float:
+    """Shortest TTL over the calls, from how recently each call's window ends."""
+    today = today or date.today()
+    ttl = HISTORICAL_TTL_SECONDS
+    for call in calls:
+        end = _window_end(call)
+        if end is None or (today - end).days <= RECENT_DAYS:
+            return RECENT_TTL_SECONDS
+        if (today - end).days <= REVISION_DAYS:
+            ttl = min(ttl, REVISION_TTL_SECONDS)
+    return ttl
+
+
+# Question parsing: only plain "<data type> in <district> in <period>"
+# questions are resolved. Once the data type, place, agency and period are
+# taken out, every remaining word must be one of _TEMPLATE_WORDS; anything
+# else ("which station", "how many", "available", "in inches", "trend")
+# asks something of the data beyond the fetch, and the question is keyed
+# by its text instead.
+_DATA_TYPE_PATTERNS = [
+    (r"ground\s*water|water\s*table|aquifer", "ground_water_level"),
+    (r"river\s+(?:water\s+)?discharge|\bdischarge|stream\s*flow", "river_water_discharge"),
+    (r"river\s+(?:water\s+)?level|river\s+stage", "river_water_level"),
+    (r"reservoir", "reservoir"),
+    (r"sediment", "suspended_sediment"),
+    (r"evapo", "evapo_transpiration"),
+    (r"soil\s+moisture", "soil_moisture"),
+    (r"snow", "snowfall"),
+    (r"humidity", "relative_humidity"),
+    (r"air\s+pressure|atmospheric\s+pressure|barometric", "atmospheric_pressure"),
+    (r"solar|radiation|sunshine", "solar_radiation"),
+    (r"\bwind", "wind_direction"),
+    (r"temperature", "temperature"),
+    (r"\brain", "rainfall"),
+]
+_TEMPLATE_WORDS = frozenset("""
+    a the in for of at during from to between and s
+    what how much did does do it was were is are
+    show get give tell fetch me please
+    data readings reading values value level levels storage district state
+""".split())
+_MONTHS = {name.lower(): i for i, name in enumerate(calendar.month_name) if name}
+_MONTHS.update({name.lower(): i for i, name in enumerate(calendar.month_abbr) if name})
+_MONTH_YEAR = re.compile(r"\b(" + "|".join(sorted(_MONTHS, key=len, reverse=True)) + r")\.?,?\s+(\d{4})\b")
+_ISO_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_YEAR = re.compile(r"\b(19\d{2}|20\d{2})\b")
+_AGENCIES = sorted({a for agencies in DATA_TYPE_AGENCIES.values() for a in agencies}, key=len, reverse=True)
+
+
+def _whole_word(name: str, text: str) -> bool:
+    return re.search(r"(?<![a-z])" + re.escape(name.lower()) + r"(?![a-z])", text) is not None
+
+
+def _period(text: str) -> Optional[Tuple[str, str]]:
+    iso = _ISO_DATE.findall(text)
+    if iso:
+        return (iso[0], iso[1]) if len(iso) == 2 and iso[0] <= iso[1] else None
+    months = _MONTH_YEAR.findall(text)
+    if len(months) == 1:
+        month, year = _MONTHS[months[0][0]], int(months[0][1])
+        last = calendar.monthrange(year, month)[1]
+        return date(year, month, 1).isoformat(), date(year, month, last).isoformat()
+    if months or any(_whole_word(m, text) for m in _MONTHS if len(m) > 3):
+        return None
+    years = set(_YEAR.findall(text))
+    if len(years) == 1:
+        year = years.pop()
+        return f"{year}-01-01", f"{year}-12-31"
+    return None
+
+
+def _plain(text: str, data_type_pattern: str, names: Iterable[str]) -> bool:
+    """Whether `text` holds nothing but the template words once the fetch's own terms are removed."""
+    rest = re.sub(data_type_pattern + r"[a-z]*", " ", text)
+    for pattern in (_ISO_DATE, _MONTH_YEAR, _YEAR):
+        rest = pattern.sub(" ", rest)
+    for name in names:
+        rest = re.sub(r"(?<![a-z])" + re.escape(name.lower()) + r"(?![a-z])", " ", rest)
+    return all(word in _TEMPLATE_WORDS for word in re.findall(r"[a-z0-9]+", rest))
+
+
+def question_key(text: str) -> Tuple:
+    """Key of a user question: its canonical call if it is a plain fetch, else its normalized text."""
+    call = parse_question(text)
+    return ("call", call) if call is not None else ("text", _norm(text))
+
+
+def parse_question(text: str) -> Optional[Call]:
+    """Resolve a plain single-fetch question to its canonical call, or None."""
+    text = " ".join((text or "").split()).lower()
+    if not text:
+        return None
+    data_types = {(pattern, dt) for pattern, dt in _DATA_TYPE_PATTERNS if re.search(pattern, text)}
+    if len(data_types) != 1:
+        return None
+    (pattern, data_type), = data_types
+    states = [s for s in STATES_DISTRICTS if _whole_word(s, text)]
+    places = [(s, d) for s, districts in STATES_DISTRICTS.items() for d in districts if _whole_word(d, text)]
+    if states:
+        places = [(s, d) for s, d in places if s in states]
+    if len(places) != 1 or len(states) > 1:
+        return None
+    period = _period(text)
+    if period is None:
+        return None
+    agencies = [a for a in _AGENCIES if _whole_word(a, text)]
+    if len(agencies) > 1:
+        return None
+    state, district = places[0]
+    if not _plain(text, pattern, [district, state] + agencies):
+        return None
+    return _fetch_call(ADMIN, data_type, state, district, agencies[0] if agencies else "", *period)
+
+
+class AnswerCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES, max_bytes: int = MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple, Tuple[Any, int, float]]" = OrderedDict()  # key -> (value, size, expires)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # invocation id -> {"question": question key or None, "calls": calls made so far}
+        self._turns: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {"answer_hits": 0, "proposal_hits": 0, "result_hits": 0, "stored_answers": 0,
+                      "stored_results": 0, "evicted": 0}
+
+    # Storage
+
+    def get(self, key: Tuple) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Tuple, value: Any, ttl_seconds: float) -> bool:
+        if isinstance(value, dict) and not isinstance(value, EncodedResult):
+            # Encoded once here; a hit serves the same object, bytes included
+            value = EncodedResult(value)
+        try:
+            size = len(encode(value))
+        except (TypeError, ValueError):
+            return False
+        if size > self.max_bytes * MAX_ENTRY_SHARE:
+            return False
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (value, size, time.monotonic() + ttl_seconds)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.stats["evicted"] += 1
+        return True
+
+    def _drop(self, key: Tuple) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), bytes=self._bytes)
+
+    def lookup_answer(self, question: Optional[Tuple], calls: Iterable[Call]) -> Optional[str]:
+        calls = calls_key(calls)
+        if question is None or _stateful(calls):
+            return None
+        return self.get(("answer", question, calls))
+
+    def store_answer(self, question: Optional[Tuple], calls: Iterable[Call], answer: str) -> None:
+        calls = calls_key(calls)
+        if question is None or not calls or _stateful(calls) or not answer.strip():
+            return
+        if self.put(("answer", question, calls), answer, freshness_ttl(calls)):
+            self.stats["stored_answers"] += 1
+
+    # Per-turn bookkeeping
+
+    def _turn(self, invocation_id: str) -> Dict[str, Any]:
+        with self._lock:
+            turn = self._turns.get(invocation_id)
+            if turn is None:
+                turn = self._turns[invocation_id] = {"question": None, "calls": []}
+                while len(self._turns) > MAX_OPEN_TURNS:
+                    self._turns.popitem(last=False)
+            return turn
+
+    def _end_turn(self, invocation_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return self._turns.pop(invocation_id, {"question": None, "calls": []})
+
+    # Agent callbacks
+
+    def before_model(self, callback_context, llm_request):
+        """Answer a plain question from cache before the model sees it."""
+        contents = llm_request.contents or []
+        if not contents or contents[-1].role != "user" or not _text(contents[-1]) \
+                or any(p.function_response for p in contents[-1].parts or []):
+            return None
+        text = _text(contents[-1])
+        question = question_key(text)
+        self._turn(callback_context.invocation_id)["question"] = question
+        call = question[1] if question[0] == "call" else None
+        answer = self.lookup_answer(question, [call]) if call else None
+        if answer is None:
+            return None
+        self.stats["answer_hits"] += 1
+        self._end_turn(callback_context.invocation_id)
+        return _reply(answer, "question")
+
+    def after_model(self, callback_context, llm_response):
+        """Swap proposed tool calls for a stored answer; store final answers."""
+        content = llm_response.content
+        if llm_response.partial or content is None or not content.parts:
+            return None
+        proposed = [p.function_call for p in content.parts if p.function_call]
+        if proposed:
+            turn = self._turn(callback_context.invocation_id)
+            calls = turn["calls"] + [canonical_call(fc.name, dict(fc.args or {})) for fc in proposed]
+            answer = self.lookup_answer(turn["question"], calls)
+            if answer is None:
+                return None
+            self.stats["proposal_hits"] += 1
+            self._end_turn(callback_context.invocation_id)
+            return _reply(answer, "tool_calls")
+        turn = self._end_turn(callback_context.invocation_id)
+        if turn["calls"] and not any(p.thought for p in content.parts):
+            self.store_answer(turn["question"], turn["calls"], _text(content))
+        return None
+
+    def before_tool(self, tool, args, tool_context):
+        """Serve a tool call from cache."""
+        call = canonical_call(tool.name, args)
+        self._turn(tool_context.invocation_id)["calls"].append(call)
+        if _stateful([call]):
+            return None
+        result = self.get(("result", call))
+        if result is not None:
+            self.stats["result_hits"] += 1
+        return result
+
+    def after_tool(self, tool, args, tool_context, tool_response):
+        if not isinstance(tool_response, dict) or tool_response.get("truncated") \
+                or tool_response.get("status") != "success" or tool.name in WATCH_TOOL_NAMES:
+            return None
+        call = canonical_call(tool.name, args)
+        if self.put(("result", call), tool_response, freshness_ttl([call])):
+            self.stats["stored_results"] += 1
+        return None
+
+    def callbacks(self) -> Dict[str, Any]:
+        """Keyword arguments installing the cache on an Agent."""
+        return {
+            "before_model_callback": self.before_model,
+            "after_model_callback": self.after_model,
+            "before_tool_callback": self.before_tool,
+            "after_tool_callback": self.after_tool,
+        }
+
+
+def _text(content) -> str:
+    return "".join(p.text for p in content.parts or [] if p.text and not p.thought)
+
+
+def _reply(answer: str, matched: str) -> LlmResponse:
+    return LlmResponse(content=types.Content(role="model", parts=[types.Part(text=answer)]),
+                       custom_metadata={"answer_cache": matched})
+
+
+default_answer_cache = AnswerCache()
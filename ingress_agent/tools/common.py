@@ -0,0 +1,590 @@
+# tools/common.py
+"""
+Shared fetch/normalize/statistics/cache path for the admin and basin tools.
+
+Both hierarchies go through `fetch_and_process`:
+
+1. apply defaults and look the query up in the response cache
+2. call the matching `WRISClient` method, or, without an agency, every
+   agency publishing the data type, merging their records by station
+3. normalize the records once into a RecordBatch
+4. run the data-quality checks and compute statistics on the batch's
+   primary value column, excluding flagged readings
+5. run the tool-specific `postprocess` hook and cache the result
+
+The hierarchy-specific response shape is preserved: admin results keep
+`status`/`data.content`/`error_message`, basin results keep
+`statusCode`/`message`/`data` plus the `status` field added for compatibility.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import logging
+
+import pandas as pd
+
+from ..utils import deadline
+from ..utils.agencies import default_agency_memory
+from ..utils.crosswalk import default_crosswalk
+from ..utils.constants import DATA_TYPE_AGENCIES, STATES_DISTRICTS
+from ..utils.data_quality import STATION_COLUMNS
+from ..utils.wris_client import default_client
+from ..utils.data_processor import default_processor
+from ..utils.record_batch import RecordBatch, extract_records
+from ..utils.response_cache import default_cache, make_key
+from ..utils.result_encoding import EncodedResult, round_floats, slim_batch, slim_records, value_places
+from ..utils.rollups import default_rollups
+from ..utils.series_store import default_series_store
+from ..utils.tracing import set_attributes, span
+
+logger = logging.getLogger(__name__)
+
+ADMIN = "admin"
+BASIN = "basin"
+
+DEFAULT_AGENCY = "CWC"
+# Agency value meaning "every agency", used for merged results and their cache key
+ALL_AGENCIES = "*"
+ALL_AGENCIES_NAMES = ("*", "all", "any")
+DEFAULT_START_DATE = "2024-01-01"
+DEFAULT_END_DATE = "2024-01-05"
+
+PostProcess = Callable[[Dict[str, Any], RecordBatch, Optional[Dict[str, Any]]], None]
+
+# Set while the prefetcher re-runs a query: the cache is written, not read
+_refreshing = ContextVar("wris_cache_refresh", default=False)
+
+
+@contextmanager
+def cache_refresh():
+    """Fetch fresh data for queries in the block and overwrite their cache entries."""
+    token = _refreshing.set(True)
+    try:
+        yield
+    finally:
+        _refreshing.reset(token)
+
+
+def _cached(key: Tuple) -> Any:
+    return None if _refreshing.get() else default_cache.get(key)
+
+
+def resolve_districts(state_name: str, district_name: Optional[str]) -> List[str]:
+    """Districts named by a tool argument: one, comma-separated, or empty/"all" for the whole state."""
+    if district_name and district_name.strip().lower() not in ("all", "*"):
+        return [d.strip() for d in district_name.split(",") if d.strip()]
+    return list(STATES_DISTRICTS.get(state_name, []))
+
+
+def _bulk_export(hierarchy: str, data_type: str, location: Tuple[str, str],
+                 agency_name: str, start_date: str, end_date: str) -> Dict[str, Any]:
+    if hierarchy == ADMIN:
+        return default_client.bulk_export_admin_hierarchy_data(
+            data_type, location[0], location[1], agency_name, start_date, end_date)
+    return default_client.bulk_export_basin_hierarchy_data(
+        data_type, location[0], location[1], agency_name, start_date, end_date)
+
+
+def _call_client(hierarchy: str, data_type: str, location: Tuple[str, str],
+                 agency_name: str, start_date: str, end_date: str) -> Any:
+    if hierarchy == ADMIN:
+        return default_client.get_admin_hierarchy_data(
+            data_type=data_type,
+            state_name=location[0],
+            district_name=location[1],
+            agency_name=agency_name,
+            start_date=start_date,
+            end_date=end_date,
+        )
+    return default_client.get_basin_hierarchy_data(
+        data_type=data_type,
+        basin_name=location[0],
+        tributary_name=location[1],
+        agency_name=agency_name,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+
+def _is_success(hierarchy: str, result: Dict[str, Any]) -> bool:
+    if hierarchy == ADMIN:
+        return result.get("status") == "success"
+    # statusCode 200 indicates success, statusCode 0 might also be success depending on the API
+    return result.get("statusCode") in [200, 0]
+
+
+def _summary(hierarchy: str, label: str, location: Tuple[str, str], total_records: int) -> str:
+    if hierarchy == ADMIN:
+        return f"Retrieved {label} data for {location[1]}, {location[0]}. Total records: {total_records}"
+    return (
+        f"Retrieved {label} data for {location[0]} basin, tributary {location[1]}. "
+        f"Total records: {total_records}"
+    )
+
+
+def _envelope(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of `result` with the record list stripped out (it lives in the batch)."""
+    envelope = dict(result)
+    data = result.get("data")
+    if isinstance(data, dict):
+        envelope["data"] = {k: v for k, v in data.items() if k != "content"}
+    else:
+        envelope["data"] = None
+    return envelope
+
+
+def _rehydrate(entry: Any) -> Dict[str, Any]:
+    """The result for a response-cache entry; it shares the entry's encoded bytes."""
+    envelope = entry.envelope
+    records = slim_batch(entry.batch)[0].to_records()
+    if isinstance(envelope.get("data"), dict):
+        data = dict(envelope["data"], content=records)
+    else:
+        data = records
+    return EncodedResult(envelope, data=data, cached=True, source=entry)
+
+
+def compute_statistics(batch: RecordBatch, data_type: str) -> Optional[Dict[str, Any]]:
+    """Statistics for the batch's primary value column, or None if there is none.
+
+    Readings flagged by the data-quality checks are excluded, and the
+    quality score and flag counts are reported alongside.
+    """
+    value_col = batch.primary_value_column()
+    if value_col is None:
+        return None
+    quality = default_processor.assess_quality(batch, data_type, value_col=value_col)
+    stats = default_processor.calculate_statistics(batch, value_col, mask=quality.valid)
+    stats["value_column"] = value_col
+    summary = quality.summary()
+    stats["data_quality_score"] = summary["data_quality_score"]
+    stats["quality_flags"] = summary["flag_counts"]
+    return stats
+
+
+def fetch_and_process(
+    hierarchy: str,
+    data_type: str,
+    location: Tuple[str, str],
+    agency_name: Optional[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+    label: Optional[str] = None,
+    postprocess: Optional[PostProcess] = None,
+) -> Dict[str, Any]:
+    """Fetch one WRIS query and attach summary/statistics, serving repeats from cache.
+
+    Without an agency, every agency known for the data type is queried and
+    the results merged (see `_fetch_all_agencies`).
+    """
+    with span("fetch_and_process", **{"wris.hierarchy": hierarchy, "wris.data_type": data_type,
+                                      "wris.location": "/".join(p or "" for p in location),
+                                      "wris.agency": agency_name, "wris.start_date": start_date,
+                                      "wris.end_date": end_date}):
+        start_date = start_date or DEFAULT_START_DATE
+        end_date = end_date or DEFAULT_END_DATE
+        label = label or data_type.replace("_", " ")
+        if not agency_name or agency_name.strip().lower() in ALL_AGENCIES_NAMES:
+            return _fetch_all_agencies(hierarchy, data_type, location, start_date, end_date, label, postprocess)
+
+        key = make_key(hierarchy, data_type, location, agency_name, start_date, end_date)
+        entry = _cached(key)
+        set_attributes(**{"wris.cache_hit": entry is not None})
+        if entry is not None:
+            return _rehydrate(entry)
+
+        result = _request(hierarchy, data_type, location, agency_name, start_date, end_date)
+        if not _is_success(hierarchy, result):
+            return result
+        return _process(hierarchy, data_type, location, label, result, extract_records(result), key, postprocess)
+
+
+def _request(hierarchy: str, data_type: str, location: Tuple[str, str], agency_name: str,
+             start_date: str, end_date: str) -> Dict[str, Any]:
+    """The client's response for one query, with failures turned into error results."""
+    try:
+        result = _call_client(hierarchy, data_type, location, agency_name, start_date, end_date)
+    except Exception as exc:  # broad catch so we return structured info instead of crashing
+        logger.exception("Failed to fetch %s data for %s (%s to %s)", data_type, location, start_date, end_date)
+        return {"status": "error", "message": f"Exception while fetching data: {exc}"}
+
+    if not isinstance(result, dict):
+        return {"status": "error", "message": "client returned unexpected non-dict response", "raw": result}
+
+    if not _is_success(hierarchy, result):
+        result["status"] = "error"
+        if hierarchy == BASIN and "message" not in result:
+            result["message"] = f"API returned error status: {result.get('statusCode', 'unknown')}"
+    return result
+
+
+def _process(hierarchy: str, data_type: str, location: Tuple[str, str], label: str, result: Dict[str, Any],
+             records: List[Dict[str, Any]], key: Tuple, postprocess: Optional[PostProcess]) -> Dict[str, Any]:
+    """Summary, statistics, tool hook and caching for a successful response."""
+    if hierarchy == BASIN:
+        result["total_records"] = len(records)
+        result["status"] = "success"
+    result["summary"] = _summary(hierarchy, label, location, result.get("total_records", 0))
+
+    try:
+        with span("normalize", **{"wris.records": len(records)}):
+            batch = RecordBatch.from_records(records)
+    except Exception as exc:
+        logger.exception("Normalizing records failed: %s", exc)
+        result.setdefault("warnings", []).append(f"normalization failed: {exc}")
+        return result
+
+    omitted = slim_records(records, batch)
+    if omitted:
+        result["omitted_fields"] = omitted
+
+    stats = None
+    try:
+        with span("statistics"):
+            stats = compute_statistics(batch, data_type)
+        if stats is not None:
+            if "error" in stats:
+                result.setdefault("warnings", []).append({"stats_error": stats})
+                stats = None
+            else:
+                stats = round_floats(stats, value_places(batch))
+                result["statistics"] = stats
+    except Exception as exc:
+        logger.exception("Statistics calculation failed: %s", exc)
+        result.setdefault("warnings", []).append(f"statistics calculation failed: {exc}")
+
+    if postprocess is not None:
+        with span("postprocess"):
+            postprocess(result, batch, stats)
+
+    if not result.get("truncated"):
+        default_cache.put(key, _envelope(result), batch)
+    return result
+
+
+def _station_of(record: Dict[str, Any]) -> Optional[str]:
+    for column in STATION_COLUMNS:
+        value = record.get(column)
+        if value not in (None, ""):
+            return str(value)
+    return None
+
+
+def merge_agency_records(per_agency: List[Tuple[str, List[Dict[str, Any]]]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Merge record lists from several agencies, given in preference order.
+
+    Each record is tagged with `sourceAgency`. A station reported by more
+    than one agency is kept only from the first; returns (records, number
+    of duplicate-station records dropped).
+    """
+    owner: Dict[str, str] = {}
+    merged: List[Dict[str, Any]] = []
+    dropped = 0
+    for agency, records in per_agency:
+        for record in records:
+            station = _station_of(record)
+            if station is not None and owner.setdefault(station, agency) != agency:
+                dropped += 1
+                continue
+            merged.append(dict(record, sourceAgency=agency))
+    return merged, dropped
+
+
+def _total_records(result: Dict[str, Any], records: List[Dict[str, Any]]) -> int:
+    """Records the query has in all, from the response's totalElements; the returned count if absent."""
+    data = result.get("data")
+    total = result.get("total_records") or (data.get("totalElements") if isinstance(data, dict) else None)
+    try:
+        return max(int(total), len(records))
+    except (TypeError, ValueError):
+        return len(records)
+
+
+def _fetch_all_agencies(hierarchy: str, data_type: str, location: Tuple[str, str], start_date: str,
+                        end_date: str, label: str, postprocess: Optional[PostProcess]) -> Dict[str, Any]:
+    """Query the agencies publishing `data_type` concurrently and merge their records.
+
+    Agencies remembered to have data for the location are tried first; the
+    rest are only probed if none of those returned records. Each agency's
+    raw response (or cached result) is merged, and the merged result is
+    processed once.
+    """
+    key = make_key(hierarchy, data_type, location, ALL_AGENCIES, start_date, end_date)
+    entry = _cached(key)
+    set_attributes(**{"wris.agency": ALL_AGENCIES, "wris.cache_hit": entry is not None})
+    if entry is not None:
+        return _rehydrate(entry)
+
+    known = DATA_TYPE_AGENCIES.get(data_type, [DEFAULT_AGENCY])
+    candidates = default_agency_memory.candidates(hierarchy, data_type, location)
+
+    def fetch(agency: str) -> Dict[str, Any]:
+        cached = _cached(make_key(hierarchy, data_type, location, agency, start_date, end_date))
+        if cached is not None:
+            return _rehydrate(cached)
+        return _request(hierarchy, data_type, location, agency, start_date, end_date)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    with ThreadPoolExecutor(max_workers=len(known)) as pool:
+        results.update(zip(candidates, pool.map(deadline.bind(fetch), candidates)))
+        remaining = [a for a in known if a not in results]
+        if remaining and not any(extract_records(r) for r in results.values() if _is_success(hierarchy, r)):
+            results.update(zip(remaining, pool.map(deadline.bind(fetch), remaining)))
+
+    order = [a for a in known if a in results] + [a for a in results if a not in known]
+    per_agency = [(a, extract_records(results[a])) for a in order if _is_success(hierarchy, results[a])]
+    answered = [a for a, records in per_agency if records]
+    set_attributes(**{"wris.agencies_queried": list(results), "wris.agencies_answered": answered})
+    default_agency_memory.record(hierarchy, data_type, location, answered,
+                                 probed_all=all(a in results for a in known))
+
+    errors = {a: r.get("error_message") or r.get("message") for a, r in results.items()
+              if not _is_success(hierarchy, r)}
+    if not per_agency:
+        message = "; ".join(f"{a}: {e}" for a, e in errors.items())
+        if hierarchy == ADMIN:
+            return {"status": "error", "error_message": f"No agency returned data: {message}"}
+        return {"status": "error", "statusCode": 502, "message": f"No agency returned data: {message}", "data": []}
+
+    records, dropped = merge_agency_records(per_agency)
+    # Each agency's own total, not just its first page; stations reported by
+    # several agencies are counted in each
+    totals = {a: _total_records(results[a], agency_records) for a, agency_records in per_agency if agency_records}
+    if hierarchy == ADMIN:
+        total = sum(totals.values())
+        result: Dict[str, Any] = {"status": "success", "data": {"content": records, "totalElements": total},
+                                  "total_records": total}
+    else:
+        result = {"statusCode": 200, "message": "Data fetched successfully", "data": records}
+    result["agencies"] = {a: {"records": sum(1 for r in records if r["sourceAgency"] == a),
+                              "total_records": totals[a]} for a in answered}
+    result["agencies_queried"] = list(results)
+    if dropped:
+        result["duplicate_station_records_dropped"] = dropped
+    if errors:
+        result["agency_errors"] = errors
+    if any(r.get("truncated") for r in results.values()):
+        deadline.mark_truncated(result)
+    return _process(hierarchy, data_type, location, label, result, records, key, postprocess)
+
+
+def fetch_series(
+    hierarchy: str,
+    data_type: str,
+    location: Tuple[str, str],
+    agency_name: Optional[str],
+    start_date: Optional[str],
+    end_date: Optional[str],
+) -> Tuple[Dict[str, Any], Optional[RecordBatch]]:
+    """Fetch the complete series for one query as a RecordBatch.
+
+    Unlike `fetch_and_process`, which returns the first page for the model to
+    read, this pulls every record through the client's bulk export. Results
+    are kept in the response cache so analytics over the same window reuse
+    them instead of refetching, and folded into the rollup store and the
+    series store. A window the series store already covers is answered
+    from it without a request, and one whose stations the crosswalk places
+    in already-stored locations of the other hierarchy is assembled from
+    those, fetching only the uncovered part (see `_from_counterpart`).
+    Without an agency, every agency known for the data type is exported
+    and the series merged (see `_fetch_series_all_agencies`).
+    Returns (envelope, batch); batch is None on error. When the current
+    deadline cut the export short, the envelope is marked `truncated`.
+    """
+    start_date = start_date or DEFAULT_START_DATE
+    end_date = end_date or DEFAULT_END_DATE
+    if not agency_name or agency_name.strip().lower() in ALL_AGENCIES_NAMES:
+        return _fetch_series_all_agencies(hierarchy, data_type, location, start_date, end_date)
+
+    key = make_key(f"{hierarchy}_bulk", data_type, location, agency_name, start_date, end_date)
+    entry = _cached(key)
+    if entry is not None:
+        # Possibly fetched by another worker: this process's rollups may lack it
+        _roll_up(hierarchy, data_type, location, agency_name, entry.batch, start_date, end_date)
+        return entry.envelope, entry.batch
+
+    if not _refreshing.get():
+        stored = default_series_store.window(data_type, hierarchy, location, agency_name, start_date, end_date)
+        if stored is not None:
+            _roll_up(hierarchy, data_type, location, agency_name, stored, start_date, end_date)
+            entry = default_cache.put(key, {"status": "success", "total_records": len(stored),
+                                            "mode": "series_store"}, stored)
+            return entry.envelope, entry.batch
+        assembled = _from_counterpart(hierarchy, data_type, location, agency_name, start_date, end_date, key)
+        if assembled is not None:
+            return assembled
+
+    exported = _bulk_export(hierarchy, data_type, location, agency_name, start_date, end_date)
+    if exported.get("status") != "success":
+        return exported, None
+    batch = RecordBatch.from_dataframe(exported["data"])
+    envelope = {"status": "success", "total_records": len(batch), "mode": exported.get("mode")}
+    if exported.get("truncated"):
+        # A partial window is returned to the caller but never cached or
+        # rolled up, so a later call with more budget fetches it in full
+        return deadline.mark_truncated(envelope), batch
+    entry = default_cache.put(key, envelope, batch)
+    default_crosswalk.observe(hierarchy, data_type, location, agency_name, batch)
+    _roll_up(hierarchy, data_type, location, agency_name, exported["data"], start_date, end_date)
+    try:
+        default_series_store.ingest(data_type, hierarchy, location, agency_name, exported["data"],
+                                    start_date, end_date)
+    except Exception as exc:
+        logger.exception("Series store ingest failed for %s %s: %s", data_type, location, exc)
+    return entry.envelope, entry.batch
+
+
+def _roll_up(hierarchy: str, data_type: str, location: Tuple[str, str], agency_name: str, data: Any,
+             start_date: str, end_date: str) -> None:
+    """Fold a complete window into the rollups unless they already cover it.
+
+    Called wherever `fetch_series` answers, not only after an export: a
+    window served from the shared response cache or the series store is
+    new to this process's rollups. `data` is a DataFrame or a RecordBatch.
+    """
+    if data is None or default_rollups.covers(data_type, hierarchy, location, agency_name, start_date, end_date):
+        return
+    try:
+        frame = data.to_dataframe() if isinstance(data, RecordBatch) else data
+        default_rollups.ingest(data_type, hierarchy, location, agency_name, frame, start_date, end_date)
+    except Exception as exc:
+        logger.exception("Rollup ingest failed for %s %s: %s", data_type, location, exc)
+
+
+def _fetch_series_all_agencies(hierarchy: str, data_type: str, location: Tuple[str, str], start_date: str,
+                               end_date: str) -> Tuple[Dict[str, Any], Optional[RecordBatch]]:
+    """Export the series of every agency publishing `data_type` and merge them.
+
+    Agencies are chosen as in `_fetch_all_agencies`, and each agency's
+    series goes through `fetch_series` (so it is cached and stored on its
+    own). Rows are tagged with `sourceAgency`, and a station reported by
+    more than one agency is kept only from the first.
+    """
+    key = make_key(f"{hierarchy}_bulk", data_type, location, ALL_AGENCIES, start_date, end_date)
+    entry = _cached(key)
+    if entry is not None:
+        agencies = [a for a in entry.envelope.get("agencies", {})
+                    if not default_rollups.covers(data_type, hierarchy, location, a, start_date, end_date)]
+        if agencies and entry.batch is not None and "sourceAgency" in entry.batch.columns:
+            frame = entry.batch.to_dataframe()
+            for agency in agencies:
+                _roll_up(hierarchy, data_type, location, agency, frame[frame["sourceAgency"] == agency],
+                         start_date, end_date)
+        return entry.envelope, entry.batch
+
+    known = DATA_TYPE_AGENCIES.get(data_type, [DEFAULT_AGENCY])
+    candidates = default_agency_memory.candidates(hierarchy, data_type, location)
+    fetch = deadline.bind(lambda agency: fetch_series(hierarchy, data_type, location, agency, start_date, end_date))
+
+    results: Dict[str, Tuple[Dict[str, Any], Optional[RecordBatch]]] = {}
+    with ThreadPoolExecutor(max_workers=len(known)) as pool:
+        results.update(zip(candidates, pool.map(fetch, candidates)))
+        remaining = [a for a in known if a not in results]
+        if remaining and not any(batch is not None and len(batch) for _, batch in results.values()):
+            results.update(zip(remaining, pool.map(fetch, remaining)))
+
+    order = [a for a in known if a in results] + [a for a in results if a not in known]
+    answered = [a for a in order if results[a][1] is not None and len(results[a][1])]
+    default_agency_memory.record(hierarchy, data_type, location, answered,
+                                 probed_all=all(a in results for a in known))
+    errors = {a: envelope.get("error_message") or envelope.get("message")
+              for a, (envelope, batch) in results.items() if batch is None}
+    if not answered:
+        message = "; ".join(f"{a}: {e}" for a, e in errors.items()) or "no records"
+        return {"status": "error", "error_message": f"No agency returned data: {message}"}, None
+
+    parts, owned, dropped = [], set(), 0
+    for agency in answered:
+        frame = results[agency][1].to_dataframe().assign(sourceAgency=agency)
+        column = next((c for c in STATION_COLUMNS if c in frame.columns), None)
+        if column is not None:
+            stations = frame[column].astype(str)
+            taken = stations.isin(owned).to_numpy()
+            dropped += int(taken.sum())
+            owned.update(stations.unique())
+            frame = frame[~taken]
+        parts.append(frame)
+    batch = RecordBatch.from_dataframe(pd.concat(parts, ignore_index=True))
+    envelope: Dict[str, Any] = {
+        "status": "success", "total_records": len(batch), "mode": "agencies",
+        "agencies": {a: int(len(p)) for a, p in zip(answered, parts)}, "agencies_queried": list(results)}
+    if dropped:
+        envelope["duplicate_station_records_dropped"] = dropped
+    if errors:
+        envelope["agency_errors"] = errors
+    if any(result.get("truncated") for result, _ in results.values()):
+        return deadline.mark_truncated(envelope), batch
+    entry = default_cache.put(key, envelope, batch)
+    return entry.envelope, entry.batch
+
+
+def _day(ns: int) -> str:
+    return pd.Timestamp(ns).strftime("%Y-%m-%d")
+
+
+def _intersect(intervals: List[Tuple[int, int]], others: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Overlaps of two sorted lists of disjoint, inclusive intervals."""
+    return [(max(a, c), min(b, d)) for a, b in intervals for c, d in others if max(a, c) <= min(b, d)]
+
+
+def _from_counterpart(hierarchy: str, data_type: str, location: Tuple[str, str], agency_name: str,
+                      start_date: str, end_date: str, key: Tuple) -> Optional[Tuple[Dict[str, Any], RecordBatch]]:
+    """Assemble a window from readings stored under the other hierarchy's locations.
+
+    The crosswalk names the districts (for a basin query) or tributaries
+    (for a district query) that hold the query's stations. The part of the
+    window the series store covers for all of them is read from the store;
+    only the rest is exported from WRIS, for this location. Returns None,
+    so the caller does a plain export, when the crosswalk cannot place
+    every station, nothing is covered, or a gap export fails, is cut short
+    or shows stations the crosswalk does not know.
+    """
+    plan = default_crosswalk.plan(hierarchy, data_type, location, agency_name)
+    if plan is None:
+        return None
+    stations, groups = plan
+    other = BASIN if hierarchy == ADMIN else ADMIN
+    lo, hi = pd.Timestamp(start_date).value, (pd.Timestamp(end_date) + pd.Timedelta(days=1)).value - 1
+
+    # Part of the window stored for every counterpart location, or for this one
+    shared = [(lo, hi)]
+    for where in groups:
+        shared = _intersect(shared, default_series_store.coverage(data_type, other, where, agency_name))
+    if not shared:
+        return None
+    own = _intersect([(lo, hi)], default_series_store.coverage(data_type, hierarchy, location, agency_name))
+    gaps, cursor = [], lo
+    for a, b in sorted(shared + own):
+        if a > cursor:
+            gaps.append((cursor, a - 1))
+        cursor = max(cursor, b + 1)
+    if cursor <= hi:
+        gaps.append((cursor, hi))
+
+    fetched = []
+    for gap_lo, gap_hi in gaps:
+        gap_start, gap_end = _day(gap_lo), _day(gap_hi)
+        exported = _bulk_export(hierarchy, data_type, location, agency_name, gap_start, gap_end)
+        if exported.get("status") != "success" or exported.get("truncated"):
+            return None
+        gap_batch = RecordBatch.from_dataframe(exported["data"])
+        default_crosswalk.observe(hierarchy, data_type, location, agency_name, gap_batch)
+        try:
+            default_series_store.ingest(data_type, hierarchy, location, agency_name, exported["data"],
+                                        gap_start, gap_end)
+        except Exception as exc:
+            logger.exception("Series store ingest failed for %s %s: %s", data_type, location, exc)
+            return None
+        if set(default_crosswalk.stations(hierarchy, data_type, location, agency_name) or ()) - set(stations):
+            return None
+        fetched.append([gap_start, gap_end])
+
+    batch = default_series_store.readings(data_type, stations, start_date, end_date)
+    default_series_store.cover(data_type, hierarchy, location, agency_name, stations, start_date, end_date)
+    _roll_up(hierarchy, data_type, location, agency_name, batch, start_date, end_date)
+    envelope = {"status": "success", "total_records": len(batch), "mode": "crosswalk",
+                "crosswalk": {"reused": [list(where) for where in groups], "fetched_windows": fetched}}
+    entry = default_cache.put(key, envelope, batch)
+    return entry.envelope, entry.batch
@@ -0,0 +1,223 @@
+# tools/generic_tools.py
+"""
+Generic, parameterized tools for the compact agent toolset.
+
+The per-data-type tools in `admin_hierarchy_tools` and
+`basin_hierarchy_tools` differ only in data type and hierarchy. Here both
+are arguments, and the accepted values are documented from the client's
+endpoint tables, so the model is sent five short declarations instead of
+one per endpoint. Each tool dispatches to the same shared paths
+(`fetch_and_process`, the analytics and chart tools), so answers match the
+full toolset.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+
+from ..utils import deadline
+from ..utils.wris_client import ADMIN_ENDPOINT_MAP, BASIN_ENDPOINT_MAP
+from .admin_hierarchy_tools import ADMIN_FETCH_OPTIONS
+from .analytics_tools import (
+    get_correlation_analysis,
+    get_groundwater_fluctuation,
+    get_rainfall_departure,
+    get_rainfall_intensity,
+    get_seasonal_decomposition,
+    get_trend_analysis,
+)
+from .common import ADMIN, BASIN, fetch_and_process, resolve_districts
+from .visualization_tools import render_comparison_chart, render_station_map, render_time_series_chart
+
+# Locations one batch call may cover, and how many are fetched at once
+MAX_BATCH_LOCATIONS = 40
+BATCH_WORKERS = 6
+
+
+def _document(**values: str) -> Callable:
+    """Fill `{placeholders}` in the decorated tool's docstring."""
+    def apply(fn):
+        fn.__doc__ = fn.__doc__.format(**values)
+        return fn
+    return apply
+
+
+_DOC_VALUES = {
+    "admin_types": ", ".join(sorted(ADMIN_ENDPOINT_MAP)),
+    "basin_types": ", ".join(sorted(BASIN_ENDPOINT_MAP)),
+}
+
+
+def _check(data_type: str, hierarchy: str) -> Tuple[str, str]:
+    hierarchy = (hierarchy or ADMIN).strip().lower()
+    endpoints = {ADMIN: ADMIN_ENDPOINT_MAP, BASIN: BASIN_ENDPOINT_MAP}.get(hierarchy)
+    if endpoints is None:
+        return hierarchy, f"hierarchy must be '{ADMIN}' or '{BASIN}'"
+    if data_type not in endpoints:
+        return hierarchy, f"Unknown {hierarchy} data type '{data_type}'. Valid: {', '.join(sorted(endpoints))}"
+    return hierarchy, ""
+
+
+def _fetch(data_type: str, hierarchy: str, region_name: str, sub_region_name: str, agency_name: str,
+           start_date: str, end_date: str) -> Dict[str, Any]:
+    options = ADMIN_FETCH_OPTIONS.get(data_type, {}) if hierarchy == ADMIN else {}
+    return fetch_and_process(hierarchy, data_type, (region_name, sub_region_name), agency_name,
+                             start_date, end_date, **options)
+
+
+@_document(**_DOC_VALUES)
+def fetch_water_data(data_type: str, hierarchy: str, region_name: str, sub_region_name: str,
+                     agency_name: str, start_date: str, end_date: str) -> Dict[str, Any]:
+    """
+    Retrieves WRIS data of one type for one location and date range.
+
+    Args:
+        data_type (str): admin: {admin_types}; basin: {basin_types}
+        hierarchy (str): "admin" (state/district) or "basin" (basin/tributary)
+        region_name (str): State (admin) or basin (basin) name
+        sub_region_name (str): District (admin) or tributary (basin) name
+        agency_name (str): Agency name; empty to search every agency publishing the data
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+
+    Returns:
+        dict: status, records, summary and statistics, or error message
+    """
+    hierarchy, problem = _check(data_type, hierarchy)
+    if problem:
+        return {"status": "error", "error_message": problem}
+    return _fetch(data_type, hierarchy, region_name, sub_region_name, agency_name, start_date, end_date)
+
+
+def _brief(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Per-location summary for batch results: statistics and flags, no raw records."""
+    brief = {"status": result.get("status")}
+    for field in ("summary", "total_records", "statistics", "rainfall_intensity", "agencies", "truncated"):
+        if field in result:
+            brief[field] = result[field]
+    if result.get("status") != "success":
+        brief["error_message"] = result.get("error_message") or result.get("message")
+    return brief
+
+
+@_document(**_DOC_VALUES)
+def fetch_water_data_batch(data_type: str, hierarchy: str, region_name: str, sub_region_names: str,
+                           agency_name: str, start_date: str, end_date: str) -> Dict[str, Any]:
+    """
+    Retrieves summary statistics of one data type for several locations at once.
+
+    Args:
+        data_type (str): admin: {admin_types}; basin: {basin_types}
+        hierarchy (str): "admin" (state/district) or "basin" (basin/tributary)
+        region_name (str): State (admin) or basin (basin) name
+        sub_region_names (str): Comma-separated districts or tributaries; empty for all districts of a state
+        agency_name (str): Agency name; empty to search every agency publishing the data
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+
+    Returns:
+        dict: per-location summary and statistics (no raw records)
+    """
+    hierarchy, problem = _check(data_type, hierarchy)
+    if problem:
+        return {"status": "error", "error_message": problem}
+    if hierarchy == ADMIN:
+        locations = resolve_districts(region_name, sub_region_names)
+    else:
+        locations = [t.strip() for t in (sub_region_names or "").split(",") if t.strip()]
+    if not locations:
+        return {"status": "error", "error_message": "No locations given"}
+    skipped: List[str] = locations[MAX_BATCH_LOCATIONS:]
+    locations = locations[:MAX_BATCH_LOCATIONS]
+
+    fetch = deadline.bind(
+        lambda loc: _fetch(data_type, hierarchy, region_name, loc, agency_name, start_date, end_date))
+    with ThreadPoolExecutor(max_workers=BATCH_WORKERS) as pool:
+        results = dict(zip(locations, pool.map(fetch, locations)))
+    ok = [loc for loc, r in results.items() if r.get("status") == "success"]
+    result = {
+        "status": "success" if ok else "error",
+        "summary": f"Fetched {data_type.replace('_', ' ')} for {len(ok)} of {len(locations)} locations in {region_name}",
+        "locations": {loc: _brief(r) for loc, r in results.items()},
+    }
+    if skipped:
+        result["skipped_locations"] = skipped
+    return result
+
+
+_ANALYSES = ("trend", "seasonal", "groundwater_fluctuation", "rainfall_departure", "rainfall_intensity",
+             "correlation")
+
+
+def analyze_water_data(analysis: str, data_types: str, state_name: str, district_name: str, agency_name: str,
+                       start_date: str, end_date: str, options: str) -> Dict[str, Any]:
+    """
+    Runs a time-series analysis over one district, several, or a whole state.
+
+    Args:
+        analysis (str): "trend" (Mann-Kendall with Sen's slope), "seasonal" (seasonal decomposition),
+            "groundwater_fluctuation" (pre/post-monsoon), "rainfall_departure" (vs. normal
+            for the same days; a period of at most a year),
+            "rainfall_intensity" (station-days per intensity band) or "correlation" (lagged correlation
+            between data types)
+        data_types (str): Data type (e.g., "rainfall"); for correlation two or more, comma-separated
+        state_name (str): Name of the state (e.g., "Maharashtra")
+        district_name (str): District, comma-separated districts, or empty for all districts of the state
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format (use several years)
+        end_date (str): End date in YYYY-MM-DD format
+        options (str): rainfall_departure: "normal_start_year,normal_end_year" (e.g., "1991,2020");
+            correlation: largest lag to test, in periods of the common time axis (default "6"); otherwise empty
+
+    Returns:
+        dict: analysis results and a short summary
+    """
+    analysis = (analysis or "").strip().lower()
+    data_type = (data_types or "").split(",")[0].strip()
+    if analysis == "trend":
+        return get_trend_analysis(data_type, state_name, district_name, agency_name, start_date, end_date)
+    if analysis == "seasonal":
+        return get_seasonal_decomposition(data_type, state_name, district_name, agency_name, start_date, end_date)
+    if analysis == "groundwater_fluctuation":
+        return get_groundwater_fluctuation(state_name, district_name, agency_name, start_date, end_date)
+    if analysis == "rainfall_departure":
+        years = [y.strip() for y in (options or "").split(",")]
+        return get_rainfall_departure(state_name, district_name, agency_name, start_date, end_date,
+                                      years[0] if years[0] else "", years[1] if len(years) > 1 else "")
+    if analysis == "rainfall_intensity":
+        return get_rainfall_intensity(state_name, district_name, agency_name, start_date, end_date)
+    if analysis == "correlation":
+        return get_correlation_analysis(data_types, state_name, district_name, agency_name,
+                                        start_date, end_date, options)
+    return {"status": "error", "error_message": f"analysis must be one of {', '.join(_ANALYSES)}"}
+
+
+def render_chart(chart: str, data_type: str, state_name: str, district_names: str, agency_name: str,
+                 start_date: str, end_date: str, image_format: str) -> Dict[str, Any]:
+    """
+    Renders a chart on the server and returns the image path.
+
+    Args:
+        chart (str): "time_series" (one district's stations), "comparison" (monthly values of several
+            districts) or "station_map" (station locations coloured by mean value)
+        data_type (str): WRIS data type (e.g., "rainfall", "ground_water_level")
+        state_name (str): Name of the state (e.g., "Karnataka")
+        district_names (str): District; for comparison comma-separated districts or empty for the whole state
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+        image_format (str): "png" (default) or "svg"
+
+    Returns:
+        dict: status, image_path and a short summary of what was plotted
+    """
+    chart = (chart or "").strip().lower()
+    if chart == "comparison":
+        return render_comparison_chart(data_type, state_name, district_names, agency_name,
+                                       start_date, end_date, image_format)
+    if chart == "station_map":
+        return render_station_map(data_type, state_name, district_names, agency_name,
+                                  start_date, end_date, image_format)
+    if chart == "time_series":
+        return render_time_series_chart(data_type, state_name, district_names, agency_name,
+                                        start_date, end_date, image_format)
+    return {"status": "error", "error_message": "chart must be 'time_series', 'comparison' or 'station_map'"}
@@ -0,0 +1,310 @@
+# tools/prefetch.py
+"""
+Background cache warming driven by observed tool calls.
+
+`observed` wraps the per-location data tools: every call is appended to a
+JSONL query log and counted in a popularity table with exponential decay.
+The `Prefetcher` thread periodically replays the top-N (tool, location,
+window) queries with `cache_refresh`, so their response-cache entries are
+rebuilt before they expire and a user's first question about a popular
+location is answered from cache.
+
+- Windows that ended on the day of the call ("the last 7 days") are
+  remembered relative to that day and rolled forward when replayed;
+  historical windows are replayed as-is.
+- Only queries learned from the log are warmed, with `MAJOR_BASINS`
+  scored up; with no history there is nothing to refresh. Keys whose
+  decayed score falls below SCORE_FLOOR are dropped, and at most MAX_KEYS
+  are kept.
+- Refreshes run at prefetch priority in the request scheduler, under a
+  rate limit, and only while live traffic is low.
+- The log is compacted to its last LOG_TAIL_LINES lines, and at most half
+  of LOG_MAX_BYTES, once it grows past LOG_MAX_BYTES. It holds users'
+  queries, so it is created readable by its owner only.
+
+The prefetcher is off unless WRIS_PREFETCH=1 (agent.py): warming costs
+upstream requests that nobody may ask for. Tools are only wrapped with
+`observed`, and calls only logged, while it is on.
+"""
+
+from collections import deque
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import functools
+import inspect
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+
+from ..utils import deadline
+from ..utils.constants import MAJOR_BASINS
+from ..utils.scheduler import PREFETCH, session_scope
+from .common import cache_refresh
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG = os.environ.get("WRIS_QUERY_LOG", os.path.join(tempfile.gettempdir(), "wris_query_log.jsonl"))
+# Popularity halves every week without new calls
+HALF_LIFE_SECONDS = 7 * 24 * 3600
+PREFETCH_TOP_N = int(os.environ.get("WRIS_PREFETCH_TOP_N", 40))
+PREFETCH_INTERVAL_SECONDS = 10 * 60
+PREFETCH_RATE_PER_MINUTE = 20
+# A refresh cycle is skipped while more live calls than this arrived in the last BUSY_WINDOW_SECONDS
+BUSY_CALLS = 30
+BUSY_WINDOW_SECONDS = 5 * 60
+# Windows ending this close to the call date are treated as "recent" and rolled forward
+RECENT_SLACK_DAYS = 2
+MAJOR_BASIN_BOOST = 1.5
+# Decayed scores below this are forgotten (one call, after about 46 days)
+SCORE_FLOOR = 0.01
+# Query keys tracked at most; past this the lowest scores are dropped
+MAX_KEYS = 20_000
+# Log lines read back at startup, and kept when the log is compacted
+LOG_TAIL_LINES = 50_000
+LOG_MAX_BYTES = int(os.environ.get("WRIS_QUERY_LOG_MAX_BYTES", 32 * 2**20))
+
+_tools: Dict[str, Callable[..., Dict[str, Any]]] = {}
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    try:
+        return datetime.strptime(str(value), "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+
+
+def query_key(tool_name: str, args: Dict[str, Any], called_on: date) -> Optional[Tuple]:
+    """Popularity key for one call: tool, location/agency args and a window spec.
+
+    The window is ("recent", length_days) when it ended on (or just before)
+    the call date, otherwise ("fixed", start, end).
+    """
+    start, end = _parse_date(args.get("start_date")), _parse_date(args.get("end_date"))
+    if start is None or end is None or end < start:
+        return None
+    if abs((called_on - end).days) <= RECENT_SLACK_DAYS:
+        window = ("recent", (end - start).days)
+    else:
+        window = ("fixed", start.isoformat(), end.isoformat())
+    fixed = tuple(sorted((k, v) for k, v in args.items() if k not in ("start_date", "end_date")))
+    return (tool_name, fixed, window)
+
+
+def window_dates(window: Tuple, today: date) -> Tuple[str, str]:
+    if window[0] == "recent":
+        return (today - timedelta(days=window[1])).isoformat(), today.isoformat()
+    return window[1], window[2]
+
+
+class Popularity:
+    """Exponentially decayed call counts per query key."""
+
+    def __init__(self, half_life_seconds: float = HALF_LIFE_SECONDS):
+        self.decay = math.log(2) / half_life_seconds
+        self._scores: Dict[Tuple, Tuple[float, float]] = {}  # key -> (score, as of)
+        self._recent = deque()                                 # timestamps of live calls
+        self._lock = threading.Lock()
+
+    def add(self, key: Tuple, at: float, weight: float = 1.0, live: bool = True) -> None:
+        with self._lock:
+            score, as_of = self._scores.get(key, (0.0, at))
+            self._scores[key] = (score * math.exp(-self.decay * max(0.0, at - as_of)) + weight, max(at, as_of))
+            if live:
+                self._recent.append(at)
+                while self._recent[0] < at - BUSY_WINDOW_SECONDS:
+                    self._recent.popleft()
+            if len(self._scores) > MAX_KEYS:
+                # Prune to three quarters, so the sort is paid once per many adds
+                self._prune(at, MAX_KEYS * 3 // 4)
+
+    def _prune(self, now: float, keep: int) -> List[Tuple[Tuple, float]]:
+        # Decayed scores, highest first; drops keys below SCORE_FLOOR and beyond `keep`
+        scored = [(key, score * math.exp(-self.decay * max(0.0, now - as_of)))
+                  for key, (score, as_of) in self._scores.items()]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        kept = [item for item in scored[:keep] if item[1] >= SCORE_FLOOR]
+        for key, _ in scored[len(kept):]:
+            del self._scores[key]
+        return kept
+
+    def top(self, n: int, now: float) -> List[Tuple[Tuple, float]]:
+        """The `n` highest decayed scores; keys decayed below SCORE_FLOOR are dropped."""
+        with self._lock:
+            return self._prune(now, MAX_KEYS)[:n]
+
+    def recent_calls(self, now: float, window: float = BUSY_WINDOW_SECONDS) -> int:
+        with self._lock:
+            while self._recent and self._recent[0] < now - window:
+                self._recent.popleft()
+            return len(self._recent)
+
+
+default_popularity = Popularity()
+
+
+def _weight(tool_name: str, args: Dict[str, Any]) -> float:
+    return MAJOR_BASIN_BOOST if args.get("basin_name") in MAJOR_BASINS else 1.0
+
+
+def record_call(tool_name: str, args: Dict[str, Any], at: Optional[float] = None) -> None:
+    """Count one live call and append it to the query log."""
+    at = time.time() if at is None else at
+    key = query_key(tool_name, args, datetime.fromtimestamp(at).date())
+    if key is None:
+        return
+    default_popularity.add(key, at, _weight(tool_name, args))
+    try:
+        with _private(QUERY_LOG, os.O_APPEND) as fh:
+            fh.write(json.dumps({"ts": at, "tool": tool_name, "args": args}, default=str) + "\n")
+            size = fh.tell()
+        if size > LOG_MAX_BYTES:
+            compact_log(QUERY_LOG, keep_bytes=LOG_MAX_BYTES // 2)
+    except OSError as exc:
+        logger.debug("Query log not writable: %s", exc)
+
+
+def _private(path: str, mode: int):
+    """Open `path` for writing (append or truncate), creating it readable by its owner only."""
+    return os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | mode, 0o600), "w", encoding="utf-8")
+
+
+_compact_lock = threading.Lock()
+
+
+def compact_log(path: str = QUERY_LOG, keep_lines: int = LOG_TAIL_LINES,
+                keep_bytes: int = LOG_MAX_BYTES // 2) -> None:
+    """Rewrite the query log as its last `keep_lines` lines, at most `keep_bytes` long.
+
+    Calls appended by other processes while it is rewritten may be lost;
+    the log only informs popularity.
+    """
+    if not _compact_lock.acquire(blocking=False):
+        return
+    try:
+        with open(path, encoding="utf-8") as fh:
+            lines = deque(fh, maxlen=keep_lines)
+        size = sum(len(line) for line in lines)
+        while lines and size > keep_bytes:
+            size -= len(lines.popleft())
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with _private(tmp, os.O_TRUNC) as fh:
+            fh.writelines(lines)
+        os.replace(tmp, path)
+    finally:
+        _compact_lock.release()
+
+
+def load_log(path: str = QUERY_LOG, max_lines: int = LOG_TAIL_LINES) -> int:
+    """Rebuild popularity from the tail of the query log; returns calls loaded."""
+    if not os.path.exists(path):
+        return 0
+    with open(path, encoding="utf-8") as fh:
+        lines = deque(fh, maxlen=max_lines)
+    loaded = 0
+    for line in lines:
+        try:
+            call = json.loads(line)
+            at = float(call["ts"])
+            key = query_key(call["tool"], call["args"], datetime.fromtimestamp(at).date())
+        except (ValueError, KeyError, TypeError):
+            continue
+        if key is not None:
+            default_popularity.add(key, at, _weight(call["tool"], call["args"]), live=False)
+            loaded += 1
+    return loaded
+
+
+def observed(tool: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+    """Wrap a per-location data tool so its calls feed the prefetcher."""
+    signature = inspect.signature(tool)
+    _tools[tool.__name__] = tool
+
+    @functools.wraps(tool)
+    def run(*args, **kwargs):
+        try:
+            bound = signature.bind(*args, **kwargs)
+            record_call(tool.__name__, dict(bound.arguments))
+        except TypeError:
+            pass
+        return tool(*args, **kwargs)
+    return run
+
+
+class Prefetcher:
+    """Daemon thread that keeps the most popular queries warm in the response cache."""
+
+    def __init__(self, top_n: int = PREFETCH_TOP_N, interval_seconds: float = PREFETCH_INTERVAL_SECONDS,
+                 rate_per_minute: float = PREFETCH_RATE_PER_MINUTE, busy_calls: int = BUSY_CALLS,
+                 popularity: Popularity = default_popularity):
+        self.top_n = top_n
+        self.interval_seconds = interval_seconds
+        self.min_gap = 60.0 / rate_per_minute
+        self.busy_calls = busy_calls
+        self.popularity = popularity
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"cycles": 0, "skipped_busy": 0, "refreshed": 0, "failed": 0}
+
+    def start(self, initial_delay: float = 60.0) -> "Prefetcher":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, args=(initial_delay,),
+                                            name="wris-prefetch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _loop(self, initial_delay: float) -> None:
+        if self._stop.wait(initial_delay):
+            return
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Prefetch cycle failed")
+            self._stop.wait(self.interval_seconds)
+
+    def run_once(self) -> int:
+        """Refresh the current top-N queries, paced by the rate limit; returns refreshes done."""
+        now = time.time()
+        self.stats["cycles"] += 1
+        if self.popularity.recent_calls(now) > self.busy_calls:
+            self.stats["skipped_busy"] += 1
+            return 0
+        today = date.today()
+        done = 0
+        for (tool_name, fixed, window), _ in self.popularity.top(self.top_n, now):
+            tool = _tools.get(tool_name)
+            if tool is None:
+                continue
+            if self._stop.is_set() or self.popularity.recent_calls(time.time()) > self.busy_calls:
+                break
+            start_date, end_date = window_dates(window, today)
+            started = time.monotonic()
+            if self._refresh(tool, dict(fixed, start_date=start_date, end_date=end_date)):
+                done += 1
+            self._stop.wait(max(0.0, self.min_gap - (time.monotonic() - started)))
+        return done
+
+    def _refresh(self, tool: Callable[..., Dict[str, Any]], args: Dict[str, Any]) -> bool:
+        with session_scope("prefetch", PREFETCH), deadline.deadline(deadline.DEFAULT_TOOL_BUDGET), cache_refresh():
+            try:
+                result = tool(**args)
+            except Exception as exc:
+                logger.debug("Prefetch of %s failed: %s", tool.__name__, exc)
+                result = None
+        ok = isinstance(result, dict) and result.get("status") == "success"
+        self.stats["refreshed" if ok else "failed"] += 1
+        return ok
+
+
+def start_prefetcher(**kwargs: Any) -> Prefetcher:
+    """Load the query log and start the background prefetcher."""
+    loaded = load_log()
+    logger.info("Prefetcher starting with %d logged calls", loaded)
+    return Prefetcher(**kwargs).start()
@@ -0,0 +1,232 @@
+# tools/visualization_tools.py
+"""
+Tools that render WRIS data to PNG/SVG charts on the server.
+
+The model receives a short summary and the path of the rendered image
+instead of the raw series. Data comes from the shared bulk path
+(`tools.common.fetch_series`, cached), long series are downsampled to the
+plot width before drawing, and images are cached by a hash of the query and
+chart spec so repeated views cost nothing.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Tuple
+import logging
+
+import numpy as np
+import pandas as pd
+
+from ..utils import deadline
+from ..utils.charts import (
+    SUPPORTED_FORMATS,
+    default_render_cache,
+    render_lines,
+    render_scatter_map,
+    spec_hash,
+)
+from ..utils.constants import SUMMED_DATA_TYPES
+from ..utils.timeseries import station_matrix, tidy_frame
+from .analytics_tools import ANALYTICS_DEFAULT_END, ANALYTICS_DEFAULT_START
+from .common import ADMIN, fetch_series, resolve_districts
+
+logger = logging.getLogger(__name__)
+
+# Beyond this many stations a time-series chart shows the cross-station mean
+MAX_LINES = 8
+LONGITUDE_COLUMNS = ('longitude', 'long', 'lon')
+LATITUDE_COLUMNS = ('latitude', 'lat')
+
+
+def _format(image_format: str) -> str:
+    fmt = (image_format or 'png').lower().lstrip('.')
+    return fmt if fmt in SUPPORTED_FORMATS else 'png'
+
+
+def _cached_render(query: Dict[str, Any], spec: Dict[str, Any],
+                   draw: Callable[[], Tuple[Dict[str, Any], bytes, int]]) -> Dict[str, Any]:
+    """Serve a chart from the render cache, or draw, store and return it.
+
+    A cached chart is served for as long as an answer over the same window
+    would be (`freshness_ttl`): briefly for recent data, longer for history.
+    """
+    # Imported here: answer_cache imports the tool modules, this one included
+    from .answer_cache import freshness_ttl
+
+    key = spec_hash(query, spec)
+    fmt = spec['format']
+    max_age = freshness_ttl([(query["chart"], (("end_date", query["end"] or ANALYTICS_DEFAULT_END),))])
+    if default_render_cache.get(key, fmt, max_age) is not None:
+        return {
+            "status": "success",
+            "image_path": default_render_cache.path_for(key, fmt),
+            "format": fmt,
+            "cached": True,
+            "summary": f"{spec['title']} (cached chart)",
+        }
+    try:
+        result, image, drawn = draw()
+    except ImportError:
+        return {"status": "error", "error_message": "Chart rendering requires matplotlib to be installed"}
+    if result.get("status") != "success":
+        return result
+    result.update({
+        "image_path": default_render_cache.put(key, fmt, image),
+        "format": fmt,
+        "cached": False,
+        "points_plotted": drawn,
+    })
+    return result
+
+
+def _load_frame(data_type: str, state_name: str, district_name: str, agency_name: str,
+                start_date: str, end_date: str) -> pd.DataFrame:
+    envelope, batch = fetch_series(ADMIN, data_type, (state_name, district_name), agency_name,
+                                   start_date or ANALYTICS_DEFAULT_START, end_date or ANALYTICS_DEFAULT_END)
+    if batch is None or not len(batch):
+        return pd.DataFrame()
+    return batch.to_dataframe()
+
+
+def render_time_series_chart(data_type: str, state_name: str, district_name: str, agency_name: str,
+                             start_date: str, end_date: str, image_format: str) -> Dict[str, Any]:
+    """
+    Renders a time-series line chart of one district's stations and returns the image path.
+
+    Args:
+        data_type (str): WRIS data type (e.g., "river_water_level", "rainfall")
+        state_name (str): Name of the state (e.g., "Maharashtra")
+        district_name (str): Name of the district (e.g., "Pune")
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+        image_format (str): "png" (default) or "svg"
+
+    Returns:
+        dict: status, image_path and a short summary of what was plotted
+    """
+    query = {"chart": "time_series", "data_type": data_type, "state": state_name, "district": district_name,
+             "agency": agency_name, "start": start_date, "end": end_date}
+    label = data_type.replace('_', ' ')
+    spec = {"format": _format(image_format), "title": f"{label.title()} - {district_name}, {state_name}",
+            "ylabel": label, "width": 1000, "height": 500}
+
+    def draw():
+        tidy = tidy_frame(_load_frame(data_type, state_name, district_name, agency_name, start_date, end_date))
+        if tidy.empty:
+            return {"status": "error", "error_message": f"No {label} data to plot for {district_name}"}, b"", 0
+        tidy = tidy.sort_values('time')
+        stations = tidy['station'].unique()
+        if len(stations) <= MAX_LINES:
+            series = [(str(st), grp['time'].to_numpy(), grp['value'].to_numpy())
+                      for st, grp in tidy.groupby('station', sort=False)]
+            note = f"{len(stations)} stations"
+        else:
+            mean = tidy.groupby('time')['value'].mean()
+            series = [("mean of stations", mean.index.to_numpy(), mean.to_numpy())]
+            note = f"mean of {len(stations)} stations"
+        image, drawn = render_lines(series, spec)
+        return {
+            "status": "success",
+            "summary": f"Plotted {len(tidy)} {label} readings ({note}) for {district_name}, {state_name}",
+            "points_raw": int(len(tidy)),
+        }, image, drawn
+
+    return _cached_render(query, spec, draw)
+
+
+def render_comparison_chart(data_type: str, state_name: str, district_names: str, agency_name: str,
+                            start_date: str, end_date: str, image_format: str) -> Dict[str, Any]:
+    """
+    Renders monthly values of several districts on one chart for comparison.
+
+    Args:
+        data_type (str): WRIS data type (e.g., "rainfall", "ground_water_level")
+        state_name (str): Name of the state (e.g., "Karnataka")
+        district_names (str): Comma-separated districts, or empty for all districts of the state
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+        image_format (str): "png" (default) or "svg"
+
+    Returns:
+        dict: status, image_path and a short summary of what was plotted
+    """
+    districts = resolve_districts(state_name, district_names)
+    query = {"chart": "comparison", "data_type": data_type, "state": state_name, "districts": districts,
+             "agency": agency_name, "start": start_date, "end": end_date}
+    label = data_type.replace('_', ' ')
+    how = "sum" if data_type in SUMMED_DATA_TYPES else "mean"
+    spec = {"format": _format(image_format), "title": f"Monthly {label} by district - {state_name}",
+            "ylabel": f"{label} (monthly {how})", "width": 1000, "height": 500}
+
+    def draw():
+        with ThreadPoolExecutor(max_workers=6) as pool:
+            frames = list(pool.map(
+                deadline.bind(lambda d: tidy_frame(
+                    _load_frame(data_type, state_name, d, agency_name, start_date, end_date))),
+                districts))
+        series: List[Tuple[str, Any, Any]] = []
+        plotted = []
+        for district, tidy in zip(districts, frames):
+            if tidy.empty:
+                continue
+            # monthly station aggregate, then mean across the district's stations
+            _, periods, matrix = station_matrix(tidy, freq='M', how=how)
+            with np.errstate(invalid='ignore'):
+                monthly = np.nanmean(matrix, axis=0)
+            series.append((district, periods.to_timestamp().to_numpy(), monthly))
+            plotted.append(district)
+        if not series:
+            return {"status": "error", "error_message": f"No {label} data to plot for {state_name}"}, b"", 0
+        image, drawn = render_lines(series, spec)
+        return {
+            "status": "success",
+            "summary": f"Compared monthly {label} for {', '.join(plotted)} in {state_name}",
+            "points_raw": int(sum(len(f) for f in frames)),
+        }, image, drawn
+
+    return _cached_render(query, spec, draw)
+
+
+def render_station_map(data_type: str, state_name: str, district_name: str, agency_name: str,
+                       start_date: str, end_date: str, image_format: str) -> Dict[str, Any]:
+    """
+    Renders a map of station locations coloured by each station's mean value.
+
+    Args:
+        data_type (str): WRIS data type (e.g., "ground_water_level")
+        state_name (str): Name of the state (e.g., "Maharashtra")
+        district_name (str): Name of the district (e.g., "Pune")
+        agency_name (str): Agency name
+        start_date (str): Start date in YYYY-MM-DD format
+        end_date (str): End date in YYYY-MM-DD format
+        image_format (str): "png" (default) or "svg"
+
+    Returns:
+        dict: status, image_path and a short summary of what was plotted
+    """
+    query = {"chart": "station_map", "data_type": data_type, "state": state_name, "district": district_name,
+             "agency": agency_name, "start": start_date, "end": end_date}
+    label = data_type.replace('_', ' ')
+    spec = {"format": _format(image_format), "title": f"{label.title()} stations - {district_name}, {state_name}",
+            "xlabel": "longitude", "ylabel": "latitude", "colorbar": f"mean {label}", "width": 800, "height": 800}
+
+    def draw():
+        df = _load_frame(data_type, state_name, district_name, agency_name, start_date, end_date)
+        lon_col = next((c for c in LONGITUDE_COLUMNS if c in df.columns), None)
+        lat_col = next((c for c in LATITUDE_COLUMNS if c in df.columns), None)
+        if df.empty or lon_col is None or lat_col is None:
+            return {"status": "error", "error_message": "Station coordinates are not available for this query"}, b"", 0
+        tidy = tidy_frame(df).assign(lon=pd.to_numeric(df[lon_col], errors='coerce'),
+                                     lat=pd.to_numeric(df[lat_col], errors='coerce'))
+        stations = tidy.groupby('station').agg(lon=('lon', 'first'), lat=('lat', 'first'), value=('value', 'mean'))
+        stations = stations.dropna(subset=['lon', 'lat'])
+        image, drawn = render_scatter_map(stations['lon'].to_numpy(), stations['lat'].to_numpy(),
+                                          stations['value'].to_numpy(), stations.index.tolist(), spec)
+        return {
+            "status": "success",
+            "summary": f"Mapped {len(stations)} {label} stations in {district_name}, {state_name}",
+            "points_raw": int(len(tidy)),
+        }, image, drawn
+
+    return _cached_render(query, spec, draw)
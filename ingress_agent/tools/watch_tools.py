@@ -0,0 +1,108 @@
+# tools/watch_tools.py
+"""
+Agent tools for live monitoring of stations (see utils/watch.py).
+
+`watch_series` registers a watch ("tell me when the river level at
+station X crosses the danger level"). The watcher then polls the series in
+the background, and `get_watch_alerts` returns the alerts raised since it
+was last called. `list_watches` shows each watch with the latest reading
+per station, and `stop_watch` removes one.
+
+Watches belong to the session that created them: the other tools see
+only the calling session's watches and alerts.
+
+These tools read and change live state, so the answer cache never stores
+or serves them (`WATCH_TOOL_NAMES`).
+"""
+
+from typing import Any, Dict, Optional
+
+from ..utils.scheduler import current_session
+from ..utils.watch import default_watcher
+from .common import ADMIN, DEFAULT_AGENCY
+from .generic_tools import _DOC_VALUES, _document
+
+WATCH_TOOL_NAMES = frozenset({"watch_series", "list_watches", "stop_watch", "get_watch_alerts"})
+DEFAULT_INTERVAL_MINUTES = 15
+MAX_ALERTS_PER_CALL = 50
+
+
+@_document(**_DOC_VALUES)
+def watch_series(data_type: str, hierarchy: str, region_name: str, sub_region_name: str,
+                 agency_name: Optional[str], station: Optional[str], above: Optional[float],
+                 below: Optional[float], max_rate_per_hour: Optional[float],
+                 interval_minutes: Optional[float]) -> Dict[str, Any]:
+    """
+    Starts monitoring a series and raises alerts on level crossings and unusual changes.
+
+    Args:
+        data_type (str): admin: {admin_types}; basin: {basin_types}
+        hierarchy (str): "admin" (state/district) or "basin" (basin/tributary)
+        region_name (str): State (admin) or basin (basin) name
+        sub_region_name (str): District (admin) or tributary (basin) name
+        agency_name (str): Agency name (default CWC)
+        station (str): Station code or name to watch; empty for every station of the location
+        above (float): Alert when a reading reaches this level (e.g. the danger level)
+        below (float): Alert when a reading falls to this level
+        max_rate_per_hour (float): Alert when the change per hour exceeds this
+        interval_minutes (float): Minutes between polls (default 15)
+
+    Returns:
+        dict: the watch, including the "watch_id" used by the other watch tools
+    """
+    try:
+        watch = default_watcher.add(
+            (hierarchy or ADMIN).strip().lower(), data_type, region_name, sub_region_name,
+            agency_name or DEFAULT_AGENCY, station=station, above=above, below=below,
+            max_rate=max_rate_per_hour,
+            interval_seconds=60 * (interval_minutes or DEFAULT_INTERVAL_MINUTES), owner=current_session())
+    except ValueError as exc:
+        return {"status": "error", "error_message": str(exc)}
+    return {"status": "success", "watch_id": watch["id"], "watch": watch,
+            "summary": f"Watching {data_type.replace('_', ' ')} in {region_name}/{sub_region_name} "
+                       f"every {watch['interval_seconds'] / 60:g} minutes"}
+
+
+def list_watches() -> Dict[str, Any]:
+    """
+    Lists this session's active watches with their latest reading per station.
+
+    Returns:
+        dict: the watches, each with its thresholds, poll counts and latest readings
+    """
+    watches = default_watcher.watches(owner=current_session())
+    return {"status": "success", "watches": watches, "total_records": len(watches)}
+
+
+def stop_watch(watch_id: str) -> Dict[str, Any]:
+    """
+    Stops a watch.
+
+    Args:
+        watch_id (str): Id returned by watch_series
+
+    Returns:
+        dict: status, or error message if there is no such watch
+    """
+    if not default_watcher.remove(watch_id, owner=current_session()):
+        return {"status": "error", "error_message": f"No watch with id '{watch_id}'"}
+    return {"status": "success", "summary": f"Stopped watch {watch_id}"}
+
+
+def get_watch_alerts(watch_id: Optional[str], max_alerts: Optional[int]) -> Dict[str, Any]:
+    """
+    Returns alerts raised by this session's watches since the last call, oldest first.
+
+    Args:
+        watch_id (str): Only this watch's alerts; empty for all
+        max_alerts (int): Most alerts to return (default 50)
+
+    Returns:
+        dict: alerts with watch id, kind (above, below, recovered, rate, anomaly), station, time and value
+    """
+    alerts = default_watcher.alerts(min(max_alerts or MAX_ALERTS_PER_CALL, MAX_ALERTS_PER_CALL), watch_id or None,
+                                    owner=current_session())
+    return {"status": "success", "alerts": alerts, "total_records": len(alerts)}
+
+
+WATCH_TOOLS = [watch_series, list_watches, stop_watch, get_watch_alerts]
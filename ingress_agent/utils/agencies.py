@@ -0,0 +1,87 @@
+# ingress_agent/utils/agencies.py
+"""
+Which agencies actually publish data for a location.
+
+When a tool is called without an agency, every agency in
+`DATA_TYPE_AGENCIES` is queried. The ones that returned records are
+remembered here per (hierarchy, data type, location), so later calls for
+the same location go straight to them. Entries are re-probed against the
+full agency list after `REPROBE_SECONDS`, in case coverage changed.
+Persisted as JSON under WRIS_AGENCY_MEMORY.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from .constants import DATA_TYPE_AGENCIES
+
+logger = logging.getLogger(__name__)
+
+AGENCY_MEMORY_PATH = os.environ.get('WRIS_AGENCY_MEMORY',
+                                    os.path.join(tempfile.gettempdir(), 'wris_agency_memory.json'))
+REPROBE_SECONDS = 30 * 24 * 3600
+DEFAULT_AGENCIES = ['CWC']
+
+
+def _key(hierarchy, data_type, location):
+    return '|'.join([hierarchy, data_type] + [str(part).strip().lower() for part in location])
+
+
+class AgencyMemory:
+    def __init__(self, path=AGENCY_MEMORY_PATH, reprobe_seconds=REPROBE_SECONDS):
+        self.path = path
+        self.reprobe_seconds = reprobe_seconds
+        self._entries = {}   # key -> {"agencies": [...], "checked": epoch seconds}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                self._entries = json.load(fh)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable agency memory %s: %s", self.path, exc)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(self._entries, fh)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logger.debug("Agency memory not writable: %s", exc)
+
+    def candidates(self, hierarchy, data_type, location):
+        """Agencies to query, in preference order: remembered ones if still fresh, else all known."""
+        known = DATA_TYPE_AGENCIES.get(data_type, DEFAULT_AGENCIES)
+        with self._lock:
+            entry = self._entries.get(_key(hierarchy, data_type, location))
+        if entry and entry['agencies'] and time.time() - entry['checked'] < self.reprobe_seconds:
+            return entry['agencies']
+        return list(known)
+
+    def record(self, hierarchy, data_type, location, agencies, probed_all):
+        """Remember the agencies that returned data.
+
+        An empty answer is only remembered after a probe of every known
+        agency, so a partial probe never hides the full list.
+        """
+        if not agencies and not probed_all:
+            return
+        key = _key(hierarchy, data_type, location)
+        with self._lock:
+            previous = self._entries.get(key)
+            checked = time.time() if probed_all or previous is None else previous['checked']
+            self._entries[key] = {'agencies': list(agencies), 'checked': checked}
+            self._save()
+
+
+default_agency_memory = AgencyMemory()
@@ -0,0 +1,188 @@
+# ingress_agent/utils/charts.py
+"""
+Server-side chart rendering for WRIS series.
+
+matplotlib is an optional dependency, imported lazily so the rest of the
+agent does not need it installed. Figures are built with
+`matplotlib.figure.Figure` directly rather than pyplot: no global figure
+registry or GUI backend is involved, so renders on concurrent tool threads
+do not share state and work on headless servers.
+
+Series longer than the plot's pixel width are reduced with min/max-per-pixel
+downsampling before drawing: every pixel column keeps its first, last,
+minimum and maximum point, so peaks and troughs survive while the number of
+drawn points stays at most 4 x width.
+
+Rendered images are cached by a SHA-256 of (query, chart spec), in memory
+and on disk, so repeated views are served without re-fetching or re-drawing.
+Callers pass a maximum age to `RenderCache.get`, so a chart of recent data
+is redrawn once the data may have changed.
+"""
+
+from collections import OrderedDict
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_WIDTH_PX = 1000
+DEFAULT_HEIGHT_PX = 500
+DEFAULT_DPI = 100
+SUPPORTED_FORMATS = ('png', 'svg')
+RENDER_DIR = os.environ.get('WRIS_RENDER_DIR', os.path.join(tempfile.gettempdir(), 'wris_charts'))
+
+
+def _new_figure(width_in, height_in, dpi):
+    from matplotlib.figure import Figure
+    return Figure(figsize=(width_in, height_in), dpi=dpi)
+
+
+def minmax_downsample(x, y, n_buckets):
+    """Reduce (x, y) to at most 4 points per bucket: first, min, max, last.
+
+    `x` must be sorted. Returns new (x, y) arrays in x order.
+    """
+    n = len(x)
+    if n <= 4 * n_buckets or n_buckets <= 0:
+        return x, y
+    edges = np.linspace(0, n, n_buckets + 1).astype(np.int64)
+    starts = edges[:-1]
+    ends = edges[1:] - 1
+
+    y_filled = np.where(np.isnan(y), np.inf, y)
+    # argmin/argmax within each bucket via reduceat on the values, then a
+    # match back to positions
+    bucket_of = np.repeat(np.arange(n_buckets), np.diff(edges))
+    mins = np.minimum.reduceat(y_filled, starts)
+    maxs = np.maximum.reduceat(np.where(np.isnan(y), -np.inf, y), starts)
+    is_min = y_filled == mins[bucket_of]
+    is_max = np.where(np.isnan(y), -np.inf, y) == maxs[bucket_of]
+    # First occurrence per bucket of the min/max
+    min_idx = np.full(n_buckets, -1)
+    max_idx = np.full(n_buckets, -1)
+    positions = np.arange(n)
+    min_pos = positions[is_min]
+    max_pos = positions[is_max]
+    min_idx[bucket_of[min_pos][::-1]] = min_pos[::-1]
+    max_idx[bucket_of[max_pos][::-1]] = max_pos[::-1]
+
+    keep = np.concatenate([starts, ends, min_idx[min_idx >= 0], max_idx[max_idx >= 0]])
+    keep = np.unique(keep)
+    return x[keep], y[keep]
+
+
+def spec_hash(query, spec):
+    """Content hash identifying one rendered chart."""
+    payload = json.dumps({'query': query, 'spec': spec}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class RenderCache:
+    """Rendered image bytes keyed by `spec_hash`, in memory and on disk."""
+
+    def __init__(self, directory=RENDER_DIR, max_entries=128):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (image bytes, rendered at)
+        self._lock = threading.Lock()
+
+    def path_for(self, key, fmt):
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def get(self, key, fmt, max_age=None):
+        """The cached image, or None if there is none rendered within `max_age` seconds."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if max_age is None or now - entry[1] <= max_age:
+                    self._entries.move_to_end(key)
+                    return entry[0]
+                del self._entries[key]
+        path = self.path_for(key, fmt)
+        try:
+            rendered = os.path.getmtime(path)
+            if max_age is not None and now - rendered > max_age:
+                return None
+            with open(path, 'rb') as fh:
+                data = fh.read()
+        except OSError:
+            return None
+        self._remember(key, data, rendered)
+        return data
+
+    def put(self, key, fmt, data):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path_for(key, fmt)
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, 'wb') as fh:
+            fh.write(data)
+        os.replace(tmp, path)
+        self._remember(key, data, time.time())
+        return path
+
+    def _remember(self, key, data, rendered):
+        with self._lock:
+            self._entries[key] = (data, rendered)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def _figure(spec):
+    dpi = spec.get('dpi', DEFAULT_DPI)
+    fig = _new_figure(spec.get('width', DEFAULT_WIDTH_PX) / dpi, spec.get('height', DEFAULT_HEIGHT_PX) / dpi, dpi)
+    return fig, fig.subplots()
+
+
+def _finish(fig, ax, spec):
+    ax.set_title(spec.get('title', ''))
+    ax.set_xlabel(spec.get('xlabel', ''))
+    ax.set_ylabel(spec.get('ylabel', ''))
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format=spec.get('format', 'png'))
+    return buf.getvalue()
+
+
+def plot_area_width(spec):
+    """Approximate pixel width of the axes area, the downsampling target."""
+    return int(spec.get('width', DEFAULT_WIDTH_PX) * 0.85)
+
+
+def render_lines(series, spec):
+    """Draw one line per (label, x, y) in `series`; x is datetime64 or numeric.
+
+    Returns (image bytes, points drawn).
+    """
+    fig, ax = _figure(spec)
+    # spec['downsample'] = False draws every point (used by the benchmark)
+    buckets = plot_area_width(spec) if spec.get('downsample', True) else 0
+    drawn = 0
+    for label, x, y in series:
+        xs, ys = minmax_downsample(np.asarray(x), np.asarray(y, dtype=np.float64), buckets)
+        drawn += len(xs)
+        ax.plot(xs, ys, linewidth=0.8, label=label)
+    if len(series) > 1:
+        ax.legend(fontsize='small', ncol=2)
+    fig.autofmt_xdate()
+    return _finish(fig, ax, spec), drawn
+
+
+def render_scatter_map(lon, lat, values, labels, spec):
+    fig, ax = _figure(spec)
+    points = ax.scatter(lon, lat, c=values, cmap='viridis', s=30, edgecolors='k', linewidths=0.3)
+    fig.colorbar(points, ax=ax, label=spec.get('colorbar', ''))
+    if len(labels) <= 40:
+        for x, y, text in zip(lon, lat, labels):
+            ax.annotate(str(text), (x, y), fontsize=6, xytext=(3, 3), textcoords='offset points')
+    ax.set_aspect('equal', adjustable='datalim')
+    return _finish(fig, ax, spec), len(values)
+
+
+default_render_cache = RenderCache()
@@ -0,0 +1,144 @@
+# ingress_agent/utils/classification.py
+"""
+Vectorized classification of readings into categories.
+
+Values are binned with one `np.searchsorted` over the band limits, and
+categories are counted with one `np.bincount`. With group codes (district,
+state, ...) the counts come out as a (groups x categories) matrix in the
+same call, so a national batch costs the same few array operations as one
+district.
+
+- rainfall: readings are summed to daily totals per station, and every
+  station-day falls in an intensity band (RAINFALL_INTENSITY_BANDS)
+- groundwater: each assessment unit's stage of extraction (extraction as a
+  percentage of annual recharge) falls in a CGWB category
+  (GROUNDWATER_CATEGORIES, limits GROUNDWATER_STAGE_LIMITS)
+"""
+
+import numpy as np
+import pandas as pd
+
+from .constants import GROUNDWATER_CATEGORIES, GROUNDWATER_STAGE_LIMITS, RAINFALL_INTENSITY_BANDS
+
+RAINFALL_LABELS = ('No Rain',) + tuple(label for _, label in RAINFALL_INTENSITY_BANDS)
+GROUNDWATER_LABELS = tuple(GROUNDWATER_CATEGORIES)
+
+
+def bin_codes(values, limits, right_closed=False):
+    """Band index of each value: 0 below limits[0], len(limits) above the last; -1 for NaN.
+
+    Bands include their lower limit, or their upper limit with `right_closed`.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.searchsorted(np.asarray(limits, dtype=np.float64), values,
+                            side='left' if right_closed else 'right')
+    codes[np.isnan(values)] = -1
+    return codes
+
+
+def category_counts(codes, n_categories, groups=None, n_groups=None):
+    """Count codes per category, or per (group, category) when `groups` are given.
+
+    Codes of -1 (unclassifiable) are skipped. Returns a 1-D array of length
+    `n_categories`, or an (n_groups x n_categories) matrix.
+    """
+    codes = np.asarray(codes)
+    valid = codes >= 0
+    if groups is None:
+        return np.bincount(codes[valid], minlength=n_categories)
+    groups = np.asarray(groups)
+    if n_groups is None:
+        n_groups = int(groups.max()) + 1 if len(groups) else 0
+    flat = groups[valid] * n_categories + codes[valid]
+    return np.bincount(flat, minlength=n_groups * n_categories).reshape(n_groups, n_categories)
+
+
+def distribution(counts):
+    """Share of each category along the last axis (0 where there is nothing to count)."""
+    counts = np.asarray(counts, dtype=np.float64)
+    totals = counts.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(totals > 0, counts / totals, 0.0)
+
+
+def summarize(labels, counts):
+    """Counts and distribution of one group as dicts keyed by label."""
+    shares = distribution(counts)
+    return {
+        'total': int(counts.sum()),
+        'counts': {label: int(c) for label, c in zip(labels, counts)},
+        'distribution': {label: round(float(s), 4) for label, s in zip(labels, shares)},
+    }
+
+
+def rainfall_codes(daily_totals):
+    """Intensity band of each daily total (index into RAINFALL_LABELS); -1 for NaN.
+
+    Totals are rounded to the 0.1 mm the bands are defined at, so a sum
+    such as 2.4999999 counts as 2.5.
+    """
+    totals = np.round(np.asarray(daily_totals, dtype=np.float64), 1)
+    return bin_codes(totals, [lower for lower, _ in RAINFALL_INTENSITY_BANDS])
+
+
+def daily_totals(tidy, group=None):
+    """Sum a tidy frame (station, time, value[, group]) to one total per station and day.
+
+    Station-days are numbered by integer key (station code x day) and
+    summed with one `np.bincount`. Returns (stations, days, totals, group
+    codes, group names); the group entries are None without `group`.
+    """
+    station_codes, station_names = pd.factorize(tidy['station'], sort=False)
+    days = tidy['time'].to_numpy(dtype='datetime64[ns]').astype('datetime64[D]').astype(np.int64)
+    first_day = days.min() if len(days) else 0
+    span = int(days.max() - first_day) + 1 if len(days) else 1
+    keys, first, inverse = np.unique(station_codes.astype(np.int64) * span + (days - first_day),
+                                     return_index=True, return_inverse=True)
+    totals = np.bincount(inverse, weights=tidy['value'].to_numpy(dtype=np.float64), minlength=len(keys))
+    stations = station_names[keys // span]
+    day_of_key = (keys % span + first_day).astype('datetime64[D]')
+    if not group:
+        return stations, day_of_key, totals, None, None
+    # A station belongs to one group: take it from the station-day's first reading
+    group_codes, group_names = pd.factorize(tidy[group], sort=False)
+    return stations, day_of_key, totals, group_codes[first], group_names
+
+
+def classify_rainfall(tidy, group=None):
+    """Intensity of every station-day in `tidy`, counted overall and per `group` column.
+
+    Returns {"station_days", "counts", "distribution", "wettest"} where
+    "wettest" is the station-day with the largest total; with `group`, also
+    "groups": {group value: counts and distribution}.
+    """
+    stations, days, totals, group_codes, group_names = daily_totals(tidy, group)
+    codes = rainfall_codes(totals)
+    result = summarize(RAINFALL_LABELS, category_counts(codes, len(RAINFALL_LABELS)))
+    result['station_days'] = result.pop('total')
+    if len(totals):
+        k = int(np.argmax(totals))
+        result['wettest'] = {'station': str(stations[k]), 'day': str(days[k]), 'total_mm': round(float(totals[k]), 1)}
+    if group:
+        per_group = category_counts(codes, len(RAINFALL_LABELS), group_codes, len(group_names))
+        result['groups'] = {str(name): summarize(RAINFALL_LABELS, row) for name, row in zip(group_names, per_group)}
+    return result
+
+
+def classify_groundwater_stage(stage_percent, units=None, groups=None):
+    """CGWB category of each assessment unit's stage of extraction (%).
+
+    Returns {"categories": label per unit, "counts", "distribution"}, with
+    "units" when unit names are given and "groups" (per group value) when
+    `groups` assigns units to districts or states.
+    """
+    codes = bin_codes(stage_percent, GROUNDWATER_STAGE_LIMITS, right_closed=True)
+    labels = np.array(GROUNDWATER_LABELS + ('Unknown',), dtype=object)
+    result = summarize(GROUNDWATER_LABELS, category_counts(codes, len(GROUNDWATER_LABELS)))
+    result['categories'] = labels[codes].tolist()
+    if units is not None:
+        result['units'] = [str(u) for u in units]
+    if groups is not None:
+        group_codes, names = pd.factorize(np.asarray(groups, dtype=object))
+        per_group = category_counts(codes, len(GROUNDWATER_LABELS), group_codes, len(names))
+        result['groups'] = {str(name): summarize(GROUNDWATER_LABELS, row) for name, row in zip(names, per_group)}
+    return result
@@ -62,6 +62,20 @@ GROUNDWATER_CATEGORIES = {
     'CRITICAL': 'Groundwater extraction is between 90-100% of annual recharge',
     'OVER_EXPLOITED': 'Groundwater extraction is more than 100% of annual recharge'
 }
+# Upper limits (inclusive, % stage of extraction) of all but the last of GROUNDWATER_CATEGORIES
+GROUNDWATER_STAGE_LIMITS = (70, 90, 100)
+
+# IMD daily rainfall intensity bands, as (lower bound in mm/day, label); a
+# day with less than the first bound is 'No Rain'. Rainfall is reported to
+# 0.1 mm, so e.g. Light is 2.5-15.5 mm.
+RAINFALL_INTENSITY_BANDS = (
+    (0.1, 'Very Light'),
+    (2.5, 'Light'),
+    (15.6, 'Moderate'),
+    (64.5, 'Heavy'),
+    (115.6, 'Very Heavy'),
+    (204.5, 'Extremely Heavy'),
+)
 
 # Common Indian States and Districts for validation
 STATES_DISTRICTS = {
@@ -106,6 +120,39 @@ DATA_QUALITY_THRESHOLDS = {
     'discharge': {'min': 0, 'max': 100000}  # cumecs
 }
 
+# Which DATA_QUALITY_THRESHOLDS entry applies to each WRIS data type
+DATA_TYPE_QUALITY_KEYS = {
+    'rainfall': 'rainfall',
+    'temperature': 'temperature',
+    'relative_humidity': 'humidity',
+    'river_water_level': 'water_level',
+    'ground_water_level': 'water_level',
+    'river_water_discharge': 'discharge'
+}
+
+# Data types whose period aggregate is a total rather than a mean
+SUMMED_DATA_TYPES = ('rainfall', 'snowfall', 'evapo_transpiration')
+
+# Agencies that publish each data type on WRIS, in preference order: when a
+# tool is called without an agency they are all queried, and a station
+# reported by several is taken from the first
+DATA_TYPE_AGENCIES = {
+    'rainfall': ['CWC', 'IMD', 'CGWB', 'State Water Resources Department'],
+    'ground_water_level': ['CGWB', 'State Ground Water Department', 'CWC'],
+    'reservoir': ['CWC', 'State Water Resources Department'],
+    'river_water_level': ['CWC', 'State Water Resources Department'],
+    'river_water_discharge': ['CWC', 'State Water Resources Department'],
+    'suspended_sediment': ['CWC'],
+    'temperature': ['IMD', 'CWC'],
+    'relative_humidity': ['IMD', 'CWC'],
+    'atmospheric_pressure': ['IMD', 'CWC'],
+    'wind_direction': ['IMD', 'CWC'],
+    'solar_radiation': ['IMD', 'CWC'],
+    'evapo_transpiration': ['IMD', 'CWC'],
+    'snowfall': ['IMD', 'CWC'],
+    'soil_moisture': ['NRSC', 'IMD', 'CWC']
+}
+
 # Time-related constants
 DATE_FORMAT = '%Y-%m-%d'
 DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
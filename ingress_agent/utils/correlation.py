@@ -0,0 +1,134 @@
+# ingress_agent/utils/correlation.py
+"""
+Alignment and lagged correlation of several WRIS datasets.
+
+Datasets for one location rarely share a sampling rate: rainfall is daily,
+groundwater levels are a few readings a year, river levels are hourly.
+Two ways of putting them on one time axis are provided:
+
+- `align_resampled`: aggregate every dataset to a common period (the
+  coarsest native sampling interval among them) and join on that period.
+- `align_asof`: keep the sparse dataset's own timestamps and attach, to each
+  reading, the dense dataset's aggregate over the preceding window via an
+  as-of join (e.g. 30-day rainfall total before each groundwater reading).
+
+`lagged_correlation` then computes Pearson correlations for every lag at once
+on (rows x time) matrices, so many stations or districts are handled in one
+vectorized pass, and `response_lag` picks the lag of strongest response.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .constants import SUMMED_DATA_TYPES
+
+# Candidate common periods, finest first, with their nominal length
+PERIODS = (('D', pd.Timedelta(days=1)), ('W', pd.Timedelta(days=7)), ('M', pd.Timedelta(days=30)),
+           ('Q', pd.Timedelta(days=91)))
+
+# Minimum overlapping points for a correlation to be reported
+MIN_OVERLAP = 6
+
+
+def aggregation(data_type):
+    return 'sum' if data_type in SUMMED_DATA_TYPES else 'mean'
+
+
+def median_interval(tidy):
+    """Median spacing between consecutive readings of the same station."""
+    if len(tidy) < 2:
+        return None
+    ordered = tidy.sort_values(['station', 'time'])
+    step = ordered['time'].diff()
+    step = step[ordered['station'].eq(ordered['station'].shift())]
+    return step.median() if len(step) else None
+
+
+def common_period(tidies):
+    """Coarsest period that every dataset can fill, as a pandas frequency alias."""
+    intervals = [median_interval(t) for t in tidies]
+    intervals = [i for i in intervals if i is not None and not pd.isna(i)]
+    if not intervals:
+        return 'M'
+    coarsest = max(intervals)
+    for alias, length in PERIODS:
+        if coarsest <= length * 1.5:
+            return alias
+    return PERIODS[-1][0]
+
+
+def align_resampled(tidies, freq, by_station=False):
+    """Resample each dataset to `freq` and join them on period (and station).
+
+    `tidies` maps data type -> tidy frame (station/time/value). Returns a
+    wide DataFrame with one column per data type, indexed by period, or by
+    (station, period) when `by_station` is set.
+    """
+    columns = {}
+    for data_type, tidy in tidies.items():
+        period = tidy['time'].dt.to_period(freq)
+        if by_station:
+            columns[data_type] = tidy.groupby([tidy['station'], period])['value'].agg(aggregation(data_type))
+        else:
+            # Station aggregate first, then mean across stations, so a dense
+            # station network does not outweigh a sparse one
+            per_station = tidy.groupby([tidy['station'], period])['value'].agg(aggregation(data_type))
+            columns[data_type] = per_station.groupby(level=1).mean()
+    wide = pd.DataFrame(columns)
+    if not by_station and len(wide):
+        full = pd.period_range(wide.index.min(), wide.index.max(), freq=freq)
+        wide = wide.reindex(full)
+    return wide
+
+
+def align_asof(sparse, dense, dense_type, window='30D'):
+    """Attach to each sparse reading the dense dataset's aggregate over the preceding `window`.
+
+    Both frames are tidy (station/time/value). The dense series is first
+    averaged across stations per timestamp, then rolled over `window` and
+    joined backward onto the sparse timestamps.
+    """
+    dense_series = dense.groupby('time')['value'].mean().sort_index()
+    rolled = dense_series.rolling(window).agg(aggregation(dense_type)).rename('dense').reset_index()
+    left = sparse.sort_values('time')[['station', 'time', 'value']]
+    joined = pd.merge_asof(left, rolled, on='time', direction='backward', tolerance=pd.Timedelta(window))
+    return joined
+
+
+def lagged_correlation(a, b, max_lag):
+    """Pearson correlation of a[t] with b[t + lag] for lag in 0..max_lag.
+
+    `a` and `b` are (rows x T) float arrays with NaN for missing values.
+    Returns (corr, overlap), both (rows x max_lag + 1); corr is NaN where
+    fewer than MIN_OVERLAP points overlap.
+    """
+    a = np.atleast_2d(np.asarray(a, dtype=np.float64))
+    b = np.atleast_2d(np.asarray(b, dtype=np.float64))
+    rows, length = a.shape
+    max_lag = max(0, min(int(max_lag), length - 1))
+
+    # b padded with NaN so every lag has a full-length window:
+    # shifted[r, lag, t] = b[r, t + lag]
+    padded = np.concatenate([b, np.full((rows, max_lag), np.nan)], axis=1)
+    shifted = np.lib.stride_tricks.sliding_window_view(padded, length, axis=1)[:, :max_lag + 1, :]
+    base = np.broadcast_to(a[:, None, :], shifted.shape)
+
+    valid = ~np.isnan(base) & ~np.isnan(shifted)
+    n = valid.sum(axis=2)
+    x = np.where(valid, base, 0.0)
+    y = np.where(valid, shifted, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = x.sum(axis=2) / n
+        mean_y = y.sum(axis=2) / n
+        dx = np.where(valid, x - mean_x[..., None], 0.0)
+        dy = np.where(valid, y - mean_y[..., None], 0.0)
+        corr = (dx * dy).sum(axis=2) / np.sqrt((dx * dx).sum(axis=2) * (dy * dy).sum(axis=2))
+    corr = np.where(n >= MIN_OVERLAP, corr, np.nan)
+    return corr, n
+
+
+def response_lag(corr):
+    """Lag (column) of the strongest absolute correlation per row; -1 where undefined."""
+    filled = np.where(np.isnan(corr), -1.0, np.abs(corr))
+    lag = filled.argmax(axis=1)
+    return np.where(filled.max(axis=1) >= 0, lag, -1)
@@ -0,0 +1,171 @@
+# ingress_agent/utils/crosswalk.py
+"""
+Which stations lie in which district and which tributary.
+
+The admin endpoints (`/Dataset/<type>`) and the basin endpoints
+(`/Dataset/Basin/<type>`) serve the same physical stations. The crosswalk
+learns, from the responses the agent sees, the stations of each queried
+location per (hierarchy, data type, agency), and for every station its
+(state, district) and (basin, tributary). A location's station set comes
+only from complete responses for that location itself: a district's
+records naming their basin and tributary map those stations, but say
+nothing about which other stations the tributary holds. Records that
+carry the other hierarchy's names (stateName/districtName,
+basinName/tributaryName) map their station directly; otherwise a station
+is mapped once it has been seen in a response of each hierarchy.
+
+`plan` then tells `tools.common.fetch_series` which locations of the other
+hierarchy hold a query's stations, so readings already stored for those
+districts (or tributaries) can answer a basin (or district) query, and
+only the uncovered part of the window goes to WRIS. Persisted as JSON
+under WRIS_CROSSWALK.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from .data_quality import STATION_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+CROSSWALK_PATH = os.environ.get('WRIS_CROSSWALK', os.path.join(tempfile.gettempdir(), 'wris_crosswalk.json'))
+SAVE_EVERY_SECONDS = 30
+# Files of earlier versions may hold station sets inferred from the other hierarchy
+FORMAT_VERSION = 2
+
+ADMIN = 'admin'
+BASIN = 'basin'
+OTHER = {ADMIN: BASIN, BASIN: ADMIN}
+# Record fields naming a station's location, per hierarchy
+LOCATION_FIELDS = {ADMIN: ('stateName', 'districtName'), BASIN: ('basinName', 'tributaryName')}
+
+
+def _key(hierarchy, data_type, location, agency):
+    return '|'.join([hierarchy, data_type, location[0], location[1], agency])
+
+
+def _names(column, i):
+    value = column[i] if column is not None else None
+    return value if isinstance(value, str) and value else None
+
+
+class StationCrosswalk:
+    def __init__(self, path=CROSSWALK_PATH):
+        self.path = path
+        self._stations = {}     # station -> {"admin": [state, district], "basin": [basin, tributary]}
+        self._locations = {}    # location key -> stations seen in its responses
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved = 0.0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                state = json.load(fh)
+            if state.get('version') != FORMAT_VERSION:
+                logger.info("Discarding station crosswalk %s of an older format", self.path)
+                return
+            self._stations = state['stations']
+            self._locations = {k: set(v) for k, v in state['locations'].items()}
+        except (OSError, ValueError, KeyError) as exc:
+            logger.warning("Ignoring unreadable station crosswalk %s: %s", self.path, exc)
+
+    def save(self):
+        with self._lock:
+            state = {'version': FORMAT_VERSION,
+                     'stations': {k: dict(v) for k, v in self._stations.items()},
+                     'locations': {k: sorted(v) for k, v in self._locations.items()}}
+            self._dirty = False
+            self._saved = time.time()
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(state, fh)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logger.debug("Station crosswalk not writable: %s", exc)
+
+    def observe(self, hierarchy, data_type, location, agency, batch):
+        """Learn the stations of one complete response (a RecordBatch) for `location`."""
+        station_col = next((c for c in STATION_COLUMNS if c in batch.columns), None)
+        if station_col is None or not len(batch):
+            return
+        stations = batch.columns[station_col]
+        region, sub_region = location
+        # Names of the other hierarchy, when the records carry them
+        other = OTHER[hierarchy]
+        other_cols = [batch.columns.get(f) for f in LOCATION_FIELDS[other]]
+        changed = False
+        with self._lock:
+            seen = self._locations.setdefault(_key(hierarchy, data_type, location, agency), set())
+            # One pass per distinct station, not per record
+            first = {}
+            for i, station in enumerate(stations.tolist()):
+                if station is not None:
+                    first.setdefault(str(station), i)
+            for station, i in first.items():
+                if station not in seen:
+                    seen.add(station)
+                    changed = True
+                entry = self._stations.setdefault(station, {})
+                if entry.get(hierarchy) != [region, sub_region]:
+                    entry[hierarchy] = [region, sub_region]
+                    changed = True
+                names = [_names(c, i) for c in other_cols]
+                # Maps the station only; the other location's station set is
+                # learned from its own responses
+                if all(names) and entry.get(other) != names:
+                    entry[other] = names
+                    changed = True
+            self._dirty = self._dirty or changed
+        if self._dirty and time.time() - self._saved > SAVE_EVERY_SECONDS:
+            self.save()
+
+    def stations(self, hierarchy, data_type, location, agency):
+        """Stations known for a location, or None if it has never been seen."""
+        with self._lock:
+            seen = self._locations.get(_key(hierarchy, data_type, location, agency))
+            return sorted(seen) if seen else None
+
+    def plan(self, hierarchy, data_type, location, agency):
+        """Where the stations of a query live in the other hierarchy.
+
+        Returns (stations, {other location: [stations]}), or None if the
+        location is unknown or any of its stations has no known location
+        in the other hierarchy.
+        """
+        other = OTHER[hierarchy]
+        with self._lock:
+            seen = self._locations.get(_key(hierarchy, data_type, location, agency))
+            if not seen:
+                return None
+            groups = {}
+            for station in sorted(seen):
+                where = self._stations.get(station, {}).get(other)
+                if where is None:
+                    return None
+                groups.setdefault(tuple(where), []).append(station)
+        return sorted(seen), groups
+
+    def __len__(self):
+        return len(self._stations)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "stations": len(self._stations),
+                "mapped": sum(1 for s in self._stations.values() if ADMIN in s and BASIN in s),
+                "locations": len(self._locations),
+            }
+
+
+default_crosswalk = StationCrosswalk()
@@ -1,31 +1,59 @@
 # ingress_agent/utils/data_processor.py
 
+import numpy as np
 import pandas as pd
 
+from .record_batch import RecordBatch, extract_records
+from .data_quality import assess_quality
+from .tracing import traced
+
 class WRISDataProcessor:
+    def normalize(self, api_response):
+        """Convert an admin or basin response (or a DataFrame) into a RecordBatch."""
+        if isinstance(api_response, RecordBatch):
+            return api_response
+        if isinstance(api_response, pd.DataFrame):
+            return RecordBatch.from_dataframe(api_response)
+        return RecordBatch.from_records(extract_records(api_response))
+
+    @traced("processor.to_dataframe")
     def to_dataframe(self, api_response):
-        # Expecting api_response['data'] with 'content' list
-        if 'data' in api_response and 'content' in api_response['data']:
-            df = pd.DataFrame(api_response['data']['content'])
-        else:
-            df = pd.DataFrame()
-        return df
+        # Accepts both {'data': {'content': [...]}} and {'data': [...]}
+        return self.normalize(api_response).to_dataframe()
 
-    def calculate_statistics(self, df, value_col):
+    @traced("processor.calculate_statistics")
+    def calculate_statistics(self, data, value_col, mask=None):
+        """Summary statistics of `value_col`; rows where `mask` is False are excluded."""
         result = {}
-        if value_col in df.columns and not df.empty:
-            col = df[value_col]
+        batch = self.normalize(data)
+        if value_col in batch.columns and len(batch):
+            col = batch.columns[value_col]
             # Only analyze numeric columns
-            if pd.api.types.is_numeric_dtype(col):
-                result['mean'] = float(col.mean())
-                result['min'] = float(col.min())
-                result['max'] = float(col.max())
-                result['std'] = float(col.std())
-                result['count'] = int(col.count())
+            if col.dtype.kind in 'iuf':
+                values = col.astype(np.float64, copy=False)
+                if mask is not None:
+                    values = values[mask]
+                count = int(np.count_nonzero(~np.isnan(values)))
+                if count == 0:
+                    result['error'] = f'Column {value_col} has no values'
+                    return result
+                result['mean'] = float(np.nanmean(values))
+                result['min'] = float(np.nanmin(values))
+                result['max'] = float(np.nanmax(values))
+                result['std'] = float(np.nanstd(values, ddof=1)) if count > 1 else float('nan')
+                result['count'] = count
+                if mask is not None:
+                    result['excluded_count'] = int(len(mask) - np.count_nonzero(mask))
             else:
                 result['error'] = f'Column {value_col} is not numeric'
         else:
             result['error'] = f'Column {value_col} not found'
         return result
 
+    @traced("processor.assess_quality")
+    def assess_quality(self, data, data_type, value_col='dataValue'):
+        """Run the vectorized data-quality checks; see utils/data_quality.py."""
+        df = data if isinstance(data, pd.DataFrame) else self.normalize(data).to_dataframe()
+        return assess_quality(df, data_type, value_col=value_col)
+
 default_processor = WRISDataProcessor()
@@ -0,0 +1,236 @@
+# ingress_agent/utils/data_quality.py
+"""
+Vectorized data-quality checks for WRIS series.
+
+`assess_quality` runs every check over the whole DataFrame at once (no
+per-row Python), grouping by station through factorized integer codes:
+
+- range:      value outside DATA_QUALITY_THRESHOLDS for the data type
+- missing:    value is null / not numeric
+- unparseable: the timestamp could not be parsed; such rows take no part
+              in the sequential checks below
+- duplicate:  a second reading for the same station and timestamp
+- spike:      an isolated jump up-then-down (or down-then-up) much larger
+              than the station's typical step
+- flatline:   the same value held for FLATLINE_MIN_DAYS of the data type
+              (at least FLATLINE_MIN_RUN readings at the station's interval)
+
+Gaps are measured per station against the station's median sampling
+interval. The result carries a boolean `valid` mask aligned with the input
+rows, so statistics can exclude flagged readings, and a 0-100 score per
+station and overall.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .constants import DATA_QUALITY_THRESHOLDS, DATA_TYPE_QUALITY_KEYS
+
+STATION_COLUMNS = ('stationCode', 'stationName', 'station')
+TIME_COLUMNS = ('dataTime', 'dataDate', 'date', 'time')
+
+# A step counts as a spike when it exceeds this many robust step scales
+SPIKE_FACTOR = 6.0
+# Fewest identical consecutive readings that can be a flatline
+FLATLINE_MIN_RUN = 6
+# How long a value must stay unchanged before it is a flatline, by data
+# type: steady river and reservoir levels routinely hold for hours, and
+# manual groundwater readings may repeat across a season
+FLATLINE_MIN_DAYS = {
+    'river_water_level': 3,
+    'river_water_discharge': 3,
+    'reservoir': 14,
+    'ground_water_level': 365,
+}
+DEFAULT_FLATLINE_MIN_DAYS = 1
+# An interval this many times the station's median interval is a gap
+GAP_FACTOR = 2.0
+# Data types where long runs of one value are expected (dry days)
+FLATLINE_EXEMPT_ZERO = ('rainfall', 'snowfall')
+
+FLAG_NAMES = ('missing', 'unparseable', 'range', 'duplicate', 'spike', 'flatline')
+
+
+def _first_present(df, candidates):
+    for name in candidates:
+        if name in df.columns:
+            return name
+    return None
+
+
+class QualityReport:
+    """Outcome of `assess_quality` for one DataFrame."""
+
+    def __init__(self, valid, flags, stations, score):
+        self.valid = valid          # np.ndarray[bool], aligned with input rows
+        self.flags = flags          # DataFrame of per-row boolean flags
+        self.stations = stations    # DataFrame indexed by station
+        self.score = score          # overall 0-100 score
+
+    def summary(self):
+        counts = {name: int(self.flags[name].sum()) for name in FLAG_NAMES}
+        return {
+            'data_quality_score': self.score,
+            'rows': int(len(self.valid)),
+            'valid_rows': int(self.valid.sum()),
+            'flag_counts': counts,
+            'stations': int(len(self.stations)),
+            'gap_count': int(self.stations['gaps'].sum()) if len(self.stations) else 0,
+        }
+
+
+def assess_quality(df, data_type, value_col='dataValue', station_col=None, time_col=None):
+    """Run all quality checks on `df` and return a QualityReport."""
+    n = len(df)
+    if n == 0 or value_col not in df.columns:
+        empty = pd.DataFrame({name: np.zeros(n, dtype=bool) for name in FLAG_NAMES})
+        return QualityReport(np.ones(n, dtype=bool), empty, pd.DataFrame(), 0.0)
+
+    station_col = station_col or _first_present(df, STATION_COLUMNS)
+    time_col = time_col or _first_present(df, TIME_COLUMNS)
+
+    values = pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=np.float64)
+    if station_col is not None:
+        station_codes, station_labels = pd.factorize(df[station_col], use_na_sentinel=False)
+    else:
+        station_codes, station_labels = np.zeros(n, dtype=np.int64), pd.Index(['all'])
+    if time_col is not None:
+        times = pd.to_datetime(df[time_col], errors='coerce').to_numpy(dtype='datetime64[ns]').view(np.int64)
+        unparseable = times == np.iinfo(np.int64).min    # NaT
+    else:
+        times = np.arange(n, dtype=np.int64)
+        unparseable = np.zeros(n, dtype=bool)
+
+    missing = np.isnan(values)
+
+    limits = DATA_QUALITY_THRESHOLDS.get(DATA_TYPE_QUALITY_KEYS.get(data_type, data_type))
+    if limits is not None:
+        out_of_range = ~missing & ((values < limits['min']) | (values > limits['max']))
+    else:
+        out_of_range = np.zeros(n, dtype=bool)
+
+    # Sort once by (station, time); every sequential check runs on the sorted view
+    order = np.lexsort((times, station_codes))
+    s_codes = station_codes[order]
+    s_times = times[order]
+    s_values = values[order]
+    s_parsed = ~unparseable[order]
+    # Unparseable rows (sorted first in their station) link to no neighbour
+    same_station = np.zeros(n, dtype=bool)
+    same_station[1:] = (s_codes[1:] == s_codes[:-1]) & s_parsed[1:] & s_parsed[:-1]
+
+    s_duplicate = np.zeros(n, dtype=bool)
+    s_duplicate[1:] = same_station[1:] & (s_times[1:] == s_times[:-1])
+
+    step_ok = same_station & ~s_duplicate
+    interval = np.full(n, np.nan)
+    interval[1:] = (s_times[1:] - s_times[:-1]).astype(np.float64)
+    interval[~step_ok] = np.nan
+    median_interval = pd.Series(interval).groupby(s_codes).transform('median').to_numpy()
+
+    s_spike = _spikes(s_codes, s_values, same_station)
+    s_flat = _flatlines(s_values, same_station, data_type,
+                        median_interval if time_col is not None else None)
+
+    duplicate = np.empty(n, dtype=bool)
+    spike = np.empty(n, dtype=bool)
+    flatline = np.empty(n, dtype=bool)
+    duplicate[order] = s_duplicate
+    spike[order] = s_spike
+    flatline[order] = s_flat
+
+    flags = pd.DataFrame({
+        'missing': missing,
+        'unparseable': unparseable,
+        'range': out_of_range,
+        'duplicate': duplicate,
+        'spike': spike,
+        'flatline': flatline,
+    }, index=df.index)
+    valid = ~(missing | unparseable | out_of_range | duplicate | spike | flatline)
+
+    stations = _station_scores(station_codes, station_labels, valid, s_codes, s_times, s_parsed,
+                               interval, median_interval, time_col is not None)
+    score = float(np.round(np.average(stations['score'], weights=stations['rows']), 1)) \
+        if len(stations) else 0.0
+    return QualityReport(valid, flags, stations, score)
+
+
+def _spikes(codes, values, same_station):
+    n = len(values)
+    spike = np.zeros(n, dtype=bool)
+    if n < 3:
+        return spike
+    step = np.full(n, np.nan)
+    step[1:] = values[1:] - values[:-1]
+    step[~same_station] = np.nan
+
+    # Robust per-station step scale: median absolute step
+    abs_step = np.abs(step)
+    scale = pd.Series(abs_step).groupby(codes).transform('median').to_numpy()
+    scale = np.where(scale > 0, scale, np.nan)
+
+    before = step[1:-1]                 # x[i] - x[i-1]
+    after = step[2:]                    # x[i+1] - x[i]
+    threshold = SPIKE_FACTOR * scale[1:-1]
+    with np.errstate(invalid='ignore'):
+        is_spike = (np.sign(before) == -np.sign(after)) & (np.abs(before) > threshold) \
+            & (np.abs(after) > threshold)
+    spike[1:-1] = is_spike & same_station[2:]
+    return spike
+
+
+def _flatlines(values, same_station, data_type, median_interval):
+    n = len(values)
+    repeat = np.zeros(n, dtype=bool)
+    repeat[1:] = same_station[1:] & (values[1:] == values[:-1])
+    run_id = np.cumsum(~repeat)
+    run_length = np.bincount(run_id)[run_id]
+
+    # Readings spanning the data type's minimum duration at the station's
+    # own sampling interval, never fewer than FLATLINE_MIN_RUN
+    min_run = np.full(n, float(FLATLINE_MIN_RUN))
+    if median_interval is not None:
+        span = pd.Timedelta(days=FLATLINE_MIN_DAYS.get(data_type, DEFAULT_FLATLINE_MIN_DAYS)).value
+        with np.errstate(invalid='ignore', divide='ignore'):
+            needed = np.ceil(span / median_interval) + 1
+        min_run = np.where(np.isfinite(needed), np.maximum(min_run, needed), min_run)
+    flat = run_length >= min_run
+    if data_type in FLATLINE_EXEMPT_ZERO:
+        flat &= values != 0
+    return flat
+
+
+def _station_scores(codes, labels, valid, s_codes, s_times, s_parsed, interval, median_interval, has_time):
+    n_stations = len(labels)
+    rows = np.bincount(codes, minlength=n_stations)
+    valid_rows = np.bincount(codes, weights=valid, minlength=n_stations)
+
+    gaps = np.zeros(n_stations, dtype=np.int64)
+    completeness = np.ones(n_stations)
+    if has_time and len(s_times) > 1:
+        with np.errstate(invalid='ignore'):
+            is_gap = interval > GAP_FACTOR * median_interval
+        gaps = np.bincount(s_codes, weights=is_gap, minlength=n_stations).astype(np.int64)
+
+        first = np.full(n_stations, np.iinfo(np.int64).max)
+        last = np.full(n_stations, np.iinfo(np.int64).min)
+        np.minimum.at(first, s_codes[s_parsed], s_times[s_parsed])
+        np.maximum.at(last, s_codes[s_parsed], s_times[s_parsed])
+        station_median = pd.Series(interval).groupby(s_codes).median().reindex(range(n_stations)).to_numpy()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            expected = (last - first) / station_median + 1
+            completeness = np.where(np.isfinite(expected) & (expected > 0),
+                                    np.minimum(rows / expected, 1.0), 1.0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        valid_fraction = np.where(rows > 0, valid_rows / rows, 0.0)
+    score = np.round(100.0 * valid_fraction * completeness, 1)
+
+    return pd.DataFrame({
+        'rows': rows,
+        'valid_rows': valid_rows.astype(np.int64),
+        'gaps': gaps,
+        'completeness': np.round(completeness, 3),
+        'score': score,
+    }, index=pd.Index(labels, name='station'))
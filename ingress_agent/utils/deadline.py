@@ -0,0 +1,161 @@
+# ingress_agent/utils/deadline.py
+"""
+End-to-end deadlines for agent tool calls.
+
+Each tool invocation runs under a `Deadline` (see `budgeted`), held in a
+context variable so it reaches the client without being threaded through
+every signature. `WRISClient` derives each request's timeout from the time
+remaining, and the bulk paths stop paging once it runs out. The
+concurrent fan-out helpers `bind` work to the caller's context, so every
+sub-request shares the same budget.
+
+When a deadline cuts work short, the result carries
+`truncated: True` and `truncation_reason: TRUNCATED_BY_DEADLINE` instead of
+waiting on a slow upstream indefinitely.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+import functools
+import os
+import time
+
+TRUNCATED_BY_DEADLINE = "truncated by deadline"
+
+# Timeout for requests made outside any deadline (scripts, benchmarks)
+DEFAULT_REQUEST_TIMEOUT = float(os.environ.get('WRIS_REQUEST_TIMEOUT_SECONDS', 30))
+# Budget for a tool call that has no entry in TOOL_BUDGETS
+DEFAULT_TOOL_BUDGET = float(os.environ.get('WRIS_TOOL_BUDGET_SECONDS', 20))
+# Connect timeout cap; the read timeout gets whatever budget remains
+CONNECT_TIMEOUT = 5.0
+
+# Tools that fan out over many districts or full series get more time
+TOOL_BUDGETS = {
+    'get_trend_analysis': 60.0,
+    'get_seasonal_decomposition': 60.0,
+    'get_groundwater_fluctuation': 60.0,
+    'get_rainfall_departure': 90.0,
+    'get_correlation_analysis': 90.0,
+    'get_aggregate_statistics': 90.0,
+    'render_time_series_chart': 45.0,
+    'render_comparison_chart': 60.0,
+    'render_station_map': 45.0,
+    'fetch_water_data_batch': 60.0,
+    'analyze_water_data': 90.0,
+    'render_chart': 60.0,
+}
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """A point in monotonic time by which work must finish."""
+
+    __slots__ = ('expires_at', 'truncated')
+
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+        # Set when any work under this deadline was cut short
+        self.truncated = False
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def check(self):
+        if self.expired():
+            raise DeadlineExceeded(TRUNCATED_BY_DEADLINE)
+
+
+_current = ContextVar('wris_deadline', default=None)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def deadline(seconds):
+    """Run the block under a deadline `seconds` from now (never later than an enclosing one)."""
+    outer = _current.get()
+    inner = Deadline(seconds)
+    if outer is not None and outer.expires_at < inner.expires_at:
+        inner = outer
+    token = _current.set(inner)
+    try:
+        yield inner
+    finally:
+        _current.reset(token)
+
+
+def remaining():
+    """Seconds left on the current deadline, or None when there is none."""
+    active = _current.get()
+    return None if active is None else active.remaining()
+
+
+def expired():
+    active = _current.get()
+    return active is not None and active.expired()
+
+
+def request_timeout():
+    """(connect, read) timeout for one HTTP request under the current deadline.
+
+    Raises DeadlineExceeded when no time is left, so no request is started
+    that could not finish.
+    """
+    active = _current.get()
+    if active is None:
+        return (min(CONNECT_TIMEOUT, DEFAULT_REQUEST_TIMEOUT), DEFAULT_REQUEST_TIMEOUT)
+    active.check()
+    left = active.remaining()
+    return (min(CONNECT_TIMEOUT, left), left)
+
+
+def bind(fn):
+    """Wrap `fn` to run in a copy of the caller's context, for use with thread pools."""
+    context = copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def mark_truncated(result):
+    """Add the deadline truncation marker to a result dict and record it on the current deadline."""
+    active = _current.get()
+    if active is not None:
+        active.truncated = True
+    result["truncated"] = True
+    result["truncation_reason"] = TRUNCATED_BY_DEADLINE
+    return result
+
+
+def budgeted(tool, seconds=None):
+    """Wrap an agent tool so each invocation runs under its latency budget.
+
+    The wrapper keeps the tool's name, signature and docstring, which the
+    agent framework uses as the tool declaration.
+    """
+    budget = seconds if seconds is not None else TOOL_BUDGETS.get(tool.__name__, DEFAULT_TOOL_BUDGET)
+
+    @functools.wraps(tool)
+    def run(*args, **kwargs):
+        with deadline(budget) as active:
+            try:
+                result = tool(*args, **kwargs)
+            except DeadlineExceeded:
+                return mark_truncated({"status": "error",
+                                       "error_message": f"No data returned within the {budget:g}s budget"})
+            # Partial sub-results (a district cut short, a skipped page) make
+            # the whole answer partial
+            if isinstance(result, dict) and active.truncated and not result.get("truncated"):
+                mark_truncated(result)
+            return result
+    return run
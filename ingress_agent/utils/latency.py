@@ -0,0 +1,90 @@
+# ingress_agent/utils/latency.py
+"""
+Streaming latency quantiles per WRIS endpoint.
+
+`QuantileSketch` keeps a log-bucketed histogram (the DDSketch scheme): a
+value v lands in bucket ceil(log_gamma(v)), so any quantile read back is
+within `relative_accuracy` of the true value, memory stays bounded by the
+number of distinct buckets (a few hundred for latencies from 1 ms to
+minutes), and adding a sample is O(1).
+
+`LatencyTracker` holds one sketch per endpoint; `WRISClient` feeds it every
+completed request and reads the p95 back as its hedging delay.
+"""
+
+from collections import defaultdict
+import math
+import threading
+
+# Latencies below this are counted in the lowest bucket
+MIN_TRACKED_SECONDS = 1e-4
+
+
+class QuantileSketch:
+    def __init__(self, relative_accuracy=0.02):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self._buckets = defaultdict(int)
+        self.count = 0
+
+    def _index(self, value):
+        return math.ceil(math.log(max(value, MIN_TRACKED_SECONDS)) / self._log_gamma)
+
+    def add(self, value):
+        self._buckets[self._index(value)] += 1
+        self.count += 1
+
+    def quantile(self, q):
+        """Value at quantile `q` (0..1), or None when nothing was added."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen > rank:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i], in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self._buckets) / (self.gamma + 1)
+
+    def merge(self, other):
+        for index, n in other._buckets.items():
+            self._buckets[index] += n
+        self.count += other.count
+
+
+class LatencyTracker:
+    """Thread-safe map of endpoint -> QuantileSketch."""
+
+    def __init__(self, relative_accuracy=0.02):
+        self.relative_accuracy = relative_accuracy
+        self._sketches = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        with self._lock:
+            sketch = self._sketches.get(endpoint)
+            if sketch is None:
+                sketch = self._sketches[endpoint] = QuantileSketch(self.relative_accuracy)
+            sketch.add(seconds)
+
+    def quantile(self, endpoint, q, min_samples=1):
+        """Quantile `q` for `endpoint`, or None with fewer than `min_samples` observations."""
+        with self._lock:
+            sketch = self._sketches.get(endpoint)
+            if sketch is None or sketch.count < min_samples:
+                return None
+            return sketch.quantile(q)
+
+    def summary(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    "count": sketch.count,
+                    "p50": round(sketch.quantile(0.5), 4),
+                    "p95": round(sketch.quantile(0.95), 4),
+                    "p99": round(sketch.quantile(0.99), 4),
+                }
+                for endpoint, sketch in self._sketches.items()
+            }
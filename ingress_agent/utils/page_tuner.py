@@ -0,0 +1,162 @@
+# ingress_agent/utils/page_tuner.py
+"""
+Per-endpoint page sizes learned from observed requests.
+
+Small pages multiply round trips; large ones make WRIS slow or fail.
+`PageSizeTuner` moves each endpoint along a ladder of sizes (SIZE_LADDER).
+For every size it keeps moving averages of request latency, error rate
+and records per second. Records per second is measured on full pages
+only, since a short last page says nothing about the size. The aim is
+the size with the most records per second whose latency stays within
+LATENCY_TARGET:
+
+- After MIN_SAMPLES requests at the current size, it moves up a rung if
+  the next size is untried or faster, and down if the smaller size is
+  faster. Otherwise it stays.
+- A server error or timeout moves it down at once, and so does a latency
+  over target (after MIN_SAMPLES). The sizes above are then left alone
+  for RETRY_LARGER_SECONDS.
+- Observations older than STALE_SECONDS are ignored, so a converged
+  endpoint re-probes its neighbours once a day.
+
+`WRISClient` tunes only the pages of a paginated bulk export (the "bulk"
+kind, per endpoint). The single page returned to the model keeps the
+client's fixed size: what a question returns, and its cache entry, must
+not depend on what the tuner has learned. Learned sizes persist as JSON
+under WRIS_PAGE_SIZES.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZES_PATH = os.environ.get('WRIS_PAGE_SIZES', os.path.join(tempfile.gettempdir(), 'wris_page_sizes.json'))
+PAGE_TUNING_ENABLED = os.environ.get('WRIS_PAGE_TUNING', '1').lower() not in ('0', 'false', 'no')
+SIZE_LADDER = (30, 50, 100, 250, 500, 1000, 2500, 5000)
+# Per-request latency (seconds) a page size may not exceed on average
+LATENCY_TARGET = float(os.environ.get('WRIS_PAGE_LATENCY_TARGET', 2.0))
+MAX_ERROR_RATE = 0.1
+MIN_SAMPLES = 3
+# A neighbouring size must be this much faster to move to it
+MIN_GAIN = 0.05
+SMOOTHING = 0.3
+RETRY_LARGER_SECONDS = 3600
+STALE_SECONDS = 24 * 3600
+SAVE_EVERY_SECONDS = 30
+
+
+def _average(previous, value):
+    return value if previous is None else SMOOTHING * value + (1 - SMOOTHING) * previous
+
+
+class PageSizeTuner:
+    def __init__(self, path=PAGE_SIZES_PATH, ladder=SIZE_LADDER, latency_target=LATENCY_TARGET):
+        self.path = path
+        self.ladder = tuple(sorted(ladder))
+        self.latency_target = latency_target
+        # key -> {"size", "lo", "hi", "since_move", "ceiling", "ceiling_set",
+        #         "stats": {size: {"latency", "errors", "rps", "n", "updated"}}}
+        self._endpoints = {}
+        self._lock = threading.Lock()
+        self._saved = 0.0
+        self._load()
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                self._endpoints = json.load(fh)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable page sizes %s: %s", self.path, exc)
+
+    def _save(self):
+        self._saved = time.time()
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(self._endpoints, fh)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logger.debug("Page sizes not writable: %s", exc)
+
+    def size_for(self, key, default, lo, hi):
+        """The page size to use for `key`: the learned one, or `default`, within [lo, hi]."""
+        with self._lock:
+            state = self._endpoints.get(key)
+            if state is None or (state['lo'], state['hi']) != (lo, hi):
+                state = self._endpoints[key] = {'size': default, 'lo': lo, 'hi': hi, 'since_move': 0,
+                                                'ceiling': None, 'ceiling_set': 0.0, 'stats': {}}
+            return state['size']
+
+    def record(self, key, size, records, seconds, error=False):
+        """Feed one request: `records` received in `seconds`, or a server-side `error`."""
+        now = time.time()
+        with self._lock:
+            state = self._endpoints.get(key)
+            if state is None:
+                return
+            stats = state['stats'].setdefault(str(size), {'latency': None, 'errors': None, 'rps': None,
+                                                          'n': 0, 'updated': 0.0})
+            stats['n'] += 1
+            stats['updated'] = now
+            stats['errors'] = _average(stats['errors'], float(error))
+            if not error:
+                stats['latency'] = _average(stats['latency'], seconds)
+                if records >= size and seconds > 0:
+                    stats['rps'] = _average(stats['rps'], records / seconds)
+            if size == state['size']:
+                state['since_move'] += 1
+                self._decide(key, state, error, now)
+            if now - self._saved > SAVE_EVERY_SECONDS:
+                self._save()
+
+    def _fresh(self, state, size, now):
+        stats = state['stats'].get(str(size))
+        return stats if stats is not None and now - stats['updated'] < STALE_SECONDS else None
+
+    def _decide(self, key, state, error, now):
+        rungs = sorted({s for s in self.ladder if state['lo'] <= s <= state['hi']} | {state['size']})
+        i = rungs.index(state['size'])
+        current = state['stats'][str(state['size'])]
+        settled = state['since_move'] >= MIN_SAMPLES
+        if error or (settled and (current['errors'] > MAX_ERROR_RATE or current['latency'] > self.latency_target)):
+            if i > 0:
+                state['ceiling'], state['ceiling_set'] = rungs[i - 1], now
+                self._move(key, state, rungs[i - 1], 'errors' if error else 'latency')
+            return
+        if not settled or current['rps'] is None:
+            return
+        if state['ceiling'] is not None and now - state['ceiling_set'] > RETRY_LARGER_SECONDS:
+            state['ceiling'] = None
+
+        if i + 1 < len(rungs) and (state['ceiling'] is None or rungs[i + 1] <= state['ceiling']):
+            up = self._fresh(state, rungs[i + 1], now)
+            if up is None or (up['rps'] or 0.0) > current['rps'] * (1 + MIN_GAIN):
+                self._move(key, state, rungs[i + 1], 'exploring' if up is None else 'faster')
+                return
+        if i > 0:
+            down = self._fresh(state, rungs[i - 1], now)
+            if down is not None and (down['rps'] or 0.0) > current['rps'] * (1 + MIN_GAIN):
+                self._move(key, state, rungs[i - 1], 'faster')
+
+    def _move(self, key, state, size, reason):
+        logger.info("Page size for %s: %d -> %d (%s)", key, state['size'], size, reason)
+        state['size'] = size
+        state['since_move'] = 0
+        self._save()
+
+    def sizes(self):
+        """The current page size of every tuned endpoint."""
+        with self._lock:
+            return {key: state['size'] for key, state in self._endpoints.items()}
+
+
+default_page_tuner = PageSizeTuner() if PAGE_TUNING_ENABLED else None
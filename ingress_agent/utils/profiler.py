@@ -0,0 +1,234 @@
+# ingress_agent/utils/profiler.py
+"""
+On-demand sampling profiler for selected tool calls.
+
+Profiling is switched on per tool while the service runs. You can do this
+from code (`enable` / `disable`), from a JSON control file
+(WRIS_PROFILE_CONTROL, re-read when it changes), or through the serving
+front end (POST /profile). The control file looks like:
+
+    {"get_trend_analysis": {"rate": 0.1, "calls": 20, "interval": 0.005}}
+
+`rate` is the share of calls profiled (0 to 1), and `calls` is how many
+profiles to take before the tool switches itself off. `interval` must lie
+between MIN_INTERVAL and MAX_INTERVAL; settings outside these bounds are
+rejected with ValueError (see `check_settings`).
+
+While a profiled call runs, a sampler thread records Python stacks every
+`interval` seconds. It samples the calling thread and the busy worker-pool
+threads, which do page fetches and per-district fan-out. Work running in
+the same pools for concurrent calls can show up too. The samples are
+written as folded stacks ("frame;frame;frame count" per line), the input
+format of flamegraph.pl, inferno and speedscope. There is one file per
+call under WRIS_PROFILE_DIR.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+import itertools
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.environ.get('WRIS_PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'wris_profiles'))
+CONTROL_PATH = os.environ.get('WRIS_PROFILE_CONTROL', '')
+DEFAULT_INTERVAL = 0.005
+# Sampling interval bounds (s): shorter would keep the sampler thread busy
+MIN_INTERVAL = 0.001
+MAX_INTERVAL = 1.0
+# The control file is checked for changes at most this often
+CONTROL_CHECK_SECONDS = 1.0
+MAX_STACK_DEPTH = 128
+
+# Frames of an idle ThreadPoolExecutor thread waiting for work
+_IDLE_FUNCTIONS = {'_worker'}
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame):
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+
+def _check(tool, rate, calls, interval):
+    """Validated (rate, calls, interval) for `tool`; ValueError if out of range."""
+    try:
+        rate = float(rate)
+        calls = None if calls is None else int(calls)
+        interval = float(interval)
+    except (TypeError, ValueError):
+        raise ValueError(f"{tool}: rate, calls and interval must be numbers") from None
+    if not 0.0 <= rate <= 1.0:
+        raise ValueError(f"{tool}: rate must be between 0 and 1")
+    if calls is not None and calls < 0:
+        raise ValueError(f"{tool}: calls must not be negative")
+    if not MIN_INTERVAL <= interval <= MAX_INTERVAL:
+        raise ValueError(f"{tool}: interval must be between {MIN_INTERVAL} and {MAX_INTERVAL} seconds")
+    return rate, calls, interval
+
+
+def check_settings(settings):
+    """Validated {tool: (rate, calls, interval)} from {tool: {"rate", "calls", "interval"}}; ValueError if malformed."""
+    if not isinstance(settings, dict):
+        raise ValueError("profile settings must be an object mapping tool names to options")
+    checked = {}
+    for tool, options in settings.items():
+        if not isinstance(options, dict):
+            raise ValueError(f"{tool}: options must be an object")
+        checked[tool] = _check(tool, options.get('rate', 1.0), options.get('calls'),
+                               options.get('interval', DEFAULT_INTERVAL))
+    return checked
+
+
+class _Sampler:
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='wris-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        return self.samples
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        for tick in itertools.count():
+            if tick % 50 == 0:
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own:
+                    continue
+                if thread_id == self.thread_id:
+                    root = 'call'
+                elif names.get(thread_id, '').startswith('ThreadPoolExecutor') \
+                        and frame.f_code.co_name not in _IDLE_FUNCTIONS:
+                    root = 'pool'
+                else:
+                    continue
+                self.samples[f"{root};{_stack(frame)}"] += 1
+            if self._stop.wait(self.interval):
+                return
+
+
+class Profiler:
+    def __init__(self, directory=PROFILE_DIR, control_path=CONTROL_PATH):
+        self.directory = directory
+        self.control_path = control_path
+        self._settings = {}        # tool -> {"rate", "calls", "interval"}
+        self._lock = threading.Lock()
+        self._control_mtime = None
+        self._control_checked = 0.0
+        self._seq = itertools.count()
+
+    def enable(self, tool, rate=1.0, calls=None, interval=DEFAULT_INTERVAL):
+        """Profile a share `rate` of `tool`'s calls, for the next `calls` profiles (None: until disabled)."""
+        rate, calls, interval = _check(tool, rate, calls, interval)
+        with self._lock:
+            if calls == 0:
+                self._settings.pop(tool, None)
+            else:
+                self._settings[tool] = {'rate': rate, 'calls': calls, 'interval': interval}
+
+    def disable(self, tool=None):
+        """Stop profiling `tool`, or every tool."""
+        with self._lock:
+            if tool is None:
+                self._settings.clear()
+            else:
+                self._settings.pop(tool, None)
+
+    def settings(self):
+        self._check_control()
+        with self._lock:
+            return {tool: dict(s) for tool, s in self._settings.items()}
+
+    def _check_control(self):
+        now = time.monotonic()
+        if not self.control_path or now - self._control_checked < CONTROL_CHECK_SECONDS:
+            return
+        self._control_checked = now
+        try:
+            mtime = os.stat(self.control_path).st_mtime
+        except OSError:
+            return
+        if mtime == self._control_mtime:
+            return
+        self._control_mtime = mtime
+        try:
+            with open(self.control_path, encoding='utf-8') as fh:
+                control = json.load(fh)
+            settings = check_settings(control)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable profile control file %s: %s", self.control_path, exc)
+            return
+        # The file states the complete set of profiled tools
+        self.disable()
+        for tool, (rate, calls, interval) in settings.items():
+            self.enable(tool, rate, calls, interval)
+        logger.info("Profiling %s", ', '.join(control) or 'no tools')
+
+    def _take(self, tool):
+        # The sampling interval if this call of `tool` is to be profiled
+        self._check_control()
+        with self._lock:
+            setting = self._settings.get(tool)
+            if setting is None or random.random() >= setting['rate']:
+                return None
+            if setting['calls'] is not None:
+                setting['calls'] -= 1
+                if setting['calls'] <= 0:
+                    del self._settings[tool]
+            return setting['interval']
+
+    @contextmanager
+    def call(self, tool):
+        """Profile the block if `tool` is selected; yields a dict that gets "path" and "samples"."""
+        info = {}
+        interval = self._take(tool)
+        if interval is None:
+            yield info
+            return
+        sampler = _Sampler(threading.get_ident(), interval).start()
+        try:
+            yield info
+        finally:
+            samples = sampler.stop()
+            info['samples'] = sum(samples.values())
+            info['path'] = self._write(tool, samples)
+
+    def _write(self, tool, samples):
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{tool}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-"
+                                            f"{next(self._seq)}.folded")
+        try:
+            with open(path, 'w', encoding='utf-8') as fh:
+                for stack, count in samples.most_common():
+                    fh.write(f"{stack} {count}\n")
+        except OSError as exc:
+            logger.warning("Could not write profile %s: %s", path, exc)
+            return None
+        return path
+
+
+default_profiler = Profiler()
@@ -0,0 +1,223 @@
+# ingress_agent/utils/record_batch.py
+"""
+Columnar representation of WRIS records.
+
+Both hierarchies return lists of flat per-record dicts, just wrapped differently:
+
+- admin:  {"content": [...], "totalElements": N, ...}  (under result["data"])
+- basin:  {"statusCode": 200, "message": "...", "data": [...]}
+
+`extract_records` finds the record list in either shape without copying it and
+`RecordBatch.from_records` turns it into one NumPy array per field in a single
+pass per column. Everything downstream (statistics, caching, analytics) works
+on the batch instead of the dicts.
+"""
+
+import io
+import json
+import math
+import struct
+
+import numpy as np
+import pandas as pd
+
+
+def extract_records(api_response):
+    """Return the list of record dicts inside any WRIS response shape."""
+    if isinstance(api_response, list):
+        return api_response
+    if not isinstance(api_response, dict):
+        return []
+    data = api_response.get('data', api_response)
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        content = data.get('content')
+        if isinstance(content, list):
+            return content
+        nested = data.get('data')
+        if isinstance(nested, list):
+            return nested
+    content = api_response.get('content')
+    if isinstance(content, list):
+        return content
+    return []
+
+
+def _column_array(values):
+    """Build the tightest array for one column of raw JSON values."""
+    has_null = False
+    all_int = True
+    for v in values:
+        if v is None:
+            has_null = True
+        elif isinstance(v, bool) or not isinstance(v, (int, float)):
+            return np.array(values, dtype=object)
+        elif all_int and not isinstance(v, int):
+            all_int = False
+    if all_int and not has_null:
+        return np.array(values, dtype=np.int64) if values else np.array([], dtype=np.float64)
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+def decimal_places(values, max_places=6):
+    """Fewest decimals (up to `max_places`) that represent every value of a float array."""
+    values = values[np.isfinite(values)]
+    for places in range(max_places + 1):
+        scaled = values * 10.0 ** places
+        if np.all(np.abs(scaled - np.round(scaled)) < 1e-6 * np.maximum(1.0, np.abs(scaled))):
+            return places
+    return max_places
+
+
+class RecordBatch:
+    """A set of WRIS records stored as one array per field."""
+
+    __slots__ = ('columns', 'length')
+
+    def __init__(self, columns, length=None):
+        self.columns = columns
+        if length is None:
+            length = len(next(iter(columns.values()))) if columns else 0
+        self.length = length
+
+    @classmethod
+    def from_records(cls, records):
+        if not records:
+            return cls({}, 0)
+        # Field order follows first appearance, like pd.DataFrame(records)
+        fields = dict.fromkeys(records[0])
+        for rec in records:
+            if rec.keys() != fields.keys():
+                fields.update(dict.fromkeys(rec))
+        columns = {key: _column_array([rec.get(key) for rec in records]) for key in fields}
+        return cls(columns, len(records))
+
+    @classmethod
+    def from_dataframe(cls, df):
+        return cls({col: df[col].to_numpy() for col in df.columns}, len(df))
+
+    @classmethod
+    def concat(cls, batches):
+        batches = [b for b in batches if len(b)]
+        if not batches:
+            return cls({}, 0)
+        fields = {}
+        for b in batches:
+            for key in b.columns:
+                fields.setdefault(key, None)
+        columns = {}
+        for key in fields:
+            parts = [b.column(key) for b in batches]
+            columns[key] = np.concatenate(parts) if all(p.dtype != object for p in parts) \
+                else np.concatenate([p.astype(object) for p in parts])
+        return cls(columns, sum(len(b) for b in batches))
+
+    def __len__(self):
+        return self.length
+
+    def column(self, name):
+        """Return column `name`, or an all-NaN column if the field is absent."""
+        col = self.columns.get(name)
+        if col is None:
+            return np.full(self.length, np.nan)
+        return col
+
+    def numeric_columns(self):
+        return [k for k, v in self.columns.items() if v.dtype.kind in 'if']
+
+    def primary_value_column(self):
+        """Name of the measured-value column ('dataValue' when present)."""
+        numeric = self.numeric_columns()
+        if 'dataValue' in numeric:
+            return 'dataValue'
+        return numeric[0] if numeric else None
+
+    def take(self, mask_or_index):
+        return RecordBatch({k: v[mask_or_index] for k, v in self.columns.items()})
+
+    def compact(self):
+        """Drop fields that are null in every record."""
+        keep = {}
+        for key, col in self.columns.items():
+            if col.dtype.kind == 'f':
+                if not np.isnan(col).all():
+                    keep[key] = col
+            elif col.dtype == object:
+                if any(v is not None for v in col):
+                    keep[key] = col
+            else:
+                keep[key] = col
+        return RecordBatch(keep, self.length)
+
+    def nbytes(self):
+        total = 0
+        for col in self.columns.values():
+            total += col.nbytes
+            if col.dtype == object:
+                total += sum(len(v) for v in col if isinstance(v, str))
+        return total
+
+    def to_dataframe(self):
+        if not self.columns:
+            return pd.DataFrame()
+        return pd.DataFrame(self.columns, copy=False)
+
+    def to_records(self):
+        """Rebuild the API's list-of-dicts shape (NaN becomes None)."""
+        keys = list(self.columns)
+        lists = []
+        for key in keys:
+            values = self.columns[key].tolist()
+            if self.columns[key].dtype.kind == 'f':
+                values = [None if isinstance(v, float) and math.isnan(v) else v for v in values]
+            lists.append(values)
+        return [dict(zip(keys, row)) for row in zip(*lists)]
+
+    def to_bytes(self):
+        """Serialize without pickle: typed columns as .npy, object columns as JSON lists."""
+        header, parts = {'length': self.length, 'columns': []}, []
+        for name, col in self.columns.items():
+            if col.dtype == object:
+                part = json.dumps([_plain(v) for v in col.tolist()]).encode()
+                kind = 'json'
+            else:
+                buffer = io.BytesIO()
+                np.save(buffer, col, allow_pickle=False)
+                part, kind = buffer.getvalue(), 'npy'
+            header['columns'].append([name, kind, len(part)])
+            parts.append(part)
+        head = json.dumps(header).encode()
+        return struct.pack('<I', len(head)) + head + b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Inverse of `to_bytes`; raises ValueError on malformed input."""
+        try:
+            (size,) = struct.unpack_from('<I', data)
+            header = json.loads(data[4:4 + size])
+            offset, columns = 4 + size, {}
+            for name, kind, length in header['columns']:
+                part = data[offset:offset + length]
+                offset += length
+                if kind == 'npy':
+                    columns[name] = np.load(io.BytesIO(part), allow_pickle=False)
+                else:
+                    values = json.loads(part)
+                    col = np.empty(len(values), dtype=object)
+                    col[:] = values
+                    columns[name] = col
+            return cls(columns, header['length'])
+        except (struct.error, KeyError, TypeError) as exc:
+            raise ValueError(f"malformed record batch: {exc}") from exc
+
+
+def _plain(value):
+    """JSON-safe form of one object-column value."""
+    if value is None or isinstance(value, (str, bool, int)):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, np.generic):
+        return _plain(value.item())
+    return str(value)
@@ -0,0 +1,137 @@
+# ingress_agent/utils/response_cache.py
+"""
+In-process cache of normalized WRIS responses.
+
+Entries hold the response envelope (status, summary, statistics, ...) and the
+records as a compacted RecordBatch, so a cached response is not kept twice as
+both dicts and arrays. The record list is rebuilt only when a hit is served.
+
+With a `SharedStore` (see utils/shared_store.py) the cache has a second,
+cross-process tier: local misses are looked up there, and every put is
+written through, so worker processes share each other's fetches. Entries
+cross processes as bytes (`pack_entry`: envelope JSON and the batch's
+arrays), never pickled.
+"""
+
+from collections import OrderedDict
+import json
+import struct
+import threading
+import time
+
+from .record_batch import RecordBatch
+from .result_encoding import dumps
+from .shared_store import default_store
+
+DEFAULT_TTL_SECONDS = 15 * 60
+DEFAULT_MAX_ENTRIES = 256
+
+
+def make_key(hierarchy, data_type, location, agency_name, start_date, end_date):
+    """Cache key for one tool query; `location` is a (state, district) or (basin, tributary) pair."""
+    return (hierarchy, data_type, tuple(location), agency_name, start_date, end_date)
+
+
+class CacheEntry:
+    __slots__ = ('envelope', 'batch', 'expires_at', 'encoded')
+
+    def __init__(self, envelope, batch, expires_at):
+        self.envelope = envelope
+        self.batch = batch
+        self.expires_at = expires_at
+        # JSON of the result rebuilt from this entry, set when first encoded
+        # (see utils/result_encoding.py)
+        self.encoded = None
+
+
+def pack_entry(envelope, batch):
+    """Bytes of an (envelope, batch) pair for the shared tier: envelope JSON, then the batch."""
+    head = dumps(envelope)
+    return struct.pack('<I', len(head)) + head + batch.to_bytes()
+
+
+def unpack_entry(data):
+    """Inverse of `pack_entry`; raises ValueError on malformed input."""
+    try:
+        (size,) = struct.unpack_from('<I', data)
+    except struct.error as exc:
+        raise ValueError(f"malformed cache entry: {exc}") from exc
+    return json.loads(data[4:4 + size]), RecordBatch.from_bytes(data[4 + size:])
+
+
+class ResponseCache:
+    def __init__(self, ttl_seconds=DEFAULT_TTL_SECONDS, max_entries=DEFAULT_MAX_ENTRIES, shared=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.shared = shared
+        self.shared_hits = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._entries[key]
+        found = self.shared.get(repr(key)) if self.shared is not None else None
+        if found is not None:
+            try:
+                (envelope, batch), ttl = unpack_entry(found[0]), found[1]
+            except ValueError:
+                found = None
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            entry = self._remember(key, CacheEntry(envelope, batch, now + ttl))
+            self.shared_hits += 1
+            return entry
+
+    def put(self, key, envelope, batch, ttl_seconds=None):
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        entry = CacheEntry(envelope, batch.compact(), time.monotonic() + ttl)
+        with self._lock:
+            self._remember(key, entry)
+        if self.shared is not None:
+            self.shared.put(repr(key), pack_entry(entry.envelope, entry.batch), ttl)
+        return entry
+
+    def _remember(self, key, entry):
+        # Called with the lock held
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key=None):
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.invalidate(None if key is None else repr(key))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'shared_hits': self.shared_hits,
+                'bytes': sum(e.batch.nbytes() for e in self._entries.values()),
+                'encoded_bytes': sum(len(e.encoded) for e in self._entries.values() if e.encoded is not None),
+            }
+
+default_cache = ResponseCache(shared=default_store)
@@ -0,0 +1,212 @@
+# ingress_agent/utils/result_encoding.py
+"""
+Compact, fast JSON encoding of tool results.
+
+Tool results are serialized several times: for the model, for the answer
+cache's size accounting and for `serve`'s HTTP replies. Most of their
+bytes are the `data` records. This module keeps those records small and
+encodes them quickly:
+
+- `slim_records` / `slim_batch` drop record fields that are null in at
+  least SPARSE_FIELD_SHARE of the records (station, time and value fields
+  are always kept; the result lists the rest under `omitted_fields`), and
+  round float fields to the precision the dataset actually carries, so
+  float noise like 3.7510000000000003 is not sent
+- `round_floats` rounds computed values (statistics) to a few decimals
+  past the dataset's precision
+- `encode` serializes with orjson when it is installed (NumPy scalars and
+  arrays included, NaN as null) and with the standard library otherwise
+- an `EncodedResult` remembers its encoding, and a result rebuilt from a
+  response-cache entry shares that entry's bytes, so a cached result
+  served again is not re-encoded. Changing the result's top-level keys
+  drops the remembered bytes.
+"""
+
+import json
+import math
+
+import numpy as np
+
+from .data_quality import STATION_COLUMNS, TIME_COLUMNS
+from .record_batch import RecordBatch, decimal_places
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Fields null in at least this share of a result's records are left out
+SPARSE_FIELD_SHARE = 0.9
+# Statistics keep this many decimals beyond the dataset's precision
+EXTRA_DECIMALS = 2
+KEEP_FIELDS = frozenset(STATION_COLUMNS + TIME_COLUMNS + ('dataValue',))
+
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+def _default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    return str(value)
+
+
+def _finite(value):
+    """`value` with NaN and infinities replaced by None, for the standard-library encoder."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def dumps(value):
+    """JSON bytes of `value`."""
+    if orjson is not None:
+        return orjson.dumps(value, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(_finite(value), default=_default, separators=(',', ':')).encode()
+
+
+class EncodedResult(dict):
+    """A tool result that remembers its JSON encoding.
+
+    `source` is an object with an `encoded` attribute (a response-cache
+    entry) that holds, or will receive, the bytes shared by every result
+    rebuilt from it.
+    """
+
+    __slots__ = ('encoded', 'source')
+
+    def __init__(self, *args, source=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encoded = source.encoded if source is not None else None
+        self.source = source
+
+    def _changed(self):
+        self.encoded = None
+        self.source = None
+
+    def __setitem__(self, key, value):
+        self._changed()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._changed()
+        super().__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self._changed()
+        super().update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._changed()
+        return super().setdefault(key, default)
+
+    def pop(self, *args):
+        self._changed()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._changed()
+        return super().popitem()
+
+    def clear(self):
+        self._changed()
+        super().clear()
+
+
+def encode(result):
+    """JSON bytes of a tool result, reusing the bytes an `EncodedResult` already has."""
+    if not isinstance(result, EncodedResult):
+        return dumps(result)
+    if result.encoded is None:
+        result.encoded = dumps(result)
+        if result.source is not None:
+            result.source.encoded = result.encoded
+    return result.encoded
+
+
+def sparse_fields(batch):
+    """Fields null in at least SPARSE_FIELD_SHARE of the batch's records."""
+    if not len(batch):
+        return []
+    sparse = []
+    for name, column in batch.columns.items():
+        if name in KEEP_FIELDS:
+            continue
+        if column.dtype.kind == 'f':
+            nulls = np.count_nonzero(np.isnan(column))
+        elif column.dtype == object:
+            nulls = sum(1 for v in column if v is None or v == '' or (isinstance(v, float) and v != v))
+        else:
+            continue
+        if nulls >= SPARSE_FIELD_SHARE * len(batch):
+            sparse.append(name)
+    return sparse
+
+
+def _rounded(column):
+    """`column` rounded to its precision, or None if it already is."""
+    places = decimal_places(column)
+    rounded = np.round(column, places)
+    return None if np.array_equal(rounded, column, equal_nan=True) else rounded
+
+
+def slim_records(records, batch):
+    """Drop sparse fields from `records` and round noisy float fields, in place.
+
+    `batch` is the RecordBatch built from the same records. Returns the
+    omitted field names.
+    """
+    omitted = sparse_fields(batch)
+    for name, column in batch.columns.items():
+        if column.dtype.kind != 'f' or name in omitted:
+            continue
+        rounded = _rounded(column)
+        if rounded is None:
+            continue
+        for record, value in zip(records, rounded.tolist()):
+            if isinstance(record.get(name), float):
+                record[name] = value
+    if omitted:
+        for record in records:
+            for name in omitted:
+                record.pop(name, None)
+    return omitted
+
+
+def slim_batch(batch):
+    """Copy of `batch` without sparse fields and with float fields rounded; returns (batch, omitted)."""
+    omitted = sparse_fields(batch)
+    columns = {}
+    for name, column in batch.columns.items():
+        if name in omitted:
+            continue
+        if column.dtype.kind == 'f':
+            rounded = _rounded(column)
+            column = column if rounded is None else rounded
+        columns[name] = column
+    return RecordBatch(columns, len(batch)), omitted
+
+
+def round_floats(value, places):
+    """`value` (a dict, list or number) with every float rounded to `places` decimals."""
+    if isinstance(value, (float, np.floating)):
+        return round(float(value), places) if math.isfinite(value) else float(value)
+    if isinstance(value, dict):
+        return {k: round_floats(v, places) for k, v in value.items()}
+    if isinstance(value, list):
+        return [round_floats(v, places) for v in value]
+    return value
+
+
+def value_places(batch):
+    """Decimals for computed values of `batch`: its value column's precision plus EXTRA_DECIMALS."""
+    column = batch.primary_value_column()
+    if column is None or batch.columns[column].dtype.kind != 'f':
+        return EXTRA_DECIMALS
+    return decimal_places(batch.columns[column]) + EXTRA_DECIMALS
@@ -0,0 +1,397 @@
+# ingress_agent/utils/rollups.py
+"""
+Materialized aggregates of WRIS readings per data type x region x agency.
+
+Every complete series fetched through the bulk path is folded into daily,
+monthly and seasonal rows holding sum, count, min, max and the number of
+station-periods that contributed. These are all mergeable, so:
+
+- updates are incremental: the store tracks which time windows it has
+  already seen per series, so each reading is counted once however often
+  (and in whatever order) overlapping windows are fetched
+- district rows combine into state and national answers, and tributary
+  rows into basin answers, by summing a few hundred rows instead of
+  re-reading millions of raw values
+
+Rows are kept in memory and persisted as a compressed .npz of columns
+(dimension strings dictionary-encoded), so the store stays compact on disk
+and reloads quickly. Processes sharing the directory (serve workers) merge
+on save: under a file lock, each series saved by another process since
+this one last looked is taken in, a whole series at a time, when it covers
+more than the copy held here. Rows of different windows cannot be told
+apart once folded, so two partial copies are never added together. The
+default store is also saved at exit.
+"""
+
+from contextlib import contextmanager
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .timeseries import tidy_frame
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: saves are not serialized across processes
+    fcntl = None
+
+Logger = logging.getLogger(__name__)
+
+ROLLUP_DIR = os.environ.get('WRIS_ROLLUP_DIR', os.path.join(tempfile.gettempdir(), 'wris_rollups'))
+GRAINS = ('day', 'month', 'season')
+# Minimum seconds between automatic saves after an ingest
+SAVE_INTERVAL_SECONDS = 30
+
+# IMD seasons, keyed by calendar month
+SEASON_OF_MONTH = {
+    1: 'winter', 2: 'winter',
+    3: 'pre_monsoon', 4: 'pre_monsoon', 5: 'pre_monsoon',
+    6: 'monsoon', 7: 'monsoon', 8: 'monsoon', 9: 'monsoon',
+    10: 'post_monsoon', 11: 'post_monsoon', 12: 'post_monsoon',
+}
+SEASON_START_MONTH = {'winter': 1, 'pre_monsoon': 3, 'monsoon': 6, 'post_monsoon': 10}
+
+# Row key: (data_type, hierarchy, region, sub_region, agency, grain, period_start)
+DIMENSIONS = ('data_type', 'hierarchy', 'region', 'sub_region', 'agency', 'grain')
+MEASURES = ('sum', 'count', 'min', 'max', 'station_periods')
+
+
+def period_start(times, grain):
+    """Start of the day/month/season containing each timestamp (datetime64[ns])."""
+    months = np.asarray(pd.DatetimeIndex(times), dtype='datetime64[ns]').astype('datetime64[M]')
+    if grain == 'day':
+        return np.asarray(pd.DatetimeIndex(times).normalize(), dtype='datetime64[ns]')
+    if grain == 'season':
+        month_of_year = months.astype(np.int64) % 12 + 1
+        back = np.array([0] + [m - SEASON_START_MONTH[SEASON_OF_MONTH[m]] for m in range(1, 13)])
+        months = months - back[month_of_year].astype('timedelta64[M]')
+    return months.astype('datetime64[ns]')
+
+
+def season_label(start):
+    start = pd.Timestamp(start)
+    return f"{start.year}-{SEASON_OF_MONTH[start.month]}"
+
+
+SEASON_MONTHS = {'winter': 2, 'pre_monsoon': 3, 'monsoon': 4, 'post_monsoon': 3}
+
+
+def period_end(start, grain):
+    """Last nanosecond of each period beginning at `start` (datetime64[ns] array)."""
+    start = np.asarray(start, dtype='datetime64[ns]')
+    if grain == 'day':
+        nxt = start + np.timedelta64(1, 'D')
+    else:
+        months = start.astype('datetime64[M]')
+        if grain == 'month':
+            span = np.ones(len(start), dtype=np.int64)
+        else:
+            month_of_year = months.astype(np.int64) % 12 + 1
+            lengths = np.array([0] + [SEASON_MONTHS[SEASON_OF_MONTH[m]] for m in range(1, 13)])
+            span = lengths[month_of_year]
+        nxt = (months + span.astype('timedelta64[M]')).astype('datetime64[ns]')
+    return nxt.view(np.int64) - 1
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _in_intervals(times, intervals):
+    """Elementwise: does each int64 time fall in one of the sorted, disjoint intervals?"""
+    if not intervals:
+        return np.zeros(len(times), dtype=bool)
+    starts = np.array([lo for lo, _ in intervals], dtype=np.int64)
+    ends = np.array([hi for _, hi in intervals], dtype=np.int64)
+    idx = np.searchsorted(starts, times, side='right') - 1
+    return (idx >= 0) & (times <= ends[np.clip(idx, 0, None)])
+
+
+def _contains(outer, inner):
+    """Does the interval list `outer` cover every interval of `inner`?"""
+    return all(any(a <= lo and hi <= b for a, b in outer) for lo, hi in inner)
+
+
+def _prefer(theirs, ours):
+    """Should a saved series with coverage `theirs` replace the one held with coverage `ours`?"""
+    if _contains(ours, theirs):
+        return False
+    if _contains(theirs, ours):
+        return True
+    # Neither holds the other: keep the wider one; the rest is refetched when asked for
+    return sum(b - a for a, b in theirs) > sum(b - a for a, b in ours)
+
+
+def _overlaps(lo, hi, intervals):
+    """Elementwise: does [lo, hi] intersect one of the sorted, disjoint intervals?"""
+    if not intervals:
+        return np.zeros(len(lo), dtype=bool)
+    starts = np.array([a for a, _ in intervals], dtype=np.int64)
+    ends = np.array([b for _, b in intervals], dtype=np.int64)
+    # last interval starting at or before hi must end at or after lo
+    idx = np.searchsorted(starts, hi, side='right') - 1
+    return (idx >= 0) & (ends[np.clip(idx, 0, None)] >= lo)
+
+
+class RollupStore:
+    def __init__(self, directory=ROLLUP_DIR, autoload=True):
+        self.directory = directory
+        self._rows = {}         # row key -> [sum, count, min, max, station_periods]
+        self._coverage = {}     # (data_type, hierarchy, region, sub_region, agency) -> [(start_ns, end_ns)]
+        self._lock = threading.Lock()
+        # Serializes snapshots and file writes so concurrent saves cannot
+        # race on the temp file or land out of order
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+        self._seen = None       # generation of the saved file last merged or written
+        if autoload:
+            self.load()
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    def ingest(self, data_type, hierarchy, location, agency, df, start_date, end_date):
+        """Fold readings from `df` (a WRIS DataFrame for one fetched window) into the rollups.
+
+        The store remembers which [start_date, end_date] windows it has seen
+        per series; readings inside an already-covered window are skipped,
+        so re-ingesting overlapping windows, in any order, is safe. Returns
+        the number of new readings.
+        """
+        tidy = tidy_frame(df)
+        region, sub_region = location
+        series = (data_type, hierarchy, region, sub_region, agency)
+        window = (pd.Timestamp(start_date).value,
+                  (pd.Timestamp(end_date) + pd.Timedelta(days=1)).value - 1)
+
+        with self._lock:
+            covered = self._coverage.get(series, [])
+            if tidy.empty:
+                self._coverage[series] = _merge_intervals(covered + [window])
+                self._dirty = True
+                return 0
+            times = tidy['time'].to_numpy(dtype='datetime64[ns]').view(np.int64)
+            fresh = (times >= window[0]) & (times <= window[1]) & ~_in_intervals(times, covered)
+            if fresh.any():
+                new = tidy[fresh]
+                for grain in GRAINS:
+                    self._fold(series, grain, new, covered)
+            self._coverage[series] = _merge_intervals(covered + [window])
+            self._dirty = True
+        self._maybe_save()
+        return int(fresh.sum())
+
+    def _fold(self, series, grain, new, covered):
+        start = period_start(new['time'], grain)
+        start_ns = start.view(np.int64)
+        # Count a station-period once: skip it if an earlier window already
+        # overlapped that period
+        end_ns = period_end(start, grain)
+        first = ~_overlaps(start_ns, end_ns, covered)
+        frame = pd.DataFrame({
+            'period': start, 'station': new['station'].astype(str).to_numpy(),
+            'value': new['value'].to_numpy(), 'first': first,
+        })
+        per_station = frame.groupby(['period', 'station'], sort=False).agg(
+            sum=('value', 'sum'), count=('value', 'size'), min=('value', 'min'),
+            max=('value', 'max'), first=('first', 'any'))
+        agg = per_station.groupby(level='period').agg(
+            sum=('sum', 'sum'), count=('count', 'sum'), min=('min', 'min'),
+            max=('max', 'max'), station_periods=('first', 'sum'))
+        for period, row in zip(agg.index, agg.itertuples(index=False)):
+            self._merge(series + (grain, pd.Timestamp(period)), row)
+
+    def _merge(self, key, row):
+        current = self._rows.get(key)
+        if current is None:
+            self._rows[key] = [float(row.sum), int(row.count), float(row.min), float(row.max),
+                               int(row.station_periods)]
+            return
+        current[0] += float(row.sum)
+        current[1] += int(row.count)
+        current[2] = min(current[2], float(row.min))
+        current[3] = max(current[3], float(row.max))
+        current[4] += int(row.station_periods)
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def query(self, data_type, grain, hierarchy='admin', region=None, sub_region=None, agency=None,
+              start=None, end=None, by=('period',)):
+        """Combine stored rows matching the filters, grouped by `by`.
+
+        `by` may include 'period', 'region', 'sub_region' and 'agency'.
+        Returns a DataFrame with sum, count, min, max, mean (per reading) and
+        mean_station_total (average per-station total for the period).
+        """
+        start = pd.Timestamp(start) if start else None
+        end = pd.Timestamp(end) if end else None
+        with self._lock:
+            matched = [
+                key + tuple(values) for key, values in self._rows.items()
+                if key[0] == data_type and key[1] == hierarchy and key[5] == grain
+                and (region is None or key[2] == region)
+                and (sub_region is None or key[3] == sub_region)
+                and (agency is None or key[4] == agency)
+                and (start is None or key[6] >= start)
+                and (end is None or key[6] <= end)
+            ]
+        columns = DIMENSIONS + ('period',) + MEASURES
+        frame = pd.DataFrame(matched, columns=columns)
+        if frame.empty:
+            return frame
+        grouped = frame.groupby(list(by)).agg(
+            sum=('sum', 'sum'), count=('count', 'sum'), min=('min', 'min'), max=('max', 'max'),
+            station_periods=('station_periods', 'sum'), rows=('sum', 'size'))
+        grouped['mean'] = grouped['sum'] / grouped['count']
+        grouped['mean_station_total'] = grouped['sum'] / grouped['station_periods'].where(
+            grouped['station_periods'] > 0)
+        return grouped
+
+    def covers(self, data_type, hierarchy, location, agency, start_date, end_date):
+        """True if [start_date, end_date] has been fully ingested for this series."""
+        series = (data_type, hierarchy, location[0], location[1], agency)
+        lo = pd.Timestamp(start_date).value
+        hi = (pd.Timestamp(end_date) + pd.Timedelta(days=1)).value - 1
+        with self._lock:
+            return any(a <= lo and hi <= b for a, b in self._coverage.get(series, []))
+
+    def __len__(self):
+        return len(self._rows)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _path(self):
+        return os.path.join(self.directory, 'rollups.npz')
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        """Serialize saves (and loads against them) across processes sharing the directory."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, 'lock'), 'a') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _maybe_save(self):
+        if self._dirty and time.monotonic() - self._last_save >= SAVE_INTERVAL_SECONDS:
+            self.save()
+
+    def flush(self):
+        """Save if anything was ingested since the last save."""
+        if self._dirty:
+            try:
+                self.save()
+            except Exception:
+                Logger.exception("Saving the rollup store to %s failed", self.directory)
+
+    def save(self):
+        """Merge in what other processes saved since, then write the store."""
+        with self._save_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with self._file_lock(exclusive=True):
+                saved = self._read()
+                if saved is not None and saved['generation'] != self._seen:
+                    self._absorb(saved)
+                self._save()
+
+    def _save(self):
+        with self._lock:
+            keys = list(self._rows)
+            values = np.array([self._rows[k] for k in keys], dtype=np.float64).reshape(-1, len(MEASURES))
+            coverage = [[list(k), v] for k, v in self._coverage.items()]
+            self._dirty = False
+            self._last_save = time.monotonic()
+        generation = f"{int(time.time() * 1000)}-{os.getpid()}"
+
+        arrays = {'measures': values}
+        for i, name in enumerate(DIMENSIONS):
+            codes, uniques = pd.factorize(pd.Series([k[i] for k in keys], dtype=object))
+            arrays[f'dim_{name}'] = codes.astype(np.int32)
+            arrays[f'dict_{name}'] = np.array(json.dumps(list(uniques)))
+        arrays['period'] = np.array([k[6] for k in keys], dtype='datetime64[ns]')
+        arrays['coverage'] = np.array(json.dumps(coverage))
+        arrays['generation'] = np.array(generation)
+
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = os.path.join(self.directory, f'rollups.{os.getpid()}.tmp.npz')
+        np.savez_compressed(tmp, **arrays)
+        os.replace(tmp, self._path())
+        self._seen = generation
+
+    def _read(self):
+        """The saved {'generation', 'rows', 'coverage'}; None if absent or unreadable."""
+        path = self._path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                measures = data['measures']
+                dims = [[json.loads(str(data[f'dict_{name}']))[c] for c in data[f'dim_{name}']]
+                        for name in DIMENSIONS]
+                periods = [pd.Timestamp(p) for p in data['period']]
+                coverage = json.loads(str(data['coverage']))
+                generation = str(data['generation']) if 'generation' in data.files else None
+        except Exception as exc:
+            Logger.warning("Ignoring unreadable rollup store %s: %s", path, exc)
+            return None
+        rows = {}
+        for i, period in enumerate(periods):
+            row = measures[i]
+            rows[tuple(d[i] for d in dims) + (period,)] = [float(row[0]), int(row[1]), float(row[2]),
+                                                           float(row[3]), int(row[4])]
+        return {'generation': generation, 'rows': rows,
+                'coverage': {tuple(key): [tuple(i) for i in intervals] for key, intervals in coverage}}
+
+    def load(self):
+        if not os.path.exists(self._path()):
+            return
+        with self._file_lock(exclusive=False):
+            saved = self._read()
+        if saved is not None:
+            self._absorb(saved)
+
+    def _absorb(self, saved):
+        """Take in each saved series that covers more than the copy held here (see _prefer)."""
+        saved_rows = {}
+        for key, row in saved['rows'].items():
+            saved_rows.setdefault(key[:5], {})[key] = row
+        with self._lock:
+            held = {}
+            for key in self._rows:
+                held.setdefault(key[:5], []).append(key)
+            for series, intervals in saved['coverage'].items():
+                ours = self._coverage.get(series)
+                if ours is not None and not _prefer(intervals, ours):
+                    continue
+                for key in held.get(series, ()):
+                    del self._rows[key]
+                self._rows.update(saved_rows.get(series, {}))
+                self._coverage[series] = intervals
+            self._seen = saved['generation']
+
+
+default_rollups = RollupStore()
+atexit.register(default_rollups.flush)
@@ -0,0 +1,221 @@
+# ingress_agent/utils/scheduler.py
+"""
+Fair admission of outbound WRIS requests across agent sessions.
+
+Every request `WRISClient` sends first takes a slot from a `FairScheduler`:
+
+- at most `max_concurrency` requests are in flight in total, and at most
+  `session_limit` per session, so one session's fan-out cannot take every
+  connection;
+- waiting requests are ordered by weighted fair queueing (self-clocked
+  finish tags) over flows of (session, priority), with priority classes
+  weighted so interactive questions overtake batch and prefetch work;
+- time spent queued counts against the caller's deadline.
+
+The session and priority of the current work are held in context variables
+(set by `scheduled` for agent tools, or `session_scope` directly), so they
+follow the work into thread pools bound with `deadline.bind`.
+"""
+
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
+import heapq
+import inspect
+import itertools
+import os
+import threading
+import time
+
+from . import deadline
+from .latency import QuantileSketch
+from .tracing import span
+
+INTERACTIVE = 'interactive'
+BATCH = 'batch'
+PREFETCH = 'prefetch'
+
+# Share of dispatches each class gets when all are backlogged
+PRIORITY_WEIGHTS = {INTERACTIVE: 8.0, BATCH: 2.0, PREFETCH: 1.0}
+
+MAX_CONCURRENCY = int(os.environ.get('WRIS_MAX_CONCURRENCY', 16))
+SESSION_LIMIT = int(os.environ.get('WRIS_SESSION_CONCURRENCY', 6))
+
+# Tools whose calls fan out over many districts or years are scheduled as
+# batch work so single-district questions stay fast under load
+BATCH_TOOLS = {
+    'get_trend_analysis',
+    'get_seasonal_decomposition',
+    'get_groundwater_fluctuation',
+    'get_rainfall_departure',
+    'get_correlation_analysis',
+    'get_aggregate_statistics',
+    'render_comparison_chart',
+    'fetch_water_data_batch',
+    'analyze_water_data',
+}
+
+_session = ContextVar('wris_session', default='default')
+_priority = ContextVar('wris_priority', default=INTERACTIVE)
+
+
+def current_session():
+    """The session the current work is attributed to."""
+    return _session.get()
+
+
+@contextmanager
+def session_scope(session_id=None, priority=None):
+    """Attribute requests made in the block to `session_id` at `priority`."""
+    tokens = []
+    if session_id is not None:
+        tokens.append((_session, _session.set(session_id)))
+    if priority is not None:
+        tokens.append((_priority, _priority.set(priority)))
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class _Waiter:
+    __slots__ = ('session', 'priority', 'enqueued', 'event', 'granted', 'cancelled')
+
+    def __init__(self, session, priority):
+        self.session = session
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.event = threading.Event()
+        self.granted = False
+        self.cancelled = False
+
+
+class FairScheduler:
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, session_limit=SESSION_LIMIT, weights=None):
+        self.max_concurrency = max_concurrency
+        self.session_limit = session_limit
+        self.weights = dict(weights or PRIORITY_WEIGHTS)
+        self._lock = threading.Lock()
+        self._queue = []               # heap of (finish_tag, seq, waiter)
+        self._seq = itertools.count()
+        self._flow_finish = {}         # (session, priority) -> last finish tag
+        self._virtual_time = 0.0
+        self._in_flight = 0
+        self._per_session = Counter()
+        self._queued = Counter()       # priority -> waiting requests
+        self._served = Counter()
+        self._timeouts = Counter()
+        self._wait = {p: QuantileSketch() for p in self.weights}
+
+    @contextmanager
+    def slot(self):
+        """Hold one request slot for the current session and priority."""
+        session = _session.get()
+        with span("scheduler.acquire", **{"wris.priority": _priority.get()}):
+            self.acquire(session, _priority.get())
+        try:
+            yield
+        finally:
+            self.release(session)
+
+    def acquire(self, session, priority):
+        """Block until a slot is granted; raises DeadlineExceeded if the deadline passes first."""
+        priority = priority if priority in self.weights else INTERACTIVE
+        waiter = _Waiter(session, priority)
+        with self._lock:
+            flow = (session, priority)
+            tag = max(self._virtual_time, self._flow_finish.get(flow, 0.0)) + 1.0 / self.weights[priority]
+            self._flow_finish[flow] = tag
+            heapq.heappush(self._queue, (tag, next(self._seq), waiter))
+            self._queued[priority] += 1
+            self._dispatch()
+        if waiter.event.wait(timeout=deadline.remaining()):
+            return
+        with self._lock:
+            if waiter.granted:
+                return
+            waiter.cancelled = True
+            self._queued[priority] -= 1
+            self._timeouts[priority] += 1
+        raise deadline.DeadlineExceeded(deadline.TRUNCATED_BY_DEADLINE)
+
+    def release(self, session):
+        with self._lock:
+            self._in_flight -= 1
+            self._per_session[session] -= 1
+            if self._per_session[session] <= 0:
+                del self._per_session[session]
+            self._dispatch()
+
+    def _dispatch(self):
+        # Grant slots in finish-tag order, skipping (but keeping) waiters
+        # whose session is at its limit. Called with the lock held.
+        held = []
+        while self._queue and self._in_flight < self.max_concurrency:
+            tag, seq, waiter = heapq.heappop(self._queue)
+            if waiter.cancelled:
+                continue
+            if self._per_session[waiter.session] >= self.session_limit:
+                held.append((tag, seq, waiter))
+                continue
+            self._virtual_time = tag
+            self._in_flight += 1
+            self._per_session[waiter.session] += 1
+            self._queued[waiter.priority] -= 1
+            self._served[waiter.priority] += 1
+            self._wait[waiter.priority].add(time.monotonic() - waiter.enqueued)
+            waiter.granted = True
+            waiter.event.set()
+        for item in held:
+            heapq.heappush(self._queue, item)
+        if len(self._flow_finish) > 4096:
+            # Flows whose tag is behind virtual time restart from it anyway
+            self._flow_finish = {f: t for f, t in self._flow_finish.items() if t > self._virtual_time}
+
+    def metrics(self):
+        """Queue depth, in-flight counts and wait-time quantiles per priority class."""
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "active_sessions": len(self._per_session),
+                "queue_depth": {p: self._queued[p] for p in self.weights},
+                "served": {p: self._served[p] for p in self.weights},
+                "deadline_timeouts": {p: self._timeouts[p] for p in self.weights},
+                "wait_seconds": {
+                    p: {q: round(sketch.quantile(v), 4) for q, v in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))}
+                    for p, sketch in self._wait.items() if sketch.count
+                },
+            }
+
+
+def _session_id(tool_context):
+    try:
+        return tool_context.session.id
+    except Exception:
+        return None
+
+
+def scheduled(tool, priority=None):
+    """Wrap an agent tool so its requests are attributed to the calling session.
+
+    The agent framework injects `tool_context` into tools that declare it;
+    the wrapper declares it (keyword-only, excluded from the tool's schema)
+    and uses the session id as the scheduling flow.
+    """
+    priority = priority or (BATCH if tool.__name__ in BATCH_TOOLS else INTERACTIVE)
+
+    @functools.wraps(tool)
+    def run(*args, tool_context=None, **kwargs):
+        with session_scope(_session_id(tool_context), priority):
+            return tool(*args, **kwargs)
+
+    signature = inspect.signature(tool)
+    run.__signature__ = signature.replace(parameters=list(signature.parameters.values()) + [
+        inspect.Parameter('tool_context', inspect.Parameter.KEYWORD_ONLY, default=None)])
+    return run
+
+
+default_scheduler = FairScheduler()
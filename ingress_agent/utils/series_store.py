@@ -0,0 +1,585 @@
+# ingress_agent/utils/series_store.py
+"""
+Compact in-process store of fetched WRIS series.
+
+A fetched window arrives as per-record dicts that repeat the station name,
+agency, unit, coordinates and a timestamp string in every reading. The
+store keeps each (data type, station) series as two contiguous arrays
+instead: timestamps as int64 nanoseconds and values as float32, sorted by
+time. Fields that are constant for a station are kept once per series, with
+strings interned. Fields that vary per reading are kept as float32 arrays
+if numeric, or as int32 codes into one string table if not.
+
+- readings are merged per series: overlapping windows are deduplicated on
+  timestamp (the newer fetch wins), in any order
+- `slice` finds a time range with two binary searches and returns views,
+  without copying
+- the store remembers which windows it has seen per query location
+  (data type, hierarchy, region, sub-region, agency), so `window` can
+  answer a covered query from memory
+- `window` and `records` build the API's column/record shape only when
+  asked for
+
+The store holds at most WRIS_SERIES_MAX_BYTES of readings. Past that, the
+least recently used series are evicted, and locations that included them
+are no longer counted as covered.
+
+The store persists to WRIS_SERIES_DIR as one .npy file per column
+concatenated across all series, plus a JSON index of offsets and metadata.
+`load` opens the arrays with `mmap_mode='r'`, so a restart reads only the
+index; readings are paged in as they are sliced, and worker processes
+loading the same files share one copy in the page cache. Saves run on a
+background thread after an ingest. Processes sharing the directory take
+turns under a file lock, and each save first merges in what the others
+saved since, so no process overwrites another's series.
+"""
+
+from contextlib import contextmanager
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .data_quality import STATION_COLUMNS, TIME_COLUMNS
+from .record_batch import RecordBatch, decimal_places
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: saves are not serialized across processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+SERIES_DIR = os.environ.get('WRIS_SERIES_DIR', os.path.join(tempfile.gettempdir(), 'wris_series'))
+# Minimum seconds between automatic saves after an ingest
+SAVE_INTERVAL_SECONDS = 30
+# Bytes of readings kept before the least recently used series are evicted
+MAX_BYTES = int(os.environ.get('WRIS_SERIES_MAX_BYTES', 1 << 30))
+VALUE_COLUMN = 'dataValue'
+# Readings newer than this may still be published late, so windows are
+# only counted as covered up to this long ago
+SETTLE_DAYS = 2
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _same(column):
+    """True if every entry of `column` is equal (NaN equal to NaN)."""
+    if len(column) < 2:
+        return True
+    if column.dtype.kind == 'f':
+        first = column[0]
+        return bool(np.all(np.isnan(column))) if np.isnan(first) else bool(np.all(column == first))
+    first = column[0]
+    return all(v == first or (v is None and first is None) for v in column)
+
+
+def _concat(a, b, len_a, len_b):
+    """Concatenate two optional field columns, filling a missing side with nulls."""
+    if a is not None and b is not None and a.dtype.kind == b.dtype.kind == 'f':
+        return np.concatenate([a, b])
+    if a is None and b is not None and b.dtype.kind == 'f':
+        return np.concatenate([np.full(len_a, np.nan), b])
+    if b is None and a is not None and a.dtype.kind == 'f':
+        return np.concatenate([a, np.full(len_b, np.nan)])
+    a = np.full(len_a, None, dtype=object) if a is None else a.astype(object)
+    b = np.full(len_b, None, dtype=object) if b is None else b.astype(object)
+    return np.concatenate([a, b])
+
+
+def _merge_intervals(intervals):
+    merged = []
+    for lo, hi in sorted(intervals):
+        if merged and lo <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], hi))
+        else:
+            merged.append((lo, hi))
+    return merged
+
+
+def _window_ns(start_date, end_date):
+    return (pd.Timestamp(start_date).value,
+            (pd.Timestamp(end_date) + pd.Timedelta(days=1)).value - 1)
+
+
+def _settled_ns(start_date, end_date):
+    """The window in ns, ending no later than SETTLE_DAYS before today."""
+    lo, hi = _window_ns(start_date, end_date)
+    settled = (pd.Timestamp.now().normalize() - pd.Timedelta(days=SETTLE_DAYS)).value - 1
+    return lo, min(hi, settled)
+
+
+class _Series:
+    """One station's readings for one data type, sorted by time."""
+
+    __slots__ = ('times', 'values', 'static', 'varying', 'decimals', 'fields')
+
+    def __init__(self, times, values, static, varying, decimals, fields):
+        self.times = times          # int64 ns since the epoch
+        self.values = values        # float32
+        self.static = static        # field -> value shared by every reading
+        self.varying = varying      # field -> float32 array, or int32 codes into the string table
+        self.decimals = decimals
+        self.fields = fields        # record field order: (station, time, value and the rest)
+
+    def __len__(self):
+        return len(self.times)
+
+    def nbytes(self):
+        return self.times.nbytes + self.values.nbytes + sum(a.nbytes for a in self.varying.values())
+
+
+class SeriesStore:
+    def __init__(self, directory=SERIES_DIR, autoload=True, max_bytes=MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._series = {}       # (data_type, station) -> _Series, least recently used first
+        self._bytes = 0
+        self._evictions = 0
+        self._locations = {}    # (data_type, hierarchy, region, sub_region, agency) -> {"intervals", "stations"}
+        self._strings = []      # string table for varying non-numeric fields
+        self._string_codes = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+        self._generation = None     # generation of the files this process last wrote
+        self._seen = None           # generation this process last wrote or merged in
+        self._save_thread = None
+        self._string_array = None
+        if autoload:
+            self.load()
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    def ingest(self, data_type, hierarchy, location, agency, df, start_date, end_date):
+        """Merge the readings of `df` (a WRIS DataFrame for one fetched window) into the store.
+
+        Readings without a parseable time or value are dropped, as in the
+        rollups. Returns the number of readings not already stored.
+        """
+        region, sub_region = location
+        place = (data_type, hierarchy, region, sub_region, agency)
+        window = _settled_ns(start_date, end_date)
+        parts = self._split(df)
+        added = 0
+        with self._lock:
+            for station, times, values, fields, columns in parts:
+                added += self._merge((data_type, station), times, values, fields, columns)
+            entry = self._locations.setdefault(place, {'intervals': [], 'stations': []})
+            if window[0] <= window[1]:
+                entry['intervals'] = _merge_intervals(entry['intervals'] + [window])
+            known = set(entry['stations'])
+            entry['stations'].extend(s for s, *_ in parts if s not in known)
+            self._dirty = True
+            self._evict()
+        self._maybe_save()
+        return added
+
+    @staticmethod
+    def _split(df):
+        """Per-station (station, times, values, fields, {field: column}) from a WRIS DataFrame."""
+        station_col = next((c for c in STATION_COLUMNS if c in df.columns), None)
+        time_col = next((c for c in TIME_COLUMNS if c in df.columns), None)
+        if station_col is None or time_col is None or VALUE_COLUMN not in df.columns or df.empty:
+            return []
+        times = pd.to_datetime(df[time_col], errors='coerce').to_numpy(dtype='datetime64[ns]').view(np.int64)
+        values = pd.to_numeric(df[VALUE_COLUMN], errors='coerce').to_numpy(dtype=np.float64)
+        keep = (times != np.iinfo(np.int64).min) & ~np.isnan(values)
+        stations = df[station_col].astype(str).to_numpy()[keep]
+        times, values = times[keep], values[keep]
+        others = [c for c in df.columns if c not in (time_col, VALUE_COLUMN)]
+        columns = {c: df[c].to_numpy()[keep] for c in others}
+        fields = tuple(_intern(str(c)) for c in df.columns)
+        # Which reading goes to which station, in one pass
+        codes, uniques = pd.factorize(stations)
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        parts = []
+        for i, station in enumerate(uniques):
+            idx = order[bounds[i]:bounds[i + 1]]
+            parts.append((_intern(station), times[idx], values[idx], fields,
+                          {c: col[idx] for c, col in columns.items()}))
+        return parts
+
+    def _merge(self, key, times, values, fields, columns):
+        # Called with the lock held
+        current = self._series.get(key)
+        before = len(current) if current is not None else 0
+        if current is not None:
+            old = self._expand(current)
+            columns = {c: _concat(old.get(c), columns.get(c), before, len(times))
+                       for c in dict.fromkeys(list(old) + list(columns))}
+            times = np.concatenate([current.times, times])
+            values = np.concatenate([np.round(current.values.astype(np.float64), current.decimals), values])
+            fields = tuple(dict.fromkeys(current.fields + fields))
+        # Sort by time; of equal timestamps keep the last, i.e. the newest fetch
+        order = np.argsort(times, kind='stable')
+        sorted_times = times[order]
+        last = np.ones(len(order), dtype=bool)
+        last[:-1] = sorted_times[1:] != sorted_times[:-1]
+        order = order[last]
+
+        static, varying = {}, {}
+        for name, column in columns.items():
+            column = column[order]
+            name = _intern(name)
+            if _same(column):
+                static[name] = _intern(column[0].item() if hasattr(column[0], 'item') else column[0]) \
+                    if len(column) else None
+            elif column.dtype.kind in 'iuf':
+                varying[name] = column.astype(np.float32)
+            else:
+                varying[name] = np.array([self._code(v) for v in column], dtype=np.int32)
+        values = values[order]
+        series = _Series(times[order], values.astype(np.float32), static, varying, decimal_places(values), fields)
+        # Re-inserted last: the most recently used
+        self._series.pop(key, None)
+        self._series[key] = series
+        self._bytes += series.nbytes() - (current.nbytes() if current is not None else 0)
+        return len(order) - before
+
+    def _touch(self, key):
+        # Called with the lock held: a series used now moves to the end
+        series = self._series.pop(key, None)
+        if series is not None:
+            self._series[key] = series
+        return series
+
+    def _evict(self):
+        # Called with the lock held: drop the least recently used series
+        # until the store fits, and the coverage of every location that
+        # included one of them
+        if self._bytes <= self.max_bytes:
+            return
+        evicted = set()
+        for key in list(self._series):
+            if self._bytes <= self.max_bytes:
+                break
+            self._bytes -= self._series.pop(key).nbytes()
+            evicted.add(key)
+        self._evictions += len(evicted)
+        for place in [place for place, entry in self._locations.items()
+                      if any((place[0], station) in evicted for station in entry['stations'])]:
+            del self._locations[place]
+        self._dirty = True
+
+    def _code(self, value):
+        if value is None or (isinstance(value, float) and np.isnan(value)):
+            return -1
+        code = self._string_codes.get(value)
+        if code is None:
+            code = self._string_codes[value] = len(self._strings)
+            self._strings.append(_intern(value) if isinstance(value, str) else value)
+            self._string_array = None
+        return code
+
+    def _expand(self, series, idx=slice(None)):
+        """Every field except time and value as full-length columns (for rows `idx`)."""
+        n = len(series.times[idx])
+        out = {}
+        for name, value in series.static.items():
+            out[name] = np.full(n, np.nan) if value is None or isinstance(value, float) and np.isnan(value) \
+                else np.full(n, value, dtype=np.float64 if isinstance(value, (int, float)) else object)
+        if self._string_array is None:
+            # Code -1 (missing) picks the trailing None
+            self._string_array = np.array(self._strings + [None], dtype=object)
+        strings = self._string_array
+        for name, column in series.varying.items():
+            column = column[idx]
+            out[name] = column.astype(np.float64) if column.dtype.kind == 'f' else strings[column]
+        return out
+
+    # ------------------------------------------------------------------
+    # Query
+    # ------------------------------------------------------------------
+
+    def slice(self, data_type, station, start=None, end=None):
+        """(times, values) of one series within [start, end], as views; empty if unknown."""
+        with self._lock:
+            series = self._touch((data_type, station))
+        if series is None:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        lo, hi = self._bounds(series, start, end)
+        return series.times[lo:hi], series.values[lo:hi]
+
+    @staticmethod
+    def _bounds(series, start, end):
+        lo = 0 if start is None else int(np.searchsorted(series.times, pd.Timestamp(start).value, side='left'))
+        hi = len(series.times) if end is None else \
+            int(np.searchsorted(series.times, pd.Timestamp(end).value, side='right'))
+        return lo, hi
+
+    def stations(self, data_type):
+        with self._lock:
+            return [station for dt, station in self._series if dt == data_type]
+
+    def covers(self, data_type, hierarchy, location, agency, start_date, end_date):
+        """True if [start_date, end_date] has been fully ingested for this query location."""
+        lo, hi = _window_ns(start_date, end_date)
+        with self._lock:
+            entry = self._locations.get((data_type, hierarchy, location[0], location[1], agency))
+            return entry is not None and any(a <= lo and hi <= b for a, b in entry['intervals'])
+
+    def window(self, data_type, hierarchy, location, agency, start_date, end_date):
+        """The query's readings as a RecordBatch in the API's field layout, or None if not covered."""
+        lo, hi = _window_ns(start_date, end_date)
+        with self._lock:
+            entry = self._locations.get((data_type, hierarchy, location[0], location[1], agency))
+            if entry is None or not any(a <= lo and hi <= b for a, b in entry['intervals']):
+                return None
+            stations = list(entry['stations'])
+        return self.readings(data_type, stations, start_date, end_date)
+
+    def readings(self, data_type, stations, start_date, end_date):
+        """Stored readings of `stations` within [start_date, end_date] as one RecordBatch."""
+        lo, hi = _window_ns(start_date, end_date)
+        batches = []
+        with self._lock:
+            for station in stations:
+                series = self._touch((data_type, station))
+                if series is None:
+                    continue
+                start = int(np.searchsorted(series.times, lo, side='left'))
+                stop = int(np.searchsorted(series.times, hi, side='right'))
+                if stop > start:
+                    batches.append(self._batch(series, slice(start, stop)))
+        return RecordBatch.concat(batches)
+
+    def coverage(self, data_type, hierarchy, location, agency):
+        """Ingested windows of a query location, as sorted (start_ns, end_ns) intervals."""
+        with self._lock:
+            entry = self._locations.get((data_type, hierarchy, location[0], location[1], agency))
+            return list(entry['intervals']) if entry is not None else []
+
+    def cover(self, data_type, hierarchy, location, agency, stations, start_date, end_date):
+        """Record that the stored readings of `stations` answer this location for the window.
+
+        Used when a window was assembled from readings ingested under
+        other locations (see utils/crosswalk.py).
+        """
+        window = _settled_ns(start_date, end_date)
+        with self._lock:
+            entry = self._locations.setdefault((data_type, hierarchy, location[0], location[1], agency),
+                                               {'intervals': [], 'stations': []})
+            if window[0] <= window[1]:
+                entry['intervals'] = _merge_intervals(entry['intervals'] + [window])
+            known = set(entry['stations'])
+            entry['stations'].extend(_intern(s) for s in stations if s not in known)
+            self._dirty = True
+            self._evict()
+        self._maybe_save()
+
+    def _batch(self, series, idx):
+        # Called with the lock held
+        columns = self._expand(series, idx)
+        time_col = next((c for c in series.fields if c in TIME_COLUMNS and c not in columns), 'dataTime')
+        columns[time_col] = np.datetime_as_string(series.times[idx].view('datetime64[ns]').astype('datetime64[s]'))
+        columns[time_col] = columns[time_col].astype(object)
+        columns[VALUE_COLUMN] = np.round(series.values[idx].astype(np.float64), series.decimals)
+        return RecordBatch({f: columns[f] for f in series.fields if f in columns})
+
+    def records(self, data_type, station, start=None, end=None):
+        """One series' readings within [start, end] as the API's list of record dicts."""
+        with self._lock:
+            series = self._touch((data_type, station))
+            if series is None:
+                return []
+            lo, hi = self._bounds(series, start, end)
+            batch = self._batch(series, slice(lo, hi))
+        return batch.to_records()
+
+    def __len__(self):
+        return len(self._series)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "series": len(self._series),
+                "readings": sum(len(s) for s in self._series.values()),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "locations": len(self._locations),
+                "strings": len(self._strings),
+            }
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _index_path(self):
+        return os.path.join(self.directory, 'index.json')
+
+    @contextmanager
+    def _file_lock(self, exclusive):
+        """Serialize saves (and loads against them) across processes sharing the directory."""
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, 'lock'), 'a') as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _maybe_save(self):
+        # One save at a time, off the ingesting thread
+        if not self._dirty or time.monotonic() - self._last_save < SAVE_INTERVAL_SECONDS:
+            return
+        with self._lock:
+            if self._save_thread is not None and self._save_thread.is_alive():
+                return
+            self._last_save = time.monotonic()
+            self._save_thread = threading.Thread(target=self._save_in_background, name='wris-series-save',
+                                                 daemon=True)
+            self._save_thread.start()
+
+    def _save_in_background(self):
+        try:
+            self.save()
+        except Exception:
+            logger.exception("Saving the series store to %s failed", self.directory)
+
+    def save(self):
+        """Merge in what other processes saved since, then write the store."""
+        with self._save_lock:
+            os.makedirs(self.directory, exist_ok=True)
+            with self._file_lock(exclusive=True):
+                saved = self._read()
+                if saved is not None and saved[0]['generation'] != self._seen:
+                    self._absorb(*saved)
+                self._save()
+
+    def _save(self):
+        with self._lock:
+            keys = list(self._series)
+            series = [self._series[k] for k in keys]
+            locations = [[list(k), v['intervals'], list(v['stations'])] for k, v in self._locations.items()]
+            strings = list(self._strings)
+            self._dirty = False
+            self._last_save = time.monotonic()
+
+        offsets = np.zeros(len(series) + 1, dtype=np.int64)
+        np.cumsum([len(s) for s in series], out=offsets[1:])
+        arrays = {
+            'times': np.concatenate([s.times for s in series]) if series else np.empty(0, dtype=np.int64),
+            'values': np.concatenate([s.values for s in series]) if series else np.empty(0, dtype=np.float32),
+        }
+        # One column per varying (field, dtype) across all series: NaN or -1
+        # where a series does not have it
+        varying = {}
+        for s in series:
+            for name, column in s.varying.items():
+                varying.setdefault((name, column.dtype.str), len(varying))
+        for (name, dtype), i in varying.items():
+            column = np.full(int(offsets[-1]), np.nan if dtype == '<f4' else -1, dtype=dtype)
+            for j, s in enumerate(series):
+                part = s.varying.get(name)
+                if part is not None and part.dtype.str == dtype:
+                    column[offsets[j]:offsets[j + 1]] = part
+            arrays[f'field{i}'] = column
+
+        generation = f"{int(time.time() * 1000)}-{os.getpid()}"
+        index = {
+            'generation': generation,
+            'series': [{'key': list(k), 'offset': int(offsets[j]), 'length': len(s), 'static': s.static,
+                        'varying': {n: varying[(n, c.dtype.str)] for n, c in s.varying.items()},
+                        'decimals': s.decimals, 'fields': list(s.fields)}
+                       for j, (k, s) in enumerate(zip(keys, series))],
+            'locations': locations,
+            'strings': strings,
+        }
+        for name, array in arrays.items():
+            tmp = os.path.join(self.directory, f'{name}.{generation}.tmp.npy')
+            np.save(tmp, array)
+            os.replace(tmp, os.path.join(self.directory, f'{name}.{generation}.npy'))
+        tmp = os.path.join(self.directory, f'index.{generation}.tmp')
+        with open(tmp, 'w', encoding='utf-8') as fh:
+            json.dump(index, fh, default=lambda v: v.item() if hasattr(v, 'item') else str(v))
+        os.replace(tmp, self._index_path())
+        previous, self._generation, self._seen = self._generation, generation, generation
+        # Under the file lock every other generation has been merged into
+        # this one and can go; without it, only this process's own. Open
+        # memory maps keep their pages until closed.
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npy') or name.endswith('.tmp.npy') or name.endswith(f'.{generation}.npy'):
+                continue
+            if fcntl is not None or name.endswith(f'.{previous}.npy'):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _read(self):
+        """The saved (index, times, values, {field: column}), memory-mapped; None if absent or unreadable."""
+        path = self._index_path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding='utf-8') as fh:
+                index = json.load(fh)
+            generation = index['generation']
+
+            def mapped(name):
+                return np.load(os.path.join(self.directory, f'{name}.{generation}.npy'), mmap_mode='r')
+
+            times, values = mapped('times'), mapped('values')
+            used = {i for entry in index['series'] for i in entry['varying'].values()}
+            fields = {i: mapped(f'field{i}') for i in used}
+        except Exception as exc:
+            logger.warning("Ignoring unreadable series store %s: %s", path, exc)
+            return None
+        return index, times, values, fields
+
+    def load(self):
+        if not os.path.exists(self._index_path()):
+            return
+        with self._file_lock(exclusive=False):
+            saved = self._read()
+        if saved is not None:
+            self._absorb(*saved)
+
+    def _absorb(self, index, times, values, fields):
+        """Merge a saved store into this one; series not held yet stay memory-mapped."""
+        with self._lock:
+            # Saved string codes in this store's table; kept as they are
+            # (and mapped) when the tables agree, as on a fresh load
+            codes = np.array([self._code(_intern(s)) for s in index['strings']] + [-1], dtype=np.int32)
+            same_codes = bool(np.array_equal(codes[:-1], np.arange(len(codes) - 1)))
+            for entry in index['series']:
+                key = tuple(entry['key'])
+                lo, hi = entry['offset'], entry['offset'] + entry['length']
+                varying = {}
+                for name, i in entry['varying'].items():
+                    column = fields[i][lo:hi]
+                    varying[_intern(name)] = column if same_codes or column.dtype.kind == 'f' else codes[column]
+                series = _Series(times[lo:hi], values[lo:hi],
+                                 {_intern(k): _intern(v) for k, v in entry['static'].items()}, varying,
+                                 entry['decimals'], tuple(_intern(f) for f in entry['fields']))
+                if key not in self._series:
+                    self._series[key] = series
+                    self._bytes += series.nbytes()
+                else:
+                    self._merge(key, series.times, np.round(series.values.astype(np.float64), series.decimals),
+                                series.fields, self._expand(series))
+            for key, intervals, stations in index['locations']:
+                entry = self._locations.setdefault(tuple(key), {'intervals': [], 'stations': []})
+                entry['intervals'] = _merge_intervals(entry['intervals'] + [tuple(i) for i in intervals])
+                known = set(entry['stations'])
+                entry['stations'].extend(_intern(s) for s in stations if s not in known)
+            self._seen = index['generation']
+            self._evict()
+
+default_series_store = SeriesStore()
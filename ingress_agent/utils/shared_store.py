@@ -0,0 +1,210 @@
+# ingress_agent/utils/shared_store.py
+"""
+State shared by the agent worker processes of one host.
+
+A single SQLite database (WAL mode, so readers never wait on the writer)
+holds:
+
+- `cache`: byte values with an expiry, bounded by total size and
+  evicted least recently used first; `ResponseCache` uses it as a second
+  tier, so a response fetched by one worker is a hit in every other
+  (values are never unpickled: callers store their own serialization);
+- `buckets`: token buckets that rate-limit upstream WRIS requests across
+  all workers together (`SharedRateLimiter`).
+
+Enabled by setting WRIS_SHARED_STORE to the database path (`ingress_agent.serve`
+does this for its workers, in a private directory); `default_store` is None
+otherwise. A database owned by another user is refused.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from . import deadline
+
+logger = logging.getLogger(__name__)
+
+SHARED_STORE_PATH = os.environ.get('WRIS_SHARED_STORE', '')
+MAX_BYTES = int(float(os.environ.get('WRIS_SHARED_STORE_MB', 512)) * 1024 * 1024)
+# Size is enforced every this many puts rather than on each one
+EVICT_EVERY = 64
+BUSY_TIMEOUT_SECONDS = 5.0
+
+# Upstream requests per second for all workers together (0: unlimited)
+UPSTREAM_RATE = float(os.environ.get('WRIS_UPSTREAM_RATE', 0))
+UPSTREAM_BURST = float(os.environ.get('WRIS_UPSTREAM_BURST', 20))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,
+    expires REAL NOT NULL, used REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS cache_used ON cache (used);
+CREATE TABLE IF NOT EXISTS buckets (
+    name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+"""
+
+
+def _check_owner(path):
+    """Raise PermissionError if `path` (or its WAL files) belongs to another user."""
+    if not hasattr(os, 'getuid'):
+        return
+    for name in (path, path + '-wal', path + '-shm'):
+        try:
+            owner = os.stat(name).st_uid
+        except FileNotFoundError:
+            continue
+        if owner != os.getuid():
+            raise PermissionError(f"shared store {name} is owned by uid {owner}, not this user")
+
+
+class SharedStore:
+    def __init__(self, path, max_bytes=MAX_BYTES):
+        _check_owner(path)
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as db:
+            db.executescript(_SCHEMA)
+
+    def _connect(self):
+        # One connection per thread and process: sqlite3 connections must
+        # not cross threads, and must not survive a fork
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT_SECONDS, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    # Cache
+
+    def get(self, key):
+        """The bytes stored under `key`, with their remaining TTL in seconds, or None."""
+        now = time.time()
+        try:
+            db = self._connect()
+            row = db.execute('SELECT value, expires FROM cache WHERE key = ?', (key,)).fetchone()
+            if row is None or row[1] <= now:
+                self.misses += 1
+                return None
+            db.execute('UPDATE cache SET used = ? WHERE key = ?', (now, key))
+            self.hits += 1
+            return bytes(row[0]), row[1] - now
+        except sqlite3.Error as exc:
+            logger.debug("Shared cache read failed for %s: %s", key, exc)
+            return None
+
+    def put(self, key, blob, ttl_seconds):
+        """Store `blob` (bytes) under `key` for `ttl_seconds`; False if it was not stored."""
+        if len(blob) > self.max_bytes // 8:
+            return False
+        now = time.time()
+        try:
+            db = self._connect()
+            db.execute('INSERT OR REPLACE INTO cache (key, value, size, expires, used) VALUES (?, ?, ?, ?, ?)',
+                       (key, blob, len(blob), now + ttl_seconds, now))
+            self._puts += 1
+            if self._puts % EVICT_EVERY == 0:
+                self._evict(db, now)
+            return True
+        except sqlite3.Error as exc:
+            logger.debug("Shared cache write failed for %s: %s", key, exc)
+            return False
+
+    def _evict(self, db, now):
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            db.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+            total = db.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+            if total > self.max_bytes:
+                # Drop least recently used rows until 90% of the budget
+                excess = total - int(self.max_bytes * 0.9)
+                dropped, keys = 0, []
+                for key, size in db.execute('SELECT key, size FROM cache ORDER BY used'):
+                    keys.append((key,))
+                    dropped += size
+                    if dropped >= excess:
+                        break
+                db.executemany('DELETE FROM cache WHERE key = ?', keys)
+            db.execute('COMMIT')
+        except sqlite3.Error:
+            db.execute('ROLLBACK')
+            raise
+
+    def invalidate(self, key=None):
+        try:
+            db = self._connect()
+            if key is None:
+                db.execute('DELETE FROM cache')
+            else:
+                db.execute('DELETE FROM cache WHERE key = ?', (key,))
+        except sqlite3.Error as exc:
+            logger.debug("Shared cache invalidation failed for %s: %s", key, exc)
+
+    def stats(self):
+        try:
+            row = self._connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+        except sqlite3.Error as exc:
+            logger.debug("Shared cache stats unavailable: %s", exc)
+            row = (None, None)
+        return {'entries': row[0], 'bytes': row[1], 'hits': self.hits, 'misses': self.misses}
+
+    # Rate limiting
+
+    def take_token(self, name, rate, burst):
+        """Take one token from bucket `name`; returns 0.0, or the seconds until one is available."""
+        db = self._connect()
+        now = time.time()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute('SELECT tokens, updated FROM buckets WHERE name = ?', (name,)).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            wait = 0.0 if tokens >= 1.0 else (1.0 - tokens) / rate
+            if wait == 0.0:
+                tokens -= 1.0
+            db.execute('INSERT OR REPLACE INTO buckets (name, tokens, updated) VALUES (?, ?, ?)',
+                       (name, tokens, now))
+            db.execute('COMMIT')
+        except sqlite3.Error:
+            db.execute('ROLLBACK')
+            raise
+        return wait
+
+
+class SharedRateLimiter:
+    """Token bucket shared by every process using the same store."""
+
+    def __init__(self, store, rate=UPSTREAM_RATE, burst=UPSTREAM_BURST, name='upstream'):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.name = name
+        self.waited_seconds = 0.0
+
+    def acquire(self):
+        """Block until a request may be sent; raises DeadlineExceeded if the deadline passes first."""
+        while True:
+            try:
+                wait = self.store.take_token(self.name, self.rate, self.burst)
+            except sqlite3.Error as exc:
+                # The limiter must never take the agent down with it
+                logger.warning("Shared rate limiter unavailable: %s", exc)
+                return
+            if wait == 0.0:
+                return
+            left = deadline.remaining()
+            if left is not None and wait >= left:
+                raise deadline.DeadlineExceeded(deadline.TRUNCATED_BY_DEADLINE)
+            self.waited_seconds += wait
+            time.sleep(wait)
+
+
+default_store = SharedStore(SHARED_STORE_PATH) if SHARED_STORE_PATH else None
+default_rate_limiter = SharedRateLimiter(default_store) if default_store and UPSTREAM_RATE > 0 else None
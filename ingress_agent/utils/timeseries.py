@@ -0,0 +1,194 @@
+# ingress_agent/utils/timeseries.py
+"""
+Vectorized time-series kernels over many stations at once.
+
+Series are first laid out as a (stations x periods) matrix with NaN for
+missing periods (`station_matrix`); every kernel then works on whole
+matrices, so analysing a state's hundreds of stations is one set of NumPy
+operations rather than a per-station loop.
+"""
+
+import math
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .data_quality import STATION_COLUMNS, TIME_COLUMNS
+
+# Upper bound on (stations x pairs) cells materialized at once for Sen's slope
+MAX_PAIR_CELLS = 20_000_000
+
+# CGWB monitoring windows: the pre-monsoon campaign (nominally May) runs
+# April-June, the post-monsoon one (nominally November) October-November
+PRE_MONSOON_MONTHS = (4, 5, 6)
+POST_MONSOON_MONTHS = (10, 11)
+
+# IMD rainfall departure categories, as (lower bound in %, label)
+RAINFALL_DEPARTURE_CATEGORIES = (
+    (60, 'Large Excess'),
+    (20, 'Excess'),
+    (-19, 'Normal'),
+    (-59, 'Deficient'),
+    (-99, 'Large Deficient'),
+)
+
+
+def tidy_frame(df, value_col='dataValue'):
+    """Reduce a WRIS DataFrame to station/time/value columns with parsed types."""
+    station_col = next((c for c in STATION_COLUMNS if c in df.columns), None)
+    time_col = next((c for c in TIME_COLUMNS if c in df.columns), None)
+    if time_col is None or value_col not in df.columns:
+        return pd.DataFrame({'station': [], 'time': pd.to_datetime([]), 'value': []})
+    out = pd.DataFrame({
+        'station': df[station_col] if station_col else 'all',
+        'time': pd.to_datetime(df[time_col], errors='coerce'),
+        'value': pd.to_numeric(df[value_col], errors='coerce'),
+    })
+    return out.dropna(subset=['time', 'value'])
+
+
+def station_matrix(tidy, freq='M', how='mean'):
+    """Aggregate a tidy frame to `freq` periods and pivot to (stations x periods).
+
+    Returns (stations Index, periods PeriodIndex, float64 matrix).
+    """
+    period = tidy['time'].dt.to_period(freq)
+    grouped = tidy.groupby([tidy['station'], period])['value'].agg(how)
+    wide = grouped.unstack()
+    if len(wide.columns):
+        full = pd.period_range(wide.columns.min(), wide.columns.max(), freq=freq)
+        wide = wide.reindex(columns=full)
+    return wide.index, wide.columns, wide.to_numpy(dtype=np.float64)
+
+
+def _normal_sf(z):
+    """Two-sided p-value for standard-normal scores, elementwise."""
+    return np.array([math.erfc(abs(v) / math.sqrt(2.0)) if np.isfinite(v) else np.nan for v in z])
+
+
+def _tie_sums(matrix):
+    """Sum of t(t-1)(2t+5) over each row's groups of t equal values (NaN ignored)."""
+    rows, cols = matrix.shape
+    if not rows or not cols:
+        return np.zeros(rows)
+    ordered = np.sort(matrix, axis=1)
+    # Equal values are adjacent once sorted; NaN never equals, so each is its own group
+    starts = np.ones((rows, cols), dtype=bool)
+    starts[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    group = np.cumsum(starts.ravel()) - 1
+    present = ~np.isnan(ordered.ravel())
+    t = np.bincount(group[present], minlength=group[-1] + 1).astype(np.float64)
+    group_row = np.repeat(np.arange(rows), cols)[starts.ravel()]
+    return np.bincount(group_row, weights=t * (t - 1) * (2 * t + 5), minlength=rows)
+
+
+def mann_kendall(matrix):
+    """Mann-Kendall trend test and Sen's slope for every row of `matrix`.
+
+    NaNs are treated as missing periods. The variance is corrected for ties
+    (dry months of rainfall, repeated groundwater readings):
+    [n(n-1)(2n+5) - sum over tied groups of t(t-1)(2t+5)] / 18. Slopes are
+    in value units per column (period).
+    Returns a dict of 1-D arrays keyed by 'n', 's', 'z', 'p', 'slope', 'trend'.
+    """
+    rows, cols = matrix.shape
+    s = np.zeros(rows)
+    slope = np.full(rows, np.nan)
+    n = np.count_nonzero(~np.isnan(matrix), axis=1).astype(np.float64)
+
+    if cols >= 2:
+        i, j = np.triu_indices(cols, k=1)
+        lag = (j - i).astype(np.float64)
+        chunk = max(1, MAX_PAIR_CELLS // len(i))
+        for start in range(0, rows, chunk):
+            block = matrix[start:start + chunk]
+            diff = block[:, j] - block[:, i]
+            s[start:start + chunk] = np.nansum(np.sign(diff), axis=1)
+            with warnings.catch_warnings():
+                # all-NaN rows are expected for stations with a single reading
+                warnings.simplefilter('ignore', category=RuntimeWarning)
+                slope[start:start + chunk] = np.nanmedian(diff / lag, axis=1)
+
+    var = (n * (n - 1) * (2 * n + 5) - _tie_sums(matrix)) / 18.0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sd = np.sqrt(var)
+        z = np.where(s > 0, (s - 1) / sd, np.where(s < 0, (s + 1) / sd, 0.0))
+    z = np.where(n >= 3, z, np.nan)
+    p = _normal_sf(z)
+    trend = np.where(~np.isfinite(p), 'insufficient data',
+                     np.where(p >= 0.05, 'no trend',
+                              np.where(s > 0, 'increasing', 'decreasing')))
+    return {'n': n.astype(np.int64), 's': s, 'z': z, 'p': p, 'slope': slope, 'trend': trend}
+
+
+def seasonal_decompose(matrix, period=12):
+    """Classical additive decomposition of every row of `matrix`.
+
+    Returns (trend, seasonal, residual) matrices of the same shape. The
+    trend is a centred moving average over `period` columns; the seasonal
+    component is the mean detrended value per position in the cycle,
+    centred to sum to zero.
+    """
+    wide = pd.DataFrame(matrix.T)
+    if period % 2 == 0:
+        trend = wide.rolling(period, center=True, min_periods=period).mean() \
+            .rolling(2, min_periods=2).mean().shift(-1)
+    else:
+        trend = wide.rolling(period, center=True, min_periods=period).mean()
+    trend = trend.to_numpy().T
+
+    detrended = matrix - trend
+    cols = matrix.shape[1]
+    phase = np.arange(cols) % period
+    seasonal_index = np.full((matrix.shape[0], period), np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', category=RuntimeWarning)
+        for k in range(period):
+            seasonal_index[:, k] = np.nanmean(detrended[:, phase == k], axis=1) \
+                if np.any(phase == k) else np.nan
+        seasonal_index -= np.nanmean(seasonal_index, axis=1, keepdims=True)
+    seasonal = seasonal_index[:, phase]
+    residual = matrix - trend - seasonal
+    return trend, seasonal, residual
+
+
+def seasonal_strength(seasonal, residual):
+    """Strength of seasonality per row, 0 (none) to 1 (purely seasonal)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        resid_var = np.nanvar(residual, axis=1)
+        total_var = np.nanvar(seasonal + residual, axis=1)
+        return np.clip(1.0 - resid_var / total_var, 0.0, 1.0)
+
+
+def monsoon_fluctuation(tidy):
+    """Pre- minus post-monsoon groundwater level per station and year.
+
+    Each is the station's mean over PRE_MONSOON_MONTHS (April-June) or
+    POST_MONSOON_MONTHS (October-November) of the year.
+
+    WRIS groundwater levels are depths below ground, so a positive value is a
+    rise in the water table over the monsoon.
+    """
+    month = tidy['time'].dt.month
+    season = np.where(np.isin(month, PRE_MONSOON_MONTHS), 'pre',
+                      np.where(np.isin(month, POST_MONSOON_MONTHS), 'post', ''))
+    frame = tidy.assign(year=tidy['time'].dt.year, season=season)
+    frame = frame[frame['season'] != '']
+    levels = frame.groupby(['station', 'year', 'season'])['value'].mean().unstack('season')
+    levels = levels.reindex(columns=['pre', 'post'])
+    levels['fluctuation'] = levels['pre'] - levels['post']
+    return levels
+
+
+def rainfall_departure(actual, normal):
+    """Percent departure from normal and its IMD category, elementwise."""
+    actual = np.asarray(actual, dtype=np.float64)
+    normal = np.asarray(normal, dtype=np.float64)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        departure = np.where(normal > 0, (actual - normal) / normal * 100.0, np.nan)
+    bounds = np.array([b for b, _ in RAINFALL_DEPARTURE_CATEGORIES][::-1], dtype=np.float64)
+    labels = np.array(['No Rain'] + [label for _, label in RAINFALL_DEPARTURE_CATEGORIES][::-1], dtype=object)
+    category = labels[np.searchsorted(bounds, np.round(departure), side='right')]
+    category = np.where(np.isnan(departure), 'Unknown', category)
+    return departure, category
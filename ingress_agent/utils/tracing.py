@@ -0,0 +1,205 @@
+# ingress_agent/utils/tracing.py
+"""
+Span-based tracing of tool calls down to WRIS requests and data processing.
+
+Spans use the OpenTelemetry API. When exported to the same place, they
+nest under the agent framework's own spans (model calls, `execute_tool`),
+so a slow turn breaks down into model time, tool code, scheduler and
+rate-limit waits, and each HTTP request, page and hedge. Within a request
+it breaks down further into JSON decoding, `to_dataframe`, normalization
+and statistics.
+
+Export is configured from the environment:
+
+- WRIS_TRACE_FILE appends spans to a file as OTLP/JSON lines, one
+  ExportTraceServiceRequest per batch. This is the format of the
+  collector's file exporter and `otlpjsonfile` receiver.
+- WRIS_TRACE_ENDPOINT posts the same payloads to an OTLP/HTTP collector,
+  e.g. http://localhost:4318.
+
+Without either, spans cost almost nothing, unless the application installs
+its own tracer provider. Span context follows work into thread pools bound
+with `deadline.bind`.
+"""
+
+import functools
+import json
+import logging
+import os
+import threading
+
+import requests
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, SpanExporter, SpanExportResult
+
+from .profiler import default_profiler
+
+logger = logging.getLogger(__name__)
+
+SERVICE_NAME = 'ingress_agent'
+TRACE_FILE = os.environ.get('WRIS_TRACE_FILE', '')
+TRACE_ENDPOINT = os.environ.get('WRIS_TRACE_ENDPOINT', '')
+EXPORT_TIMEOUT_SECONDS = 10
+
+tracer = trace.get_tracer(SERVICE_NAME)
+
+
+def _attribute_value(value):
+    if isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [str(v) for v in value]
+    return str(value)
+
+
+def span(name, **attributes):
+    """Context manager running the block in a new span; None-valued attributes are dropped."""
+    return tracer.start_as_current_span(
+        name, attributes={k: _attribute_value(v) for k, v in attributes.items() if v is not None})
+
+
+def set_attributes(**attributes):
+    """Add attributes to the current span."""
+    current = trace.get_current_span()
+    if current.is_recording():
+        current.set_attributes({k: _attribute_value(v) for k, v in attributes.items() if v is not None})
+
+
+def traced(name):
+    """Decorator running the function in a span called `name`."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def run(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return run
+    return decorate
+
+
+def traced_tool(tool):
+    """Wrap an agent tool in a span (with its arguments and outcome) and the on-demand profiler."""
+    name = tool.__name__
+
+    @functools.wraps(tool)
+    def run(*args, **kwargs):
+        attributes = {f"wris.arg.{k}": v for k, v in kwargs.items()}
+        with span(f"tool {name}", **attributes) as current:
+            with default_profiler.call(name) as profile:
+                result = tool(*args, **kwargs)
+            if profile.get('path'):
+                current.set_attribute("wris.profile.path", profile['path'])
+                logger.info("Profile of %s written to %s (%d samples)", name, profile['path'], profile['samples'])
+            if isinstance(result, dict):
+                set_attributes(**{
+                    "wris.status": result.get("status"),
+                    "wris.total_records": result.get("total_records"),
+                    "wris.truncated": result.get("truncated"),
+                })
+                if result.get("status") not in (None, "success"):
+                    current.set_status(trace.StatusCode.ERROR,
+                                       str(result.get("error_message") or result.get("message") or ""))
+        return result
+    return run
+
+
+# OTLP/JSON encoding (opentelemetry-proto's JSON mapping)
+
+def _any_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_any_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+
+def _key_values(attributes):
+    return [{"key": k, "value": _any_value(v)} for k, v in (attributes or {}).items()]
+
+
+def _encode_span(span_data):
+    context = span_data.context
+    encoded = {
+        "traceId": format(context.trace_id, '032x'),
+        "spanId": format(context.span_id, '016x'),
+        "name": span_data.name,
+        # OTLP numbers kinds from 1 (INTERNAL); the Python enum from 0
+        "kind": span_data.kind.value + 1,
+        "startTimeUnixNano": str(span_data.start_time),
+        "endTimeUnixNano": str(span_data.end_time),
+        "attributes": _key_values(span_data.attributes),
+        "events": [{"timeUnixNano": str(e.timestamp), "name": e.name, "attributes": _key_values(e.attributes)}
+                   for e in span_data.events],
+        "status": {"code": span_data.status.status_code.value},
+    }
+    if span_data.parent is not None:
+        encoded["parentSpanId"] = format(span_data.parent.span_id, '016x')
+    if span_data.status.description:
+        encoded["status"]["message"] = span_data.status.description
+    return encoded
+
+
+def encode_otlp_json(spans):
+    """An ExportTraceServiceRequest (as a dict) for `spans`, grouped by resource and scope."""
+    resources = {}
+    for span_data in spans:
+        resource_key = id(span_data.resource)
+        scope = span_data.instrumentation_scope
+        scope_key = (scope.name, scope.version) if scope is not None else ('', '')
+        entry = resources.setdefault(resource_key, (span_data.resource, {}))
+        entry[1].setdefault(scope_key, []).append(_encode_span(span_data))
+    return {"resourceSpans": [
+        {"resource": {"attributes": _key_values(resource.attributes if resource else {})},
+         "scopeSpans": [{"scope": {"name": name, "version": version or ""}, "spans": encoded}
+                        for (name, version), encoded in scopes.items()]}
+        for resource, scopes in resources.values()
+    ]}
+
+
+class OTLPJsonExporter(SpanExporter):
+    """Exports spans as OTLP/JSON to a JSON-lines file or an OTLP/HTTP endpoint."""
+
+    def __init__(self, path=None, endpoint=None):
+        self.path = path
+        self.url = endpoint.rstrip('/') + '/v1/traces' if endpoint else None
+        self._lock = threading.Lock()
+        self._session = requests.Session() if self.url else None
+
+    def export(self, spans):
+        payload = json.dumps(encode_otlp_json(spans), separators=(',', ':'))
+        try:
+            if self.path:
+                with self._lock, open(self.path, 'a', encoding='utf-8') as fh:
+                    fh.write(payload + '\n')
+            if self.url:
+                resp = self._session.post(self.url, data=payload, headers={'Content-Type': 'application/json'},
+                                          timeout=EXPORT_TIMEOUT_SECONDS)
+                resp.raise_for_status()
+        except (OSError, requests.exceptions.RequestException) as exc:
+            logger.warning("Span export failed: %s", exc)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        if self._session is not None:
+            self._session.close()
+
+
+def configure(trace_file=TRACE_FILE, endpoint=TRACE_ENDPOINT):
+    """Export spans to `trace_file` and/or `endpoint`; returns the tracer provider, or None if neither is set."""
+    if not trace_file and not endpoint:
+        return None
+    provider = trace.get_tracer_provider()
+    if not isinstance(provider, TracerProvider):
+        provider = TracerProvider(resource=Resource.create({"service.name": SERVICE_NAME}))
+        trace.set_tracer_provider(provider)
+    provider.add_span_processor(BatchSpanProcessor(OTLPJsonExporter(trace_file or None, endpoint or None)))
+    return provider
+
+
+default_provider = configure()
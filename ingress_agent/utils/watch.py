@@ -0,0 +1,506 @@
+# ingress_agent/utils/watch.py
+"""
+Live monitoring of WRIS series: polling, ring buffers and alerts.
+
+A watch is a rule on one series, i.e. one (hierarchy, data type,
+location, agency) query, optionally narrowed to one station. A rule can
+set any of:
+
+- `above`: a level such as a river's danger level;
+- `below`: a level such as a reservoir's dead storage;
+- `max_rate`: a limit on the absolute change per hour.
+
+Every rule also gets automatic rate-of-change anomaly detection.
+
+`Watcher` polls every watched series on its own schedule through
+`WRISClient`, and watches on the same series share one poll. A poll asks
+only for the newest window, from the day of the last reading seen to
+today, and drops readings already seen. New readings go into a
+fixed-size ring buffer per station. Each is checked against the previous
+reading, so detection costs O(new readings) per poll:
+
+- `above` / `below` raise an alert when a station crosses the level,
+  and a "recovered" alert when it comes back;
+- `max_rate` raises an alert when the change per hour since the
+  previous reading exceeds it;
+- anomaly detection raises an alert when the change per hour is more
+  than ANOMALY_SIGMA standard deviations from the station's moving
+  average, once ANOMALY_MIN_HISTORY readings have been seen.
+
+Every watch belongs to an owner (the session that created it), and
+`watches()`, `remove()` and `alerts()` can be limited to one owner.
+Alerts go to a bounded log and to every subscribed callback (pass
+`queue.Queue.put` to feed a queue). Each watch keeps a cursor into the
+log, so `alerts()` returns a watch's alerts since it was last asked
+without taking them from other watches or owners.
+
+One scheduler thread and a small pool handle thousands of series per
+process. Polls run at batch priority in the request scheduler, and their
+times are jittered so they spread out. With WRIS_WATCH_FILE set, watches
+are saved there and restored at startup.
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from . import deadline
+from .data_quality import STATION_COLUMNS, TIME_COLUMNS
+from .record_batch import RecordBatch
+from .scheduler import BATCH, session_scope
+from .wris_client import ADMIN_ENDPOINT_MAP, BASIN_ENDPOINT_MAP, default_client
+
+logger = logging.getLogger(__name__)
+
+ADMIN = "admin"
+BASIN = "basin"
+
+WATCH_FILE = os.environ.get('WRIS_WATCH_FILE', '')
+# Readings kept per station
+RING_CAPACITY = int(os.environ.get('WRIS_WATCH_RING', 96))
+DEFAULT_INTERVAL_SECONDS = 15 * 60
+MIN_INTERVAL_SECONDS = 60
+# A new series' first poll looks back this far, and starts within FIRST_POLL_SPREAD_SECONDS
+INITIAL_LOOKBACK_DAYS = 2
+FIRST_POLL_SPREAD_SECONDS = 10
+POLL_WORKERS = 6
+POLL_BUDGET_SECONDS = 60
+# Poll times vary by up to this share of the interval
+JITTER = 0.1
+ANOMALY_SIGMA = 4.0
+ANOMALY_MIN_HISTORY = 8
+ANOMALY_SMOOTHING = 0.1
+MAX_QUEUED_ALERTS = 10_000
+# Owner of watches created outside any session (and of older saved watches)
+DEFAULT_OWNER = 'default'
+
+
+class RingBuffer:
+    """The last `capacity` (time, value) readings of one station."""
+
+    __slots__ = ('times', 'values', 'start', 'count')
+
+    def __init__(self, capacity=RING_CAPACITY):
+        self.times = np.empty(capacity, dtype=np.float64)
+        self.values = np.empty(capacity, dtype=np.float64)
+        self.start = 0
+        self.count = 0
+
+    def append(self, t, value):
+        capacity = len(self.times)
+        i = (self.start + self.count) % capacity
+        self.times[i] = t
+        self.values[i] = value
+        if self.count < capacity:
+            self.count += 1
+        else:
+            self.start = (self.start + 1) % capacity
+
+    def last(self):
+        """The newest (time, value), or None."""
+        if not self.count:
+            return None
+        i = (self.start + self.count - 1) % len(self.times)
+        return float(self.times[i]), float(self.values[i])
+
+    def arrays(self):
+        """(times, values), oldest first."""
+        order = (self.start + np.arange(self.count)) % len(self.times)
+        return self.times[order], self.values[order]
+
+
+class _Station:
+    __slots__ = ('name', 'ring', 'rate_mean', 'rate_var', 'rate_count', 'sides')
+
+    def __init__(self, name, capacity):
+        self.name = name
+        self.ring = RingBuffer(capacity)
+        self.rate_mean = 0.0
+        self.rate_var = 0.0
+        self.rate_count = 0
+        self.sides = {}          # watch id -> (above level, below level), None until first reading
+
+
+class _Series:
+    __slots__ = ('key', 'rules', 'stations', 'interval', 'due', 'in_flight', 'last_time', 'polls', 'errors')
+
+    def __init__(self, key):
+        self.key = key
+        self.rules = {}          # watch id -> watch
+        self.stations = {}       # station code -> _Station
+        self.interval = DEFAULT_INTERVAL_SECONDS
+        self.due = None
+        self.in_flight = False
+        self.last_time = None    # newest reading seen, epoch seconds
+        self.polls = 0
+        self.errors = 0
+
+
+def _series_key(watch):
+    return (watch['hierarchy'], watch['data_type'], watch['region'], watch['sub_region'], watch['agency'])
+
+
+def _first_present(df, candidates):
+    return next((c for c in candidates if c in df.columns), None)
+
+
+def _iso(t):
+    # Reading times are naive local times, kept as if UTC
+    return datetime.fromtimestamp(t, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class Watcher:
+    def __init__(self, client=default_client, path=WATCH_FILE, workers=POLL_WORKERS,
+                 ring_capacity=RING_CAPACITY, max_alerts=MAX_QUEUED_ALERTS):
+        self.client = client
+        self.path = path
+        self.workers = workers
+        self.ring_capacity = ring_capacity
+        self._watches = {}       # watch id -> watch
+        self._series = {}        # series key -> _Series
+        self._heap = []          # (due, seq, series key)
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._alerts = deque(maxlen=max_alerts)   # (seq, alert)
+        self._alert_seq = itertools.count(1)
+        self._cursors = {}       # watch id -> seq of the last alert returned
+        self._callbacks = []
+        self.stats = {"polls": 0, "poll_errors": 0, "readings": 0, "alerts": 0}
+        self._load()
+
+    # Watches
+
+    def add(self, hierarchy, data_type, region, sub_region, agency='CWC', station=None, above=None,
+            below=None, max_rate=None, anomaly=True, interval_seconds=DEFAULT_INTERVAL_SECONDS,
+            owner=DEFAULT_OWNER):
+        """Start watching a series for `owner`; returns the watch (a dict with its "id").
+
+        Raises ValueError for an unknown hierarchy or data type.
+        """
+        endpoints = {ADMIN: ADMIN_ENDPOINT_MAP, BASIN: BASIN_ENDPOINT_MAP}.get(hierarchy)
+        if endpoints is None:
+            raise ValueError(f"hierarchy must be '{ADMIN}' or '{BASIN}'")
+        if data_type not in endpoints:
+            raise ValueError(f"Unknown {hierarchy} data type '{data_type}'")
+        watch = {
+            "id": uuid.uuid4().hex[:8], "hierarchy": hierarchy, "data_type": data_type,
+            "region": region, "sub_region": sub_region, "agency": agency or 'CWC',
+            "station": station or None, "above": above, "below": below, "max_rate": max_rate,
+            "anomaly": bool(anomaly), "interval_seconds": max(MIN_INTERVAL_SECONDS, float(interval_seconds)),
+            "owner": owner, "created": time.time(),
+        }
+        with self._lock:
+            self._attach(watch, time.time())
+            self._save()
+        self.start()
+        return dict(watch)
+
+    def _attach(self, watch, now):
+        key = _series_key(watch)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _Series(key)
+            first = now + random.uniform(0, min(watch['interval_seconds'], FIRST_POLL_SPREAD_SECONDS))
+        else:
+            first = min(series.due, now + watch['interval_seconds']) if series.due is not None else now
+        watch.setdefault('owner', DEFAULT_OWNER)
+        series.rules[watch['id']] = watch
+        series.interval = min(w['interval_seconds'] for w in series.rules.values())
+        self._watches[watch['id']] = watch
+        if not series.in_flight:
+            self._schedule(series, first)
+
+    def remove(self, watch_id, owner=None):
+        """Stop a watch; returns False if there is none with that id (of `owner`, if given)."""
+        with self._lock:
+            watch = self._watches.get(watch_id)
+            if watch is None or (owner is not None and watch['owner'] != owner):
+                return False
+            del self._watches[watch_id]
+            self._cursors.pop(watch_id, None)
+            series = self._series[_series_key(watch)]
+            del series.rules[watch_id]
+            if series.rules:
+                series.interval = min(w['interval_seconds'] for w in series.rules.values())
+            else:
+                # Its heap entry is skipped when it comes due
+                del self._series[series.key]
+            self._save()
+        return True
+
+    def watches(self, owner=None):
+        """Every watch (of `owner`, if given), with its series' poll state and each station's latest reading."""
+        with self._lock:
+            listed = []
+            for watch in self._watches.values():
+                if owner is not None and watch['owner'] != owner:
+                    continue
+                series = self._series[_series_key(watch)]
+                latest = {}
+                for code, station in series.stations.items():
+                    last = station.ring.last()
+                    if last is not None and (watch['station'] is None or _matches(watch, code, station)):
+                        latest[code] = {"station_name": station.name, "time": _iso(last[0]), "value": last[1]}
+                listed.append(dict(watch, polls=series.polls, poll_errors=series.errors,
+                                   last_reading=_iso(series.last_time) if series.last_time else None,
+                                   latest=latest))
+            return listed
+
+    def history(self, watch_id):
+        """Buffered readings per station of a watch's series: {code: (times, values)}."""
+        with self._lock:
+            watch = self._watches.get(watch_id)
+            if watch is None:
+                return {}
+            series = self._series[_series_key(watch)]
+            return {code: station.ring.arrays() for code, station in series.stations.items()
+                    if watch['station'] is None or _matches(watch, code, station)}
+
+    def _load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding='utf-8') as fh:
+                watches = json.load(fh)
+        except (OSError, ValueError) as exc:
+            logger.warning("Ignoring unreadable watch file %s: %s", self.path, exc)
+            return
+        now = time.time()
+        for watch in watches:
+            self._attach(watch, now)
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, 'w', encoding='utf-8') as fh:
+                json.dump(list(self._watches.values()), fh)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logger.warning("Watch file not writable: %s", exc)
+
+    # Alerts
+
+    def subscribe(self, callback):
+        """Call `callback(alert)` for every alert raised from now on."""
+        self._callbacks.append(callback)
+
+    def alerts(self, max_alerts=None, watch_id=None, owner=None):
+        """Alerts raised since they were last returned, oldest first.
+
+        Only `watch_id`'s and `owner`'s watches' alerts, if given. Returned
+        alerts advance their watch's cursor; they stay in the log for other
+        watches' cursors until it is full.
+        """
+        with self._lock:
+            wanted = {wid for wid, watch in self._watches.items()
+                      if (watch_id is None or wid == watch_id) and (owner is None or watch['owner'] == owner)}
+            taken = []
+            for seq, alert in self._alerts:
+                if max_alerts is not None and len(taken) >= max_alerts:
+                    break
+                wid = alert["watch_id"]
+                if wid in wanted and seq > self._cursors.get(wid, 0):
+                    self._cursors[wid] = seq
+                    taken.append(alert)
+            return taken
+
+    def _publish(self, alerts):
+        with self._lock:
+            self._alerts.extend((next(self._alert_seq), alert) for alert in alerts)
+            self.stats["alerts"] += len(alerts)
+        for alert in alerts:
+            for callback in list(self._callbacks):
+                try:
+                    callback(alert)
+                except Exception:
+                    logger.exception("Watch alert callback failed")
+
+    # Polling
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='wris-watch-poll')
+                self._thread = threading.Thread(target=self._loop, name='wris-watch', daemon=True)
+                self._thread.start()
+        self._wake.set()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _schedule(self, series, due):
+        series.due = due
+        heapq.heappush(self._heap, (due, next(self._seq), series.key))
+        self._wake.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self._wake.clear()
+            now = time.time()
+            ready = []
+            with self._lock:
+                while self._heap and self._heap[0][0] <= now:
+                    due, _, key = heapq.heappop(self._heap)
+                    series = self._series.get(key)
+                    # Entries of removed or rescheduled series are stale
+                    if series is not None and series.due == due and not series.in_flight:
+                        series.in_flight = True
+                        ready.append(series)
+                wait = self._heap[0][0] - now if self._heap else None
+            for series in ready:
+                self._pool.submit(self._poll, series)
+            self._wake.wait(wait)
+
+    def _poll(self, series):
+        try:
+            self._publish(self.poll(series))
+        except Exception:
+            logger.exception("Watch poll of %s failed", series.key)
+            series.errors += 1
+            self.stats["poll_errors"] += 1
+        finally:
+            with self._lock:
+                series.in_flight = False
+                if self._series.get(series.key) is series:
+                    self._schedule(series, time.time() + series.interval * (1 + random.uniform(-JITTER, JITTER)))
+
+    def poll(self, series):
+        """Fetch the newest window of `series` and return the alerts its new readings raise."""
+        hierarchy, data_type, region, sub_region, agency = series.key
+        today = date.today()
+        if series.last_time is None:
+            start = today - timedelta(days=INITIAL_LOOKBACK_DAYS)
+        else:
+            start = datetime.fromtimestamp(series.last_time, timezone.utc).date()
+        export = (self.client.bulk_export_admin_hierarchy_data if hierarchy == ADMIN
+                  else self.client.bulk_export_basin_hierarchy_data)
+        with session_scope('watch', BATCH), deadline.deadline(POLL_BUDGET_SECONDS):
+            result = export(data_type, region, sub_region, agency, start.isoformat(), today.isoformat())
+        series.polls += 1
+        self.stats["polls"] += 1
+        if result.get("status") != "success":
+            series.errors += 1
+            self.stats["poll_errors"] += 1
+            logger.info("Watch poll of %s failed: %s", series.key, result.get("error_message"))
+            return []
+        return self.ingest(series, result["data"])
+
+    # Detection
+
+    def ingest(self, series, df):
+        """Add the new readings in `df` to `series`; returns the alerts they raise."""
+        time_col = _first_present(df, TIME_COLUMNS)
+        value_col = 'dataValue' if 'dataValue' in df.columns else RecordBatch.from_dataframe(df).primary_value_column()
+        if df.empty or time_col is None or value_col is None:
+            return []
+        station_col = _first_present(df, STATION_COLUMNS)
+        codes = df[station_col].astype(str) if station_col else pd.Series('', index=df.index)
+        names = df['stationName'].astype(str) if 'stationName' in df.columns else codes
+        times = pd.to_datetime(df[time_col], errors='coerce')
+        readings = pd.DataFrame({
+            'code': codes.to_numpy(), 'name': names.to_numpy(),
+            't': times.to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9,
+            'v': pd.to_numeric(df[value_col], errors='coerce').to_numpy(dtype=np.float64),
+        })[times.notna().to_numpy()]
+        readings = readings[~np.isnan(readings['v'].to_numpy())]
+
+        # Only readings newer than each station's last one
+        last_seen = {code: s.ring.last()[0] for code, s in series.stations.items() if s.ring.count}
+        if last_seen:
+            newest = readings['code'].map(last_seen).fillna(-np.inf).to_numpy()
+            readings = readings[readings['t'].to_numpy() > newest]
+        if readings.empty:
+            return []
+        readings = readings.drop_duplicates(['code', 't']).sort_values(['code', 't'], kind='stable')
+
+        with self._lock:
+            rules = list(series.rules.values())
+        alerts = []
+        for code, group in readings.groupby('code', sort=False):
+            station = series.stations.get(code)
+            if station is None:
+                with self._lock:
+                    station = series.stations[code] = _Station(group['name'].iat[0], self.ring_capacity)
+            matching = [w for w in rules if w['station'] is None or _matches(w, code, station)]
+            for t, value in zip(group['t'].to_numpy(), group['v'].to_numpy()):
+                alerts.extend(self._check(series, code, station, matching, float(t), float(value)))
+                station.ring.append(t, value)
+        series.last_time = max(series.last_time or 0.0, float(readings['t'].max()))
+        self.stats["readings"] += len(readings)
+        return alerts
+
+    def _check(self, series, code, station, rules, t, value):
+        alerts = []
+        previous = station.ring.last()
+        rate = None
+        if previous is not None and t > previous[0]:
+            rate = (value - previous[1]) / ((t - previous[0]) / 3600.0)
+        anomalous, typical = False, station.rate_mean
+        if rate is not None:
+            if station.rate_count >= ANOMALY_MIN_HISTORY and station.rate_var > 0:
+                anomalous = abs(rate - station.rate_mean) > ANOMALY_SIGMA * station.rate_var ** 0.5
+            delta = rate - station.rate_mean
+            station.rate_mean += ANOMALY_SMOOTHING * delta
+            station.rate_var = (1 - ANOMALY_SMOOTHING) * (station.rate_var + ANOMALY_SMOOTHING * delta * delta)
+            station.rate_count += 1
+
+        def alert(watch, kind, **details):
+            alerts.append(dict({
+                "watch_id": watch["id"], "kind": kind, "data_type": series.key[1],
+                "location": f"{series.key[2]}/{series.key[3]}", "station": code, "station_name": station.name,
+                "time": _iso(t), "value": value}, **details))
+
+        for watch in rules:
+            was_above, was_below = station.sides.get(watch["id"], (None, None))
+            is_above = is_below = None
+            if watch["above"] is not None:
+                is_above = value >= watch["above"]
+                # A station first seen above the level alerts too
+                if is_above != was_above and (was_above is not None or is_above):
+                    alert(watch, "above" if is_above else "recovered", threshold=watch["above"])
+            if watch["below"] is not None:
+                is_below = value <= watch["below"]
+                if is_below != was_below and (was_below is not None or is_below):
+                    alert(watch, "below" if is_below else "recovered", threshold=watch["below"])
+            station.sides[watch["id"]] = (is_above, is_below)
+            if rate is not None and watch["max_rate"] is not None and abs(rate) > watch["max_rate"]:
+                alert(watch, "rate", rate_per_hour=rate, threshold=watch["max_rate"])
+            elif anomalous and watch["anomaly"]:
+                alert(watch, "anomaly", rate_per_hour=rate, typical_rate_per_hour=typical)
+        return alerts
+
+    def metrics(self):
+        with self._lock:
+            return dict(self.stats, watches=len(self._watches), series=len(self._series),
+                        stations=sum(len(s.stations) for s in self._series.values()),
+                        queued_alerts=len(self._alerts))
+
+
+def _matches(watch, code, station):
+    wanted = watch["station"].strip().lower()
+    return wanted in (code.lower(), station.name.lower())
+
+
+default_watcher = Watcher()
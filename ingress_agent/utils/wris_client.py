@@ -1,46 +1,273 @@
 # ingress_agent/utils/wris_client.py
 
 import requests
-from urllib.parse import urlencode
+from contextlib import nullcontext
+from urllib.parse import urlencode, urlparse
+from concurrent.futures import ThreadPoolExecutor, wait
 import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import time
+
+import pandas as pd
+
+from . import deadline
+from .data_processor import default_processor
+from .latency import LatencyTracker
+from .page_tuner import default_page_tuner
+from .scheduler import default_scheduler
+from .shared_store import default_rate_limiter
+from .tracing import set_attributes, span
 
 # Use a basic logger for demonstration
 Logger = logging.getLogger(__name__)
 
+# Map data types to endpoints - EXACTLY like your working version
+ADMIN_ENDPOINT_MAP = {
+    'rainfall': '/Dataset/RainFall',
+    'ground_water_level': '/Dataset/Ground Water Level',
+    'wind_direction': '/Dataset/Wind Direction',
+    'temperature': '/Dataset/Temperature',
+    'suspended_sediment': '/Dataset/Suspended Sediment',
+    'solar_radiation': '/Dataset/Solar Radiation',
+    'soil_moisture': '/Dataset/Soil Moisture',
+    'snowfall': '/Dataset/SnowFall',
+    'river_water_level': '/Dataset/River Water Level',
+    'river_water_discharge': '/Dataset/River Water Discharge',
+    'reservoir': '/Dataset/Reservoir',
+    'relative_humidity': '/Dataset/Relative Humidity',
+    'evapo_transpiration': '/Dataset/Evapo Transpiration',
+    'atmospheric_pressure': '/Dataset/Atmospheric Pressure'
+}
+
+BASIN_ENDPOINT_MAP = {
+    'suspended_sediment': '/Dataset/Basin/Suspended Sediment',
+    'wind_direction': '/Dataset/Basin/Wind Direction',
+    'temperature': '/Dataset/Basin/Temperature',
+    'solar_radiation': '/Dataset/Basin/Solar Radiation',
+    'soil_moisture': '/Dataset/Basin/Soil Moisture',
+    'snowfall': '/Dataset/Basin/SnowFall',
+    'river_water_level': '/Dataset/Basin/River WaterLevel',
+    'river_water_discharge': '/Dataset/Basin/River Water Discharge',
+    'reservoir': '/Dataset/Basin/Reservoir',
+    'relative_humidity': '/Dataset/Basin/Relative Humidity',
+    'rainfall': '/Dataset/Basin/RainFall',
+    'evapo_transpiration': '/Dataset/Basin/Evapo Transpiration',
+    'atmospheric_pressure': '/Dataset/Basin/Atmospheric Pressure'
+}
+
+# Page size used when a bulk export has to fall back to paginated JSON;
+# with a page tuner, the starting point within [MIN_BULK_PAGE_SIZE, MAX_BULK_PAGE_SIZE]
+BULK_PAGE_SIZE = 1000
+MIN_BULK_PAGE_SIZE = 100
+MAX_BULK_PAGE_SIZE = 5000
+
+# Hedged requests: a backup is sent once a request has been outstanding
+# for the endpoint's HEDGE_QUANTILE latency, at most for MAX_HEDGE_RATIO of
+# all requests, and only after HEDGE_MIN_SAMPLES observations
+HEDGE_QUANTILE = 0.95
+MAX_HEDGE_RATIO = 0.05
+HEDGE_MIN_SAMPLES = 20
+
+
+def _read_columnar(path):
+    """Parse a downloaded CSV export, preferring the pyarrow engine when installed."""
+    try:
+        import pyarrow  # noqa: F401
+        engine = 'pyarrow'
+    except ImportError:
+        engine = 'c'
+    df = pd.read_csv(path, engine=engine)
+    # Export headers are human-readable ("Data Value"); the JSON API uses
+    # camelCase keys ("dataValue"). Rename so both paths share one schema.
+    df.columns = [_to_camel_case(col) for col in df.columns]
+    return df
+
+
+def _to_camel_case(header):
+    words = re.split(r'[\s_]+', str(header).strip())
+    if len(words) == 1:
+        return words[0][:1].lower() + words[0][1:]
+    return words[0].lower() + ''.join(w[:1].upper() + w[1:] for w in words[1:] if w)
+
+
+class _DownloadUnsupported(Exception):
+    """The endpoint answered a download request with JSON or HTML instead of a file."""
+
+
 class WRISClient:
-    def __init__(self, base_url="https://indiawris.gov.in", page=0, size=30):
+    def __init__(self, base_url="https://indiawris.gov.in", page=0, size=30,
+                 download_chunk_size=1 << 20, max_workers=8, hedge=False,
+                 hedge_quantile=HEDGE_QUANTILE, max_hedge_ratio=MAX_HEDGE_RATIO, scheduler=None,
+                 rate_limiter=None, page_tuner=None):
         self.base_url = base_url
         self.default_page = page
         self.default_size = size
         self.headers = {'accept': 'application/json'}
+        self.download_chunk_size = download_chunk_size
+        self.max_workers = max_workers
+        # Pooled connections so concurrent page fetches reuse sockets
+        self.session = requests.Session()
+        # Endpoints that answered a download request with something other
+        # than a file; bulk exports for these go straight to paginated JSON
+        self._download_unsupported = set()
+        # Per-endpoint latency sketches, fed by every completed request
+        self.latency = LatencyTracker()
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.max_hedge_ratio = max_hedge_ratio
+        self._hedge_lock = threading.Lock()
+        self._hedge_executor = None
+        self._hedge_counts = {"requests": 0, "hedged": 0, "hedge_wins": 0}
+        # Admission control shared by every client in the process (None disables it)
+        self.scheduler = scheduler
+        # Upstream rate limit shared with other worker processes (None disables it)
+        self.rate_limiter = rate_limiter
+        # Learns page sizes per endpoint (None keeps them fixed)
+        self.page_tuner = page_tuner
+
+    def _slot(self):
+        return self.scheduler.slot() if self.scheduler is not None else nullcontext()
+
+    def _throttle(self):
+        if self.rate_limiter is not None:
+            with span("wris.rate_limit"):
+                self.rate_limiter.acquire()
+
+    def _page_size(self, url, kind, default, lo, hi):
+        if self.page_tuner is None:
+            return default
+        return self.page_tuner.size_for(f"{kind} {_endpoint_key(url)}", default, lo, hi)
+
+    def _observe(self, url, kind, size, records, seconds, error=False):
+        if self.page_tuner is not None:
+            self.page_tuner.record(f"{kind} {_endpoint_key(url)}", size, records, seconds, error)
+
+    def _post(self, url, params, **kwargs):
+        # Every request is bounded by the caller's deadline (or the default
+        # timeout outside one); raises DeadlineExceeded if none is left
+        if kwargs.get('stream'):
+            # The caller holds the scheduler slot while it reads the body
+            self._throttle()
+            kwargs.setdefault('timeout', deadline.request_timeout())
+            return self._timed_post(url, params, **kwargs)
+        with self._slot():
+            self._throttle()
+            # Computed after admission: time spent queued comes out of the budget
+            kwargs.setdefault('timeout', deadline.request_timeout())
+            if self.hedge:
+                return self._hedged_post(url, params, **kwargs)
+            return self._timed_post(url, params, **kwargs)
+
+    def _timed_post(self, url, params, role=None, **kwargs):
+        with span("wris.http", **{"url.path": _endpoint_key(url), "wris.page": params.get('page'),
+                                  "wris.page_size": params.get('size'), "wris.download": params.get('download'),
+                                  "wris.hedge_role": role}):
+            started = time.monotonic()
+            resp = self.session.post(url, headers=self.headers, params=params, data='', **kwargs)
+            # Streamed responses return after the headers; their latency says
+            # little about the endpoint, so only buffered ones are recorded
+            if not kwargs.get('stream'):
+                resp.wris_seconds = time.monotonic() - started
+                self.latency.record(_endpoint_key(url), resp.wris_seconds)
+                set_attributes(**{"http.response.body.size": len(resp.content)})
+            set_attributes(**{"http.response.status_code": resp.status_code})
+            return resp
+
+    def _hedged_post(self, url, params, **kwargs):
+        """Send the request on this thread; if it outlives the endpoint's p95, send a backup.
+
+        The backup is sent from the hedge pool, under its own scheduler
+        slot and rate-limit token, so hedging never delays a primary or
+        exceeds the limits. A request in flight cannot be abandoned, so the
+        caller still waits for its primary; the backup's answer is used
+        when the primary fails (an error, a 5xx or its timeout).
+        """
+        with self._hedge_lock:
+            self._hedge_counts["requests"] += 1
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                          thread_name_prefix='wris-hedge')
+        delay = self.latency.quantile(_endpoint_key(url), self.hedge_quantile, HEDGE_MIN_SAMPLES)
+        if delay is None:
+            return self._timed_post(url, params, 'primary', **kwargs)
+
+        answered, sent = threading.Event(), threading.Event()
+        # Bound so the backup's spans, session and deadline are the caller's
+        backup = self._hedge_executor.submit(deadline.bind(self._backup_post), url, params, kwargs, delay,
+                                             answered, sent)
+        try:
+            resp = self._timed_post(url, params, 'primary', **kwargs)
+        except requests.exceptions.RequestException:
+            answered.set()
+            if not sent.is_set():
+                raise
+            fallback = self._backup_result(backup)
+            if fallback is None:
+                raise
+            return fallback
+        answered.set()
+        if resp.status_code >= 500 and sent.is_set():
+            fallback = self._backup_result(backup)
+            if fallback is not None:
+                resp.close()
+                return fallback
+        backup.add_done_callback(_close_response)
+        return resp
+
+    def _backup_post(self, url, params, kwargs, delay, answered, sent):
+        if answered.wait(delay) or not self._take_hedge():
+            return None
+        with self._slot():
+            # The primary may have answered while the backup waited for a slot
+            if answered.is_set():
+                return None
+            self._throttle()
+            kwargs = dict(kwargs, timeout=deadline.request_timeout())
+            sent.set()
+            return self._timed_post(url, params, 'backup', **kwargs)
+
+    def _backup_result(self, backup):
+        """The backup's response if it succeeded, else None."""
+        try:
+            resp = backup.result()
+        except Exception:
+            return None
+        if resp is None or resp.status_code >= 500:
+            if resp is not None:
+                resp.close()
+            return None
+        with self._hedge_lock:
+            self._hedge_counts["hedge_wins"] += 1
+        return resp
+
+    def _take_hedge(self):
+        with self._hedge_lock:
+            counts = self._hedge_counts
+            if counts["hedged"] >= self.max_hedge_ratio * counts["requests"]:
+                return False
+            counts["hedged"] += 1
+            return True
+
+    def hedge_stats(self):
+        """Hedging counters and per-endpoint latency quantiles."""
+        with self._hedge_lock:
+            stats = dict(self._hedge_counts)
+        stats["latency"] = self.latency.summary()
+        return stats
 
     def get_admin_hierarchy_data(self, data_type, state_name, district_name, agency_name,
                                  start_date, end_date):
-        # Map data types to endpoints - EXACTLY like your working version
-        endpoint_map = {
-            'rainfall': '/Dataset/RainFall',
-            'ground_water_level': '/Dataset/Ground Water Level',
-            'wind_direction': '/Dataset/Wind Direction',
-            'temperature': '/Dataset/Temperature',
-            'suspended_sediment': '/Dataset/Suspended Sediment',
-            'solar_radiation': '/Dataset/Solar Radiation',
-            'soil_moisture': '/Dataset/Soil Moisture',
-            'snowfall': '/Dataset/SnowFall',
-            'river_water_level': '/Dataset/River Water Level',
-            'river_water_discharge': '/Dataset/River Water Discharge',
-            'reservoir': '/Dataset/Reservoir',
-            'relative_humidity': '/Dataset/Relative Humidity',
-            'evapo_transpiration': '/Dataset/Evapo Transpiration',
-            'atmospheric_pressure': '/Dataset/Atmospheric Pressure'
-        }
-        
-        endpoint = endpoint_map.get(data_type)
+        endpoint = ADMIN_ENDPOINT_MAP.get(data_type)
         if not endpoint:
             return {"status": "error", "error_message": f"Unknown data type: {data_type}"}
-        
+
         # Build URL EXACTLY like your working version
         url = f"{self.base_url}{endpoint}"
-        
+
         # Prepare the query parameters
         params = {
             'stateName': state_name,
@@ -56,12 +283,13 @@ class WRISClient:
         try:
             print(f"Requesting WRIS Admin Data: {url}")
             # Use POST exactly like your working version
-            resp = requests.post(url, headers=self.headers, params=params, data='')
-            
+            resp = self._post(url, params)
+
             print(f"Response Status Code: {resp.status_code}")
-            
+
             if resp.status_code == 200:
-                data = resp.json()
+                with span("wris.decode_json"):
+                    data = resp.json()
                 Logger.info(f"WRIS Admin Data Retrieved: {data}")
                 return {
                     "status": "success",
@@ -73,38 +301,23 @@ class WRISClient:
                     "status": "error",
                     "error_message": f"API request failed with status {resp.status_code}: {resp.text}"
                 }
-                
+
+        except deadline.DeadlineExceeded:
+            return deadline.mark_truncated({"status": "error", "error_message": "Request skipped: deadline exceeded"})
         except requests.exceptions.RequestException as e:
-            return {"status": "error", "error_message": f"API request failed: {e}"}
+            return _deadline_marked({"status": "error", "error_message": f"API request failed: {e}"})
         except Exception as e:
             return {"status": "error", "error_message": f"Exception occurred while fetching data: {str(e)}"}
 
     def get_basin_hierarchy_data(self, data_type, basin_name, tributary_name, agency_name,
                                  start_date, end_date):
-        # Map data types to endpoints - EXACTLY like your working version
-        endpoint_map = {
-            'suspended_sediment': '/Dataset/Basin/Suspended Sediment',
-            'wind_direction': '/Dataset/Basin/Wind Direction',
-            'temperature': '/Dataset/Basin/Temperature',
-            'solar_radiation': '/Dataset/Basin/Solar Radiation',
-            'soil_moisture': '/Dataset/Basin/Soil Moisture',
-            'snowfall': '/Dataset/Basin/SnowFall',
-            'river_water_level': '/Dataset/Basin/River WaterLevel',
-            'river_water_discharge': '/Dataset/Basin/River Water Discharge',
-            'reservoir': '/Dataset/Basin/Reservoir',
-            'relative_humidity': '/Dataset/Basin/Relative Humidity',
-            'rainfall': '/Dataset/Basin/RainFall',
-            'evapo_transpiration': '/Dataset/Basin/Evapo Transpiration',
-            'atmospheric_pressure': '/Dataset/Basin/Atmospheric Pressure'
-        }
-        
-        endpoint = endpoint_map.get(data_type)
+        endpoint = BASIN_ENDPOINT_MAP.get(data_type)
         if not endpoint:
             return {"statusCode": 400, "message": f"Unknown data type: {data_type}", "data": []}
-        
+
         # Build URL EXACTLY like your working version
         url = f"{self.base_url}{endpoint}"
-        
+
         # Prepare the query parameters - same as in your curl example
         params = {
             'basinName': basin_name,
@@ -120,17 +333,18 @@ class WRISClient:
         try:
             print(f"Requesting WRIS Basin Data: {url}")
             print(f"Parameters: {params}")
-            
+
             # Use POST exactly like your curl example
-            resp = requests.post(url, headers=self.headers, params=params, data='')
-            
+            resp = self._post(url, params)
+
             print(f"Response Status Code: {resp.status_code}")
             print(f"Response Headers: {dict(resp.headers)}")
-            
+
             if resp.status_code == 200:
-                data = resp.json()
+                with span("wris.decode_json"):
+                    data = resp.json()
                 print(f"WRIS Basin Data Response: {data}")
-                
+
                 # Return the response as-is since it's already in correct format
                 # {"statusCode": 200, "message": "Data fetched successfully", "data": [...]}
                 if isinstance(data, dict) and 'statusCode' in data:
@@ -148,11 +362,294 @@ class WRISClient:
                     "message": f"API request failed with status {resp.status_code}: {resp.text}",
                     "data": []
                 }
-                
+
+        except deadline.DeadlineExceeded:
+            return deadline.mark_truncated({"statusCode": 504, "message": "Request skipped: deadline exceeded",
+                                            "data": []})
         except requests.exceptions.RequestException as e:
-            return {"statusCode": 500, "message": f"API request failed: {e}", "data": []}
+            return _deadline_marked({"statusCode": 500, "message": f"API request failed: {e}", "data": []})
         except Exception as e:
             return {"statusCode": 500, "message": f"Exception occurred while fetching data: {str(e)}", "data": []}
 
+    # ------------------------------------------------------------------
+    # Bulk export
+    # ------------------------------------------------------------------
+
+    def bulk_export_admin_hierarchy_data(self, data_type, state_name, district_name, agency_name,
+                                         start_date, end_date, dest_dir=None):
+        """Fetch a whole admin-hierarchy window as one DataFrame.
+
+        Uses the server's ``download=true`` variant when the endpoint supports it
+        and falls back to concurrent paginated JSON otherwise. The returned
+        ``data`` DataFrame has the same columns ``WRISDataProcessor.to_dataframe``
+        produces for the JSON API. If the current deadline runs out part way,
+        the records received so far are returned with ``truncated`` set.
+        """
+        endpoint = ADMIN_ENDPOINT_MAP.get(data_type)
+        if not endpoint:
+            return {"status": "error", "error_message": f"Unknown data type: {data_type}"}
+        params = {
+            'stateName': state_name,
+            'districtName': district_name,
+            'agencyName': agency_name,
+            'startdate': start_date,
+            'enddate': end_date,
+        }
+        return self._bulk_export(endpoint, params, dest_dir)
+
+    def bulk_export_basin_hierarchy_data(self, data_type, basin_name, tributary_name, agency_name,
+                                         start_date, end_date, dest_dir=None):
+        """Basin-hierarchy counterpart of ``bulk_export_admin_hierarchy_data``."""
+        endpoint = BASIN_ENDPOINT_MAP.get(data_type)
+        if not endpoint:
+            return {"status": "error", "error_message": f"Unknown data type: {data_type}"}
+        params = {
+            'basinName': basin_name,
+            'tributaryName': tributary_name,
+            'agencyName': agency_name,
+            'startdate': start_date,
+            'enddate': end_date,
+        }
+        return self._bulk_export(endpoint, params, dest_dir)
+
+    def _bulk_export(self, endpoint, params, dest_dir):
+        url = f"{self.base_url}{endpoint}"
+        try:
+            with span("wris.bulk_export", **{"url.path": endpoint}):
+                if endpoint not in self._download_unsupported:
+                    try:
+                        downloaded = self._download_to_dataframe(url, params, dest_dir)
+                    except _DownloadUnsupported:
+                        # Only a successful non-file answer is remembered
+                        self._download_unsupported.add(endpoint)
+                        Logger.info("Download not supported for %s, falling back to paginated JSON", endpoint)
+                        downloaded = None
+                    except requests.exceptions.RequestException as exc:
+                        if deadline.expired():
+                            raise
+                        Logger.info("Download from %s failed (%s), falling back to paginated JSON", endpoint, exc)
+                        downloaded = None
+                    if downloaded is not None:
+                        df, truncated = downloaded
+                        set_attributes(**{"wris.mode": "download", "wris.records": len(df)})
+                        return _export_result(df, "download", truncated)
+
+                records, truncated = self._fetch_all_pages(url, params)
+                df = default_processor.to_dataframe({"data": {"content": records}})
+                set_attributes(**{"wris.mode": "paginated", "wris.records": len(df)})
+                return _export_result(df, "paginated", truncated)
+
+        except deadline.DeadlineExceeded:
+            return deadline.mark_truncated({"status": "error", "error_message": "Export stopped: deadline exceeded"})
+        except requests.exceptions.RequestException as e:
+            return _deadline_marked({"status": "error", "error_message": f"API request failed: {e}"})
+        except Exception as e:
+            return {"status": "error", "error_message": f"Exception occurred while exporting data: {str(e)}"}
+
+    def _download_to_dataframe(self, url, params, dest_dir):
+        """Stream a download response to a temporary file and parse it.
+
+        Returns ``(df, truncated)``, or ``None`` when this response is not a
+        file (an error status or an unknown content type). Raises
+        `_DownloadUnsupported` when the endpoint answers with JSON or HTML.
+        When the deadline expires mid-stream, the rows received so far (up
+        to the last complete line) are parsed.
+        """
+        download_params = dict(params, download='true')
+        Logger.debug("Requesting WRIS Download: %s?%s", url, urlencode(download_params))
+        with span("wris.download"), self._slot(), self._post(url, download_params, stream=True) as resp:
+            content_type = resp.headers.get('Content-Type', '')
+            if resp.status_code != 200:
+                return None
+            if 'json' in content_type or 'html' in content_type:
+                raise _DownloadUnsupported(content_type)
+            if 'csv' not in content_type and 'text/plain' not in content_type \
+                    and 'octet-stream' not in content_type:
+                return None
+
+            fd, path = tempfile.mkstemp(suffix='.csv', dir=dest_dir)
+            try:
+                truncated = False
+                written = complete = 0
+                with os.fdopen(fd, 'wb') as fh:
+                    try:
+                        for chunk in resp.iter_content(chunk_size=self.download_chunk_size):
+                            if chunk:
+                                fh.write(chunk)
+                                newline = chunk.rfind(b'\n')
+                                if newline >= 0:
+                                    complete = written + newline + 1
+                                written += len(chunk)
+                            if deadline.expired():
+                                truncated = True
+                                break
+                    except requests.exceptions.RequestException:
+                        if not deadline.expired():
+                            raise
+                        truncated = True
+                    if truncated:
+                        fh.truncate(complete)
+                set_attributes(**{"wris.bytes": written, "wris.truncated": truncated})
+                if truncated and complete == 0:
+                    return pd.DataFrame(), True
+                with span("wris.parse_csv"):
+                    return _read_columnar(path), truncated
+            finally:
+                os.unlink(path)
+
+    def _fetch_page(self, url, params, page, size):
+        with span("wris.page", **{"wris.page": page}):
+            try:
+                resp = self._post(url, dict(params, download='false', page=page, size=size))
+                resp.raise_for_status()
+            except requests.exceptions.RequestException as exc:
+                if _server_side(exc) and not deadline.expired():
+                    self._observe(url, 'bulk', size, 0, None, error=True)
+                raise
+            with span("wris.decode_json"):
+                body = resp.json()
+            self._observe(url, 'bulk', size, len(_page_records(body)), resp.wris_seconds)
+            return body
+
+    def _bulk_size(self, url):
+        return self._page_size(url, 'bulk', BULK_PAGE_SIZE, MIN_BULK_PAGE_SIZE, MAX_BULK_PAGE_SIZE)
+
+    def _fetch_all_pages(self, url, params, size=None):
+        """Fetch every page of a paginated JSON endpoint, several pages at a time.
+
+        Returns ``(records, truncated)``; ``truncated`` is set when the
+        current deadline expired before every page arrived. Without an
+        explicit `size`, the page tuner's size for the endpoint is used; if
+        the first page fails server-side, it is retried at the smaller size
+        the tuner falls back to.
+        """
+        tuned = size is None
+        size = size or self._bulk_size(url)
+        while True:
+            try:
+                first = self._fetch_page(url, params, 0, size)
+                break
+            except requests.exceptions.RequestException as exc:
+                smaller = self._bulk_size(url) if tuned else size
+                if not _server_side(exc) or deadline.expired() or smaller >= size:
+                    raise
+                Logger.info("Page size %d failed for %s (%s); retrying with %d", size, url, exc, smaller)
+                size = smaller
+        records = list(_page_records(first))
+        total_pages = _page_count(first, size)
+        set_attributes(**{"wris.pages": total_pages})
+        fetch = deadline.bind(lambda p: self._fetch_page(url, params, p, size))
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            if total_pages is not None:
+                bodies, truncated = _gather(pool, fetch, range(1, total_pages))
+                for body in bodies:
+                    records.extend(_page_records(body))
+                return records, truncated
+
+            # No page count in the response (basin endpoints): fetch in waves
+            # until a page comes back short.
+            next_page = 1
+            last_len = len(records)
+            while last_len >= size:
+                bodies, truncated = _gather(pool, fetch, range(next_page, next_page + self.max_workers))
+                for body in bodies:
+                    page_records = _page_records(body)
+                    records.extend(page_records)
+                    last_len = len(page_records)
+                    if last_len < size:
+                        break
+                if truncated:
+                    return records, True
+                next_page += self.max_workers
+            return records, False
+        finally:
+            # Pages still queued when the deadline hit are cancelled; running
+            # ones are bounded by their own request timeout
+            pool.shutdown(wait=not deadline.expired(), cancel_futures=True)
+
+
+def _gather(pool, fetch, pages):
+    """Run `fetch` over `pages` on `pool` until done or the deadline expires.
+
+    Returns (bodies of the leading pages that completed, in page order,
+    truncated). Page errors are re-raised unless the deadline caused them.
+    """
+    futures = [pool.submit(fetch, p) for p in pages]
+    done, _ = wait(futures, timeout=deadline.remaining())
+    bodies = []
+    for future in futures:
+        if future not in done:
+            break
+        error = future.exception()
+        if error is not None:
+            if deadline.expired() or isinstance(error, deadline.DeadlineExceeded):
+                break
+            raise error
+        bodies.append(future.result())
+    truncated = len(bodies) < len(futures)
+    if truncated:
+        for future in futures:
+            future.cancel()
+    return bodies, truncated
+
+
+def _server_side(exc):
+    # Failures a smaller page could avoid: timeouts, dropped connections, 5xx
+    if isinstance(exc, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return True
+    response = getattr(exc, 'response', None)
+    return response is not None and response.status_code >= 500
+
+
+def _endpoint_key(url):
+    return urlparse(url).path
+
+
+def _close_response(future):
+    if not future.cancelled() and future.exception() is None and future.result() is not None:
+        future.result().close()
+
+
+def _deadline_marked(result):
+    # A request that failed because the budget ran out is a truncation,
+    # not an upstream error
+    return deadline.mark_truncated(result) if deadline.expired() else result
+
+
+def _export_result(df, mode, truncated):
+    result = {"status": "success", "data": df, "total_records": len(df), "mode": mode}
+    if truncated:
+        deadline.mark_truncated(result)
+    return result
+
+
+def _page_records(body):
+    # Admin endpoints return a Spring page ({"content": [...]}); basin
+    # endpoints return {"statusCode", "message", "data": [...]}.
+    if isinstance(body, dict):
+        if isinstance(body.get('content'), list):
+            return body['content']
+        if isinstance(body.get('data'), list):
+            return body['data']
+    if isinstance(body, list):
+        return body
+    return []
+
+
+def _page_count(body, size):
+    if not isinstance(body, dict):
+        return None
+    if 'totalPages' in body:
+        return int(body['totalPages'])
+    if 'totalElements' in body:
+        return math.ceil(int(body['totalElements']) / size)
+    return None
+
+
 # Use singleton pattern for module-wide client
-default_client = WRISClient()
\ No newline at end of file
+default_client = WRISClient(base_url=os.environ.get('WRIS_BASE_URL', 'https://indiawris.gov.in'),
+                            hedge=os.environ.get('WRIS_HEDGE_REQUESTS', '').lower() in ('1', 'true', 'yes'),
+                            scheduler=default_scheduler, rate_limiter=default_rate_limiter,
+                            page_tuner=default_page_tuner)
@@ -0,0 +1,42 @@
+import os
+
+os.environ.setdefault('WRIS_PREFETCH', '0')
+
+import pytest
+
+from ingress_agent.tools.answer_cache import AnswerCache, parse_question, question_key
+
+PUNE_JANUARY = ('fetch', 'admin', 'rainfall', 'maharashtra', 'pune', '*', '2024-01-01', '2024-01-31')
+PLAIN = 'rainfall Pune Jan 2024'
+
+
+@pytest.mark.parametrize('question', [
+    PLAIN,
+    'how much did it rain in Pune in January 2024',
+    'What was the rainfall in Pune district, Maharashtra in Jan 2024?',
+])
+def test_paraphrases_share_the_plain_question_key(question):
+    assert parse_question(question) == PUNE_JANUARY
+    assert question_key(question) == question_key(PLAIN)
+
+
+@pytest.mark.parametrize('question', [
+    'which station had the highest rainfall in Pune in January 2024',
+    'how many stations reported rainfall in Pune in January 2024',
+    'is rainfall data available for Pune in January 2024',
+    'rainfall in Pune in January 2024 in inches',
+    'rainfall trend in Pune in 2024',
+])
+def test_other_questions_about_the_same_fetch_are_keyed_by_text(question):
+    assert parse_question(question) is None
+    assert question_key(question) == ('text', question.lower())
+
+
+def test_answer_to_a_plain_question_is_not_served_to_a_different_one():
+    cache = AnswerCache()
+    cache.store_answer(question_key(PLAIN), [PUNE_JANUARY], 'Pune received 3.2 mm in January 2024.')
+
+    assert cache.lookup_answer(question_key('how much did it rain in Pune in January 2024'), [PUNE_JANUARY]) \
+        == 'Pune received 3.2 mm in January 2024.'
+    assert cache.lookup_answer(question_key('which station had the highest rainfall in Pune in January 2024'),
+                               [PUNE_JANUARY]) is None
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingress_agent.tools.admin_hierarchy_tools import _classify_rainfall
+from ingress_agent.utils.classification import (
+    RAINFALL_LABELS, classify_groundwater_stage, classify_rainfall, rainfall_codes,
+)
+from ingress_agent.utils.record_batch import RecordBatch
+
+
+@pytest.mark.parametrize('total, label', [
+    (0.0, 'No Rain'), (0.05, 'No Rain'),
+    (0.1, 'Very Light'), (2.4, 'Very Light'),
+    (2.5, 'Light'), (2.4999999, 'Light'), (15.5, 'Light'),
+    (15.6, 'Moderate'), (64.4, 'Moderate'),
+    (64.5, 'Heavy'), (115.5, 'Heavy'),
+    (115.6, 'Very Heavy'), (204.4, 'Very Heavy'),
+    (204.5, 'Extremely Heavy'), (500.0, 'Extremely Heavy'),
+])
+def test_daily_totals_fall_in_imd_bands(total, label):
+    assert RAINFALL_LABELS[rainfall_codes([total])[0]] == label
+
+
+def test_missing_total_is_unclassified():
+    assert list(rainfall_codes([np.nan, 1.0])) == [-1, 1]
+
+
+def test_readings_are_summed_per_station_day_before_classifying():
+    tidy = pd.DataFrame({
+        'station': ['a', 'a', 'a', 'b'],
+        'time': pd.to_datetime(['2020-07-01 03:00', '2020-07-01 15:00', '2020-07-02 09:00', '2020-07-01 09:00']),
+        'value': [1.5, 1.5, 0.0, 70.0],
+        'district': ['D1', 'D1', 'D1', 'D2'],
+    })
+    result = classify_rainfall(tidy, group='district')
+
+    assert result['station_days'] == 3
+    assert result['counts']['Light'] == 1          # a on 1 July: 3.0 mm over two readings
+    assert result['counts']['No Rain'] == 1
+    assert result['counts']['Heavy'] == 1
+    assert result['wettest'] == {'station': 'b', 'day': '2020-07-01', 'total_mm': 70.0}
+    assert result['groups']['D1']['counts']['Light'] == 1
+    assert result['groups']['D2']['counts']['Heavy'] == 1
+
+
+def test_groundwater_stage_limits_are_inclusive_upper_bounds():
+    result = classify_groundwater_stage([45.0, 70.0, 70.5, 90.0, 100.0, 100.5, np.nan],
+                                        groups=['D1', 'D1', 'D1', 'D2', 'D2', 'D2', 'D2'])
+
+    assert result['categories'] == ['SAFE', 'SAFE', 'SEMI_CRITICAL', 'SEMI_CRITICAL', 'CRITICAL',
+                                    'OVER_EXPLOITED', 'Unknown']
+    assert result['total'] == 6
+    assert result['groups']['D1']['counts'] == {'SAFE': 2, 'SEMI_CRITICAL': 1, 'CRITICAL': 0, 'OVER_EXPLOITED': 0}
+
+
+def test_page_intensity_is_marked_as_a_sample_of_the_period():
+    batch = RecordBatch.from_records([
+        {'stationCode': 'a', 'dataTime': '2020-07-01T09:00:00', 'dataValue': 20.0},
+        {'stationCode': 'a', 'dataTime': '2020-07-02T09:00:00', 'dataValue': 0.0},
+    ])
+    stats = {'value_column': 'dataValue'}
+
+    partial = {'total_records': 40}
+    _classify_rainfall(partial, batch, stats)
+    assert partial['rainfall_intensity']['sample'] is True
+    assert '2 returned records of 40' in partial['rainfall_intensity']['note']
+
+    complete = {'total_records': 2}
+    _classify_rainfall(complete, batch, stats)
+    assert complete['rainfall_intensity']['sample'] is False
+    assert complete['rainfall_intensity']['counts']['Moderate'] == 1
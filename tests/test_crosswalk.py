@@ -0,0 +1,70 @@
+import os
+
+os.environ.setdefault('WRIS_PREFETCH', '0')
+
+import pandas as pd
+import pytest
+
+from ingress_agent.tools import common
+from ingress_agent.utils.crosswalk import StationCrosswalk
+from ingress_agent.utils.rollups import RollupStore
+from ingress_agent.utils.series_store import SeriesStore
+
+DATA_TYPE = 'ground_water_level'
+AGENCY = 'CGWB'
+# Tributary T drains two districts, one station in each
+DISTRICTS = {('State', 'D1'): ['s1'], ('State', 'D2'): ['s2']}
+TRIBUTARY = ('Basin', 'T')
+
+
+@pytest.fixture
+def exports(tmp_path, monkeypatch):
+    monkeypatch.setattr(common, 'default_crosswalk', StationCrosswalk(path=str(tmp_path / 'crosswalk.json')))
+    monkeypatch.setattr(common, 'default_series_store', SeriesStore(directory=str(tmp_path / 'series')))
+    monkeypatch.setattr(common, 'default_rollups', RollupStore(directory=str(tmp_path / 'rollups')))
+    common.default_cache.invalidate()
+    calls = []
+
+    def bulk_export(hierarchy, data_type, location, agency_name, start_date, end_date):
+        calls.append((hierarchy, tuple(location), start_date, end_date))
+        if hierarchy == common.ADMIN:
+            places = [(station, tuple(location)) for station in DISTRICTS[tuple(location)]]
+        else:
+            places = [(station, district) for district, stations in DISTRICTS.items() for station in stations]
+        rows = [{'stationCode': station, 'dataTime': when.strftime('%Y-%m-%dT%H:%M:%S'), 'dataValue': 5.0,
+                 'stateName': district[0], 'districtName': district[1],
+                 'basinName': TRIBUTARY[0], 'tributaryName': TRIBUTARY[1]}
+                for station, district in places for when in pd.date_range(start_date, end_date, freq='7D')]
+        return {'status': 'success', 'data': pd.DataFrame(rows), 'mode': 'test'}
+
+    monkeypatch.setattr(common, '_bulk_export', bulk_export)
+    yield calls
+    common.default_cache.invalidate()
+
+
+def _stations(batch):
+    return sorted(set(batch.to_dataframe()['stationCode']))
+
+
+def test_district_records_do_not_define_tributary_stations(exports):
+    common.fetch_series(common.ADMIN, DATA_TYPE, ('State', 'D1'), AGENCY, '2020-01-01', '2020-12-31')
+    exports.clear()
+
+    envelope, batch = common.fetch_series(common.BASIN, DATA_TYPE, TRIBUTARY, AGENCY, '2020-01-01', '2020-12-31')
+
+    assert envelope['mode'] != 'crosswalk'
+    assert exports == [(common.BASIN, TRIBUTARY, '2020-01-01', '2020-12-31')]
+    assert _stations(batch) == ['s1', 's2']
+
+
+def test_tributary_assembled_from_its_districts(exports):
+    for district in DISTRICTS:
+        common.fetch_series(common.ADMIN, DATA_TYPE, district, AGENCY, '2020-01-01', '2020-12-31')
+    common.fetch_series(common.BASIN, DATA_TYPE, TRIBUTARY, AGENCY, '2020-01-01', '2020-03-31')
+    exports.clear()
+
+    envelope, batch = common.fetch_series(common.BASIN, DATA_TYPE, TRIBUTARY, AGENCY, '2020-02-01', '2020-12-31')
+
+    assert envelope['mode'] == 'crosswalk'
+    assert exports == []
+    assert _stations(batch) == ['s1', 's2']
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from ingress_agent.utils.data_quality import assess_quality
+
+
+def _frame(values, times=None, station='s1'):
+    times = pd.date_range('2020-01-01', periods=len(values), freq='D') if times is None else times
+    return pd.DataFrame({'stationCode': station, 'dataTime': times, 'dataValue': values})
+
+
+def _flagged(report, flag):
+    return list(np.flatnonzero(report.flags[flag].to_numpy()))
+
+
+def test_range_and_missing_values_are_flagged_and_invalid():
+    report = assess_quality(_frame([1.0, -5.0, None, 20000.0, 3.0]), 'rainfall')
+
+    assert _flagged(report, 'range') == [1, 3]
+    assert _flagged(report, 'missing') == [2]
+    assert list(report.valid) == [True, False, False, False, True]
+    assert report.summary()['valid_rows'] == 2
+
+
+def test_repeated_timestamp_is_a_duplicate_but_unparseable_ones_are_not():
+    df = pd.DataFrame({'stationCode': 's1', 'dataValue': [1.0, 2.0, 3.0, 4.0, 5.0],
+                       'dataTime': ['2020-01-01', '2020-01-02', '2020-01-02', 'n/a', 'n/a']})
+    report = assess_quality(df, 'temperature')
+
+    assert _flagged(report, 'duplicate') == [2]
+    assert _flagged(report, 'unparseable') == [3, 4]
+    assert report.summary()['flag_counts']['unparseable'] == 2
+
+
+def test_isolated_jump_is_a_spike_and_a_level_shift_is_not():
+    values = [10.0, 10.2, 10.1, 10.3, 30.0, 10.2, 10.1, 10.2, 10.0, 10.1]
+    assert _flagged(assess_quality(_frame(values), 'temperature'), 'spike') == [4]
+
+    shifted = [10.0, 10.2, 10.1, 10.3, 30.0, 30.2, 30.1, 30.2, 30.0, 30.1]
+    assert _flagged(assess_quality(_frame(shifted), 'temperature'), 'spike') == []
+
+
+def test_flatline_length_depends_on_data_type_and_sampling_interval():
+    # Six identical daily temperatures are a stuck sensor
+    daily = np.r_[np.arange(10.0), np.full(6, 3.5), np.arange(4.0)]
+    assert len(_flagged(assess_quality(_frame(daily), 'temperature'), 'flatline')) == 6
+
+    # A river level held for a day of hourly readings is ordinary; for four days it is not
+    hours = pd.date_range('2020-01-01', periods=24 * 6, freq='h')
+    steady_day = np.r_[np.linspace(9.0, 10.0, 24), np.full(24, 10.0), np.linspace(10.0, 11.0, 96)]
+    assert _flagged(assess_quality(_frame(steady_day, hours), 'river_water_level'), 'flatline') == []
+    stuck = np.r_[np.linspace(9.0, 10.0, 24), np.full(120, 10.5)]
+    assert len(_flagged(assess_quality(_frame(stuck, hours), 'river_water_level'), 'flatline')) == 120
+
+    # Dry days are not a flatline for rainfall
+    dry = np.r_[np.zeros(20), [4.0, 2.0]]
+    assert _flagged(assess_quality(_frame(dry), 'rainfall'), 'flatline') == []
+
+
+def test_gaps_lower_completeness_and_the_station_score():
+    times = pd.to_datetime(['2020-01-01', '2020-01-02', '2020-01-03', '2020-01-04', '2020-01-10'])
+    df = pd.concat([_frame([1.0, 2.0, 3.0, 4.0, 5.0], times, 'gappy'),
+                    _frame([1.0, 2.0, 3.0, 4.0, 5.0], station='complete')])
+    stations = assess_quality(df, 'temperature').stations
+
+    assert stations.loc['gappy', 'gaps'] == 1
+    assert stations.loc['gappy', 'completeness'] == 0.5
+    assert stations.loc['gappy', 'score'] == 50.0
+    assert stations.loc['complete', 'score'] == 100.0
+
+
+def test_checks_are_per_station():
+    # The same timestamps at two stations are not duplicates
+    times = pd.date_range('2020-01-01', periods=3, freq='D')
+    df = pd.concat([_frame([1.0, 2.0, 3.0], times, 'a'), _frame([1.0, 2.0, 3.0], times, 'b')])
+    report = assess_quality(df, 'temperature')
+
+    assert report.valid.all()
+    assert report.score == 100.0
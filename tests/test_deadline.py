@@ -0,0 +1,85 @@
+import os
+
+os.environ.setdefault('WRIS_PREFETCH', '0')
+
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+import pandas as pd
+import pytest
+
+from ingress_agent.tools import common
+from ingress_agent.utils import deadline
+from ingress_agent.utils.crosswalk import StationCrosswalk
+from ingress_agent.utils.rollups import RollupStore
+from ingress_agent.utils.series_store import SeriesStore
+
+
+def test_tool_out_of_time_returns_a_truncated_error():
+    def slow_tool():
+        time.sleep(0.05)
+        deadline.request_timeout()      # as the client does before each request
+
+    result = deadline.budgeted(slow_tool, seconds=0.01)()
+
+    assert result['status'] == 'error'
+    assert result['truncated'] is True
+    assert result['truncation_reason'] == deadline.TRUNCATED_BY_DEADLINE
+
+
+def test_a_truncated_sub_result_in_a_pool_marks_the_whole_result():
+    def part(i):
+        return deadline.mark_truncated({'part': i}) if i == 2 else {'part': i}
+
+    def tool():
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            parts = list(pool.map(deadline.bind(part), range(4)))
+        return {'status': 'success', 'parts': parts}
+
+    result = deadline.budgeted(tool, seconds=5)()
+
+    assert result['status'] == 'success'
+    assert result['truncated'] is True
+    assert deadline.budgeted(lambda: {'status': 'success'}, seconds=5)().get('truncated') is None
+
+
+def test_inner_deadline_never_outlasts_the_enclosing_one():
+    with deadline.deadline(0.5) as outer:
+        with deadline.deadline(60) as inner:
+            assert inner is outer
+            assert deadline.remaining() <= 0.5
+        with deadline.deadline(0.1):
+            assert deadline.remaining() <= 0.1
+
+
+@pytest.fixture
+def exports(tmp_path, monkeypatch):
+    monkeypatch.setattr(common, 'default_crosswalk', StationCrosswalk(path=str(tmp_path / 'crosswalk.json')))
+    monkeypatch.setattr(common, 'default_series_store', SeriesStore(directory=str(tmp_path / 'series')))
+    monkeypatch.setattr(common, 'default_rollups', RollupStore(directory=str(tmp_path / 'rollups')))
+    common.default_cache.invalidate()
+    calls = []
+
+    def bulk_export(hierarchy, data_type, location, agency_name, start_date, end_date):
+        calls.append(start_date)
+        rows = pd.DataFrame({'stationCode': 's1', 'dataValue': 1.0,
+                             'dataTime': pd.date_range(start_date, end_date, freq='D').strftime('%Y-%m-%d')})
+        result = {'status': 'success', 'data': rows, 'mode': 'test'}
+        # The first export is cut short by the deadline
+        return deadline.mark_truncated(result) if len(calls) == 1 else result
+
+    monkeypatch.setattr(common, '_bulk_export', bulk_export)
+    yield calls
+    common.default_cache.invalidate()
+
+
+def test_truncated_export_is_returned_marked_but_never_kept(exports):
+    location = ('State', 'D1')
+    envelope, batch = common.fetch_series(common.ADMIN, 'rainfall', location, 'IMD', '2020-01-01', '2020-01-31')
+    assert envelope['truncated'] is True
+    assert len(batch) == 31
+    assert not common.default_rollups.covers('rainfall', common.ADMIN, location, 'IMD', '2020-01-01', '2020-01-31')
+
+    envelope, _ = common.fetch_series(common.ADMIN, 'rainfall', location, 'IMD', '2020-01-01', '2020-01-31')
+    assert 'truncated' not in envelope
+    assert len(exports) == 2
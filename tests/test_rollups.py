@@ -0,0 +1,90 @@
+import os
+
+os.environ.setdefault('WRIS_PREFETCH', '0')
+
+import pandas as pd
+import pytest
+
+from ingress_agent.tools import common
+from ingress_agent.utils.crosswalk import StationCrosswalk
+from ingress_agent.utils.rollups import RollupStore
+from ingress_agent.utils.series_store import SeriesStore
+
+DATA_TYPE = 'rainfall'
+LOCATION = ('State', 'D1')
+AGENCY = 'IMD'
+
+
+def _readings(start, end, stations=('s1', 's2'), value=1.0):
+    return pd.DataFrame([{'stationCode': station, 'dataTime': when.strftime('%Y-%m-%dT%H:%M:%S'), 'dataValue': value}
+                         for station in stations for when in pd.date_range(start, end, freq='D')])
+
+
+def _total(store, grain='month'):
+    rows = store.query(DATA_TYPE, grain, region=LOCATION[0], sub_region=LOCATION[1])
+    return int(rows['count'].sum()) if len(rows) else 0
+
+
+def test_overlapping_windows_count_each_reading_once(tmp_path):
+    store = RollupStore(directory=str(tmp_path), autoload=False)
+    assert store.ingest(DATA_TYPE, common.ADMIN, LOCATION, AGENCY, _readings('2020-01-01', '2020-01-31'),
+                        '2020-01-01', '2020-01-31') == 62
+    # Overlaps January; only February is new
+    assert store.ingest(DATA_TYPE, common.ADMIN, LOCATION, AGENCY, _readings('2020-01-15', '2020-02-29'),
+                        '2020-01-15', '2020-02-29') == 58
+    assert store.ingest(DATA_TYPE, common.ADMIN, LOCATION, AGENCY, _readings('2020-01-01', '2020-02-29'),
+                        '2020-01-01', '2020-02-29') == 0
+
+    assert _total(store) == 120
+    assert _total(store, 'day') == 120
+    january = store.query(DATA_TYPE, 'month', start='2020-01-01', end='2020-01-01')
+    assert january['station_periods'].sum() == 2
+    assert store.covers(DATA_TYPE, common.ADMIN, LOCATION, AGENCY, '2020-01-10', '2020-02-20')
+    assert not store.covers(DATA_TYPE, common.ADMIN, LOCATION, AGENCY, '2020-01-10', '2020-03-01')
+
+
+def test_saves_from_two_processes_merge_without_double_counting(tmp_path):
+    first = RollupStore(directory=str(tmp_path), autoload=False)
+    second = RollupStore(directory=str(tmp_path), autoload=False)
+    first.ingest(DATA_TYPE, common.ADMIN, LOCATION, AGENCY, _readings('2020-01-01', '2020-01-31'),
+                 '2020-01-01', '2020-01-31')
+    second.ingest(DATA_TYPE, common.ADMIN, LOCATION, AGENCY, _readings('2020-01-01', '2020-02-29'),
+                  '2020-01-01', '2020-02-29')
+    second.ingest(DATA_TYPE, common.ADMIN, ('State', 'D2'), AGENCY, _readings('2020-01-01', '2020-01-31'),
+                  '2020-01-01', '2020-01-31')
+    second.save()
+    first.save()
+
+    reloaded = RollupStore(directory=str(tmp_path))
+    # The wider D1 copy replaced the narrower one; D2 came along
+    assert _total(reloaded) == 120
+    assert reloaded.covers(DATA_TYPE, common.ADMIN, LOCATION, AGENCY, '2020-01-01', '2020-02-29')
+    assert reloaded.covers(DATA_TYPE, common.ADMIN, ('State', 'D2'), AGENCY, '2020-01-01', '2020-01-31')
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(common, 'default_crosswalk', StationCrosswalk(path=str(tmp_path / 'crosswalk.json')))
+    monkeypatch.setattr(common, 'default_series_store', SeriesStore(directory=str(tmp_path / 'series')))
+    monkeypatch.setattr(common, 'default_rollups', RollupStore(directory=str(tmp_path / 'rollups')))
+    monkeypatch.setattr(common, '_bulk_export', lambda hierarchy, data_type, location, agency, start, end: {
+        'status': 'success', 'data': _readings(start, end), 'mode': 'test'})
+    common.default_cache.invalidate()
+    yield monkeypatch
+    common.default_cache.invalidate()
+
+
+@pytest.mark.parametrize('source', ['cache', 'series_store'])
+def test_windows_answered_without_an_export_still_feed_the_rollups(stores, tmp_path, source):
+    common.fetch_series(common.ADMIN, DATA_TYPE, LOCATION, AGENCY, '2020-01-01', '2020-01-31')
+    # Another worker's rollups: the window is in the shared cache (or the series store), not in them
+    other = RollupStore(directory=str(tmp_path / 'other'), autoload=False)
+    stores.setattr(common, 'default_rollups', other)
+    if source == 'series_store':
+        common.default_cache.invalidate()
+
+    envelope, _ = common.fetch_series(common.ADMIN, DATA_TYPE, LOCATION, AGENCY, '2020-01-01', '2020-01-31')
+
+    assert envelope['status'] == 'success'
+    assert other.covers(DATA_TYPE, common.ADMIN, LOCATION, AGENCY, '2020-01-01', '2020-01-31')
+    assert _total(other) == 62
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from ingress_agent.utils import deadline
+from ingress_agent.utils.scheduler import BATCH, INTERACTIVE, FairScheduler
+
+
+def _queued(scheduler):
+    return sum(scheduler.metrics()['queue_depth'].values())
+
+
+def _enqueue(scheduler, session, priority, granted):
+    """Queue one request on a thread; it records its grant and releases at once."""
+    before = _queued(scheduler)
+
+    def run():
+        scheduler.acquire(session, priority)
+        granted.append(session)
+        scheduler.release(session)
+
+    threading.Thread(target=run, daemon=True).start()
+    while _queued(scheduler) == before:
+        time.sleep(0.001)
+
+
+def _drain(scheduler, granted, count):
+    scheduler.release('holder')
+    started = time.monotonic()
+    while len(granted) < count and time.monotonic() - started < 5:
+        time.sleep(0.001)
+    return granted
+
+
+def test_interactive_request_overtakes_queued_batch_work():
+    scheduler = FairScheduler(max_concurrency=1)
+    scheduler.acquire('holder', INTERACTIVE)
+    granted = []
+    for _ in range(3):
+        _enqueue(scheduler, 'batch', BATCH, granted)
+    _enqueue(scheduler, 'question', INTERACTIVE, granted)
+
+    assert _drain(scheduler, granted, 4) == ['question', 'batch', 'batch', 'batch']
+
+
+def test_sessions_at_one_priority_take_turns():
+    scheduler = FairScheduler(max_concurrency=1)
+    scheduler.acquire('holder', INTERACTIVE)
+    granted = []
+    for session in ('a', 'a', 'a', 'b', 'b', 'b'):
+        _enqueue(scheduler, session, BATCH, granted)
+
+    assert _drain(scheduler, granted, 6) == ['a', 'b', 'a', 'b', 'a', 'b']
+
+
+def test_a_session_at_its_limit_does_not_block_others():
+    scheduler = FairScheduler(max_concurrency=3, session_limit=1)
+    scheduler.acquire('a', INTERACTIVE)
+    granted = []
+    _enqueue(scheduler, 'a', INTERACTIVE, granted)
+    scheduler.acquire('b', INTERACTIVE)
+
+    assert granted == []
+    assert scheduler.metrics()['in_flight'] == 2
+    scheduler.release('a')
+    started = time.monotonic()
+    while not granted and time.monotonic() - started < 5:
+        time.sleep(0.001)
+    assert granted == ['a']
+
+
+def test_waiting_past_the_deadline_raises_and_is_counted():
+    scheduler = FairScheduler(max_concurrency=1)
+    scheduler.acquire('holder', INTERACTIVE)
+    with deadline.deadline(0.05), pytest.raises(deadline.DeadlineExceeded):
+        scheduler.acquire('late', BATCH)
+
+    metrics = scheduler.metrics()
+    assert metrics['deadline_timeouts'][BATCH] == 1
+    assert metrics['queue_depth'][BATCH] == 0
+    # The cancelled waiter is skipped, not granted
+    scheduler.release('holder')
+    assert scheduler.metrics()['in_flight'] == 0
@@ -0,0 +1,94 @@
+import numpy as np
+import pandas as pd
+
+from ingress_agent.utils.series_store import SeriesStore
+
+DATA_TYPE = 'river_water_level'
+HIERARCHY = 'admin'
+AGENCY = 'CWC'
+
+
+def _readings(start, end, stations=('s1',), value=1.0, remark='ok'):
+    rows = []
+    for station in stations:
+        for i, when in enumerate(pd.date_range(start, end, freq='D')):
+            rows.append({'stationCode': station, 'stationName': f"Station {station}",
+                         'dataTime': when.strftime('%Y-%m-%dT%H:%M:%S'), 'dataValue': value + i,
+                         'remark': f"{remark}{i % 2}"})
+    return pd.DataFrame(rows)
+
+
+def _ingest(store, location, df, start, end):
+    return store.ingest(DATA_TYPE, HIERARCHY, location, AGENCY, df, start, end)
+
+
+def test_overlapping_windows_merge_sorted_and_the_newer_fetch_wins(tmp_path):
+    store = SeriesStore(directory=str(tmp_path), autoload=False)
+    assert _ingest(store, ('State', 'D1'), _readings('2020-01-11', '2020-01-20', value=100.0),
+                   '2020-01-11', '2020-01-20') == 10
+    assert _ingest(store, ('State', 'D1'), _readings('2020-01-01', '2020-01-15'), '2020-01-01', '2020-01-15') == 10
+
+    times, values = store.slice(DATA_TYPE, 's1')
+    assert len(times) == 20
+    assert np.all(np.diff(times) > 0)
+    # 11-15 January came again in the later fetch, starting at 11.0
+    assert list(values[10:16]) == [11.0, 12.0, 13.0, 14.0, 15.0, 105.0]
+
+    assert store.covers(DATA_TYPE, HIERARCHY, ('State', 'D1'), AGENCY, '2020-01-03', '2020-01-18')
+    batch = store.window(DATA_TYPE, HIERARCHY, ('State', 'D1'), AGENCY, '2020-01-01', '2020-01-02')
+    assert batch.to_records() == [
+        {'stationCode': 's1', 'stationName': 'Station s1', 'dataTime': '2020-01-01T00:00:00', 'dataValue': 1.0,
+         'remark': 'ok0'},
+        {'stationCode': 's1', 'stationName': 'Station s1', 'dataTime': '2020-01-02T00:00:00', 'dataValue': 2.0,
+         'remark': 'ok1'},
+    ]
+
+
+def test_least_recently_used_series_are_evicted_with_their_coverage(tmp_path):
+    store = SeriesStore(directory=str(tmp_path), autoload=False)
+    _ingest(store, ('State', 'D1'), _readings('2020-01-01', '2020-12-31', ('s1',)), '2020-01-01', '2020-12-31')
+    _ingest(store, ('State', 'D2'), _readings('2020-01-01', '2020-12-31', ('s2',)), '2020-01-01', '2020-12-31')
+    one_series = store.metrics()['bytes'] // 2
+    store.slice(DATA_TYPE, 's1')        # s1 is now the most recently used
+    store.max_bytes = 2 * one_series + one_series // 2
+
+    _ingest(store, ('State', 'D3'), _readings('2020-01-01', '2020-12-31', ('s3',)), '2020-01-01', '2020-12-31')
+
+    assert sorted(store.stations(DATA_TYPE)) == ['s1', 's3']
+    assert store.metrics()['evictions'] == 1
+    assert store.metrics()['bytes'] <= store.max_bytes
+    assert not store.covers(DATA_TYPE, HIERARCHY, ('State', 'D2'), AGENCY, '2020-01-01', '2020-12-31')
+    assert store.covers(DATA_TYPE, HIERARCHY, ('State', 'D1'), AGENCY, '2020-01-01', '2020-12-31')
+
+
+def test_saved_store_reloads_the_same_readings(tmp_path):
+    store = SeriesStore(directory=str(tmp_path), autoload=False)
+    _ingest(store, ('State', 'D1'), _readings('2020-01-01', '2020-03-31', ('s1', 's2')), '2020-01-01', '2020-03-31')
+    store.save()
+
+    reloaded = SeriesStore(directory=str(tmp_path))
+    assert sorted(reloaded.stations(DATA_TYPE)) == ['s1', 's2']
+    assert reloaded.records(DATA_TYPE, 's2') == store.records(DATA_TYPE, 's2')
+    assert reloaded.covers(DATA_TYPE, HIERARCHY, ('State', 'D1'), AGENCY, '2020-01-01', '2020-03-31')
+
+
+def test_saves_from_two_processes_merge(tmp_path):
+    first = SeriesStore(directory=str(tmp_path), autoload=False)
+    second = SeriesStore(directory=str(tmp_path), autoload=False)
+    # Different string tables: codes must be remapped when merged
+    _ingest(first, ('State', 'D1'), _readings('2020-01-01', '2020-01-31', ('s1',), remark='first'),
+            '2020-01-01', '2020-01-31')
+    _ingest(second, ('State', 'D2'), _readings('2020-01-01', '2020-01-31', ('s2',), remark='second'),
+            '2020-01-01', '2020-01-31')
+    _ingest(second, ('State', 'D1'), _readings('2020-02-01', '2020-02-29', ('s1',), remark='second'),
+            '2020-02-01', '2020-02-29')
+    second.save()
+    first.save()
+
+    reloaded = SeriesStore(directory=str(tmp_path))
+    assert sorted(reloaded.stations(DATA_TYPE)) == ['s1', 's2']
+    records = reloaded.records(DATA_TYPE, 's1')
+    assert len(records) == 60
+    assert {r['remark'] for r in records} == {'first0', 'first1', 'second0', 'second1'}
+    assert {r['remark'] for r in reloaded.records(DATA_TYPE, 's2')} == {'second0', 'second1'}
+    assert reloaded.covers(DATA_TYPE, HIERARCHY, ('State', 'D1'), AGENCY, '2020-01-01', '2020-02-29')